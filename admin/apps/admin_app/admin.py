@@ -3,6 +3,7 @@ from django.utils.html import format_html
 from django.urls import path, reverse
 from django.shortcuts import redirect
 from django.utils import timezone
+from django.db.models import Count, Sum
 from datetime import timedelta
 import logging
 from .models import (
@@ -12,8 +13,13 @@ from .models import (
     Task, TaskTranslation, TaskGenderTarget,
     CompletedTask,
     DailyFreeTask, DailyBonus,
-    Transaction
+    Transaction,
+    TranslationJob, TranslationMemory
 )
+from .catalog import bump_catalog_version
+from .user_cache import bump_user_cache_version
+from .daily_bonus_streak import sync_daily_bonus_streaks
+from .translation_queue import enqueue_task_translation
 
 # Настраиваем logger для отладки
 logger = logging.getLogger(__name__)
@@ -76,12 +82,63 @@ def custom_index(self, request, extra_context=None):
 admin.site.index = custom_index.__get__(admin.site, admin.AdminSite)
 
 
+# ============================================================================
+# Catalog version
+# ============================================================================
+
+class CatalogVersionAdminMixin:
+    """
+    Увеличивает версию справочников после сохранения и удаления объектов,
+    чтобы воркеры бэкенда сбросили кэш справочников
+    """
+    
+    def response_add(self, request, obj, post_url_continue=None):
+        bump_catalog_version()
+        return super().response_add(request, obj, post_url_continue)
+    
+    def response_change(self, request, obj):
+        bump_catalog_version()
+        return super().response_change(request, obj)
+    
+    def response_delete(self, request, obj_display, obj_id):
+        bump_catalog_version()
+        return super().response_delete(request, obj_display, obj_id)
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_catalog_version()
+
+
+class UserCacheVersionAdminMixin:
+    """
+    Увеличивает версию кэша пользователей после сохранения и удаления,
+    чтобы воркеры бэкенда сбросили кэш авторизации (например, чтобы
+    деактивированный пользователь сразу потерял доступ)
+    """
+    
+    def response_add(self, request, obj, post_url_continue=None):
+        bump_user_cache_version()
+        return super().response_add(request, obj, post_url_continue)
+    
+    def response_change(self, request, obj):
+        bump_user_cache_version()
+        return super().response_change(request, obj)
+    
+    def response_delete(self, request, obj_display, obj_id):
+        bump_user_cache_version()
+        return super().response_delete(request, obj_display, obj_id)
+    
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        bump_user_cache_version()
+
+
 # ============================================================================
 # Language Admin
 # ============================================================================
 
 @admin.register(Language)
-class LanguageAdmin(admin.ModelAdmin):
+class LanguageAdmin(CatalogVersionAdminMixin, admin.ModelAdmin):
     verbose_name = 'Язык'
     verbose_name_plural = 'Языки'
     list_display = ['code', 'name', 'is_active', 'created_at']
@@ -100,10 +157,12 @@ class LanguageAdmin(admin.ModelAdmin):
     
     def activate_languages(self, request, queryset):
         queryset.update(is_active=True)
+        bump_catalog_version()
     activate_languages.short_description = 'Активировать выбранные языки'
     
     def deactivate_languages(self, request, queryset):
         queryset.update(is_active=False)
+        bump_catalog_version()
     deactivate_languages.short_description = 'Деактивировать выбранные языки'
 
 
@@ -216,7 +275,7 @@ class UserCategoryInline(admin.TabularInline):
 # ============================================================================
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(UserCacheVersionAdminMixin, admin.ModelAdmin):
     verbose_name = 'Пользователь'
     verbose_name_plural = 'Пользователи'
     list_display = ['tg_id', 'username', 'get_full_name', 'gender', 'language', 'balance', 'wallet_address', 'is_active', 'created_at']
@@ -520,6 +579,7 @@ class UserAdmin(admin.ModelAdmin):
             user.is_active = True
             user.updated_at = timezone.now()
             user.save()
+        bump_user_cache_version()
         self.message_user(request, f"Активировано пользователей: {queryset.count()}")
     activate_users.short_description = 'Активировать выбранных пользователей'
     
@@ -531,6 +591,7 @@ class UserAdmin(admin.ModelAdmin):
             user.is_active = False
             user.updated_at = timezone.now()
             user.save()
+        bump_user_cache_version()
         self.message_user(request, f"Деактивировано пользователей: {queryset.count()}")
     deactivate_users.short_description = 'Деактивировать выбранных пользователей'
     
@@ -624,7 +685,7 @@ class CategoryTranslationInline(admin.TabularInline):
 # ============================================================================
 
 @admin.register(TaskCategory)
-class TaskCategoryAdmin(admin.ModelAdmin):
+class TaskCategoryAdmin(CatalogVersionAdminMixin, admin.ModelAdmin):
     verbose_name = 'Категория заданий'
     verbose_name_plural = 'Категории заданий'
     list_display = ['id', 'get_name', 'slug', 'color', 'is_active', 'created_at']
@@ -809,10 +870,12 @@ class TaskCategoryAdmin(admin.ModelAdmin):
     
     def activate_categories(self, request, queryset):
         queryset.update(is_active=True)
+        bump_catalog_version()
     activate_categories.short_description = 'Активировать выбранные категории'
     
     def deactivate_categories(self, request, queryset):
         queryset.update(is_active=False)
+        bump_catalog_version()
     deactivate_categories.short_description = 'Деактивировать выбранные категории'
 
 
@@ -821,7 +884,7 @@ class TaskCategoryAdmin(admin.ModelAdmin):
 # ============================================================================
 
 @admin.register(CategoryTranslation)
-class CategoryTranslationAdmin(admin.ModelAdmin):
+class CategoryTranslationAdmin(CatalogVersionAdminMixin, admin.ModelAdmin):
     verbose_name = 'Перевод категории'
     verbose_name_plural = 'Переводы категорий'
     list_display = ['category', 'language', 'name']
@@ -912,7 +975,7 @@ class TaskGenderTargetInline(admin.TabularInline):
 # ============================================================================
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(CatalogVersionAdminMixin, admin.ModelAdmin):
     verbose_name = 'Задание'
     verbose_name_plural = 'Задания'
     list_display = ['id', 'get_title', 'category', 'get_gender_targets', 'is_active', 'created_at']
@@ -981,11 +1044,6 @@ class TaskAdmin(admin.ModelAdmin):
         
         # Сохраняем объект
         obj.save()
-        
-        # После сохранения пытаемся автоматически перевести задание
-        # Используем транзакцию Django для гарантии что данные сохранены
-        from django.db import transaction
-        transaction.on_commit(lambda: self._auto_translate_task(obj))
     
     def save_formset(self, request, form, formset, change):
         """Переопределяем сохранение формсета для правильной обработки связанных объектов"""
@@ -1060,24 +1118,20 @@ class TaskAdmin(admin.ModelAdmin):
         
         # Сохраняем изменения в формсете
         formset.save_m2m()
-        
-        # После сохранения переводов пытаемся автоматически перевести задание
-        # если это был формсет с переводами
-        if formset.model == TaskTranslation and form.instance.pk:
-            # Выполняем перевод сразу после сохранения формсета
-            # Используем транзакцию Django для гарантии что данные сохранены
-            from django.db import transaction
-            # Сохраняем ссылку на объект чтобы избежать проблем с замыканием
-            task_id = form.instance.id
-            def translate_after_commit():
-                try:
-                    # Получаем свежий объект из БД
-                    from .models import Task
-                    task = Task.objects.get(pk=task_id)
-                    self._auto_translate_task(task)
-                except Exception as e:
-                    print(f"[Admin] Ошибка при получении задания для перевода: {e}")
-            transaction.on_commit(translate_after_commit)
+    
+    def save_related(self, request, form, formsets, change):
+        """После сохранения переводов ставим задание в очередь автоперевода"""
+        super().save_related(request, form, formsets, change)
+        task = form.instance
+        # Переводим только с русского и только если не хватает en/es
+        if not task.translations.filter(language__code='ru').exists():
+            return
+        if task.translations.filter(language__code__in=['en', 'es']).count() >= 2:
+            return
+        # Задача добавляется в той же транзакции, что и задание: воркер увидит
+        # ее только вместе с сохраненными переводами
+        if enqueue_task_translation(task.id):
+            self.message_user(request, f'Задание #{task.id} поставлено в очередь автоперевода')
     
     def get_title(self, obj):
         """Получаем заголовок из перевода (русский)"""
@@ -1099,86 +1153,13 @@ class TaskAdmin(admin.ModelAdmin):
     
     def activate_tasks(self, request, queryset):
         queryset.update(is_active=True)
+        bump_catalog_version()
     activate_tasks.short_description = 'Активировать выбранные задания'
     
     def deactivate_tasks(self, request, queryset):
         queryset.update(is_active=False)
+        bump_catalog_version()
     deactivate_tasks.short_description = 'Деактивировать выбранные задания'
-    
-    def _auto_translate_task(self, task):
-        """Автоматический перевод задания на другие языки"""
-        try:
-            # Импортируем сервис перевода из бэкенда
-            import sys
-            import os
-            import time
-            backend_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), '..', 'backend')
-            if backend_path not in sys.path:
-                sys.path.insert(0, backend_path)
-            
-            from app.services.translation_service import TranslationService
-            from app.core.database import SessionLocal
-            
-            # Обновляем объект из БД чтобы убедиться что он сохранен
-            task.refresh_from_db()
-            
-            # Получаем русский перевод через Django ORM
-            ru_translation = task.translations.filter(language__code='ru').first()
-            if not ru_translation:
-                print(f"[Admin] Нет русского перевода для задания #{task.id}")
-                return  # Нет русского перевода - не переводим
-            
-            # Проверяем есть ли уже переводы на другие языки
-            en_translation = task.translations.filter(language__code='en').first()
-            es_translation = task.translations.filter(language__code='es').first()
-            
-            # Если есть все переводы - не переводим
-            if en_translation and es_translation:
-                print(f"[Admin] Все переводы уже существуют для задания #{task.id}")
-                return
-            
-            # Небольшая задержка чтобы убедиться что данные сохранены в БД
-            time.sleep(0.2)
-            
-            # Используем сервис перевода из бэкенда
-            db = SessionLocal()
-            try:
-                # Проверяем что задание существует в БД бэкенда
-                from app.models.task import Task as BackendTask
-                from app.core.config import settings as backend_settings
-                print(f"[Admin] Проверяю задание #{task.id} в БД бэкенда (путь: {backend_settings.DATABASE_PATH})")
-                
-                backend_task = db.query(BackendTask).filter(BackendTask.id == task.id).first()
-                if not backend_task:
-                    print(f"[Admin] Задание #{task.id} не найдено в БД бэкенда")
-                    # Пробуем найти все задания для диагностики
-                    all_tasks = db.query(BackendTask).limit(5).all()
-                    print(f"[Admin] Найдено заданий в БД бэкенда: {[t.id for t in all_tasks]}")
-                    return
-                
-                print(f"[Admin] Задание #{task.id} найдено в БД бэкенда, начинаю перевод...")
-                translation_service = TranslationService()
-                translation_service.translate_task(db, task.id, source_lang='ru')
-                print(f"[Admin] Автоматически переведено задание #{task.id}")
-                
-                # Обновляем объект Django чтобы увидеть новые переводы
-                task.refresh_from_db()
-            except Exception as e:
-                print(f"[Admin] Ошибка автоматического перевода задания {task.id}: {e}")
-                import traceback
-                traceback.print_exc()
-                # Не критично - можно добавить переводы вручную
-            finally:
-                db.close()
-        except ImportError as e:
-            # Если не удалось импортировать модули бэкенда - это нормально
-            # Пользователь может добавить переводы вручную
-            print(f"[Admin] Не удалось импортировать модули бэкенда: {e}")
-        except Exception as e:
-            # Другие ошибки - логируем но не прерываем работу
-            print(f"[Admin] Не удалось выполнить автоматический перевод: {e}")
-            import traceback
-            traceback.print_exc()
 
 
 # ============================================================================
@@ -1186,7 +1167,7 @@ class TaskAdmin(admin.ModelAdmin):
 # ============================================================================
 
 @admin.register(TaskTranslation)
-class TaskTranslationAdmin(admin.ModelAdmin):
+class TaskTranslationAdmin(CatalogVersionAdminMixin, admin.ModelAdmin):
     verbose_name = 'Перевод задания'
     verbose_name_plural = 'Переводы заданий'
     list_display = ['task', 'language', 'title']
@@ -1200,7 +1181,7 @@ class TaskTranslationAdmin(admin.ModelAdmin):
 # ============================================================================
 
 @admin.register(TaskGenderTarget)
-class TaskGenderTargetAdmin(admin.ModelAdmin):
+class TaskGenderTargetAdmin(CatalogVersionAdminMixin, admin.ModelAdmin):
     verbose_name = 'Целевая аудитория задания'
     verbose_name_plural = 'Целевые аудитории заданий'
     list_display = ['task', 'gender']
@@ -1208,6 +1189,84 @@ class TaskGenderTargetAdmin(admin.ModelAdmin):
     search_fields = ['task__id']
 
 
+# ============================================================================
+# TranslationJob Admin
+# ============================================================================
+
+@admin.register(TranslationJob)
+class TranslationJobAdmin(admin.ModelAdmin):
+    verbose_name = 'Задача перевода'
+    verbose_name_plural = 'Задачи перевода'
+    # task_id вместо task: Task.__str__ читает перевод (запрос на каждую строку)
+    list_display = ['id', 'task_id', 'status', 'attempts', 'get_error', 'run_after', 'locked_by', 'created_at', 'finished_at']
+    list_filter = ['status']
+    search_fields = ['task__id']
+    readonly_fields = [
+        'id', 'task', 'source_lang', 'status', 'attempts', 'last_error',
+        'run_after', 'locked_by', 'locked_at', 'created_at', 'finished_at'
+    ]
+    actions = ['retry_jobs']
+    
+    def has_add_permission(self, request):
+        # Задачи ставит сохранение задания
+        return False
+    
+    def get_error(self, obj):
+        if obj.last_error and len(obj.last_error) > 80:
+            return obj.last_error[:80] + '...'
+        return obj.last_error or '-'
+    get_error.short_description = 'Последняя ошибка'
+    
+    def retry_jobs(self, request, queryset):
+        """Повтор задач с ошибкой (выполняемые не трогаем)"""
+        updated = queryset.exclude(status='running').update(
+            status='pending', attempts=0, last_error=None, run_after=timezone.now(), finished_at=None
+        )
+        self.message_user(request, f'Поставлено в очередь задач: {updated}')
+    retry_jobs.short_description = 'Перезапустить выбранные задачи'
+
+
+# ============================================================================
+# TranslationMemory Admin
+# ============================================================================
+
+@admin.register(TranslationMemory)
+class TranslationMemoryAdmin(admin.ModelAdmin):
+    verbose_name = 'Перевод из памяти'
+    verbose_name_plural = 'Память переводов'
+    list_display = ['get_source', 'get_translation', 'source_lang', 'target_lang', 'provider', 'hits', 'last_used_at']
+    list_filter = ['provider', 'target_lang']
+    search_fields = ['source_text', 'translated_text']
+    readonly_fields = [
+        'id', 'key', 'provider', 'source_lang', 'target_lang', 'source_text',
+        'translated_text', 'hits', 'created_at', 'last_used_at'
+    ]
+    
+    def has_add_permission(self, request):
+        # Записи добавляет бэкенд при переводе; неверный перевод можно удалить - он переведется заново
+        return False
+    
+    def changelist_view(self, request, extra_context=None):
+        """Под заголовком - доля переводов, взятых из памяти"""
+        stats = TranslationMemory.objects.aggregate(entries=Count('id'), hits=Sum('hits'))
+        entries, hits = stats['entries'], stats['hits'] or 0
+        # Каждая запись - один запрос к API перевода, каждое попадание - сэкономленный запрос
+        rate = hits / (hits + entries) if entries else 0
+        extra_context = extra_context or {}
+        extra_context['subtitle'] = (
+            f'Записей: {entries}, переводов из памяти: {hits} ({rate:.0%} без обращения к API)'
+        )
+        return super().changelist_view(request, extra_context=extra_context)
+    
+    def get_source(self, obj):
+        return obj.source_text[:80] + ('...' if len(obj.source_text) > 80 else '')
+    get_source.short_description = 'Текст'
+    
+    def get_translation(self, obj):
+        return obj.translated_text[:80] + ('...' if len(obj.translated_text) > 80 else '')
+    get_translation.short_description = 'Перевод'
+
+
 # ============================================================================
 # CompletedTask Admin
 # ============================================================================
@@ -1267,6 +1326,27 @@ class DailyBonusAdmin(admin.ModelAdmin):
             'fields': ('claimed_at',)
         }),
     )
+    
+    # Бэкенд считает статус бонуса по daily_bonus_streaks - пересчитываем
+    # серию пользователей, чьи бонусы изменены
+    
+    def save_model(self, request, obj, form, change):
+        user_ids = [obj.user_id]
+        if change:
+            # Бонус мог быть перенесен на другого пользователя
+            user_ids += DailyBonus.objects.filter(pk=obj.pk).values_list('user_id', flat=True)
+        super().save_model(request, obj, form, change)
+        sync_daily_bonus_streaks(user_ids)
+    
+    def delete_model(self, request, obj):
+        user_id = obj.user_id
+        super().delete_model(request, obj)
+        sync_daily_bonus_streaks([user_id])
+    
+    def delete_queryset(self, request, queryset):
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        sync_daily_bonus_streaks(user_ids)
 
 
 # ============================================================================
@@ -1327,7 +1407,7 @@ class TransactionAdmin(admin.ModelAdmin):
 # ============================================================================
 
 @admin.register(UserCategory)
-class UserCategoryAdmin(admin.ModelAdmin):
+class UserCategoryAdmin(UserCacheVersionAdminMixin, admin.ModelAdmin):
     verbose_name = 'Интерес пользователя'
     verbose_name_plural = 'Интересы пользователей'
     list_display = ['user', 'category', 'created_at']
@@ -1,7 +1,12 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
 
 
 class AdminAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.admin_app'
     verbose_name = 'Админка'
+
+    def ready(self):
+        from .sqlite import apply_sqlite_pragmas
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='sparks_sqlite_pragmas')
@@ -0,0 +1,32 @@
+"""
+Версия справочников (таблица catalog_version)
+
+Бэкенд кэширует языки, категории и переводы в памяти каждого воркера
+и сбрасывает кэш, когда версия в catalog_version меняется.
+Поэтому любое изменение справочников через админку должно увеличивать версию.
+"""
+from django.db import connection
+from django.utils import timezone
+
+
+def get_catalog_version():
+    """Текущая версия справочников (0 если строки нет)"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT version FROM catalog_version WHERE id = 1")
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def bump_catalog_version():
+    """Увеличение версии справочников (в текущей транзакции)"""
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE catalog_version SET version = version + 1, updated_at = %s WHERE id = 1",
+            [now]
+        )
+        if cursor.rowcount == 0:
+            cursor.execute(
+                "INSERT INTO catalog_version (id, version, updated_at) VALUES (1, 1, %s)",
+                [now]
+            )
@@ -0,0 +1,48 @@
+"""
+Серия ежедневных бонусов (таблица daily_bonus_streaks)
+
+Бэкенд хранит для каждого пользователя номер дня и дату последнего
+полученного бонуса и считает статус бонуса только по этой строке.
+Поэтому после изменения или удаления бонусов через админку серия
+пересчитывается из daily_bonuses.
+"""
+from django.db import connection
+from django.utils import timezone
+
+
+def get_daily_bonus_streak(user_id):
+    """Серия пользователя: (номер дня, дата последнего бонуса) или None"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT day_number, last_claim_date FROM daily_bonus_streaks WHERE user_id = %s",
+            [user_id]
+        )
+        return cursor.fetchone()
+
+
+def sync_daily_bonus_streaks(user_ids):
+    """
+    Пересчет серии бонусов пользователей из daily_bonuses (в текущей транзакции)
+
+    Серия - последний полученный бонус пользователя; если бонусов не
+    осталось, строка серии удаляется.
+    """
+    user_ids = sorted(set(user_ids))
+    if not user_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM daily_bonus_streaks WHERE user_id IN ({placeholders})",
+            user_ids
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO daily_bonus_streaks (user_id, day_number, last_claim_date, updated_at)
+            SELECT b.user_id, b.day_number, b.date, %s
+            FROM daily_bonuses b
+            WHERE b.user_id IN ({placeholders})
+              AND b.date = (SELECT MAX(latest.date) FROM daily_bonuses latest WHERE latest.user_id = b.user_id)
+            """,
+            [timezone.now()] + user_ids
+        )
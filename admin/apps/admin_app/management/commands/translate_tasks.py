@@ -71,6 +71,8 @@ class Command(BaseCommand):
             else:
                 # Переводим все задания
                 tasks = db.query(Task).all()
+                # Переводы всех заданий из памяти переводов - одним запросом, а не по заданию
+                translation_service.prefetch_tasks(db, [task.id for task in tasks], source_lang='ru')
                 translated_count = 0
                 skipped_count = 0
                 
@@ -128,6 +130,10 @@ class Command(BaseCommand):
                         f'  Пропущено: {skipped_count}'
                     )
                 )
+            
+            if translation_service.memory is not None:
+                translation_service.memory.flush(force=True)
+                self.stdout.write(f'Память переводов: {translation_service.memory.format_stats()}')
         
         except Exception as e:
             self.stdout.write(
@@ -817,3 +817,69 @@ class UserCategory(models.Model):
         except:
             pass
         return f"{self.user.first_name} - {self.category.slug}"
+
+
+# ============================================================================
+# TranslationJob - Очередь автоперевода заданий
+# ============================================================================
+
+class TranslationJob(models.Model):
+    """Задача автоперевода задания (выполняет воркер бэкенда)"""
+    STATUS_CHOICES = [
+        ('pending', 'В очереди'),
+        ('running', 'Выполняется'),
+        ('done', 'Выполнена'),
+        ('failed', 'Ошибка'),
+    ]
+    
+    id = models.AutoField(primary_key=True)
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        db_column='task_id',
+        related_name='translation_jobs',
+        verbose_name='Задание'
+    )
+    source_lang = models.CharField(max_length=10, default='ru', verbose_name='Исходный язык')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='Статус')
+    attempts = models.IntegerField(default=0, verbose_name='Попыток')
+    last_error = models.CharField(max_length=500, null=True, blank=True, verbose_name='Последняя ошибка')
+    run_after = models.DateTimeField(verbose_name='Не раньше')
+    locked_by = models.CharField(max_length=100, null=True, blank=True, verbose_name='Воркер')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='Взята в работу')
+    created_at = models.DateTimeField(null=True, blank=True, verbose_name='Создана')
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name='Завершена')
+    
+    class Meta:
+        db_table = 'translation_jobs'
+        verbose_name = 'Задача перевода'
+        verbose_name_plural = 'Задачи перевода'
+        ordering = ['-id']
+        managed = False
+    
+    def __str__(self):
+        return f"Перевод задания #{self.task_id} ({self.get_status_display()})"
+
+
+class TranslationMemory(models.Model):
+    """Память переводов: перевод строки провайдером (пишет бэкенд)"""
+    id = models.AutoField(primary_key=True)
+    key = models.CharField(max_length=64, unique=True, verbose_name='Ключ')
+    provider = models.CharField(max_length=50, verbose_name='Провайдер')
+    source_lang = models.CharField(max_length=10, verbose_name='Исходный язык')
+    target_lang = models.CharField(max_length=10, verbose_name='Язык перевода')
+    source_text = models.TextField(verbose_name='Текст')
+    translated_text = models.TextField(verbose_name='Перевод')
+    hits = models.IntegerField(default=0, verbose_name='Использований')
+    created_at = models.DateTimeField(verbose_name='Создан')
+    last_used_at = models.DateTimeField(verbose_name='Использован')
+    
+    class Meta:
+        db_table = 'translation_memory'
+        verbose_name = 'Перевод из памяти'
+        verbose_name_plural = 'Память переводов'
+        ordering = ['-last_used_at']
+        managed = False
+    
+    def __str__(self):
+        return f"{self.source_lang} -> {self.target_lang}: {self.source_text[:50]}"
@@ -0,0 +1,18 @@
+"""
+Настройка соединений с SQLite (PRAGMA из settings.SQLITE_PRAGMAS)
+
+Админка, API и планировщик пишут в один файл sparks.db. В режиме WAL
+читатели не блокируют писателя, а busy_timeout заставляет ждать
+освобождения блокировки вместо ошибки "database is locked".
+"""
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """Обработчик сигнала connection_created: выполняет PRAGMA на новом соединении"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
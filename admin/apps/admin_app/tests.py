@@ -1,7 +1,8 @@
 """
 Тесты для админки Django
 """
-from django.test import TestCase, Client
+from django.conf import settings
+from django.test import TestCase, Client, override_settings
 from django.contrib.admin.sites import site
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -17,7 +18,8 @@ from .models import (
     Task, TaskTranslation, TaskGenderTarget,
     CompletedTask,
     DailyFreeTask, DailyBonus,
-    Transaction
+    Transaction,
+    TranslationJob, TranslationMemory
 )
 from .admin import (
     LanguageAdmin,
@@ -31,8 +33,14 @@ from .admin import (
     DailyFreeTaskAdmin,
     DailyBonusAdmin,
     TransactionAdmin,
-    UserCategoryAdmin
+    UserCategoryAdmin,
+    TranslationJobAdmin
 )
+from .catalog import get_catalog_version, bump_catalog_version
+from .user_cache import get_user_cache_version, bump_user_cache_version
+from .daily_bonus_streak import get_daily_bonus_streak
+from .sqlite import apply_sqlite_pragmas
+from .translation_queue import enqueue_task_translation
 
 User = get_user_model()  # Django User для суперпользователя
 # AdminUser - это наша модель пользователя из admin_app
@@ -227,6 +235,19 @@ class AdminTestCase(TestCase):
                     )
                 """)
             
+            # Проверяем и создаем таблицу daily_bonus_streaks
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='daily_bonus_streaks'")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    CREATE TABLE daily_bonus_streaks (
+                        user_id BIGINT PRIMARY KEY,
+                        day_number INTEGER NOT NULL,
+                        last_claim_date DATE NOT NULL,
+                        updated_at DATETIME,
+                        FOREIGN KEY (user_id) REFERENCES users(tg_id) ON DELETE CASCADE
+                    )
+                """)
+            
             # Проверяем и создаем таблицу transactions
             cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='transactions'")
             if cursor.fetchone() is None:
@@ -248,6 +269,68 @@ class AdminTestCase(TestCase):
                         FOREIGN KEY (user_id) REFERENCES users(tg_id)
                     )
                 """)
+            
+            # Проверяем и создаем таблицу catalog_version
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='catalog_version'")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    CREATE TABLE catalog_version (
+                        id INTEGER PRIMARY KEY,
+                        version INTEGER NOT NULL,
+                        updated_at DATETIME
+                    )
+                """)
+                cursor.execute("INSERT INTO catalog_version (id, version) VALUES (1, 1)")
+            
+            # Проверяем и создаем таблицу user_cache_version
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user_cache_version'")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    CREATE TABLE user_cache_version (
+                        id INTEGER PRIMARY KEY,
+                        version INTEGER NOT NULL,
+                        updated_at DATETIME
+                    )
+                """)
+                cursor.execute("INSERT INTO user_cache_version (id, version) VALUES (1, 1)")
+            
+            # Проверяем и создаем таблицу translation_jobs
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='translation_jobs'")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    CREATE TABLE translation_jobs (
+                        id INTEGER PRIMARY KEY,
+                        task_id INTEGER NOT NULL,
+                        source_lang VARCHAR(10) NOT NULL,
+                        status VARCHAR(20) NOT NULL,
+                        attempts INTEGER NOT NULL,
+                        last_error VARCHAR(500),
+                        run_after DATETIME NOT NULL,
+                        locked_by VARCHAR(100),
+                        locked_at DATETIME,
+                        created_at DATETIME,
+                        finished_at DATETIME,
+                        FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE
+                    )
+                """)
+            
+            # Проверяем и создаем таблицу translation_memory
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='translation_memory'")
+            if cursor.fetchone() is None:
+                cursor.execute("""
+                    CREATE TABLE translation_memory (
+                        id INTEGER PRIMARY KEY,
+                        key VARCHAR(64) NOT NULL UNIQUE,
+                        provider VARCHAR(50) NOT NULL,
+                        source_lang VARCHAR(10) NOT NULL,
+                        target_lang VARCHAR(10) NOT NULL,
+                        source_text TEXT NOT NULL,
+                        translated_text TEXT NOT NULL,
+                        hits INTEGER NOT NULL,
+                        created_at DATETIME NOT NULL,
+                        last_used_at DATETIME NOT NULL
+                    )
+                """)
     
     def setup_base_data(self):
         """Создание базовых данных для тестов"""
@@ -347,6 +430,116 @@ class LanguageAdminTest(AdminTestCase):
         self.assertFalse(language.is_active)
 
 
+class CatalogVersionTest(AdminTestCase):
+    """Тесты увеличения версии справочников (инвалидация кэша бэкенда)"""
+    
+    def test_language_create_bumps_version(self):
+        """Сохранение языка через админку увеличивает версию"""
+        version_before = get_catalog_version()
+        url = reverse('admin:admin_app_language_add')
+        self.client.post(url, {
+            'id': 4,
+            'code': 'de',
+            'name': 'Deutsch',
+            'is_active': True
+        })
+        self.assertTrue(Language.objects.filter(code='de').exists())
+        self.assertEqual(get_catalog_version(), version_before + 1)
+    
+    def test_deactivate_languages_action_bumps_version(self):
+        """Действие деактивации языков увеличивает версию"""
+        version_before = get_catalog_version()
+        admin = LanguageAdmin(Language, site)
+        admin.deactivate_languages(None, Language.objects.filter(code='es'))
+        self.assertEqual(get_catalog_version(), version_before + 1)
+    
+    def test_bump_creates_missing_row(self):
+        """Если строки версии нет, она создается"""
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM catalog_version")
+        self.assertEqual(get_catalog_version(), 0)
+        bump_catalog_version()
+        self.assertEqual(get_catalog_version(), 1)
+
+
+class UserCacheVersionTest(AdminTestCase):
+    """Тесты увеличения версии кэша пользователей (инвалидация кэша авторизации бэкенда)"""
+    
+    def create_user(self, tg_id=555000111):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO users (tg_id, username, first_name, last_name, gender, language_id, balance, is_admin, is_active, has_lifetime_subscription, created_at, updated_at)
+                VALUES (%s, 'cached', 'Cached', 'User', 'male', %s, 0, 0, 1, 0, datetime('now'), datetime('now'))
+            """, [tg_id, self.language_ru.id])
+        return tg_id
+    
+    def test_deactivate_users_action_bumps_version(self):
+        """Действие деактивации пользователей увеличивает версию"""
+        tg_id = self.create_user()
+        version_before = get_user_cache_version()
+        url = reverse('admin:admin_app_user_changelist')
+        self.client.post(url, {
+            'action': 'deactivate_users',
+            '_selected_action': [tg_id]
+        })
+        self.assertFalse(AdminUser.objects.get(tg_id=tg_id).is_active)
+        self.assertEqual(get_user_cache_version(), version_before + 1)
+    
+    def test_delete_interests_bumps_version(self):
+        """Удаление интересов пользователя через админку увеличивает версию"""
+        tg_id = self.create_user()
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO task_categories (id, slug, color, is_active, created_at)
+                VALUES (90, 'cached', '#000000', 1, datetime('now'))
+            """)
+            cursor.execute(
+                "INSERT INTO user_categories (user_id, category_id) VALUES (%s, 90)",
+                [tg_id]
+            )
+        version_before = get_user_cache_version()
+        admin = UserCategoryAdmin(UserCategory, site)
+        admin.delete_queryset(None, UserCategory.objects.filter(user_id=tg_id))
+        self.assertFalse(UserCategory.objects.filter(user_id=tg_id).exists())
+        self.assertEqual(get_user_cache_version(), version_before + 1)
+    
+    def test_bump_creates_missing_row(self):
+        """Если строки версии нет, она создается"""
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM user_cache_version")
+        self.assertEqual(get_user_cache_version(), 0)
+        bump_user_cache_version()
+        self.assertEqual(get_user_cache_version(), 1)
+
+
+class SqlitePragmaTest(TestCase):
+    """Тесты профиля PRAGMA для соединений SQLite"""
+    
+    def get_pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+    
+    def test_profile_applied_to_connection(self):
+        """Профиль из settings применяется к соединению админки"""
+        self.assertEqual(self.get_pragma('busy_timeout'), int(settings.SQLITE_PRAGMAS['busy_timeout']))
+        self.assertEqual(self.get_pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self.get_pragma('temp_store'), 2)  # MEMORY
+        self.assertEqual(self.get_pragma('foreign_keys'), 1)
+    
+    def test_apply_custom_profile(self):
+        """apply_sqlite_pragmas берет значения из settings.SQLITE_PRAGMAS"""
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': '1234'}):
+            apply_sqlite_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.get_pragma('busy_timeout'), 1234)
+        
+        # Возвращаем исходное значение (synchronous нельзя менять внутри транзакции теста)
+        busy_timeout = settings.SQLITE_PRAGMAS['busy_timeout']
+        with override_settings(SQLITE_PRAGMAS={'busy_timeout': busy_timeout}):
+            apply_sqlite_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.get_pragma('busy_timeout'), int(busy_timeout))
+
+
 class UserAdminTest(AdminTestCase):
     """Тесты для UserAdmin"""
     
@@ -708,6 +901,106 @@ class TaskAdminTest(AdminTestCase):
         self.assertFalse(task.is_active)
 
 
+class TranslationQueueTest(AdminTestCase):
+    """Сохранение задания только ставит его в очередь автоперевода"""
+    
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO task_categories (id, slug, color, is_active, created_at)
+                VALUES (10, 'test-category', '#FF0000', 1, datetime('now'))
+            """)
+        self.category = TaskCategory.objects.get(slug='test-category')
+    
+    def post_task(self, translations):
+        """Создание задания через форму админки (префиксы формсетов - related_name)"""
+        data = {
+            'category': self.category.id,
+            'is_active': True,
+            'translations-TOTAL_FORMS': str(len(translations)),
+            'translations-INITIAL_FORMS': '0',
+            'translations-MIN_NUM_FORMS': '0',
+            'translations-MAX_NUM_FORMS': '1000',
+            'gender_targets-TOTAL_FORMS': '0',
+            'gender_targets-INITIAL_FORMS': '0',
+            'gender_targets-MIN_NUM_FORMS': '0',
+            'gender_targets-MAX_NUM_FORMS': '1000',
+        }
+        for idx, (language, title) in enumerate(translations):
+            data[f'translations-{idx}-language'] = language.id
+            data[f'translations-{idx}-title'] = title
+            data[f'translations-{idx}-description'] = f'{title} - описание'
+        response = self.client.post(reverse('admin:admin_app_task_add'), data)
+        self.assertEqual(response.status_code, 302, response.content[:500])
+        return Task.objects.get(category=self.category)
+    
+    def test_task_save_enqueues_translation(self):
+        """Задание с русским переводом ставится в очередь, переводы не создаются в запросе"""
+        task = self.post_task([(self.language_ru, 'Тестовая задача')])
+        jobs = TranslationJob.objects.filter(task_id=task.id)
+        self.assertEqual(jobs.count(), 1)
+        self.assertEqual(jobs[0].status, 'pending')
+        self.assertEqual(jobs[0].source_lang, 'ru')
+        self.assertEqual(task.translations.count(), 1)
+    
+    def test_task_without_missing_translations_not_enqueued(self):
+        """Задание без русского перевода или со всеми переводами не ставится в очередь"""
+        self.post_task([(self.language_en, 'Test task')])
+        self.assertEqual(TranslationJob.objects.count(), 0)
+        TaskTranslation.objects.all().delete()
+        Task.objects.all().delete()
+        self.post_task([
+            (self.language_ru, 'Тестовая задача'),
+            (self.language_en, 'Test task'),
+            (self.language_es, 'Tarea'),
+        ])
+        self.assertEqual(TranslationJob.objects.count(), 0)
+    
+    def test_enqueue_deduplicates_pending(self):
+        """Вторая задача для задания с pending задачей не создается"""
+        task = self.post_task([(self.language_ru, 'Тестовая задача')])
+        self.assertFalse(enqueue_task_translation(task.id))
+        TranslationJob.objects.update(status='running')
+        self.assertTrue(enqueue_task_translation(task.id))
+        self.assertEqual(TranslationJob.objects.filter(status='pending').count(), 1)
+    
+    def test_translation_job_list_view(self):
+        """Список задач перевода со статусами"""
+        task = self.post_task([(self.language_ru, 'Тестовая задача')])
+        TranslationJob.objects.update(status='failed', attempts=5, last_error='TranslationError: All translators failed')
+        response = self.client.get(reverse('admin:admin_app_translationjob_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'All translators failed')
+    
+    def test_retry_jobs_action(self):
+        """Перезапуск задачи с ошибкой сбрасывает попытки"""
+        task = self.post_task([(self.language_ru, 'Тестовая задача')])
+        TranslationJob.objects.update(status='failed', attempts=5, last_error='error')
+        job = TranslationJob.objects.get(task_id=task.id)
+        response = self.client.post(reverse('admin:admin_app_translationjob_changelist'), {
+            'action': 'retry_jobs',
+            '_selected_action': [job.id],
+        })
+        self.assertEqual(response.status_code, 302)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.last_error), ('pending', 0, None))
+    
+    def test_translation_memory_list_view(self):
+        """Список памяти переводов с долей переводов без обращения к API"""
+        now = timezone.now()
+        for key, hits in (('a' * 64, 3), ('b' * 64, 0)):
+            TranslationMemory.objects.create(
+                key=key, provider='mymemory', source_lang='ru', target_lang='en',
+                source_text=f'Текст {key[0]}', translated_text=f'Text {key[0]}',
+                hits=hits, created_at=now, last_used_at=now
+            )
+        response = self.client.get(reverse('admin:admin_app_translationmemory_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Text a')
+        self.assertContains(response, 'Записей: 2, переводов из памяти: 3 (60% без обращения к API)')
+
+
 class CompletedTaskAdminTest(AdminTestCase):
     """Тесты для CompletedTaskAdmin"""
     
@@ -804,6 +1097,37 @@ class DailyBonusAdminTest(AdminTestCase):
         url = reverse('admin:admin_app_dailybonus_changelist')
         response = self.client.get(url)
         self.assertEqual(response.status_code, 200)
+    
+    def create_bonus(self, bonus_id, day_number, date):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO daily_bonuses (id, user_id, day_number, bonus_amount, claimed_at, date)
+                VALUES (?, ?, ?, 10, datetime('now'), ?)
+            """, [bonus_id, self.user.tg_id, day_number, date])
+    
+    def test_delete_bonus_resyncs_streak(self):
+        """Удаление последнего бонуса откатывает серию к предыдущему бонусу"""
+        today = timezone.now().date()
+        self.create_bonus(1, 1, today - timedelta(days=1))
+        self.create_bonus(2, 2, today)
+        admin = DailyBonusAdmin(DailyBonus, site)
+        admin.delete_model(None, DailyBonus.objects.get(pk=2))
+        self.assertEqual(get_daily_bonus_streak(self.user.tg_id), (1, today - timedelta(days=1)))
+        admin.delete_queryset(None, DailyBonus.objects.filter(user_id=self.user.tg_id))
+        self.assertIsNone(get_daily_bonus_streak(self.user.tg_id))
+    
+    def test_change_bonus_resyncs_streak(self):
+        """Изменение бонуса через админку пересчитывает серию"""
+        today = timezone.now().date()
+        self.create_bonus(1, 1, today)
+        url = reverse('admin:admin_app_dailybonus_change', args=[1])
+        self.client.post(url, {
+            'user': self.user.tg_id,
+            'day_number': 5,
+            'bonus_amount': 30,
+            'date': today.isoformat(),
+        })
+        self.assertEqual(get_daily_bonus_streak(self.user.tg_id), (5, today))
 
 
 class TransactionAdminTest(AdminTestCase):
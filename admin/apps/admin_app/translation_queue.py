@@ -0,0 +1,35 @@
+"""
+Очередь автоперевода заданий (таблица translation_jobs)
+
+Сохранение задания в админке не переводит его само: внешние API перевода
+отвечают секундами и держали бы запрос. Админка только ставит задачу
+pending, перевод выполняет воркер бэкенда (scripts/translation_worker.py).
+Статус задач виден в разделе "Задачи перевода".
+"""
+from django.db import connection
+from django.utils import timezone
+
+
+def enqueue_task_translation(task_id, source_lang='ru'):
+    """
+    Постановка задания в очередь перевода (в текущей транзакции)
+
+    Если задача pending для задания уже есть, новая не создается - воркер
+    прочитает актуальный текст при выполнении.
+
+    Returns:
+        True, если задача добавлена
+    """
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO translation_jobs (task_id, source_lang, status, attempts, run_after, created_at)
+            SELECT %s, %s, 'pending', 0, %s, %s
+            WHERE NOT EXISTS (
+                SELECT 1 FROM translation_jobs WHERE task_id = %s AND status = 'pending'
+            )
+            """,
+            [task_id, source_lang, now, now, task_id]
+        )
+        return cursor.rowcount > 0
@@ -0,0 +1,33 @@
+"""
+Версия кэша пользователей (таблица user_cache_version)
+
+Бэкенд кэширует пользователей для авторизации запросов в памяти каждого
+воркера и сбрасывает кэш, когда версия в user_cache_version меняется.
+Поэтому любое изменение пользователей через админку (деактивация,
+редактирование, интересы) должно увеличивать версию.
+"""
+from django.db import connection
+from django.utils import timezone
+
+
+def get_user_cache_version():
+    """Текущая версия кэша пользователей (0 если строки нет)"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT version FROM user_cache_version WHERE id = 1")
+        row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def bump_user_cache_version():
+    """Увеличение версии кэша пользователей (в текущей транзакции)"""
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE user_cache_version SET version = version + 1, updated_at = %s WHERE id = 1",
+            [now]
+        )
+        if cursor.rowcount == 0:
+            cursor.execute(
+                "INSERT INTO user_cache_version (id, version, updated_at) VALUES (1, 1, %s)",
+                [now]
+            )
@@ -182,6 +182,31 @@ DATABASES = {
     }
 }
 
+# PRAGMA для каждого соединения с SQLite (тот же профиль, что и в бэкенде,
+# переменные окружения общие). Пустое значение или 0 - значение SQLite по умолчанию
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL').upper()
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000') or 0)
+SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', '65536') or 0)
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', '268435456') or 0)
+SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY').upper()
+
+SQLITE_PRAGMAS = {}
+if SQLITE_BUSY_TIMEOUT_MS:
+    SQLITE_PRAGMAS['busy_timeout'] = str(SQLITE_BUSY_TIMEOUT_MS)
+if SQLITE_JOURNAL_MODE:
+    SQLITE_PRAGMAS['journal_mode'] = SQLITE_JOURNAL_MODE
+if SQLITE_SYNCHRONOUS:
+    SQLITE_PRAGMAS['synchronous'] = SQLITE_SYNCHRONOUS
+if SQLITE_CACHE_SIZE_KB:
+    # Отрицательное значение cache_size - размер в KiB, а не в страницах
+    SQLITE_PRAGMAS['cache_size'] = str(-SQLITE_CACHE_SIZE_KB)
+if SQLITE_MMAP_SIZE:
+    SQLITE_PRAGMAS['mmap_size'] = str(SQLITE_MMAP_SIZE)
+if SQLITE_TEMP_STORE:
+    SQLITE_PRAGMAS['temp_store'] = SQLITE_TEMP_STORE
+SQLITE_PRAGMAS['foreign_keys'] = 'ON'
+
 # Отключаем авто-миграции только для admin_app (таблицы управляются через Alembic)
 # Системные приложения Django (auth, sessions, contenttypes, admin) используют свои миграции
 MIGRATION_MODULES = {
@@ -16,12 +16,17 @@ from app.models import *  # Импортируем все модели
 # this is the Alembic Config object
 config = context.config
 
-# Переопределяем sqlalchemy.url из настроек для SQLite
+# Переопределяем sqlalchemy.url из настроек: та же БД, что у приложения
 from pathlib import Path
-db_path = Path(settings.DATABASE_PATH)
-if not db_path.is_absolute():
-    db_path = Path(__file__).parent.parent / db_path
-config.set_main_option("sqlalchemy.url", f"sqlite:///{db_path}")
+if settings.DATABASE_URL_ASYNC:
+    from app.core.database import DATABASE_URL
+    # % в пароле - интерполяция configparser
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+else:
+    db_path = Path(settings.DATABASE_PATH)
+    if not db_path.is_absolute():
+        db_path = Path(__file__).parent.parent / db_path
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{db_path}")
 
 # Interpret the config file for Python logging.
 if config.config_file_name is not None:
@@ -56,6 +61,9 @@ def run_migrations_online() -> None:
         # Включаем foreign keys для SQLite
         if 'sqlite' in str(connection.engine.url):
             connection.execute(text("PRAGMA foreign_keys=ON"))
+            # В SQLAlchemy 2.0 execute открывает транзакцию; без commit
+            # context.begin_transaction() не станет коммитить миграции
+            connection.commit()
         
         context.configure(
             connection=connection, 
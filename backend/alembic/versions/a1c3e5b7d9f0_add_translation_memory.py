@@ -0,0 +1,37 @@
+"""add translation_memory
+
+Revision ID: a1c3e5b7d9f0
+Revises: f6a8c0e2b4d6
+Create Date: 2026-02-10 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5b7d9f0'
+down_revision = 'f6a8c0e2b4d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('translation_memory',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('provider', sa.String(length=50), nullable=False),
+    sa.Column('source_lang', sa.String(length=10), nullable=False),
+    sa.Column('target_lang', sa.String(length=10), nullable=False),
+    sa.Column('source_text', sa.Text(), nullable=False),
+    sa.Column('translated_text', sa.Text(), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('key')
+    )
+    op.create_index('ix_translation_memory_last_used_at', 'translation_memory', ['last_used_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_translation_memory_last_used_at', table_name='translation_memory')
+    op.drop_table('translation_memory')
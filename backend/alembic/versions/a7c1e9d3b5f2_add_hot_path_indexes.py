@@ -0,0 +1,47 @@
+"""add hot path indexes
+
+Revision ID: a7c1e9d3b5f2
+Revises: f4b8d2a91c3e
+Create Date: 2026-01-27 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'a7c1e9d3b5f2'
+down_revision = 'f4b8d2a91c3e'
+branch_labels = None
+depends_on = None
+
+# completed_tasks(user_id), daily_free_tasks(user_id, date), daily_bonuses(user_id, date)
+# и task_translations(task_id, language_id) уже покрыты уникальными ограничениями
+# uq_completed_task, uq_daily_free_task, uq_daily_bonus и uq_task_translation
+
+PENDING_TON_WHERE = "payment_method = 'TON' AND status = 'PENDING'"
+
+
+def upgrade():
+    # История выполненных заданий: WHERE user_id = ? ORDER BY completed_at DESC
+    op.create_index('ix_completed_tasks_user_completed_at', 'completed_tasks', ['user_id', 'completed_at'], unique=False)
+    # Ежедневный сброс: WHERE date = ?
+    op.create_index('ix_daily_free_tasks_date', 'daily_free_tasks', ['date'], unique=False)
+    # Лента: WHERE is_active AND category_id IN (...) ORDER BY created_at DESC
+    op.create_index('ix_tasks_active_category_created', 'tasks', ['is_active', 'category_id', 'created_at'], unique=False)
+    op.create_index('ix_task_gender_targets_gender_task', 'task_gender_targets', ['gender', 'task_id'], unique=False)
+    # Мониторинг платежей: только pending TON транзакции
+    op.create_index(
+        'ix_transactions_pending_ton',
+        'transactions',
+        ['created_at'],
+        unique=False,
+        sqlite_where=sa.text(PENDING_TON_WHERE),
+        postgresql_where=sa.text(PENDING_TON_WHERE),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_transactions_pending_ton', table_name='transactions')
+    op.drop_index('ix_task_gender_targets_gender_task', table_name='task_gender_targets')
+    op.drop_index('ix_tasks_active_category_created', table_name='tasks')
+    op.drop_index('ix_daily_free_tasks_date', table_name='daily_free_tasks')
+    op.drop_index('ix_completed_tasks_user_completed_at', table_name='completed_tasks')
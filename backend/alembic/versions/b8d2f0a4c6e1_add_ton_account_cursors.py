@@ -0,0 +1,32 @@
+"""add ton_account_cursors
+
+Revision ID: b8d2f0a4c6e1
+Revises: a7c1e9d3b5f2
+Create Date: 2026-01-27 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'b8d2f0a4c6e1'
+down_revision = 'a7c1e9d3b5f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_sqlite = bind.dialect.name == 'sqlite'
+    datetime_type = sa.DateTime() if is_sqlite else sa.DateTime(timezone=True)
+    datetime_default = sa.text('CURRENT_TIMESTAMP') if is_sqlite else sa.text('now()')
+
+    op.create_table('ton_account_cursors',
+    sa.Column('account', sa.String(length=100), nullable=False),
+    sa.Column('last_lt', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', datetime_type, server_default=datetime_default, nullable=True),
+    sa.PrimaryKeyConstraint('account')
+    )
+
+
+def downgrade():
+    op.drop_table('ton_account_cursors')
@@ -0,0 +1,34 @@
+"""add user_cache_version
+
+Revision ID: c5e7a9b1d3f4
+Revises: b8d2f0a4c6e1
+Create Date: 2026-01-28 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'c5e7a9b1d3f4'
+down_revision = 'b8d2f0a4c6e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_sqlite = bind.dialect.name == 'sqlite'
+    datetime_type = sa.DateTime() if is_sqlite else sa.DateTime(timezone=True)
+    datetime_default = sa.text('CURRENT_TIMESTAMP') if is_sqlite else sa.text('now()')
+
+    op.create_table('user_cache_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', datetime_type, server_default=datetime_default, nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Единственная строка с версией кэша пользователей
+    op.execute("INSERT INTO user_cache_version (id, version) VALUES (1, 1)")
+
+
+def downgrade():
+    op.drop_table('user_cache_version')
@@ -0,0 +1,25 @@
+"""add task feed cursor index
+
+Revision ID: d2f6b8a0c4e7
+Revises: c5e7a9b1d3f4
+Create Date: 2026-02-10 00:00:00.000000
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6b8a0c4e7'
+down_revision = 'c5e7a9b1d3f4'
+branch_labels = None
+depends_on = None
+
+# История по курсору (user_id = ? AND (completed_at, id) < (?, ?)) уже покрыта
+# ix_completed_tasks_user_completed_at: в индексе SQLite id (rowid) идет последним
+
+
+def upgrade():
+    # Лента по курсору: WHERE is_active AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+    op.create_index('ix_tasks_active_created', 'tasks', ['is_active', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_tasks_active_created', table_name='tasks')
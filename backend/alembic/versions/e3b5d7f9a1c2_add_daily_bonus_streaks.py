@@ -0,0 +1,42 @@
+"""add daily_bonus_streaks
+
+Revision ID: e3b5d7f9a1c2
+Revises: d2f6b8a0c4e7
+Create Date: 2026-02-01 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'e3b5d7f9a1c2'
+down_revision = 'd2f6b8a0c4e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_sqlite = bind.dialect.name == 'sqlite'
+    datetime_type = sa.DateTime() if is_sqlite else sa.DateTime(timezone=True)
+    datetime_default = sa.text('CURRENT_TIMESTAMP') if is_sqlite else sa.text('now()')
+
+    op.create_table('daily_bonus_streaks',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('day_number', sa.Integer(), nullable=False),
+    sa.Column('last_claim_date', sa.Date(), nullable=False),
+    sa.Column('updated_at', datetime_type, server_default=datetime_default, nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.tg_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Серия каждого пользователя - его последний полученный бонус
+    # (uq_daily_bonus: не больше одного бонуса пользователя за дату)
+    op.execute("""
+        INSERT INTO daily_bonus_streaks (user_id, day_number, last_claim_date)
+        SELECT b.user_id, b.day_number, b.date
+        FROM daily_bonuses b
+        WHERE b.date = (SELECT MAX(latest.date) FROM daily_bonuses latest WHERE latest.user_id = b.user_id)
+    """)
+
+
+def downgrade():
+    op.drop_table('daily_bonus_streaks')
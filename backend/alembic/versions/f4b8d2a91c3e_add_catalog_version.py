@@ -0,0 +1,34 @@
+"""add catalog_version
+
+Revision ID: f4b8d2a91c3e
+Revises: e2a0c8f4c1f5
+Create Date: 2026-01-20 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f4b8d2a91c3e'
+down_revision = 'e2a0c8f4c1f5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_sqlite = bind.dialect.name == 'sqlite'
+    datetime_type = sa.DateTime() if is_sqlite else sa.DateTime(timezone=True)
+    datetime_default = sa.text('CURRENT_TIMESTAMP') if is_sqlite else sa.text('now()')
+
+    op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', datetime_type, server_default=datetime_default, nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Единственная строка с версией справочников
+    op.execute("INSERT INTO catalog_version (id, version) VALUES (1, 1)")
+
+
+def downgrade():
+    op.drop_table('catalog_version')
@@ -0,0 +1,45 @@
+"""add translation_jobs
+
+Revision ID: f6a8c0e2b4d6
+Revises: e3b5d7f9a1c2
+Create Date: 2026-02-03 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'f6a8c0e2b4d6'
+down_revision = 'e3b5d7f9a1c2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    is_sqlite = bind.dialect.name == 'sqlite'
+    datetime_type = sa.DateTime() if is_sqlite else sa.DateTime(timezone=True)
+    datetime_default = sa.text('CURRENT_TIMESTAMP') if is_sqlite else sa.text('now()')
+
+    op.create_table('translation_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('task_id', sa.Integer(), nullable=False),
+    sa.Column('source_lang', sa.String(length=10), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=500), nullable=True),
+    sa.Column('run_after', sa.DateTime(), nullable=False),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', datetime_type, server_default=datetime_default, nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_translation_jobs_status_run_after', 'translation_jobs', ['status', 'run_after'], unique=False)
+    op.create_index('ix_translation_jobs_task_status', 'translation_jobs', ['task_id', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_translation_jobs_task_status', table_name='translation_jobs')
+    op.drop_index('ix_translation_jobs_status_run_after', table_name='translation_jobs')
+    op.drop_table('translation_jobs')
@@ -1,5 +1,5 @@
 # Импорты для удобства
-from app.api.v1 import auth, tasks, profile, categories, languages, payments, admin, daily_bonus
+from app.api.v1 import auth, tasks, profile, categories, languages, payments, admin, daily_bonus, bootstrap, metrics
 
-__all__ = ["auth", "tasks", "profile", "categories", "languages", "payments", "admin", "daily_bonus"]
+__all__ = ["auth", "tasks", "profile", "categories", "languages", "payments", "admin", "daily_bonus", "bootstrap", "metrics"]
 
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from app.core.database import get_db
 from app.core.dependencies import get_current_admin
@@ -18,14 +18,14 @@ class AdminLoginRequest(BaseModel):
 @router.post("/login", response_model=UserResponse)
 async def admin_login(
     data: AdminLoginRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Авторизация администратора"""
     from app.core.dependencies import get_current_admin
     
     try:
         user = await get_current_admin(data.username, data.password, db)
-        return user_to_response(user, db)
+        return await user_to_response(user, db)
     except HTTPException:
         raise
     except Exception as e:
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, Header
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 import secrets
 import hashlib
 from app.core.database import get_db
-from app.core.dependencies import get_current_user_required as get_current_user
+from app.core.dependencies import get_current_user_required as get_current_user, tg_id_from_init_data
 from app.schemas.user import UserCreate, UserResponse
 from app.schemas.auth import (
     TonConnectRequest, 
@@ -15,22 +16,22 @@ from app.schemas.auth import (
 )
 from app.services.user_service import UserService
 from app.services.ton_service import TONService
+from app.services.ton_proof_store import payload_store
+from app.core.config import settings
 from app.models.user import User, Gender
 from app.models.language import Language
 from app.utils.user_utils import user_to_response
 
 router = APIRouter()
 
-# In-memory кэш для payload (в продакшене использовать Redis)
-_payload_cache: dict[str, dict] = {}
-
 
 @router.post("/register", response_model=UserResponse)
 async def register(
     data: UserCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     tg_id_header: Optional[int] = Header(None, alias="X-Telegram-User-ID"),
-    tg_username_header: Optional[str] = Header(None, alias="X-Telegram-Username")
+    tg_username_header: Optional[str] = Header(None, alias="X-Telegram-Username"),
+    init_data: Optional[str] = Header(None, alias="X-Telegram-Init-Data")
 ):
     """
     Регистрация нового пользователя
@@ -38,6 +39,10 @@ async def register(
     Может работать как с tg_id (из Telegram Mini App), так и с wallet_address
     Если есть wallet_address, но нет tg_id - генерируем tg_id из wallet_address
     (только для случаев, когда приложение запущено не в Telegram)
+    
+    tg_id проверяется по X-Telegram-Init-Data, как в get_current_user_required.
+    С TELEGRAM_INIT_DATA_REQUIRED неподписанный wallet_address не дает
+    изменить существующего пользователя с другим tg_id.
     """
     # Используем данные из заголовков если они переданы и не указаны в data
     if tg_id_header and not data.tg_id:
@@ -45,19 +50,27 @@ async def register(
     if tg_username_header and not data.username:
         data.username = tg_username_header
     
+    # Если передан initData, tg_id берется из проверенной подписи
+    data.tg_id = tg_id_from_init_data(init_data, data.tg_id)
+    
+    if settings.TELEGRAM_INIT_DATA_REQUIRED and data.wallet_address:
+        owner = await UserService.get_user(db, User.wallet_address == data.wallet_address)
+        if owner and owner.tg_id != data.tg_id:
+            raise HTTPException(status_code=401, detail="Telegram init data required")
+    
     # Если есть wallet_address, но нет tg_id - генерируем tg_id из wallet_address
     # Это происходит только если приложение запущено не в Telegram Mini App
     if data.wallet_address and not data.tg_id:
         tg_id_hash = int(hashlib.md5(data.wallet_address.encode()).hexdigest()[:15], 16)
         
         # Проверяем что такого tg_id нет
-        while db.query(User).filter(User.tg_id == tg_id_hash).first():
+        while (await db.execute(select(User.tg_id).where(User.tg_id == tg_id_hash))).first():
             tg_id_hash += 1
         
         data.tg_id = tg_id_hash
     
     try:
-        user = UserService.create_user(db, data)
+        user = await UserService.create_user(db, data)
         
         # Обновляем username из заголовков если передан
         # НЕ обновляем tg_id - это первичный ключ и нарушит внешние ключи
@@ -67,13 +80,13 @@ async def register(
             updated = True
         
         if updated:
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            user = await UserService.reload(db, user)
         
         # Формируем ответ
-        return user_to_response(user, db)
+        return await user_to_response(user, db)
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         print(f"[Register] ERROR: {str(e)}")
         import traceback
         traceback.print_exc()
@@ -84,12 +97,16 @@ async def register(
 async def get_me(
     tg_id: Optional[str] = Header(None, alias="X-Telegram-User-ID"),
     wallet_address: Optional[str] = Header(None, alias="X-Wallet-Address"),
-    db: Session = Depends(get_db)
+    init_data: Optional[str] = Header(None, alias="X-Telegram-Init-Data"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Получение текущего пользователя или автоматическая регистрация по tg_id
     
     Если пользователь не найден, но есть tg_id из Telegram - создаем пользователя автоматически
+    
+    tg_id и wallet_address проверяются по X-Telegram-Init-Data, как в
+    get_current_user_required.
     """
     # Сначала пытаемся найти существующего пользователя
     user = None
@@ -98,15 +115,22 @@ async def get_me(
     if wallet_address:
         wallet_address_clean = str(wallet_address).strip()
         if wallet_address_clean:
-            user = db.query(User).options(joinedload(User.interests)).filter(User.wallet_address == wallet_address_clean).first()
+            user = await UserService.get_user(db, User.wallet_address == wallet_address_clean)
+            # Адрес кошелька не подписан - с обязательным initData он не заменяет его
+            if user and settings.TELEGRAM_INIT_DATA_REQUIRED:
+                tg_id_from_init_data(init_data, user.tg_id)
     
     # Если не найден по wallet_address, ищем по tg_id
-    if not user and tg_id:
+    if not user:
+        user_tg_id = None
         try:
-            user_tg_id = int(str(tg_id).strip())
-            user = db.query(User).options(joinedload(User.interests)).filter(User.tg_id == user_tg_id).first()
+            user_tg_id = int(str(tg_id).strip()) if tg_id else None
         except (ValueError, TypeError):
             pass
+        # Если передан initData, tg_id берется из проверенной подписи
+        user_tg_id = tg_id_from_init_data(init_data, user_tg_id)
+        if user_tg_id:
+            user = await UserService.get_user(db, User.tg_id == user_tg_id)
     
     # Если пользователь не найден - возвращаем 404
     # Пользователь должен быть создан через /register после прохождения онбординга
@@ -120,26 +144,23 @@ async def get_me(
     if not user.is_active:
         raise HTTPException(status_code=403, detail="User is not active")
     
-    # Обновляем связи для получения актуальных данных
-    db.refresh(user)
-    
-    return user_to_response(user, db)
+    return await user_to_response(user, db)
 
 
 @router.get("/verify")
 async def verify(
-    tg_id: int
+    tg_id: int,
+    db: AsyncSession = Depends(get_db)
 ):
     """Проверка существования пользователя"""
-    db = next(get_db())
-    user = db.query(User).filter(User.tg_id == tg_id).first()
+    user = await db.get(User, tg_id)
     return {"exists": user is not None, "is_active": user.is_active if user else False}
 
 
 @router.post("/ton/connect", response_model=TonConnectResponse)
 async def ton_connect(
     data: TonConnectRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Авторизация через TON Connect
@@ -151,17 +172,16 @@ async def ton_connect(
         raise HTTPException(status_code=401, detail="Invalid signature")
     
     # Ищем пользователя по wallet_address
-    user = db.query(User).filter(User.wallet_address == data.wallet_address).first()
+    user = await UserService.get_user(db, User.wallet_address == data.wallet_address)
     
-    if user:
-        # Пользователь найден - обновляем данные если нужно
-        db.refresh(user)
-    else:
+    if not user:
         # Создаем нового пользователя
         # Для TON пользователей без Telegram используем дефолтные значения
-        default_language = db.query(Language).filter(Language.code == 'en').first()
+        default_language = (await db.execute(
+            select(Language).where(Language.code == 'en')
+        )).scalars().first()
         if not default_language:
-            default_language = db.query(Language).first()
+            default_language = (await db.execute(select(Language))).scalars().first()
         
         if not default_language:
             raise HTTPException(status_code=500, detail="No default language found")
@@ -171,7 +191,7 @@ async def ton_connect(
         tg_id_hash = int(hashlib.md5(data.wallet_address.encode()).hexdigest()[:15], 16)
         
         # Проверяем что такого tg_id нет
-        while db.query(User).filter(User.tg_id == tg_id_hash).first():
+        while (await db.execute(select(User.tg_id).where(User.tg_id == tg_id_hash))).first():
             tg_id_hash += 1
         
         user = User(
@@ -188,50 +208,33 @@ async def ton_connect(
             has_lifetime_subscription=False
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        user = await UserService.reload(db, user)
     
     # Формируем ответ
     return TonConnectResponse(
         success=True,
-        user=user_to_response(user, db)
+        user=await user_to_response(user, db)
     )
 
 
 @router.post("/ton-proof/generate", response_model=TonProofGenerateResponse)
 async def generate_ton_proof_payload(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Генерация payload для TON Proof
     
     Payload - это случайная строка, которая будет подписана кошельком
     """
-    import time
-    
     # Генерируем случайный payload (32 байта в hex)
     payload = secrets.token_hex(32)
     
-    # Сохраняем payload в кэш с временем жизни (TTL = 20 минут)
-    ttl_seconds = 20 * 60
-    created_at = time.time()
-    _payload_cache[payload] = {
-        "created_at": created_at,
-        "ttl": ttl_seconds
-    }
-    
-    print(f"[TON Proof] Generated payload: {payload[:50]}... (cache size: {len(_payload_cache)})")
-    
-    # Очищаем старые payload из кэша
-    current_time = time.time()
-    expired_keys = [
-        key for key, value in _payload_cache.items()
-        if current_time - value["created_at"] > value["ttl"]
-    ]
-    if expired_keys:
-        print(f"[TON Proof] Cleaning {len(expired_keys)} expired payloads from cache")
-        for key in expired_keys:
-            del _payload_cache[key]
+    # Сохраняем payload в общем хранилище с временем жизни (по умолчанию 20 минут);
+    # истекшие payload удаляет само хранилище
+    await payload_store.put(payload, settings.TON_PROOF_PAYLOAD_TTL)
+    
+    print(f"[TON Proof] Generated payload: {payload[:50]}...")
     
     return TonProofGenerateResponse(payload=payload)
 
@@ -240,7 +243,8 @@ async def generate_ton_proof_payload(
 async def check_ton_proof(
     data: TonProofCheckRequest,
     tg_id: Optional[int] = Header(None, alias="X-Telegram-User-ID"),
-    db: Session = Depends(get_db)
+    init_data: Optional[str] = Header(None, alias="X-Telegram-Init-Data"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Проверка TON Proof и авторизация пользователя
@@ -258,20 +262,14 @@ async def check_ton_proof(
     """
     import time
     
-    # Проверяем что payload существует в кэше
+    # Кошелек привязывается к tg_id - он должен быть подтвержден initData
+    tg_id = tg_id_from_init_data(init_data, tg_id)
+    
+    # Проверяем что payload был выдан и еще не использован
     proof_payload = data.proof.get("payload")
     print(f"[TON Proof] Checking proof for address: {data.address}")
     print(f"[TON Proof] Payload from request: {proof_payload[:50] if proof_payload else None}...")
     print(f"[TON Proof] Payload full length: {len(proof_payload) if proof_payload else 0}")
-    print(f"[TON Proof] Payload cache keys count: {len(_payload_cache)}")
-    
-    # Показываем первые несколько payload из кэша для отладки
-    if _payload_cache:
-        cache_samples = list(_payload_cache.keys())[:3]
-        print(f"[TON Proof] Sample payloads in cache:")
-        for i, cached_payload in enumerate(cache_samples):
-            print(f"[TON Proof]   [{i}] {cached_payload[:50]}... (length: {len(cached_payload)})")
-            print(f"[TON Proof]   [{i}] Match: {cached_payload == proof_payload}")
     
     if not proof_payload:
         print("[TON Proof] ERROR: No payload in proof")
@@ -280,25 +278,16 @@ async def check_ton_proof(
             detail="Invalid proof: missing payload"
         )
     
-    # Проверяем точное совпадение payload
-    if proof_payload not in _payload_cache:
-        print(f"[TON Proof] ERROR: Payload not found in cache")
-        print(f"[TON Proof] Request payload type: {type(proof_payload)}")
+    # Погашаем payload (одноразовое использование): атомарно, поэтому
+    # при повторе того же proof успешен только первый запрос
+    if not await payload_store.pop(proof_payload):
+        print(f"[TON Proof] ERROR: Payload not found in store (unknown, expired or already used)")
         print(f"[TON Proof] Request payload value: {repr(proof_payload[:100])}")
-        
-        # Проверяем есть ли похожие payload (для отладки)
-        similar_payloads = [k for k in _payload_cache.keys() if k.startswith(proof_payload[:10])]
-        if similar_payloads:
-            print(f"[TON Proof] Found similar payloads (first 10 chars match): {len(similar_payloads)}")
-        
         raise HTTPException(
             status_code=401,
             detail="Invalid or expired payload. Please reconnect your wallet."
         )
     
-    # Удаляем использованный payload из кэша (одноразовое использование)
-    del _payload_cache[proof_payload]
-    
     # Для базовой версии упрощаем проверку proof
     # В продакшене нужна реальная криптографическая проверка через Ed25519
     # Проверяем базовые поля proof
@@ -334,22 +323,22 @@ async def check_ton_proof(
     # Сначала ищем по tg_id (приоритет - пользователь уже зарегистрирован)
     if tg_id:
         try:
-            user = db.query(User).filter(User.tg_id == tg_id).first()
+            user = await UserService.get_user(db, User.tg_id == tg_id)
             if user:
                 print(f"[TON Proof] Found user by tg_id: tg_id={user.tg_id}, current wallet_address={user.wallet_address}")
                 # Обновляем wallet_address если он отличается
                 if user.wallet_address != data.address:
                     print(f"[TON Proof] Updating wallet_address: {user.wallet_address} -> {data.address}")
                     user.wallet_address = data.address
-                    db.commit()
-                    db.refresh(user)
+                    await db.commit()
+                    user = await UserService.reload(db, user)
                     print(f"[TON Proof] Wallet address updated successfully")
         except Exception as e:
             print(f"[TON Proof] Error searching by tg_id: {e}")
     
     # Если не найден по tg_id, ищем по wallet_address
     if not user:
-        user = db.query(User).filter(User.wallet_address == data.address).first()
+        user = await UserService.get_user(db, User.wallet_address == data.address)
         if user:
             print(f"[TON Proof] Found user by wallet_address: tg_id={user.tg_id}, wallet_address={user.wallet_address}")
     
@@ -370,11 +359,10 @@ async def check_ton_proof(
     print(f"[TON Proof] Authentication successful for user: tg_id={user.tg_id}, wallet_address={user.wallet_address}")
     
     # Пользователь найден или создан - возвращаем его
-    db.refresh(user)
     print(f"[TON Proof] Authentication successful for wallet: {data.address}")
     return TonProofCheckResponse(
         success=True,
-        user=user_to_response(user, db),
+        user=await user_to_response(user, db),
         token=None,  # Можно добавить JWT токен если нужен
         message="Authentication successful"
     )
@@ -383,13 +371,16 @@ async def check_ton_proof(
 @router.patch("/wallet/disconnect", response_model=UserResponse)
 async def disconnect_wallet(
     tg_id: Optional[int] = Header(None, alias="X-Telegram-User-ID"),
-    db: Session = Depends(get_db)
+    init_data: Optional[str] = Header(None, alias="X-Telegram-Init-Data"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Отключение TON кошелька от профиля пользователя
     
     Устанавливает wallet_address в null для текущего пользователя
     """
+    # Если передан initData, tg_id берется из проверенной подписи
+    tg_id = tg_id_from_init_data(init_data, tg_id)
     if not tg_id:
         raise HTTPException(
             status_code=400,
@@ -397,7 +388,7 @@ async def disconnect_wallet(
         )
     
     # Ищем пользователя по tg_id
-    user = db.query(User).filter(User.tg_id == tg_id).first()
+    user = await UserService.get_user(db, User.tg_id == tg_id)
     
     if not user:
         raise HTTPException(
@@ -407,10 +398,10 @@ async def disconnect_wallet(
     
     # Устанавливаем wallet_address в null
     user.wallet_address = None
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    user = await UserService.reload(db, user)
     
     print(f"[Wallet Disconnect] Wallet disconnected for user: tg_id={user.tg_id}")
     
-    return user_to_response(user, db)
+    return await user_to_response(user, db)
 
@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, Query, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.core.database import get_db
+from app.core.dependencies import get_current_user_required
+from app.schemas.bootstrap import BootstrapResponse
+from app.schemas.task import TaskListResponse, DailyFreeCountResponse
+from app.schemas.transaction import BalanceResponse
+from app.services.task_service import TaskService
+from app.services.user_service import UserService
+from app.services.user_cache import UserSnapshot
+from app.models.user import User
+from app.utils.user_utils import user_to_response
+from app.api.v1.daily_bonus import get_bonus_status
+
+router = APIRouter()
+
+# Разделы ответа в порядке вычисления
+SECTIONS = ("me", "balance", "tasks", "daily_free_count", "daily_bonus")
+
+
+def parse_sections(include: Optional[str]) -> set:
+    """
+    Разделы из параметра include
+
+    Args:
+        include: Разделы через запятую (None или пустая строка - все)
+
+    Returns:
+        Множество названий разделов
+
+    Raises:
+        HTTPException: Если указан неизвестный раздел
+    """
+    if not include or not include.strip():
+        return set(SECTIONS)
+    sections = {name.strip() for name in include.split(",") if name.strip()}
+    unknown = sections.difference(SECTIONS)
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown sections: {', '.join(sorted(unknown))}. Allowed: {', '.join(SECTIONS)}"
+        )
+    return sections
+
+
+@router.get("/", response_model=BootstrapResponse)
+async def get_bootstrap(
+    include: Optional[str] = Query(None, description=f"Разделы через запятую: {', '.join(SECTIONS)} (по умолчанию все)"),
+    limit: int = Query(20, ge=1, le=100, description="limit ленты заданий"),
+    category_id: Optional[int] = Query(None, description="Фильтр ленты по категории"),
+    user: UserSnapshot = Depends(get_current_user_required),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Данные для запуска mini-app одним запросом
+
+    Заменяет /auth/me, /tasks/, /tasks/daily-free-count, /daily-bonus/status
+    и /payments/balance: разделы считаются в одной сессии БД, пользователь
+    и запись о бесплатных заданиях за сегодня читаются один раз. Каждый
+    раздел совпадает с ответом соответствующего эндпоинта.
+    """
+    sections = parse_sections(include)
+    result = BootstrapResponse()
+
+    # Пользователь с интересами нужен только для me; баланс берем из него же
+    if "me" in sections:
+        db_user = await UserService.get_user(db, User.tg_id == user.tg_id)
+        result.me = await user_to_response(db_user, db)
+        balance = db_user.balance
+    elif "balance" in sections:
+        balance = (await db.execute(select(User.balance).where(User.tg_id == user.tg_id))).scalar_one()
+    if "balance" in sections:
+        result.balance = BalanceResponse(balance=balance)
+
+    # Лента и счетчик бесплатных заданий используют одну запись за сегодня
+    if "tasks" in sections or "daily_free_count" in sections:
+        daily_task = await TaskService.get_daily_task(db, user.tg_id)
+        if "tasks" in sections:
+            result.tasks = TaskListResponse(**await TaskService.get_tasks_for_user(
+                db=db,
+                user=user,
+                limit=limit,
+                category_id=category_id,
+                daily_task=daily_task
+            ))
+        if "daily_free_count" in sections:
+            result.daily_free_count = DailyFreeCountResponse(**TaskService.get_daily_free_count(daily_task))
+
+    if "daily_bonus" in sections:
+        result.daily_bonus = await get_bonus_status(db, user)
+
+    return result
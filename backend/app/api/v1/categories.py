@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Header
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.schemas.category import CategoryListResponse, CategoryResponse
-from app.models.task import TaskCategory, CategoryTranslation
-from app.models.language import Language
-from app.models.user import User
+from app.services.user_cache import UserSnapshot
+from app.services.catalog_cache import catalog_cache
+from app.utils.http_cache import cached_response
 
 router = APIRouter()
 
@@ -14,46 +14,45 @@ router = APIRouter()
 @router.get("/", response_model=CategoryListResponse)
 async def get_categories(
     language_code: Optional[str] = Query(None),
-    user: Optional[User] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    user: Optional[UserSnapshot] = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение списка категорий"""
+    """
+    Получение списка категорий
+    
+    Ответ на каждый язык сериализуется один раз на версию справочников и
+    отдается с ETag; при совпадении If-None-Match - 304 без тела.
+    Без language_code язык берется у пользователя, поэтому ответ private.
+    """
     # Определяем язык
     
     if language_code:
-        language = db.query(Language).filter(Language.code == language_code).first()
+        language = await catalog_cache.language_by_code(db, language_code)
     elif user:
-        language = user.language
+        language = await catalog_cache.language(db, user.language_id)
     else:
-        language = db.query(Language).filter(Language.code == 'en').first()
+        language = await catalog_cache.language_by_code(db, 'en')
     
     if not language:
-        language = db.query(Language).filter(Language.code == 'en').first()
-    
-    # Получаем категории
-    categories = db.query(TaskCategory).filter(
-        TaskCategory.is_active == True
-    ).all()
+        language = await catalog_cache.language_by_code(db, 'en')
     
-    result = []
-    for category in categories:
-        # Получаем перевод
-        translation = db.query(CategoryTranslation).filter(
-            CategoryTranslation.category_id == category.id,
-            CategoryTranslation.language_id == language.id
-        ).first()
+    async def build() -> CategoryListResponse:
+        # Получаем категории с названиями на выбранном языке (из кэша справочников)
+        categories = await catalog_cache.active_categories(db, language.id)
         
-        name = category.slug
-        if translation:
-            name = translation.name
+        result = [
+            CategoryResponse(
+                id=category.id,
+                slug=category.slug,
+                name=category.name,
+                color=category.color,
+                is_active=category.is_active
+            )
+            for category in categories
+        ]
         
-        result.append(CategoryResponse(
-            id=category.id,
-            slug=category.slug,
-            name=name,
-            color=category.color,
-            is_active=category.is_active
-        ))
+        return CategoryListResponse(categories=result)
     
-    return CategoryListResponse(categories=result)
-
+    rendered = await catalog_cache.rendered(db, ("categories", language.id), build)
+    return cached_response(rendered, if_none_match, shared=language_code is not None)
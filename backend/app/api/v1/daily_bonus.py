@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, and_, case, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
 import pytz
-from app.core.database import get_db
+from app.core.database import get_db, serialized_write, dialect_insert
 from app.core.dependencies import get_current_user_required as get_current_user
 from app.core.config import settings
 from app.schemas.daily_bonus import DailyBonusStatusResponse, DailyBonusClaimResponse
 from app.models.user import User
-from app.models.daily import DailyBonus
+from app.services.user_cache import UserSnapshot
+from app.models.daily import DailyBonus, DailyBonusStreak
 from app.models.transaction import Transaction, TransactionType, PaymentMethod
 
 router = APIRouter()
@@ -40,140 +43,159 @@ def get_next_reset_time() -> datetime:
     return reset_time
 
 
-def calculate_day_number(db: Session, user: User) -> int:
-    """Вычислить номер дня для пользователя (1-7)"""
-    today = get_moscow_date()
-    
-    # Получаем последний бонус пользователя
-    last_bonus = db.query(DailyBonus).filter(
-        DailyBonus.user_id == user.tg_id
-    ).order_by(DailyBonus.date.desc()).first()
-    
-    if not last_bonus:
+async def get_streak(db: AsyncSession, user_id: int) -> Optional[Tuple[int, date]]:
+    """
+    Серия бонусов пользователя: (номер дня, дата) последнего полученного бонуса
+
+    Одна строка daily_bonus_streaks по первичному ключу, история
+    daily_bonuses не читается.
+    """
+    return (await db.execute(
+        select(DailyBonusStreak.day_number, DailyBonusStreak.last_claim_date)
+        .where(DailyBonusStreak.user_id == user_id)
+    )).first()
+
+
+def calculate_day_number(streak: Optional[Tuple[int, date]], today: date) -> int:
+    """Вычислить номер дня для пользователя (1-7) по серии бонусов"""
+    if not streak:
         # Первый бонус - день 1
         return 1
     
-    # Проверяем, был ли бонус получен вчера
-    yesterday = today - timedelta(days=1)
+    last_day_number, last_claim_date = streak
     
-    if last_bonus.date == yesterday:
-        # Бонус был получен вчера - увеличиваем день
-        next_day = last_bonus.day_number + 1
-        if next_day > 7:
-            # После 7-го дня начинаем заново
-            return 1
-        return next_day
-    elif last_bonus.date == today:
+    if last_claim_date == today - timedelta(days=1):
+        # Бонус был получен вчера - увеличиваем день, после 7-го дня начинаем заново
+        return last_day_number + 1 if last_day_number < 7 else 1
+    elif last_claim_date == today:
         # Бонус уже получен сегодня - возвращаем текущий день
-        return last_bonus.day_number
+        return last_day_number
     else:
         # Пропущен день - начинаем заново с дня 1
         return 1
 
 
-@router.get("/status", response_model=DailyBonusStatusResponse)
-async def get_daily_bonus_status(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Получение статуса ежедневного бонуса"""
+def calculate_claimed_days(streak: Optional[Tuple[int, date]], today: date, day_number: int) -> List[int]:
+    """Номера уже полученных дней текущей серии (для отображения галочек)"""
+    if not streak:
+        # Нет бонусов - пройденных дней нет
+        return []
+    
+    last_claim_date = streak[1]
+    if last_claim_date == today - timedelta(days=1):
+        # Бонус был получен вчера - все дни до текущего пройдены
+        return list(range(1, day_number))
+    elif last_claim_date == today:
+        # Бонус получен сегодня - все дни до текущего включительно пройдены
+        return list(range(1, day_number + 1))
+    # Пропущен день - начинаем заново, пройденных дней нет
+    return []
+
+
+async def get_bonus_status(db: AsyncSession, user: UserSnapshot) -> DailyBonusStatusResponse:
+    """Статус ежедневного бонуса пользователя (используется и в /bootstrap)"""
     today = get_moscow_date()
+    streak = await get_streak(db, user.tg_id)
     
-    # Проверяем, был ли бонус получен сегодня
-    today_bonus = db.query(DailyBonus).filter(
-        DailyBonus.user_id == user.tg_id,
-        DailyBonus.date == today
-    ).first()
-    
-    day_number = calculate_day_number(db, user)
-    bonus_amount = BONUS_AMOUNTS.get(day_number, 10)
-    is_claimed = today_bonus is not None
-    can_claim = not is_claimed
-    
-    # Получаем список всех полученных дней для отображения галочек
-    # Нужно получить все бонусы, которые были получены последовательно (без пропусков)
-    all_bonuses = db.query(DailyBonus).filter(
-        DailyBonus.user_id == user.tg_id
-    ).order_by(DailyBonus.date.desc()).all()
-    
-    claimed_days = []
-    if all_bonuses:
-        yesterday = today - timedelta(days=1)
-        last_bonus = all_bonuses[0]  # Самый последний бонус
-        
-        if last_bonus.date == yesterday:
-            # Бонус был получен вчера - все дни до текущего пройдены
-            # Получаем все последовательные дни до текущего
-            claimed_days = list(range(1, day_number))
-        elif last_bonus.date == today:
-            # Бонус получен сегодня - все дни до текущего включительно пройдены
-            claimed_days = list(range(1, day_number + 1))
-        else:
-            # Пропущен день - начинаем заново, пройденных дней нет
-            claimed_days = []
-    else:
-        # Нет бонусов - пройденных дней нет
-        claimed_days = []
+    day_number = calculate_day_number(streak, today)
+    is_claimed = streak is not None and streak[1] == today
     
     return DailyBonusStatusResponse(
         day_number=day_number,
-        bonus_amount=bonus_amount,
+        bonus_amount=BONUS_AMOUNTS.get(day_number, 10),
         is_claimed=is_claimed,
-        can_claim=can_claim,
+        can_claim=not is_claimed,
         next_reset_at=get_next_reset_time(),
-        claimed_days=claimed_days
+        claimed_days=calculate_claimed_days(streak, today, day_number)
     )
 
 
+@router.get("/status", response_model=DailyBonusStatusResponse)
+async def get_daily_bonus_status(
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Получение статуса ежедневного бонуса"""
+    return await get_bonus_status(db, user)
+
+
 @router.post("/claim", response_model=DailyBonusClaimResponse)
 async def claim_daily_bonus(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение ежедневного бонуса"""
+    """
+    Получение ежедневного бонуса
+    
+    Серия продлевается одним INSERT ... ON CONFLICT DO UPDATE ... WHERE
+    last_claim_date < сегодня RETURNING: запрос сразу вычисляет номер дня,
+    а повторный (в том числе параллельный) запрос за тот же день не
+    изменяет строку и получает 400.
+    """
     today = get_moscow_date()
+    yesterday = today - timedelta(days=1)
     
-    # Проверяем, был ли бонус уже получен сегодня
-    today_bonus = db.query(DailyBonus).filter(
-        DailyBonus.user_id == user.tg_id,
-        DailyBonus.date == today
-    ).first()
-    
-    if today_bonus:
-        raise HTTPException(status_code=400, detail="Бонус уже получен сегодня")
-    
-    # Вычисляем номер дня
-    day_number = calculate_day_number(db, user)
-    bonus_amount = BONUS_AMOUNTS.get(day_number, 10)
-    
-    # Создаем запись о бонусе
-    bonus = DailyBonus(
-        user_id=user.tg_id,
-        day_number=day_number,
-        bonus_amount=bonus_amount,
-        date=today
-    )
-    db.add(bonus)
-    
-    # Обновляем баланс пользователя
-    user.balance += bonus_amount
-    
-    # Создаем транзакцию
-    transaction = Transaction(
-        user_id=user.tg_id,
-        amount=bonus_amount,
-        transaction_type=TransactionType.BONUS,
-        payment_method=PaymentMethod.DAILY_BONUS
-    )
-    db.add(transaction)
-    
-    db.commit()
-    db.refresh(user)
+    async with serialized_write():
+        day_number = (await db.execute(
+            dialect_insert(DailyBonusStreak)
+            .values(user_id=user.tg_id, day_number=1, last_claim_date=today)
+            .on_conflict_do_update(
+                index_elements=["user_id"],
+                set_={
+                    # Бонус получен вчера - следующий день (после 7-го - снова 1), иначе серия сначала
+                    "day_number": case(
+                        (and_(DailyBonusStreak.last_claim_date == yesterday, DailyBonusStreak.day_number < 7),
+                         DailyBonusStreak.day_number + 1),
+                        else_=1
+                    ),
+                    "last_claim_date": today,
+                    "updated_at": func.now()
+                },
+                where=DailyBonusStreak.last_claim_date < today
+            )
+            .returning(DailyBonusStreak.day_number)
+        )).scalar()
+        
+        if day_number is None:
+            # Бонус уже получен сегодня - строка не изменена
+            await db.commit()
+            raise HTTPException(status_code=400, detail="Бонус уже получен сегодня")
+        
+        bonus_amount = BONUS_AMOUNTS.get(day_number, 10)
+        
+        # Создаем запись о бонусе
+        bonus = DailyBonus(
+            user_id=user.tg_id,
+            day_number=day_number,
+            bonus_amount=bonus_amount,
+            date=today
+        )
+        db.add(bonus)
+        
+        # Обновляем баланс пользователя атомарно (снимок пользователя неизменяемый,
+        # а баланс могут менять параллельные запросы)
+        new_balance = (await db.execute(
+            update(User)
+            .where(User.tg_id == user.tg_id)
+            .values(balance=User.balance + bonus_amount)
+            .returning(User.balance)
+            .execution_options(synchronize_session=False)
+        )).scalar_one()
+        
+        # Создаем транзакцию
+        transaction = Transaction(
+            user_id=user.tg_id,
+            amount=bonus_amount,
+            transaction_type=TransactionType.BONUS,
+            payment_method=PaymentMethod.DAILY_BONUS
+        )
+        db.add(transaction)
+        
+        await db.commit()
     
     return DailyBonusClaimResponse(
         success=True,
         bonus_amount=bonus_amount,
-        new_balance=user.balance,
+        new_balance=new_balance,
         day_number=day_number
     )
-
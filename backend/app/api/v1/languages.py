@@ -1,30 +1,39 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.schemas.language import LanguageListResponse, LanguageResponse
-from app.models.language import Language
+from app.services.catalog_cache import catalog_cache
+from app.utils.http_cache import cached_response
 
 router = APIRouter()
 
 
 @router.get("/", response_model=LanguageListResponse)
 async def get_languages(
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение списка доступных языков"""
-    languages = db.query(Language).filter(
-        Language.is_active == True
-    ).all()
+    """
+    Получение списка доступных языков
     
-    return LanguageListResponse(
-        languages=[
-            LanguageResponse(
-                code=lang.code,
-                name=lang.name,
-                is_active=lang.is_active,
-                created_at=lang.created_at
-            )
-            for lang in languages
-        ]
-    )
-
+    Ответ сериализуется один раз на версию справочников и отдается с ETag;
+    при совпадении If-None-Match - 304 без тела.
+    """
+    async def build() -> LanguageListResponse:
+        languages = await catalog_cache.active_languages(db)
+        
+        return LanguageListResponse(
+            languages=[
+                LanguageResponse(
+                    code=lang.code,
+                    name=lang.name,
+                    is_active=lang.is_active,
+                    created_at=lang.created_at
+                )
+                for lang in languages
+            ]
+        )
+    
+    rendered = await catalog_cache.rendered(db, ("languages",), build)
+    return cached_response(rendered, if_none_match)
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import hmac
+from app.core.config import settings
+from app.core.metrics import metrics
+
+router = APIRouter()
+
+
+def check_metrics_token(authorization: Optional[str]) -> None:
+    """
+    Проверка токена /metrics (если задан METRICS_TOKEN)
+
+    Raises:
+        HTTPException: 401, если токен не передан или не совпадает
+    """
+    if not settings.METRICS_TOKEN:
+        return
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not authorization or not hmac.compare_digest(authorization, expected):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Метрики запросов воркера в формате Prometheus"""
+    check_metrics_token(authorization)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@router.get("/metrics/slow-queries", include_in_schema=False)
+async def get_slow_queries(authorization: Optional[str] = Header(None)):
+    """Последние медленные SQL запросы (дольше METRICS_SLOW_QUERY_MS), новые первыми"""
+    check_metrics_token(authorization)
+    return {
+        "threshold_ms": settings.METRICS_SLOW_QUERY_MS,
+        "queries": list(reversed(metrics.slow_samples)),
+    }
@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Header
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.dependencies import get_current_user_required as get_current_user
 from app.schemas.transaction import (
@@ -12,27 +14,32 @@ from app.schemas.transaction import (
 )
 from app.services.payment_service import PaymentService
 from app.models.user import User
+from app.services.user_cache import UserSnapshot
+from app.services.catalog_cache import catalog_cache
+from app.utils.http_cache import cached_response
 
 router = APIRouter()
 
 
 @router.get("/balance", response_model=BalanceResponse)
 async def get_balance(
-    user: User = Depends(get_current_user)
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение баланса пользователя"""
-    return BalanceResponse(balance=user.balance)
+    """Получение баланса пользователя (баланс не кэшируется - читается из БД)"""
+    balance = (await db.execute(select(User.balance).where(User.tg_id == user.tg_id))).scalar_one()
+    return BalanceResponse(balance=balance)
 
 
 @router.post("/ton/create", response_model=TonPaymentCreateResponse)
 async def create_ton_payment(
     data: TonPaymentCreateRequest,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Создание TON платежа"""
     try:
-        result = PaymentService.create_ton_payment(
+        result = await PaymentService.create_ton_payment(
             db=db,
             user=user,
             package_id=data.package_id
@@ -47,8 +54,8 @@ async def create_ton_payment(
 @router.get("/ton/check/{transaction_id}", response_model=TonPaymentStatusResponse)
 async def check_ton_payment(
     transaction_id: int,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Проверка статуса TON платежа"""
     try:
@@ -64,21 +71,33 @@ async def check_ton_payment(
 
 
 @router.get("/packages", response_model=PackageListResponse)
-async def get_packages():
-    """Получение списка пакетов искр"""
-    packages = PaymentService.get_packages()
-    return PackageListResponse(
-        packages=[
-            PackageResponse(
-                id=pkg["id"],
-                amount=pkg["amount"],
-                price=pkg["price"],
-                min_ton_amount=str(pkg.get("min_ton_amount_nanotons", 0)),
-                original_price=pkg.get("original_price"),
-                discount=pkg.get("discount"),
-                title=pkg.get("title"),
-                description=pkg.get("description")
-            )
-            for pkg in packages
-        ]
-    )
+async def get_packages(
+    if_none_match: Optional[str] = Header(None, alias="If-None-Match"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Получение списка пакетов искр
+    
+    Ответ сериализуется один раз (вместе со справочниками) и отдается
+    с ETag; при совпадении If-None-Match - 304 без тела.
+    """
+    async def build() -> PackageListResponse:
+        packages = PaymentService.get_packages()
+        return PackageListResponse(
+            packages=[
+                PackageResponse(
+                    id=pkg["id"],
+                    amount=pkg["amount"],
+                    price=pkg["price"],
+                    min_ton_amount=str(pkg.get("min_ton_amount_nanotons", 0)),
+                    original_price=pkg.get("original_price"),
+                    discount=pkg.get("discount"),
+                    title=pkg.get("title"),
+                    description=pkg.get("description")
+                )
+                for pkg in packages
+            ]
+        )
+    
+    rendered = await catalog_cache.rendered(db, ("packages",), build)
+    return cached_response(rendered, if_none_match)
@@ -1,128 +1,119 @@
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, Response, HTTPException
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.dependencies import get_current_user_required as get_current_user
 from app.schemas.user import UserResponse, UserUpdate, UserInterestsUpdate, UserLanguageUpdate
 from app.schemas.task import TaskResponse
 from app.services.user_service import UserService
 from app.models.user import User
+from app.services.user_cache import UserSnapshot
 from app.utils.user_utils import user_to_response
+from app.services.task_feed import TaskFeedService
 
 router = APIRouter()
 
 
 @router.get("/", response_model=UserResponse)
 async def get_profile(
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Получение профиля пользователя"""
-    db.refresh(user)
-    
-    return user_to_response(user, db)
+    # Профиль содержит баланс и подписку - загружаем пользователя целиком
+    db_user = await UserService.get_user(db, User.tg_id == user.tg_id)
+    return await user_to_response(db_user, db)
 
 
 @router.put("/", response_model=UserResponse)
 async def update_profile(
     data: UserUpdate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновление профиля пользователя"""
+    db_user = await UserService.get_user(db, User.tg_id == user.tg_id)
     if data.first_name is not None:
-        user.first_name = data.first_name
+        db_user.first_name = data.first_name
     if data.last_name is not None:
-        user.last_name = data.last_name
+        db_user.last_name = data.last_name
     
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    db_user = await UserService.reload(db, db_user)
     
-    return user_to_response(user, db)
+    return await user_to_response(db_user, db)
 
 
 @router.put("/interests", response_model=UserResponse)
 async def update_interests(
     data: UserInterestsUpdate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновление интересов пользователя"""
-    user = UserService.update_interests(db, user, data.category_ids)
-    db.refresh(user)
+    db_user = await UserService.get_user(db, User.tg_id == user.tg_id)
+    db_user = await UserService.update_interests(db, db_user, data.category_ids)
     
-    return user_to_response(user, db)
+    return await user_to_response(db_user, db)
 
 
 @router.put("/language", response_model=UserResponse)
 async def update_language(
     data: UserLanguageUpdate,
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
     """Обновление языка пользователя"""
-    user = UserService.update_language(db, user, data.language_code)
-    db.refresh(user)
+    db_user = await UserService.get_user(db, User.tg_id == user.tg_id)
+    db_user = await UserService.update_language(db, db_user, data.language_code)
     
-    return user_to_response(user, db)
+    return await user_to_response(db_user, db)
 
 
 @router.get("/history", response_model=list[TaskResponse])
 async def get_history(
+    response: Response,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
-    user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Значение X-Next-Cursor из предыдущего ответа (вместо offset)"),
+    user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Получение истории выполненных заданий"""
-    from app.models.daily import CompletedTask
-    from app.models.task import Task, TaskTranslation, TaskCategory, CategoryTranslation
+    """
+    Получение истории выполненных заданий
+    
+    Страница (выполнения, переводы заданий и категории) выбирается одним
+    запросом. Курсор следующей страницы возвращается в заголовке
+    X-Next-Cursor (нет заголовка - страниц больше нет). С курсором страница
+    выбирается по индексу (user_id, completed_at) без OFFSET; offset
+    оставлен для совместимости.
+    """
+    try:
+        history, next_cursor = await TaskFeedService.get_history_page(
+            db,
+            user,
+            limit=limit,
+            offset=offset,
+            cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    completed_tasks = db.query(CompletedTask).filter(
-        CompletedTask.user_id == user.tg_id
-    ).order_by(CompletedTask.completed_at.desc()).offset(offset).limit(limit).all()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
-    result = []
-    for ct in completed_tasks:
-        task = ct.task
-        translation = db.query(TaskTranslation).filter(
-            TaskTranslation.task_id == task.id,
-            TaskTranslation.language_id == user.language_id
-        ).first()
-        
-        if not translation:
-            from app.models.language import Language
-            ru_language = db.query(Language).filter(Language.code == 'ru').first()
-            if ru_language:
-                translation = db.query(TaskTranslation).filter(
-                    TaskTranslation.task_id == task.id,
-                    TaskTranslation.language_id == ru_language.id
-                ).first()
-        
-        if not translation:
-            continue
-        
-        category = db.query(TaskCategory).filter(TaskCategory.id == task.category_id).first()
-        category_translation = db.query(CategoryTranslation).filter(
-            CategoryTranslation.category_id == category.id,
-            CategoryTranslation.language_id == user.language_id
-        ).first()
-        
-        category_name = category.slug
-        if category_translation:
-            category_name = category_translation.name
-        
-        result.append(TaskResponse(
+    return [
+        TaskResponse(
             id=task.id,
-            title=translation.title,
-            description=translation.description,
+            title=task.title,
+            description=task.description,
             category={
-                "id": category.id,
-                "name": category_name,
-                "color": category.color
+                "id": task.category_id,
+                "name": task.category_name,
+                "color": task.category_color
             },
             is_free=False,
             is_completed=True
-        ))
-    
-    return result
-
+        )
+        for task in history
+    ]
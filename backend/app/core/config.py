@@ -7,11 +7,23 @@ import os
 class Settings(BaseSettings):
     # Database
     DATABASE_PATH: str = "sparks.db"  # Путь к SQLite файлу
+    DATABASE_URL_ASYNC: Optional[str] = None  # URL для async engine (например, postgresql+asyncpg://...), по умолчанию sqlite+aiosqlite к DATABASE_PATH; синхронный engine и миграции используют ту же БД
+    
+    # SQLite: PRAGMA для каждого соединения (общие с админкой, пусто/0 - значение SQLite по умолчанию)
+    SQLITE_JOURNAL_MODE: str = "WAL"  # WAL - читатели не блокируют писателя и наоборот
+    SQLITE_SYNCHRONOUS: str = "NORMAL"  # В режиме WAL NORMAL безопасен и не делает fsync на каждый commit
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000  # Сколько ждать освобождения блокировки вместо "database is locked"
+    SQLITE_CACHE_SIZE_KB: int = 65536  # Размер page cache на соединение
+    SQLITE_MMAP_SIZE: int = 268435456  # Чтение через mmap (256 МБ)
+    SQLITE_TEMP_STORE: str = "MEMORY"  # Временные таблицы и индексы сортировки в памяти
     
     # Telegram
     TELEGRAM_BOT_TOKEN: str = ""
     APP_URL: str = ""  # URL приложения для бота (например, https://your-app.com)
     ENABLE_TELEGRAM_BOT: bool = True  # Включить/выключить автозапуск бота (для локальной разработки можно установить False)
+    TELEGRAM_INIT_DATA_REQUIRED: bool = False  # Требовать подписанный initData (X-Telegram-Init-Data) для входа по tg_id
+    TELEGRAM_INIT_DATA_MAX_AGE: int = 86400  # Сколько секунд initData действителен после auth_date (0 - без ограничения)
+    TELEGRAM_INIT_DATA_CACHE_SIZE: int = 10000  # Максимум проверенных initData в LRU воркера (0 - без кэша)
     
     # TON
     TON_WALLET_ADDRESS: str = ""  # Адрес кошелька для приема платежей
@@ -20,17 +32,65 @@ class Settings(BaseSettings):
     TON_NETWORK: str = "mainnet"  # mainnet или testnet
     TON_MIN_AMOUNT_NANOTONS: int = 100000000  # Минимальная сумма перевода в nanotons (0.1 TON)
     TON_SIMULATE_PAYMENTS: bool = False  # Симуляция платежей (для тестирования без реальных транзакций)
+    TON_API_TIMEOUT: float = 10.0  # Таймаут запроса к TON API (сек)
+    TON_API_MAX_CONCURRENCY: int = 5  # Максимум одновременных запросов к TON API
+    TON_API_RATE_LIMIT: float = 1.0  # Запросов в секунду на хост (0 - без ограничения; без ключа tonapi.io дает ~1 rps)
+    TON_API_MAX_RETRIES: int = 3  # Повторы при 429/5xx и сетевых ошибках
+    TON_API_RETRY_BACKOFF: float = 0.5  # Базовая задержка перед повтором (сек), удваивается
+    TON_MONITOR_BATCH_SIZE: int = 100  # Сколько pending платежей проверять за один проход мониторинга
+    TON_MONITOR_MODE: str = "hash"  # "hash" - запрос на каждый pending платеж, "account" - входящие переводы на кошелек по курсору lt
+    TON_MONITOR_PAGE_SIZE: int = 100  # Транзакций кошелька на страницу в режиме account
+    TON_MONITOR_MAX_PAGES: int = 10  # Максимум страниц за один проход в режиме account (остальное - в следующий проход)
+    TON_PROOF_STORE: str = "memory"  # Хранилище payload TON Proof: "memory" (один воркер) или "redis" (несколько воркеров/инстансов)
+    TON_PROOF_PAYLOAD_TTL: int = 1200  # Время жизни payload TON Proof (сек)
+    
+    # Redis
+    REDIS_URL: str = "redis://localhost:6379/0"
     
     # MyMemory Translation API
     MYMEMORY_API_KEY: Optional[str] = None
     
+    # Перевод заданий (TranslationService.translate_task)
+    TRANSLATION_LANGUAGE_CONCURRENCY: int = 3  # Языков одного задания, переводимых одновременно
+    TRANSLATION_MYMEMORY_RATE_LIMIT: float = 2.0  # Запросов в секунду к MyMemory на процесс (0 - без ограничения)
+    TRANSLATION_GOOGLE_RATE_LIMIT: float = 5.0  # Запросов в секунду к Google Translate на процесс (0 - без ограничения)
+    TRANSLATION_MEMORY_ENABLED: bool = True  # Брать переводы из памяти переводов (таблица translation_memory)
+    TRANSLATION_MEMORY_MAX_ENTRIES: int = 50000  # Больше записей - давно не использованные удаляются
+    TRANSLATION_MEMORY_LOCAL_TTL: float = 300.0  # Сколько секунд процесс кэширует найденные и отсутствующие переводы (удаление в админке видно не позже)
+    
+    # Очередь автоперевода заданий (scripts/translation_worker.py)
+    TRANSLATION_WORKER_CONCURRENCY: int = 2  # Заданий, переводимых одновременно одним воркером
+    TRANSLATION_WORKER_POLL_INTERVAL: float = 2.0  # Как часто проверять пустую очередь (сек)
+    TRANSLATION_JOB_MAX_ATTEMPTS: int = 5  # Попыток перевода до статуса failed
+    TRANSLATION_JOB_RETRY_BACKOFF: float = 30.0  # Задержка перед повтором (сек), удваивается с каждой попыткой
+    TRANSLATION_JOB_LEASE: int = 600  # Задача running дольше (сек) считается брошенной упавшим воркером и возвращается в очередь
+    
     # Timezone
     TIMEZONE: str = "Europe/Moscow"
     
     # API
     API_V1_PREFIX: str = "/api/v1"
     
-    @field_validator('TON_SIMULATE_PAYMENTS', 'ENABLE_TELEGRAM_BOT', mode='before')
+    # Кэш справочников: как часто (в секундах) воркер сверяет версию справочников в БД
+    CATALOG_CACHE_CHECK_INTERVAL: float = 5.0
+    CATALOG_CACHE_MAX_TASKS: int = 10000  # Максимум переводов заданий (task_id, язык) в кэше воркера, включая несуществующие ID
+    # Cache-Control ответов справочников (категории, языки, пакеты): сколько секунд клиент не перепроверяет ETag (0 - каждый раз)
+    CATALOG_HTTP_MAX_AGE: int = 60
+    
+    # Кэш пользователей для авторизации (X-Telegram-User-ID / X-Wallet-Address)
+    USER_CACHE_TTL: float = 15.0  # Время жизни записи (сек), 0 - кэш выключен; изменения из других воркеров видны не позже
+    USER_CACHE_MAX_SIZE: int = 10000  # Максимум пользователей в кэше воркера
+    USER_CACHE_CHECK_INTERVAL: float = 5.0  # Как часто сверять версию user_cache_version (изменения из админки)
+    
+    # Метрики запросов (SQL запросы, время БД и ответа по маршрутам)
+    METRICS_ENABLED: bool = False  # Собирать метрики и отдавать их на GET /metrics (формат Prometheus)
+    METRICS_SERVER_TIMING: bool = False  # Заголовок Server-Timing (время БД, количество SQL запросов, время ответа)
+    METRICS_SLOW_QUERY_MS: float = 100.0  # SQL запрос дольше порога сохраняется как пример медленного (0 - не сохранять)
+    METRICS_SLOW_QUERY_SAMPLES: int = 50  # Сколько последних медленных запросов хранить (GET /metrics/slow-queries)
+    METRICS_TOKEN: Optional[str] = None  # Если задан, /metrics требует заголовок Authorization: Bearer <token>
+    QUERY_REPEAT_THRESHOLD: int = 0  # Режим разработки: сообщать о запросе одной формы, выполненном столько раз за HTTP запрос (N+1), 0 - выключено
+    
+    @field_validator('TON_SIMULATE_PAYMENTS', 'ENABLE_TELEGRAM_BOT', 'TELEGRAM_INIT_DATA_REQUIRED', 'METRICS_ENABLED', 'METRICS_SERVER_TIMING', mode='before')
     @classmethod
     def parse_bool(cls, v):
         """Парсинг boolean значений из переменных окружения"""
@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Dict
+import asyncio
 import os
 from app.core.config import settings
 
@@ -31,7 +36,41 @@ elif db_path.is_absolute() and not db_path.exists():
         # Если и стандартного пути нет, используем backend/ директорию
         db_path = backend_dir / "sparks.db"
 
-DATABASE_URL = f"sqlite:///{db_path.resolve()}"
+# Синхронный драйвер для async драйвера из DATABASE_URL_ASYNC
+SYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql",
+    "postgresql+psycopg": "postgresql+psycopg",
+}
+
+
+def sync_database_url(async_url: str) -> str:
+    """
+    URL синхронного engine для той же БД, что и async URL
+    
+    Синхронные сессии (скрипты, фоновые задачи, воркер переводов) и async
+    engine API должны работать с одной базой.
+    
+    Raises:
+        ValueError: Для async драйвера неизвестен синхронный
+    """
+    url = make_url(async_url)
+    drivername = SYNC_DRIVERS.get(url.drivername)
+    if drivername is None:
+        raise ValueError(
+            f"DATABASE_URL_ASYNC: unsupported driver {url.drivername!r}, expected one of {', '.join(SYNC_DRIVERS)}"
+        )
+    return url.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+# Async engine для FastAPI роутеров (aiosqlite локально, asyncpg через DATABASE_URL_ASYNC),
+# синхронный engine - к той же БД
+if settings.DATABASE_URL_ASYNC:
+    ASYNC_DATABASE_URL = settings.DATABASE_URL_ASYNC
+    DATABASE_URL = sync_database_url(ASYNC_DATABASE_URL)
+else:
+    ASYNC_DATABASE_URL = f"sqlite+aiosqlite:///{db_path.resolve()}"
+    DATABASE_URL = f"sqlite:///{db_path.resolve()}"
 
 # Создаем engine
 engine = create_engine(
@@ -39,27 +78,112 @@ engine = create_engine(
     echo=False,
     connect_args={
         "check_same_thread": False,  # Нужно для SQLite в многопоточности
-    },
+    } if DATABASE_URL.startswith("sqlite") else {},
     pool_pre_ping=True,
 )
 
-# Включаем foreign keys для SQLite через event listener
-@event.listens_for(engine, "connect")
-def set_sqlite_pragma(dbapi_conn, connection_record):
-    """Включаем поддержку foreign keys в SQLite"""
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    echo=False,
+    pool_pre_ping=True,
+)
+
+
+def sqlite_pragma_profile() -> Dict[str, str]:
+    """
+    Профиль PRAGMA для соединений SQLite из настроек
+
+    busy_timeout идет первым, чтобы переключение journal_mode тоже
+    дожидалось блокировки, а не падало с "database is locked".
+
+    Returns:
+        Упорядоченный словарь {pragma: значение}
+    """
+    pragmas = {}
+    if settings.SQLITE_BUSY_TIMEOUT_MS:
+        pragmas["busy_timeout"] = str(settings.SQLITE_BUSY_TIMEOUT_MS)
+    if settings.SQLITE_JOURNAL_MODE:
+        pragmas["journal_mode"] = settings.SQLITE_JOURNAL_MODE.upper()
+    if settings.SQLITE_SYNCHRONOUS:
+        pragmas["synchronous"] = settings.SQLITE_SYNCHRONOUS.upper()
+    if settings.SQLITE_CACHE_SIZE_KB:
+        # Отрицательное значение cache_size - размер в KiB, а не в страницах
+        pragmas["cache_size"] = str(-settings.SQLITE_CACHE_SIZE_KB)
+    if settings.SQLITE_MMAP_SIZE:
+        pragmas["mmap_size"] = str(settings.SQLITE_MMAP_SIZE)
+    if settings.SQLITE_TEMP_STORE:
+        pragmas["temp_store"] = settings.SQLITE_TEMP_STORE.upper()
+    pragmas["foreign_keys"] = "ON"
+    return pragmas
+
+
+SQLITE_PRAGMAS = sqlite_pragma_profile()
+
+
+def apply_sqlite_pragmas(dbapi_conn, pragmas: Dict[str, str]) -> None:
+    """Выполнение PRAGMA на новом соединении"""
     cursor = dbapi_conn.cursor()
-    cursor.execute("PRAGMA foreign_keys=ON")
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
     cursor.close()
+
+
+# Применяем профиль PRAGMA (WAL, busy_timeout, foreign keys...) через event listener
+def set_sqlite_pragma(dbapi_conn, connection_record):
+    """Настройка нового соединения SQLite по профилю SQLITE_PRAGMAS"""
+    apply_sqlite_pragmas(dbapi_conn, SQLITE_PRAGMAS)
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", set_sqlite_pragma)
+if async_engine.dialect.name == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragma)
+
+# Синхронные сессии - для скриптов, админки и фоновых задач
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронные сессии - для обработчиков API (не блокируют event loop)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 Base = declarative_base()
 
+# SQLite допускает только одного писателя. При сотнях одновременных запросов
+# соединения, ожидающие блокировку записи, опрашивают её (busy_timeout) и часть
+# из них не дожидается. Внутри процесса транзакции записи горячих операций
+# встают в очередь asyncio.Lock; busy_timeout остается для других процессов
+_sqlite_write_lock = asyncio.Lock()
+
+
+@asynccontextmanager
+async def serialized_write():
+    """Очередь транзакций записи внутри процесса (только для SQLite)"""
+    if async_engine.dialect.name != "sqlite":
+        yield
+        return
+    async with _sqlite_write_lock:
+        yield
 
-def get_db():
-    """Dependency для получения сессии БД"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+def dialect_insert(model, bind=None):
+    """
+    INSERT с поддержкой ON CONFLICT для диалекта БД (SQLite или PostgreSQL)
+    
+    Args:
+        model: Модель или таблица
+        bind: Engine/Connection синхронной сессии (db.get_bind()); по умолчанию async_engine
+    """
+    dialect = (bind or async_engine).dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+
+async def get_db():
+    """Dependency для получения асинхронной сессии БД"""
+    async with AsyncSessionLocal() as db:
+        yield db
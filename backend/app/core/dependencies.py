@@ -1,31 +1,82 @@
 from fastapi import Header, HTTPException, Depends, Query
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
+from app.core.config import settings
 from app.core.database import get_db
 from app.models.user import User
 from app.services.user_service import UserService
+from app.services.user_cache import user_cache, UserSnapshot
+from app.utils.telegram import verify_telegram_data
 
 
-def get_current_user_required(
+def tg_id_from_init_data(init_data: Optional[str], tg_id: Optional[int]) -> Optional[int]:
+    """
+    Telegram ID из подписанного initData Telegram WebApp
+    
+    Args:
+        init_data: initData из заголовка X-Telegram-Init-Data
+        tg_id: Telegram ID из X-Telegram-User-ID или query параметра
+        
+    Returns:
+        Telegram ID (из initData, если он передан)
+        
+    Без TELEGRAM_BOT_TOKEN подпись проверить нечем: initData игнорируется
+    и используется tg_id (с TELEGRAM_INIT_DATA_REQUIRED приложение без
+    токена не запускается, см. main.startup_event).
+    
+    Raises:
+        HTTPException: initData не прошел проверку, не совпадает с tg_id
+            или обязателен (TELEGRAM_INIT_DATA_REQUIRED), но не передан
+    """
+    init_data = (init_data or "").strip()
+    if not settings.TELEGRAM_BOT_TOKEN and not settings.TELEGRAM_INIT_DATA_REQUIRED:
+        return tg_id
+    if not init_data:
+        if tg_id and settings.TELEGRAM_INIT_DATA_REQUIRED:
+            raise HTTPException(status_code=401, detail="Telegram init data required")
+        return tg_id
+    
+    data = verify_telegram_data(init_data)
+    if not data or not data.get('tg_id'):
+        raise HTTPException(status_code=401, detail="Invalid Telegram init data")
+    if tg_id and tg_id != data['tg_id']:
+        raise HTTPException(status_code=401, detail="Telegram init data does not match tg_id")
+    return data['tg_id']
+
+
+async def get_current_user_required(
     tg_id: Optional[str] = Header(None, alias="X-Telegram-User-ID"),
     tg_id_query: Optional[int] = Query(None, alias="tg_id"),
     wallet_address: Optional[str] = Header(None, alias="X-Wallet-Address"),
-    db: Session = Depends(get_db)
-) -> User:
+    init_data: Optional[str] = Header(None, alias="X-Telegram-Init-Data"),
+    db: AsyncSession = Depends(get_db)
+) -> UserSnapshot:
     """
     Получение текущего пользователя по tg_id или wallet_address (обязательно)
     
+    Пользователь берется из кэша авторизации (user_cache) - без запросов
+    к БД на повторных запросах. Возвращается неизменяемый снимок: для
+    изменения пользователя его нужно загрузить через UserService.
+    
+    Если передан X-Telegram-Init-Data, tg_id берется из initData после
+    проверки подписи (повторные запросы сессии проверяются по LRU, см.
+    utils/telegram). С TELEGRAM_INIT_DATA_REQUIRED вход по tg_id без
+    initData запрещен, а пользователь, найденный по X-Wallet-Address,
+    должен передать initData своего tg_id.
+    
     Args:
         tg_id: Telegram ID из заголовка X-Telegram-User-ID (строка, будет преобразована в int)
         tg_id_query: Telegram ID из query параметра (альтернатива)
         wallet_address: TON адрес кошелька из заголовка X-Wallet-Address
+        init_data: Подписанный initData Telegram WebApp из заголовка X-Telegram-Init-Data
         db: Сессия БД
         
     Returns:
-        Пользователь
+        Снимок пользователя
         
     Raises:
-        HTTPException: Если ни tg_id ни wallet_address не указаны или пользователь не найден
+        HTTPException: Если ни tg_id ни wallet_address не указаны, пользователь не найден
+            или initData не прошел проверку
     """
     user = None
     
@@ -33,10 +84,13 @@ def get_current_user_required(
     if wallet_address:
         wallet_address_clean = str(wallet_address).strip()
         if wallet_address_clean:
-            user = db.query(User).options(joinedload(User.interests)).filter(User.wallet_address == wallet_address_clean).first()
+            user = await user_cache.get_by_wallet(db, wallet_address_clean)
             if user:
                 if not user.is_active:
                     raise HTTPException(status_code=403, detail="User is not active")
+                # Адрес кошелька не подписан - с обязательным initData он не заменяет его
+                if settings.TELEGRAM_INIT_DATA_REQUIRED:
+                    tg_id_from_init_data(init_data, user.tg_id)
                 return user
     
     # Если не найден по wallet_address, ищем по tg_id
@@ -53,8 +107,11 @@ def get_current_user_required(
     # Используем tg_id из заголовка или из query параметра
     user_tg_id = user_tg_id or tg_id_query
     
+    # Если передан initData, tg_id берется из проверенной подписи
+    user_tg_id = tg_id_from_init_data(init_data, user_tg_id)
+    
     if user_tg_id:
-        user = db.query(User).options(joinedload(User.interests)).filter(User.tg_id == user_tg_id).first()
+        user = await user_cache.get_by_tg_id(db, user_tg_id)
         if user:
             if not user.is_active:
                 raise HTTPException(status_code=403, detail="User is not active")
@@ -74,19 +131,25 @@ async def get_current_user(
     tg_id: Optional[str] = Header(None, alias="X-Telegram-User-ID"),
     tg_id_query: Optional[int] = Query(None, alias="tg_id"),
     wallet_address: Optional[str] = Header(None, alias="X-Wallet-Address"),
-    db: Session = Depends(get_db)
-) -> Optional[User]:
+    init_data: Optional[str] = Header(None, alias="X-Telegram-Init-Data"),
+    db: AsyncSession = Depends(get_db)
+) -> Optional[UserSnapshot]:
     """
     Получение текущего пользователя по tg_id или wallet_address (опционально)
     
+    Как get_current_user_required, пользователь берется из кэша авторизации,
+    tg_id - из X-Telegram-Init-Data, если он передан; с
+    TELEGRAM_INIT_DATA_REQUIRED initData проверяется и для X-Wallet-Address.
+    
     Args:
         tg_id: Telegram ID из заголовка X-Telegram-User-ID (строка, будет преобразована в int)
         tg_id_query: Telegram ID из query параметра (альтернатива)
         wallet_address: TON адрес кошелька из заголовка X-Wallet-Address
+        init_data: Подписанный initData Telegram WebApp из заголовка X-Telegram-Init-Data
         db: Сессия БД
         
     Returns:
-        Пользователь или None если не указан ни tg_id ни wallet_address
+        Снимок пользователя или None если не указан ни tg_id ни wallet_address
         
     Raises:
         HTTPException: Если пользователь не найден или неактивен
@@ -97,10 +160,15 @@ async def get_current_user(
     if wallet_address:
         wallet_address_clean = str(wallet_address).strip()
         if wallet_address_clean:
-            user = db.query(User).options(joinedload(User.interests)).filter(User.wallet_address == wallet_address_clean).first()
+            user = await user_cache.get_by_wallet(db, wallet_address_clean)
             if user:
                 if not user.is_active:
                     return None
+                if settings.TELEGRAM_INIT_DATA_REQUIRED:
+                    try:
+                        tg_id_from_init_data(init_data, user.tg_id)
+                    except HTTPException:
+                        return None
                 return user
     
     # Если не найден по wallet_address, ищем по tg_id
@@ -118,8 +186,14 @@ async def get_current_user(
     # Используем tg_id из заголовка или из query параметра
     user_tg_id = user_tg_id or tg_id_query
     
+    # Если передан initData, tg_id берется из проверенной подписи
+    try:
+        user_tg_id = tg_id_from_init_data(init_data, user_tg_id)
+    except HTTPException:
+        return None
+    
     if user_tg_id:
-        user = db.query(User).options(joinedload(User.interests)).filter(User.tg_id == user_tg_id).first()
+        user = await user_cache.get_by_tg_id(db, user_tg_id)
         if user:
             if not user.is_active:
                 return None
@@ -131,7 +205,7 @@ async def get_current_user(
 async def get_current_admin(
     username: str,
     password: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """
     Получение администратора по username и password
@@ -147,10 +221,11 @@ async def get_current_admin(
     Raises:
         HTTPException: Если данные невалидны
     """
-    user = db.query(User).filter(
+    user = await UserService.get_user(
+        db,
         User.username == username,
         User.is_admin == True
-    ).first()
+    )
     
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -0,0 +1,319 @@
+"""
+Метрики запросов API: количество SQL запросов, время БД и время ответа
+
+MetricsMiddleware (чистый ASGI) заводит на каждый HTTP запрос RequestStats
+в contextvar, а обработчики событий SQLAlchemy (install_sql_hooks) считают
+в нем SQL запросы и их время. После ответа статистика попадает в реестр
+metrics по маршруту (шаблон пути, например /api/v1/tasks/{task_id}) и
+отдается в формате Prometheus (GET /metrics). Запросы дольше
+METRICS_SLOW_QUERY_MS сохраняются как примеры медленных запросов.
+
+С METRICS_SERVER_TIMING ответ получает заголовок Server-Timing
+(db - время и количество SQL запросов, app - время ответа).
+
+С QUERY_REPEAT_THRESHOLD > 0 (режим разработки) middleware считает
+отпечатки запросов (query_budget.fingerprint) и сообщает о HTTP запросах,
+в которых запрос одной формы выполнен не меньше порога раз (N+1).
+
+Если METRICS_ENABLED, METRICS_SERVER_TIMING и QUERY_REPEAT_THRESHOLD
+выключены, middleware и обработчики событий не подключаются и ничего не стоят.
+
+Реестр хранится в памяти воркера: при нескольких воркерах uvicorn каждый
+отдает свои метрики.
+"""
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Deque, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from app.core.config import settings
+from app.core.query_budget import fingerprint, repeated_statements, format_repeats
+
+# Границы гистограмм: время ответа (сек) и SQL запросов на HTTP запрос
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Метка маршрута для запросов, не попавших ни в один маршрут (404)
+UNMATCHED_ROUTE = "<unmatched>"
+
+# Длина SQL в примере медленного запроса
+SLOW_STATEMENT_MAX_LENGTH = 1000
+
+
+class Histogram:
+    """Гистограмма Prometheus с фиксированными границами"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Пары (le, накопленное количество), включая +Inf"""
+        result = []
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((_format_number(bound), total))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class RouteMetrics:
+    """Метрики одного маршрута (метод + шаблон пути)"""
+    __slots__ = (
+        "responses", "latency", "statements", "statements_total", "db_seconds", "slow_queries", "repeated_requests"
+    )
+
+    def __init__(self):
+        self.responses: Dict[int, int] = {}  # статус -> количество ответов
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.statements_total = 0
+        self.db_seconds = 0.0
+        self.slow_queries = 0
+        self.repeated_requests = 0  # HTTP запросы с повторами запроса одной формы (N+1)
+
+
+class RequestStats:
+    """SQL запросы одного HTTP запроса"""
+    __slots__ = ("statements", "db_seconds", "slow", "fingerprints", "repeats")
+
+    def __init__(self, fingerprints: bool = False):
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slow: List[Tuple[str, float]] = []  # (SQL, секунды)
+        # Отпечатки запросов - только в режиме поиска N+1
+        self.fingerprints: Optional[Counter] = Counter() if fingerprints else None
+        self.repeats: List[Tuple[str, int]] = []
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик воркера
+
+    Args:
+        slow_query_seconds: Порог медленного SQL запроса (0 - не собирать примеры)
+        slow_query_samples: Сколько последних медленных запросов хранить
+    """
+
+    def __init__(self, slow_query_seconds: float = 0.1, slow_query_samples: int = 50):
+        self.slow_query_seconds = slow_query_seconds
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.slow_samples: Deque[Dict] = deque(maxlen=slow_query_samples)
+
+    def observe(self, method: str, route: str, status: int, stats: RequestStats, seconds: float) -> None:
+        """Учет завершенного HTTP запроса"""
+        key = (method, route)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        metrics.responses[status] = metrics.responses.get(status, 0) + 1
+        metrics.latency.observe(seconds)
+        metrics.statements.observe(stats.statements)
+        metrics.statements_total += stats.statements
+        metrics.db_seconds += stats.db_seconds
+        if stats.repeats:
+            metrics.repeated_requests += 1
+        if stats.slow:
+            metrics.slow_queries += len(stats.slow)
+            for statement, duration in stats.slow:
+                self.slow_samples.append({
+                    "method": method,
+                    "route": route,
+                    "duration_ms": round(duration * 1000, 2),
+                    "statement": statement[:SLOW_STATEMENT_MAX_LENGTH],
+                    "at": time.time(),
+                })
+
+    def clear(self) -> None:
+        self.routes.clear()
+        self.slow_samples.clear()
+
+    def render(self) -> str:
+        """Метрики в текстовом формате Prometheus (0.0.4)"""
+        lines = []
+        routes = sorted(self.routes.items())
+
+        lines.append("# HELP sparks_http_requests_total HTTP responses by route and status.")
+        lines.append("# TYPE sparks_http_requests_total counter")
+        for (method, route), metrics in routes:
+            for status, count in sorted(metrics.responses.items()):
+                lines.append(f"sparks_http_requests_total{_labels(method, route, status=str(status))} {count}")
+
+        lines.append("# HELP sparks_http_request_duration_seconds HTTP request latency.")
+        lines.append("# TYPE sparks_http_request_duration_seconds histogram")
+        for (method, route), metrics in routes:
+            _render_histogram(lines, "sparks_http_request_duration_seconds", method, route, metrics.latency)
+
+        lines.append("# HELP sparks_db_statements_per_request SQL statements executed per HTTP request.")
+        lines.append("# TYPE sparks_db_statements_per_request histogram")
+        for (method, route), metrics in routes:
+            _render_histogram(lines, "sparks_db_statements_per_request", method, route, metrics.statements)
+
+        lines.append("# HELP sparks_db_statements_total SQL statements executed by route.")
+        lines.append("# TYPE sparks_db_statements_total counter")
+        for (method, route), metrics in routes:
+            lines.append(f"sparks_db_statements_total{_labels(method, route)} {metrics.statements_total}")
+
+        lines.append("# HELP sparks_db_duration_seconds_total Time spent executing SQL statements by route.")
+        lines.append("# TYPE sparks_db_duration_seconds_total counter")
+        for (method, route), metrics in routes:
+            lines.append(f"sparks_db_duration_seconds_total{_labels(method, route)} {_format_number(metrics.db_seconds)}")
+
+        lines.append("# HELP sparks_db_slow_statements_total SQL statements slower than METRICS_SLOW_QUERY_MS by route.")
+        lines.append("# TYPE sparks_db_slow_statements_total counter")
+        for (method, route), metrics in routes:
+            lines.append(f"sparks_db_slow_statements_total{_labels(method, route)} {metrics.slow_queries}")
+
+        lines.append("# HELP sparks_db_repeated_statements_total HTTP requests repeating one SQL statement shape "
+                     "at least QUERY_REPEAT_THRESHOLD times (N+1).")
+        lines.append("# TYPE sparks_db_repeated_statements_total counter")
+        for (method, route), metrics in routes:
+            lines.append(f"sparks_db_repeated_statements_total{_labels(method, route)} {metrics.repeated_requests}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_number(value) -> str:
+    """Число для формата Prometheus (целые без дробной части)"""
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(method: str, route: str, **extra: str) -> str:
+    labels = {"method": method, "route": route, **extra}
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _render_histogram(lines: List[str], name: str, method: str, route: str, histogram: Histogram) -> None:
+    for le, count in histogram.cumulative():
+        lines.append(f"{name}_bucket{_labels(method, route, le=le)} {count}")
+    lines.append(f"{name}_sum{_labels(method, route)} {_format_number(histogram.sum)}")
+    lines.append(f"{name}_count{_labels(method, route)} {histogram.count}")
+
+
+# Статистика текущего HTTP запроса (None вне запроса: фоновые задачи, скрипты)
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("sparks_request_stats", default=None)
+
+metrics = MetricsRegistry(
+    slow_query_seconds=settings.METRICS_SLOW_QUERY_MS / 1000,
+    slow_query_samples=settings.METRICS_SLOW_QUERY_SAMPLES
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    if stats is None:
+        return
+    started = conn.info.get("metrics_query_start")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats.statements += 1
+    stats.db_seconds += elapsed
+    if metrics.slow_query_seconds and elapsed >= metrics.slow_query_seconds:
+        stats.slow.append((statement, elapsed))
+    if stats.fingerprints is not None:
+        stats.fingerprints[fingerprint(statement)] += 1
+
+
+def install_sql_hooks(sync_engine) -> None:
+    """Подключение счетчиков SQL запросов к engine (async_engine.sync_engine)"""
+    if not event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def server_timing(stats: RequestStats, seconds: float) -> str:
+    """Значение заголовка Server-Timing"""
+    return (
+        f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.statements} queries", '
+        f"app;dur={seconds * 1000:.2f}"
+    )
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: SQL запросы, время БД и время ответа по маршрутам
+
+    Args:
+        app: ASGI приложение
+        record: Записывать метрики в реестр metrics (для /metrics)
+        server_timing: Добавлять заголовок Server-Timing
+        repeat_threshold: Сообщать о запросах одной формы, выполненных
+            не меньше стольких раз за HTTP запрос (0 - не искать N+1)
+    """
+
+    def __init__(self, app, record: bool = True, server_timing: bool = False, repeat_threshold: int = 0):
+        self.app = app
+        self.record = record
+        self.server_timing = server_timing
+        self.repeat_threshold = repeat_threshold
+        self._route_paths: Optional[Dict] = None
+
+    def route_label(self, scope) -> str:
+        """Шаблон пути маршрута по endpoint, который выбрал роутер"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._route_paths is None:
+            # Маршруты окончательно известны только после подключения всех роутеров
+            self._route_paths = {
+                route.endpoint: route.path
+                for route in scope["app"].routes
+                if getattr(route, "endpoint", None) is not None
+            }
+        return self._route_paths.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(fingerprints=self.repeat_threshold > 0)
+        token = _current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    value = server_timing(stats, time.perf_counter() - started)
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", value.encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            if stats.fingerprints:
+                stats.repeats = repeated_statements(stats.fingerprints, self.repeat_threshold)
+                if stats.repeats:
+                    print(f"[N+1] {scope['method']} {self.route_label(scope)}: {format_repeats(stats.repeats)}")
+            if self.record:
+                metrics.observe(
+                    scope["method"], self.route_label(scope), status, stats, time.perf_counter() - started
+                )
@@ -0,0 +1,180 @@
+"""
+Поиск N+1 и бюджет SQL запросов
+
+fingerprint() приводит SQL запрос к форме без значений (литералы и
+параметры - ?, списки IN - одно (?...)), поэтому запросы одной формы,
+выполненные в цикле по строкам, получают одинаковый отпечаток.
+
+- count_queries() - сбор SQL запросов engine в блоке кода
+- assert_max_queries() / query_budget() - бюджет запросов для проверок
+  (скрипты scripts/check_*, pytest): QueryBudgetExceeded, если запросов
+  больше max_queries или запрос одной формы повторяется больше max_repeats раз
+- QUERY_REPEAT_THRESHOLD > 0 включает режим разработки: MetricsMiddleware
+  считает отпечатки запросов каждого HTTP запроса и сообщает о повторах
+  (print и счетчик sparks_db_repeated_statements_total в /metrics)
+"""
+import functools
+import inspect
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import event
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|:\w+|%s")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+# Длина SQL в отчетах о повторах
+REPORT_STATEMENT_MAX_LENGTH = 200
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Форма SQL запроса без значений
+
+    Args:
+        statement: SQL запрос (как в before_cursor_execute)
+
+    Returns:
+        Запрос с литералами и параметрами, замененными на ?, и списками
+        (?, ?, ...) неважной длины, свернутыми в (?...)
+    """
+    result = _STRING.sub("?", statement)
+    result = _PARAMETER.sub("?", result)
+    result = _NUMBER.sub("?", result)
+    result = _IN_LIST.sub("(?...)", result)
+    return _SPACES.sub(" ", result).strip()
+
+
+def repeated_statements(fingerprints: Counter, threshold: int) -> List[Tuple[str, int]]:
+    """Формы запросов, выполненные не меньше threshold раз (сначала самые частые)"""
+    return [(shape, count) for shape, count in fingerprints.most_common() if count >= threshold]
+
+
+def format_repeats(repeats: List[Tuple[str, int]]) -> str:
+    return "; ".join(f"{count} x {shape[:REPORT_STATEMENT_MAX_LENGTH]}" for shape, count in repeats)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Превышен бюджет SQL запросов (AssertionError - падает как проверка в pytest)"""
+
+
+class QueryLog:
+    """SQL запросы, выполненные внутри count_queries()"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self.fingerprints: Counter = Counter()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def max_repeats(self) -> int:
+        """Сколько раз выполнена самая частая форма запроса"""
+        return self.fingerprints.most_common(1)[0][1] if self.fingerprints else 0
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return repeated_statements(self.fingerprints, threshold)
+
+    def clear(self) -> None:
+        self.statements.clear()
+        self.fingerprints.clear()
+
+
+def _default_engine():
+    from app.core.database import async_engine
+    return async_engine.sync_engine
+
+
+@contextmanager
+def count_queries(engine=None) -> Iterator[QueryLog]:
+    """
+    Сбор SQL запросов engine внутри блока
+
+    Args:
+        engine: Engine (для AsyncEngine - его sync_engine), по умолчанию async_engine API
+
+    Yields:
+        QueryLog, который заполняется по мере выполнения запросов
+    """
+    engine = engine if engine is not None else _default_engine()
+    log = QueryLog()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        log.statements.append(statement)
+        log.fingerprints[fingerprint(statement)] += 1
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield log
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def check_budget(log: QueryLog, max_queries: Optional[int] = None, max_repeats: Optional[int] = None,
+                 label: str = "") -> None:
+    """
+    Проверка собранных запросов на бюджет
+
+    Raises:
+        QueryBudgetExceeded: Запросов больше max_queries или форма запроса
+            повторяется больше max_repeats раз
+    """
+    prefix = f"{label}: " if label else ""
+    if max_queries is not None and log.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{prefix}{log.count} SQL запросов, бюджет {max_queries}. "
+            f"Повторы: {format_repeats(log.repeated(2)) or 'нет'}"
+        )
+    if max_repeats is not None and log.max_repeats > max_repeats:
+        raise QueryBudgetExceeded(
+            f"{prefix}запрос одной формы выполнен {log.max_repeats} раз, допускается {max_repeats} "
+            f"(N+1): {format_repeats(log.repeated(max_repeats + 1))}"
+        )
+
+
+@contextmanager
+def assert_max_queries(max_queries: Optional[int] = None, max_repeats: Optional[int] = None,
+                       engine=None, label: str = "") -> Iterator[QueryLog]:
+    """
+    Бюджет SQL запросов блока кода
+
+    with assert_max_queries(3, max_repeats=1):
+        await tasks_api.get_task(...)
+
+    Raises:
+        QueryBudgetExceeded: При выходе из блока, если бюджет превышен
+    """
+    with count_queries(engine) as log:
+        yield log
+    check_budget(log, max_queries, max_repeats, label)
+
+
+def query_budget(max_queries: Optional[int] = None, max_repeats: Optional[int] = None, engine=None):
+    """
+    Декоратор: бюджет SQL запросов функции (синхронной или async)
+
+    @query_budget(max_queries=5, max_repeats=1)
+    async def test_history(client): ...
+    """
+    def decorator(func):
+        label = func.__qualname__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with assert_max_queries(max_queries, max_repeats, engine, label):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with assert_max_queries(max_queries, max_repeats, engine, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
@@ -2,14 +2,18 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from app.core.config import settings
-from app.api.v1 import auth, tasks, profile, categories, languages, payments, admin, daily_bonus
+from app.api.v1 import auth, tasks, profile, categories, languages, payments, admin, daily_bonus, bootstrap
+from app.api.v1 import metrics as metrics_api
+from app.core.database import async_engine
+from app.core.metrics import MetricsMiddleware, install_sql_hooks
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 import pytz
 from app.services.daily_service import reset_daily_free_tasks
-from app.services.ton_service import TONService
-from app.core.database import SessionLocal
+from app.services.ton_api import ton_api_client
+from app.services.ton_monitor import ton_payment_monitor
+from app.services.ton_proof_store import payload_store
 
 app = FastAPI(
     title="Sparks API",
@@ -24,8 +28,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # Курсор следующей страницы истории
 )
 
+# Метрики запросов: SQL запросы, время БД и ответа по маршрутам, поиск N+1 (выключены по умолчанию)
+if settings.METRICS_ENABLED or settings.METRICS_SERVER_TIMING or settings.QUERY_REPEAT_THRESHOLD > 0:
+    install_sql_hooks(async_engine.sync_engine)
+    app.add_middleware(
+        MetricsMiddleware,
+        record=settings.METRICS_ENABLED,
+        server_timing=settings.METRICS_SERVER_TIMING,
+        repeat_threshold=settings.QUERY_REPEAT_THRESHOLD
+    )
+
 # Подключение роутеров
 app.include_router(auth.router, prefix=settings.API_V1_PREFIX + "/auth", tags=["auth"])
 app.include_router(tasks.router, prefix=settings.API_V1_PREFIX + "/tasks", tags=["tasks"])
@@ -34,7 +49,10 @@ app.include_router(categories.router, prefix=settings.API_V1_PREFIX + "/categori
 app.include_router(languages.router, prefix=settings.API_V1_PREFIX + "/languages", tags=["languages"])
 app.include_router(payments.router, prefix=settings.API_V1_PREFIX + "/payments", tags=["payments"])
 app.include_router(daily_bonus.router, prefix=settings.API_V1_PREFIX + "/daily-bonus", tags=["daily-bonus"])
+app.include_router(bootstrap.router, prefix=settings.API_V1_PREFIX + "/bootstrap", tags=["bootstrap"])
 app.include_router(admin.router, prefix=settings.API_V1_PREFIX + "/admin", tags=["admin"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics_api.router, tags=["metrics"])
 
 
 # Обработка ошибок
@@ -56,7 +74,7 @@ async def health_check():
 scheduler = AsyncIOScheduler()
 moscow_tz = pytz.timezone(settings.TIMEZONE)
 
-# Задача на 00:00 МСК каждый день
+# Задача на 00:00 МСК каждый день (корутина: UPDATE выполняется через aiosqlite, не блокируя event loop)
 scheduler.add_job(
     reset_daily_free_tasks,
     trigger=CronTrigger(hour=0, minute=0, timezone=moscow_tz),
@@ -68,13 +86,17 @@ scheduler.add_job(
 # Задача для периодической проверки pending TON платежей (каждые 60 секунд)
 async def monitor_ton_payments():
     """Периодическая проверка pending TON платежей"""
-    db = SessionLocal()
     try:
-        await TONService.monitor_pending_payments(db)
+        confirmed = await ton_payment_monitor.run_once()
+        metrics = ton_payment_monitor.metrics.snapshot()
+        if metrics["last_batch_size"]:
+            print(
+                f"[TON Monitor] {ton_payment_monitor.mode}: checked {metrics['last_batch_size']} in "
+                f"{metrics['last_batch_seconds']}s, confirmed {confirmed}, "
+                f"{metrics['confirmations_per_minute']} confirmations/min"
+            )
     except Exception as e:
         print(f"Error monitoring TON payments: {e}")
-    finally:
-        db.close()
 
 scheduler.add_job(
     monitor_ton_payments,
@@ -93,6 +115,10 @@ async def startup_event():
     """Запуск scheduled tasks при старте приложения"""
     global bot_app_instance
     
+    # Без токена бота подпись initData проверить нечем - все входы отклонялись бы
+    if settings.TELEGRAM_INIT_DATA_REQUIRED and not settings.TELEGRAM_BOT_TOKEN:
+        raise RuntimeError("TELEGRAM_INIT_DATA_REQUIRED=true requires TELEGRAM_BOT_TOKEN")
+    
     scheduler.start()
     print("Scheduler started")
     
@@ -130,6 +156,12 @@ async def shutdown_event():
     scheduler.shutdown()
     print("Scheduler stopped")
     
+    # Закрытие пула соединений TON API
+    await ton_api_client.aclose()
+    
+    # Закрытие соединения с хранилищем payload TON Proof
+    await payload_store.close()
+    
     # Остановка Telegram бота
     if bot_app_instance:
         try:
@@ -9,13 +9,17 @@ from app.models.task import (
     GenderTarget,
 )
 from app.models.user import User, UserCategory, Gender
-from app.models.daily import CompletedTask, DailyFreeTask, DailyBonus
+from app.models.daily import CompletedTask, DailyFreeTask, DailyBonus, DailyBonusStreak
 from app.models.transaction import (
     Transaction,
     TransactionType,
     PaymentMethod,
     TransactionStatus,
 )
+from app.models.catalog import CatalogVersion
+from app.models.ton_cursor import TonAccountCursor
+from app.models.user_cache import UserCacheVersion
+from app.models.translation import TranslationJob, TranslationJobStatus, TranslationMemory
 
 __all__ = [
     "Base",
@@ -32,9 +36,16 @@ __all__ = [
     "CompletedTask",
     "DailyFreeTask",
     "DailyBonus",
+    "DailyBonusStreak",
     "Transaction",
     "TransactionType",
     "PaymentMethod",
     "TransactionStatus",
+    "CatalogVersion",
+    "TonAccountCursor",
+    "UserCacheVersion",
+    "TranslationJob",
+    "TranslationJobStatus",
+    "TranslationMemory",
 ]
 
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class CatalogVersion(Base):
+    """
+    Версия справочников (языки, категории, задания и их переводы)
+
+    Единственная строка с id=1. Версия увеличивается при каждом изменении
+    справочников (админка, перевод заданий), по ней воркеры API сбрасывают
+    in-process кэш справочников.
+    """
+    __tablename__ = "catalog_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=1, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
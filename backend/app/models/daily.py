@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, DateTime, Date, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, BigInteger, DateTime, Date, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -18,6 +18,8 @@ class CompletedTask(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'task_id', name='uq_completed_task'),
+        # История выполненных заданий пользователя (ORDER BY completed_at DESC)
+        Index('ix_completed_tasks_user_completed_at', 'user_id', 'completed_at'),
     )
 
 
@@ -36,6 +38,8 @@ class DailyFreeTask(Base):
 
     __table_args__ = (
         UniqueConstraint('user_id', 'date', name='uq_daily_free_task'),
+        # Ежедневный сброс счетчиков фильтрует только по дате
+        Index('ix_daily_free_tasks_date', 'date'),
     )
 
 
@@ -56,3 +60,20 @@ class DailyBonus(Base):
         UniqueConstraint('user_id', 'date', name='uq_daily_bonus'),
     )
 
+
+
+class DailyBonusStreak(Base):
+    """
+    Текущая серия ежедневных бонусов пользователя
+
+    Одна строка на пользователя: номер дня и дата последнего полученного
+    бонуса. Обновляется атомарно при получении бонуса, поэтому статус
+    считается по одной строке, без чтения истории daily_bonuses. Django
+    админка пересчитывает строку из daily_bonuses после изменения бонусов.
+    """
+    __tablename__ = "daily_bonus_streaks"
+
+    user_id = Column(BigInteger, ForeignKey("users.tg_id", ondelete="CASCADE"), primary_key=True)
+    day_number = Column(Integer, nullable=False)  # День последнего полученного бонуса (1-7)
+    last_claim_date = Column(Date, nullable=False)  # Дата последнего полученного бонуса (МСК)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum as SQLEnum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum as SQLEnum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -58,6 +58,13 @@ class Task(Base):
     gender_targets = relationship("TaskGenderTarget", back_populates="task", cascade="all, delete-orphan")
     completed_by = relationship("CompletedTask", back_populates="task")
 
+    __table_args__ = (
+        # Лента: активные задания по категориям в порядке создания
+        Index('ix_tasks_active_category_created', 'is_active', 'category_id', 'created_at'),
+        # Курсорная пагинация ленты: WHERE is_active AND (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC
+        Index('ix_tasks_active_created', 'is_active', 'created_at', 'id'),
+    )
+
 
 class TaskTranslation(Base):
     __tablename__ = "task_translations"
@@ -89,5 +96,6 @@ class TaskGenderTarget(Base):
 
     __table_args__ = (
         UniqueConstraint('task_id', 'gender', name='uq_task_gender_target'),
+        Index('ix_task_gender_targets_gender_task', 'gender', 'task_id'),
     )
 
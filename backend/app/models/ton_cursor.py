@@ -0,0 +1,18 @@
+from sqlalchemy import Column, String, BigInteger, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class TonAccountCursor(Base):
+    """
+    Курсор чтения входящих переводов на TON кошелек
+
+    Одна строка на адрес кошелька: logical time (lt) последней обработанной
+    транзакции аккаунта. Мониторинг запрашивает у TON API только транзакции
+    после этого lt.
+    """
+    __tablename__ = "ton_account_cursors"
+
+    account = Column(String(100), primary_key=True)
+    last_lt = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey, Enum as SQLEnum, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -45,3 +45,14 @@ class Transaction(Base):
     # Relationships
     user = relationship("User", back_populates="transactions")
 
+    __table_args__ = (
+        # Частичный индекс: мониторинг выбирает только pending TON платежи,
+        # которых на порядки меньше, чем всех транзакций
+        Index(
+            'ix_transactions_pending_ton',
+            'created_at',
+            sqlite_where=text("payment_method = 'TON' AND status = 'PENDING'"),
+            postgresql_where=text("payment_method = 'TON' AND status = 'PENDING'"),
+        ),
+    )
+
@@ -0,0 +1,70 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+import enum
+from app.core.database import Base
+
+
+class TranslationJobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class TranslationJob(Base):
+    """
+    Задача автоперевода задания (очередь переводов)
+
+    Админка при сохранении задания только добавляет строку pending, переводит
+    отдельный процесс scripts/translation_worker.py. Статус хранится строкой
+    (значение TranslationJobStatus), чтобы его одинаково читали бэкенд и админка.
+    Время (run_after, locked_at, finished_at) - UTC, как его пишет Django.
+    """
+    __tablename__ = "translation_jobs"
+
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
+    source_lang = Column(String(10), default="ru", nullable=False)
+    status = Column(String(20), default=TranslationJobStatus.PENDING.value, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(String(500), nullable=True)
+    run_after = Column(DateTime, nullable=False)  # Не раньше этого времени (отложенный повтор)
+    locked_by = Column(String(100), nullable=True)  # Воркер, выполняющий задачу
+    locked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Выборка готовых к выполнению задач
+        Index('ix_translation_jobs_status_run_after', 'status', 'run_after'),
+        # Одна pending задача на задание, поиск выполняемых задач задания
+        Index('ix_translation_jobs_task_status', 'task_id', 'status'),
+    )
+
+
+class TranslationMemory(Base):
+    """
+    Память переводов: перевод строки одним провайдером
+
+    Ключ - sha256 от нормализованного исходного текста, языков и провайдера
+    (app/services/translation_memory.py). TranslationService берет перевод
+    отсюда, прежде чем обращаться к MyMemory/Google. Размер ограничен
+    TRANSLATION_MEMORY_MAX_ENTRIES, лишние записи удаляются по last_used_at.
+    """
+    __tablename__ = "translation_memory"
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String(64), nullable=False, unique=True)
+    provider = Column(String(50), nullable=False)
+    source_lang = Column(String(10), nullable=False)
+    target_lang = Column(String(10), nullable=False)
+    source_text = Column(Text, nullable=False)  # Нормализованный исходный текст
+    translated_text = Column(Text, nullable=False)
+    hits = Column(Integer, default=0, nullable=False)  # Сколько раз перевод взят из памяти
+    created_at = Column(DateTime, nullable=False)
+    last_used_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Вытеснение давно не использованных записей
+        Index('ix_translation_memory_last_used_at', 'last_used_at'),
+    )
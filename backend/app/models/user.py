@@ -37,6 +37,11 @@ class User(Base):
     daily_free_tasks = relationship("DailyFreeTask", back_populates="user")
     daily_bonuses = relationship("DailyBonus", back_populates="user")
 
+    @property
+    def interest_ids(self) -> tuple:
+        """ID категорий интересов (как у UserSnapshot; interests должны быть загружены)"""
+        return tuple(uc.category_id for uc in self.interests)
+
 
 class UserCategory(Base):
     __tablename__ = "user_categories"
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, DateTime
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class UserCacheVersion(Base):
+    """
+    Версия кэша пользователей
+
+    Единственная строка с id=1. Версия увеличивается при изменении
+    пользователей через Django админку (деактивация, редактирование),
+    по ней воркеры API сбрасывают in-process кэш пользователей.
+    """
+    __tablename__ = "user_cache_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=1, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
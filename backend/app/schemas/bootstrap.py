@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import Optional
+from app.schemas.user import UserResponse
+from app.schemas.task import TaskListResponse, DailyFreeCountResponse
+from app.schemas.daily_bonus import DailyBonusStatusResponse
+from app.schemas.transaction import BalanceResponse
+
+
+class BootstrapResponse(BaseModel):
+    """Данные для запуска mini-app; разделы, не запрошенные в include, равны null"""
+    me: Optional[UserResponse] = None  # /auth/me
+    tasks: Optional[TaskListResponse] = None  # /tasks/
+    daily_free_count: Optional[DailyFreeCountResponse] = None  # /tasks/daily-free-count
+    daily_bonus: Optional[DailyBonusStatusResponse] = None  # /daily-bonus/status
+    balance: Optional[BalanceResponse] = None  # /payments/balance
@@ -33,6 +33,7 @@ class TaskListResponse(BaseModel):
     total: int
     free_remaining: int
     paid_available: int = 0
+    next_cursor: Optional[str] = None  # Курсор следующей страницы (параметр cursor), None - страниц больше нет
 
 
 class TaskCompleteRequest(BaseModel):
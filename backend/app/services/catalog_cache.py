@@ -0,0 +1,392 @@
+"""
+In-process кэш справочников: языки, категории, переводы заданий и категорий
+
+Справочники меняются редко (только через Django админку и translate_tasks),
+а читаются почти в каждом запросе. Кэш работает по принципу read-through:
+при промахе данные загружаются из БД и сохраняются в памяти процесса.
+
+Методы чтения асинхронные и принимают AsyncSession из обработчиков API.
+
+Кроме данных кэшируются готовые сериализованные ответы API справочников
+(rendered) - для ETag/304 и отдачи без повторной сериализации.
+
+Инвалидация: в таблице catalog_version хранится номер версии, который
+увеличивается при каждом изменении справочников. Каждый воркер не чаще раза
+в CATALOG_CACHE_CHECK_INTERVAL секунд сверяет версию и при её изменении
+сбрасывает кэш целиком.
+
+Переводы заданий кэшируются по (task_id, language_id) в LRU не больше
+CATALOG_CACHE_MAX_TASKS записей: ID задания приходит от клиента, и
+запросы несуществующих заданий не должны раздувать память воркера.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from pydantic import BaseModel
+from sqlalchemy import select, update, insert, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.catalog import CatalogVersion
+from app.models.language import Language
+from app.models.task import Task, TaskTranslation, TaskCategory, CategoryTranslation
+from app.utils.http_cache import RenderedBody, render_body
+
+# Язык, на который откатываемся при отсутствии перевода задания
+FALLBACK_LANGUAGE_CODE = 'ru'
+
+# Маркер "в БД нет" для отрицательного кэширования
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class LanguageInfo:
+    id: int
+    code: str
+    name: str
+    is_active: bool
+    created_at: Optional[datetime]
+
+
+@dataclass(frozen=True)
+class CategoryInfo:
+    """Категория с названием на конкретном языке (перевод или slug)"""
+    id: int
+    slug: str
+    name: str
+    color: str
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class TaskText:
+    """
+    Задание с переводом на конкретный язык
+
+    Перевод уже с учетом fallback на русский; title/description равны None,
+    если у задания нет ни перевода на язык, ни русского перевода.
+    """
+    id: int
+    category_id: int
+    title: Optional[str]
+    description: Optional[str]
+
+    @property
+    def has_translation(self) -> bool:
+        return self.title is not None
+
+
+async def get_catalog_version(db: AsyncSession) -> int:
+    """Текущая версия справочников в БД (0 если строки нет)"""
+    version = (await db.execute(
+        select(CatalogVersion.version).where(CatalogVersion.id == 1)
+    )).scalar()
+    return version or 0
+
+
+def bump_catalog_version(db: Session) -> None:
+    """
+    Увеличение версии справочников после их изменения
+
+    Вызывается в той же транзакции, что и изменение; коммит остается
+    за вызывающим кодом. Локальный кэш процесса сбрасывается сразу,
+    остальные воркеры увидят новую версию при следующей проверке.
+    """
+    result = db.execute(
+        update(CatalogVersion)
+        .where(CatalogVersion.id == 1)
+        .values(version=CatalogVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(CatalogVersion).values(id=1, version=1))
+    catalog_cache.clear()
+
+
+class CatalogCache:
+    def __init__(self, check_interval: float, max_tasks: int):
+        self.check_interval = check_interval
+        self.max_tasks = max(1, max_tasks)
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._languages: Optional[Tuple[Dict[int, LanguageInfo], Dict[str, LanguageInfo]]] = None
+        self._categories: Dict[int, Dict[int, CategoryInfo]] = {}
+        # (task_id, language_id) -> TaskText или _MISSING; порядок - от давно использованных к недавним
+        self._tasks: "OrderedDict[Tuple[int, int], object]" = OrderedDict()
+        self._rendered: Dict[Hashable, RenderedBody] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ------------------------------------------------------------------
+    # Версия и сброс
+    # ------------------------------------------------------------------
+
+    def clear(self) -> None:
+        """Сброс всего кэша (версия будет перечитана при следующем обращении)"""
+        with self._lock:
+            self._languages = None
+            self._categories = {}
+            self._tasks = OrderedDict()
+            self._rendered = {}
+            self._version = None
+            self._checked_at = 0.0
+            self.invalidations += 1
+
+    async def _ensure_fresh(self, db: AsyncSession) -> None:
+        """Сверка версии справочников с БД (не чаще раза в check_interval секунд)"""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+
+        version = await get_catalog_version(db)
+        with self._lock:
+            if self._version is not None and version != self._version:
+                self._languages = None
+                self._categories = {}
+                self._tasks = OrderedDict()
+                self._rendered = {}
+                self.invalidations += 1
+            self._version = version
+            self._checked_at = now
+
+    def stats(self) -> Dict:
+        """Счетчики попаданий/промахов и размер кэша"""
+        total = self.hits + self.misses
+        return {
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+            "tasks_cached": len(self._tasks),
+            "category_languages_cached": len(self._categories),
+            "rendered_cached": len(self._rendered),
+        }
+
+    # ------------------------------------------------------------------
+    # Готовые ответы API
+    # ------------------------------------------------------------------
+
+    async def rendered(
+        self,
+        db: AsyncSession,
+        key: Hashable,
+        build: Callable[[], Awaitable[BaseModel]]
+    ) -> RenderedBody:
+        """
+        Сериализованный ответ справочника с ETag текущей версии
+
+        Args:
+            db: Сессия БД
+            key: Ключ ответа (эндпоинт и язык)
+            build: Корутина, строящая модель ответа из кэша справочников
+
+        Returns:
+            RenderedBody (сериализуется один раз на версию справочников)
+        """
+        await self._ensure_fresh(db)
+        rendered = self._rendered.get(key)
+        if rendered is not None:
+            self.hits += 1
+            return rendered
+
+        self.misses += 1
+        version = self._version
+        rendered = render_body(await build(), version)
+        with self._lock:
+            # Пока строили ответ, версия могла смениться - такой ответ не сохраняем
+            if self._version == version:
+                self._rendered[key] = rendered
+        return rendered
+
+    # ------------------------------------------------------------------
+    # Языки
+    # ------------------------------------------------------------------
+
+    async def _get_languages(self, db: AsyncSession) -> Tuple[Dict[int, LanguageInfo], Dict[str, LanguageInfo]]:
+        await self._ensure_fresh(db)
+        languages = self._languages
+        if languages is not None:
+            self.hits += 1
+            return languages
+
+        self.misses += 1
+        by_id: Dict[int, LanguageInfo] = {}
+        by_code: Dict[str, LanguageInfo] = {}
+        for lang in (await db.execute(select(Language))).scalars():
+            info = LanguageInfo(
+                id=lang.id,
+                code=lang.code,
+                name=lang.name,
+                is_active=lang.is_active,
+                created_at=lang.created_at
+            )
+            by_id[info.id] = info
+            by_code[info.code] = info
+        languages = (by_id, by_code)
+        self._languages = languages
+        return languages
+
+    async def language(self, db: AsyncSession, language_id: int) -> Optional[LanguageInfo]:
+        """Язык по ID"""
+        return (await self._get_languages(db))[0].get(language_id)
+
+    async def language_by_code(self, db: AsyncSession, code: str) -> Optional[LanguageInfo]:
+        """Язык по коду (ru, en, es)"""
+        return (await self._get_languages(db))[1].get(code)
+
+    async def active_languages(self, db: AsyncSession) -> List[LanguageInfo]:
+        """Активные языки в порядке ID"""
+        by_id = (await self._get_languages(db))[0]
+        return [lang for _, lang in sorted(by_id.items()) if lang.is_active]
+
+    # ------------------------------------------------------------------
+    # Категории
+    # ------------------------------------------------------------------
+
+    async def _get_categories(self, db: AsyncSession, language_id: int) -> Dict[int, CategoryInfo]:
+        await self._ensure_fresh(db)
+        categories = self._categories.get(language_id)
+        if categories is not None:
+            self.hits += 1
+            return categories
+
+        # Категорий немного - загружаем весь справочник для языка одним запросом
+        self.misses += 1
+        rows = (await db.execute(
+            select(
+                TaskCategory.id,
+                TaskCategory.slug,
+                TaskCategory.color,
+                TaskCategory.is_active,
+                CategoryTranslation.name
+            )
+            .outerjoin(
+                CategoryTranslation,
+                and_(
+                    CategoryTranslation.category_id == TaskCategory.id,
+                    CategoryTranslation.language_id == language_id
+                )
+            )
+            .order_by(TaskCategory.id)
+        )).all()
+
+        categories = {
+            row.id: CategoryInfo(
+                id=row.id,
+                slug=row.slug,
+                name=row.name if row.name else row.slug,
+                color=row.color,
+                is_active=row.is_active
+            )
+            for row in rows
+        }
+        self._categories[language_id] = categories
+        return categories
+
+    async def category(self, db: AsyncSession, category_id: int, language_id: int) -> Optional[CategoryInfo]:
+        """
+        Категория с названием на языке language_id (slug если перевода нет)
+
+        Категории нет в кэше, если ее создали в админке, а новая версия
+        справочников еще не перечитана - тогда категории языка загружаются
+        заново.
+
+        Returns:
+            CategoryInfo или None если категории нет в БД
+        """
+        category = (await self._get_categories(db, language_id)).get(category_id)
+        if category is None:
+            with self._lock:
+                self._categories.pop(language_id, None)
+            category = (await self._get_categories(db, language_id)).get(category_id)
+        return category
+
+    async def active_categories(self, db: AsyncSession, language_id: int) -> List[CategoryInfo]:
+        """Активные категории с названиями на языке language_id"""
+        categories = await self._get_categories(db, language_id)
+        return [c for c in categories.values() if c.is_active]
+
+    # ------------------------------------------------------------------
+    # Задания
+    # ------------------------------------------------------------------
+
+    async def task(self, db: AsyncSession, task_id: int, language_id: int) -> Optional[TaskText]:
+        """
+        Задание с переводом на язык language_id (с fallback на русский)
+
+        Returns:
+            TaskText или None если задания нет в БД
+        """
+        await self._ensure_fresh(db)
+        key = (task_id, language_id)
+        with self._lock:
+            cached = self._tasks.get(key)
+            if cached is not None:
+                self._tasks.move_to_end(key)
+        if cached is not None:
+            self.hits += 1
+            return None if cached is _MISSING else cached
+
+        self.misses += 1
+        version = self._version
+        fallback = await self.language_by_code(db, FALLBACK_LANGUAGE_CODE)
+        language_ids = {language_id}
+        if fallback:
+            language_ids.add(fallback.id)
+
+        rows = (await db.execute(
+            select(
+                Task.id,
+                Task.category_id,
+                TaskTranslation.language_id,
+                TaskTranslation.title,
+                TaskTranslation.description
+            )
+            .outerjoin(
+                TaskTranslation,
+                and_(
+                    TaskTranslation.task_id == Task.id,
+                    TaskTranslation.language_id.in_(language_ids)
+                )
+            )
+            .where(Task.id == task_id)
+        )).all()
+
+        if not rows:
+            self._store_task(key, _MISSING, version)
+            return None
+
+        translations = {row.language_id: row for row in rows if row.language_id is not None}
+        translation = translations.get(language_id)
+        if translation is None and fallback:
+            translation = translations.get(fallback.id)
+
+        task_text = TaskText(
+            id=rows[0].id,
+            category_id=rows[0].category_id,
+            title=translation.title if translation else None,
+            description=translation.description if translation else None
+        )
+        self._store_task(key, task_text, version)
+        return task_text
+
+    def _store_task(self, key: Tuple[int, int], value: object, version: Optional[int]) -> None:
+        """Сохранение задания в LRU, если версия не сменилась, пока шел запрос"""
+        with self._lock:
+            if self._version != version:
+                return
+            self._tasks[key] = value
+            self._tasks.move_to_end(key)
+            while len(self._tasks) > self.max_tasks:
+                self._tasks.popitem(last=False)
+
+
+catalog_cache = CatalogCache(
+    check_interval=settings.CATALOG_CACHE_CHECK_INTERVAL,
+    max_tasks=settings.CATALOG_CACHE_MAX_TASKS
+)
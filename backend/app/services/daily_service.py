@@ -1,41 +1,84 @@
-from sqlalchemy.orm import Session
-from datetime import date, datetime
+from datetime import datetime
+from typing import Dict, Optional
+import time
 import pytz
+from sqlalchemy import update
 from app.models.daily import DailyFreeTask
-from app.core.database import SessionLocal
+from app.core.database import AsyncSessionLocal
 from app.core.config import settings
 
 
-def reset_daily_free_tasks():
+class DailyResetMetrics:
+    """Счетчики ежедневного сброса: время выполнения и количество строк"""
+
+    def __init__(self):
+        self.runs = 0
+        self.errors = 0
+        self.total_rows = 0
+        self.last_rows = 0
+        self.last_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_run_at: Optional[datetime] = None
+
+    def record(self, rows: int, seconds: float, run_at: datetime) -> None:
+        self.runs += 1
+        self.total_rows += rows
+        self.last_rows = rows
+        self.last_seconds = seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_run_at = run_at
+
+    def snapshot(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "errors": self.errors,
+            "total_rows": self.total_rows,
+            "last_rows": self.last_rows,
+            "last_seconds": round(self.last_seconds, 4),
+            "max_seconds": round(self.max_seconds, 4),
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+        }
+
+
+reset_metrics = DailyResetMetrics()
+
+
+async def reset_daily_free_tasks() -> int:
     """
     Сброс счетчика бесплатных заданий для всех пользователей
     Запускается в 00:00 по МСК
+
+    Строки daily_free_tasks привязаны к дате, поэтому в новый день счетчик
+    и так начинается с нуля при первом обращении; сбрасываются только уже
+    созданные строки за сегодня. Сброс - один UPDATE по индексу даты,
+    без загрузки строк в ORM. Запрос выполняется через AsyncSession
+    (aiosqlite, в отдельном потоке) и не блокирует event loop.
+
+    Returns:
+        Количество сброшенных строк
     """
-    db = SessionLocal()
+    # Получаем текущую дату по МСК
+    moscow_tz = pytz.timezone(settings.TIMEZONE)
+    moscow_time = datetime.now(moscow_tz)
+    today = moscow_time.date()
+
+    started = time.perf_counter()
     try:
-        # Получаем текущую дату по МСК
-        moscow_tz = pytz.timezone(settings.TIMEZONE)
-        moscow_time = datetime.now(moscow_tz)
-        today = moscow_time.date()
-        
-        # Сбрасываем счетчики для всех пользователей
-        # Обновляем записи за сегодня или создаем новые
-        daily_tasks = db.query(DailyFreeTask).filter(
-            DailyFreeTask.date == today
-        ).all()
-        
-        for daily_task in daily_tasks:
-            daily_task.count = 0
-            daily_task.last_reset = moscow_time
-        
-        # Для пользователей без записи на сегодня создаем новые
-        # (это должно происходить при первом обращении, но на всякий случай)
-        
-        db.commit()
-        print(f"Daily free tasks reset at {moscow_time} for {len(daily_tasks)} users")
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(DailyFreeTask)
+                .where(DailyFreeTask.date == today)
+                .values(count=0, last_reset=moscow_time)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
     except Exception as e:
-        db.rollback()
+        reset_metrics.errors += 1
         print(f"Error resetting daily free tasks: {e}")
-    finally:
-        db.close()
+        return 0
 
+    rows = result.rowcount
+    seconds = time.perf_counter() - started
+    reset_metrics.record(rows, seconds, moscow_time)
+    print(f"Daily free tasks reset at {moscow_time} for {rows} users in {seconds:.3f}s")
+    return rows
@@ -1,18 +1,20 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Optional
 import re
 import time
 from app.models.user import User
 from app.models.transaction import Transaction, TransactionType, PaymentMethod, TransactionStatus
 from app.core.config import settings
+from app.services.user_cache import UserSnapshot
 # TONService импортируется внутри методов чтобы избежать циклической зависимости
 
 
 class PaymentService:
     @staticmethod
-    def create_ton_payment(
-        db: Session,
-        user: User,
+    async def create_ton_payment(
+        db: AsyncSession,
+        user: UserSnapshot,
         package_id: int
     ) -> Dict:
         """
@@ -20,7 +22,7 @@ class PaymentService:
         
         Args:
             db: Сессия БД
-            user: Пользователь
+            user: Снимок пользователя (UserSnapshot)
             package_id: ID пакета
             
         Returns:
@@ -57,8 +59,8 @@ class PaymentService:
             ton_from_address=user.wallet_address  # Адрес отправителя (если есть)
         )
         db.add(transaction)
-        db.commit()
-        db.refresh(transaction)
+        await db.commit()
+        await db.refresh(transaction)
         
         # Генерируем комментарий для транзакции
         comment = f"Payment for package {package_id}, transaction {transaction.id}"
@@ -72,9 +74,9 @@ class PaymentService:
     
     @staticmethod
     async def check_ton_payment_status(
-        db: Session,
+        db: AsyncSession,
         transaction_id: int,
-        user: User
+        user: UserSnapshot
     ) -> Dict:
         """
         Проверка статуса TON платежа
@@ -82,7 +84,7 @@ class PaymentService:
         Args:
             db: Сессия БД
             transaction_id: ID транзакции
-            user: Пользователь
+            user: Снимок пользователя (UserSnapshot)
             
         Returns:
             Словарь со статусом платежа
@@ -90,11 +92,13 @@ class PaymentService:
         print(f"[Payment Service] Checking transaction {transaction_id} for user {user.tg_id}")
         
         # Получаем транзакцию
-        transaction = db.query(Transaction).filter(
-            Transaction.id == transaction_id,
-            Transaction.user_id == user.tg_id,
-            Transaction.payment_method == PaymentMethod.TON
-        ).first()
+        transaction = (await db.execute(
+            select(Transaction).where(
+                Transaction.id == transaction_id,
+                Transaction.user_id == user.tg_id,
+                Transaction.payment_method == PaymentMethod.TON
+            )
+        )).scalars().first()
         
         if not transaction:
             print(f"[Payment Service] ERROR: Transaction {transaction_id} not found for user {user.tg_id}")
@@ -137,34 +141,9 @@ class PaymentService:
                     expected_amount,
                     transaction.ton_from_address
                 ):
-                    # Транзакция подтверждена
-                    transaction.status = TransactionStatus.COMPLETED
-                    
-                    # Проверяем если это lifetime подписка
-                    is_lifetime = False
-                    if transaction.description and "lifetime" in transaction.description.lower():
-                        is_lifetime = True
-                    elif isinstance(transaction.amount, str) and transaction.amount.lower() == "lifetime":
-                        is_lifetime = True
-                    else:
-                        # Проверяем по пакету через описание
-                        packages = PaymentService.get_packages()
-                        match = re.search(r'пакет #(\d+)', transaction.description or '')
-                        if match:
-                            package_id_match = int(match.group(1))
-                            package = next((pkg for pkg in packages if pkg["id"] == package_id_match), None)
-                            if package and package.get("amount") == "lifetime":
-                                is_lifetime = True
-                    
-                    if is_lifetime:
-                        # Для lifetime подписки только устанавливаем флаг, баланс не пополняем
-                        user.has_lifetime_subscription = True
-                    else:
-                        # Для обычных пакетов пополняем баланс
-                        if isinstance(transaction.amount, int) and transaction.amount > 0:
-                            user.balance += transaction.amount
-                    
-                    db.commit()
+                    # Транзакция подтверждена (монитор мог успеть подтвердить её раньше)
+                    await PaymentService.confirm_ton_payment(db, transaction)
+                    await db.commit()
                     
                     return {
                         "status": "completed",
@@ -179,6 +158,82 @@ class PaymentService:
             "message": "Payment is pending confirmation"
         }
     
+    @staticmethod
+    def is_lifetime_payment(transaction: Transaction) -> bool:
+        """
+        Является ли платеж покупкой lifetime подписки
+        
+        Args:
+            transaction: Транзакция покупки
+            
+        Returns:
+            True для lifetime пакета (по описанию, сумме или номеру пакета)
+        """
+        if transaction.description and "lifetime" in transaction.description.lower():
+            return True
+        if isinstance(transaction.amount, str) and transaction.amount.lower() == "lifetime":
+            return True
+        
+        # Проверяем по пакету через описание
+        match = re.search(r'пакет #(\d+)', transaction.description or '')
+        if match:
+            package_id = int(match.group(1))
+            package = next((pkg for pkg in PaymentService.get_packages() if pkg["id"] == package_id), None)
+            if package and package.get("amount") == "lifetime":
+                return True
+        return False
+    
+    @staticmethod
+    async def confirm_ton_payment(
+        db: AsyncSession,
+        transaction: Transaction,
+        transaction_hash: Optional[str] = None
+    ) -> bool:
+        """
+        Подтверждение pending TON платежа и зачисление покупки
+        
+        Статус меняется условным UPDATE (только из PENDING), поэтому платеж
+        зачисляется ровно один раз, даже если его одновременно подтверждают
+        монитор и запрос пользователя. Коммит остается за вызывающим кодом.
+        
+        Args:
+            db: Сессия БД
+            transaction: Pending транзакция
+            transaction_hash: Хеш транзакции в блокчейне (если найден по переводу на кошелек)
+            
+        Returns:
+            True если платеж подтвержден этим вызовом
+        """
+        values = {"status": TransactionStatus.COMPLETED}
+        if transaction_hash:
+            values["ton_transaction_hash"] = transaction_hash
+        result = await db.execute(
+            update(Transaction)
+            .where(
+                Transaction.id == transaction.id,
+                Transaction.status == TransactionStatus.PENDING
+            )
+            .values(**values)
+        )
+        if result.rowcount != 1:
+            return False
+        
+        if PaymentService.is_lifetime_payment(transaction):
+            # Для lifetime подписки только устанавливаем флаг, баланс не пополняем
+            await db.execute(
+                update(User)
+                .where(User.tg_id == transaction.user_id)
+                .values(has_lifetime_subscription=True)
+            )
+        elif isinstance(transaction.amount, int) and transaction.amount > 0:
+            # Для обычных пакетов пополняем баланс
+            await db.execute(
+                update(User)
+                .where(User.tg_id == transaction.user_id)
+                .values(balance=User.balance + transaction.amount)
+            )
+        return True
+    
     @staticmethod
     def get_packages() -> list[Dict]:
         """
@@ -0,0 +1,279 @@
+"""
+Сборка ленты заданий одним SQL запросом
+
+Вместо отдельных запросов на каждое задание (перевод, fallback на русский,
+категория, перевод категории) вся страница ленты выбирается одним SELECT:
+- выполненные задания исключаются через NOT EXISTS (anti-join)
+- фильтр по полу - через EXISTS по task_gender_targets
+- перевод с fallback на русский - два LEFT JOIN + COALESCE
+- категория и её название - JOIN + LEFT JOIN
+- общее количество - оконная функция COUNT(*) OVER ()
+
+Страница выбирается по OFFSET или по курсору (created_at, id) - см.
+utils/cursor; с курсором стоимость страницы не зависит от ее номера.
+
+История выполненных заданий собирается тем же SELECT с JOIN по
+completed_tasks - одним запросом на страницу независимо от ее размера.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import select, exists, and_, or_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from app.services.user_cache import UserSnapshot
+from app.models.task import Task, TaskTranslation, TaskGenderTarget, GenderTarget, CategoryTranslation, TaskCategory
+from app.models.daily import CompletedTask
+from app.models.language import Language
+from app.utils.cursor import raw_value, encode_cursor, before_cursor
+
+# Язык, на который откатываемся при отсутствии перевода
+FALLBACK_LANGUAGE_CODE = 'ru'
+
+
+@dataclass(frozen=True)
+class FeedTask:
+    """Строка ленты заданий (задание с переводом и категорией)"""
+    id: int
+    title: str
+    description: str
+    category_id: int
+    category_name: str
+    category_color: str
+
+
+def localized_task_select(language_id: int):
+    """
+    SELECT заданий с переводом на язык пользователя и категорией
+
+    Перевод берется на язык пользователя, при его отсутствии - на русский.
+    Задания без перевода отфильтровываются.
+
+    Args:
+        language_id: ID языка пользователя
+
+    Returns:
+        SELECT со столбцами FeedTask (без фильтров по пользователю)
+    """
+    user_translation = aliased(TaskTranslation)
+    fallback_translation = aliased(TaskTranslation)
+    category_translation = aliased(CategoryTranslation)
+
+    fallback_language_id = select(Language.id).where(
+        Language.code == FALLBACK_LANGUAGE_CODE
+    ).scalar_subquery()
+
+    return (
+        select(
+            Task.id,
+            func.coalesce(user_translation.title, fallback_translation.title).label("title"),
+            func.coalesce(user_translation.description, fallback_translation.description).label("description"),
+            Task.category_id,
+            func.coalesce(category_translation.name, TaskCategory.slug).label("category_name"),
+            TaskCategory.color.label("category_color"),
+        )
+        .select_from(Task)
+        .join(TaskCategory, TaskCategory.id == Task.category_id)
+        .outerjoin(
+            user_translation,
+            and_(
+                user_translation.task_id == Task.id,
+                user_translation.language_id == language_id
+            )
+        )
+        .outerjoin(
+            fallback_translation,
+            and_(
+                fallback_translation.task_id == Task.id,
+                fallback_translation.language_id == fallback_language_id
+            )
+        )
+        .outerjoin(
+            category_translation,
+            and_(
+                category_translation.category_id == Task.category_id,
+                category_translation.language_id == language_id
+            )
+        )
+        .where(or_(user_translation.id.isnot(None), fallback_translation.id.isnot(None)))
+    )
+
+
+def _row_to_feed_task(row) -> FeedTask:
+    return FeedTask(
+        id=row.id,
+        title=row.title,
+        description=row.description,
+        category_id=row.category_id,
+        category_name=row.category_name,
+        category_color=row.category_color,
+    )
+
+
+class TaskFeedService:
+    @staticmethod
+    def feed_filter(user: UserSnapshot, category_ids: Sequence[int], category_id: Optional[int] = None) -> list:
+        """
+        Условия WHERE ленты для пользователя
+
+        Args:
+            user: Снимок пользователя (UserSnapshot)
+            category_ids: ID категорий интересов пользователя (пустой список - без фильтра)
+            category_id: Фильтр по категории (опционально)
+
+        Returns:
+            Список SQL условий
+        """
+        conditions = [Task.is_active == True]
+
+        if category_ids:
+            conditions.append(Task.category_id.in_(list(category_ids)))
+
+        if category_id:
+            conditions.append(Task.category_id == category_id)
+
+        # Задание должно быть для 'all' или для пола пользователя
+        conditions.append(
+            exists().where(
+                TaskGenderTarget.task_id == Task.id,
+                or_(
+                    TaskGenderTarget.gender == GenderTarget.ALL,
+                    TaskGenderTarget.gender == user.gender.value
+                )
+            )
+        )
+
+        # Исключаем выполненные задания (anti-join)
+        conditions.append(
+            ~exists().where(
+                CompletedTask.task_id == Task.id,
+                CompletedTask.user_id == user.tg_id
+            )
+        )
+        return conditions
+
+    @staticmethod
+    async def get_page(
+        db: AsyncSession,
+        user: UserSnapshot,
+        limit: int,
+        offset: int = 0,
+        category_id: Optional[int] = None,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[FeedTask], int, Optional[str]]:
+        """
+        Страница ленты заданий и общее количество доступных заданий
+
+        Без курсора выполняет один запрос с OFFSET; второй (COUNT) - только
+        если страница пустая, так как тогда оконная функция не возвращает
+        ни одной строки. С курсором страница выбирается условием
+        (created_at, id) < курсор по индексу ix_tasks_active_created,
+        а общее количество - отдельным COUNT.
+
+        Args:
+            db: Сессия БД
+            user: Снимок пользователя (UserSnapshot)
+            limit: Размер страницы
+            offset: Смещение (игнорируется, если передан курсор)
+            category_id: Фильтр по категории (опционально)
+            cursor: Курсор следующей страницы из предыдущего ответа
+
+        Returns:
+            (список заданий страницы, общее количество, курсор следующей страницы или None)
+
+        Raises:
+            ValueError: Если курсор поврежден
+        """
+        category_ids = list(user.interest_ids)
+        conditions = TaskFeedService.feed_filter(user, category_ids, category_id)
+
+        base = localized_task_select(user.language_id).where(*conditions)
+        order = (Task.created_at.desc(), Task.id.desc())
+        cursor_column = raw_value(Task.created_at).label("cursor_created_at")
+
+        if cursor is not None:
+            page_query = (
+                base.add_columns(cursor_column)
+                .where(before_cursor(Task.created_at, Task.id, cursor))
+                .order_by(*order)
+                .limit(limit + 1)
+            )
+            rows = (await db.execute(page_query)).all()
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            total = (await db.execute(
+                select(func.count()).select_from(base.subquery())
+            )).scalar_one()
+        else:
+            page_query = (
+                base.add_columns(func.count().over().label("total"), cursor_column)
+                .order_by(*order)
+                .offset(offset)
+                .limit(limit)
+            )
+            rows = (await db.execute(page_query)).all()
+
+            if rows:
+                total = rows[0].total
+            else:
+                total = (await db.execute(
+                    select(func.count()).select_from(base.subquery())
+                )).scalar_one()
+            has_more = offset + len(rows) < total
+
+        next_cursor = None
+        if rows and has_more:
+            next_cursor = encode_cursor(rows[-1].cursor_created_at, rows[-1].id)
+
+        return [_row_to_feed_task(row) for row in rows], total, next_cursor
+
+    @staticmethod
+    async def get_history_page(
+        db: AsyncSession,
+        user: UserSnapshot,
+        limit: int,
+        offset: int = 0,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[FeedTask], Optional[str]]:
+        """
+        Страница истории выполненных заданий (новые сначала)
+
+        Выполнения, перевод задания (с fallback на русский) и категория
+        выбираются одним запросом по индексу (user_id, completed_at).
+        Задания без перевода пропускаются.
+
+        Args:
+            db: Сессия БД
+            user: Снимок пользователя (UserSnapshot)
+            limit: Размер страницы
+            offset: Смещение (игнорируется, если передан курсор)
+            cursor: Курсор следующей страницы из предыдущего ответа
+
+        Returns:
+            (список заданий страницы, курсор следующей страницы или None)
+
+        Raises:
+            ValueError: Если курсор поврежден
+        """
+        query = (
+            localized_task_select(user.language_id)
+            .add_columns(
+                CompletedTask.id.label("completed_id"),
+                raw_value(CompletedTask.completed_at).label("cursor_completed_at"),
+            )
+            .join(CompletedTask, CompletedTask.task_id == Task.id)
+            .where(CompletedTask.user_id == user.tg_id)
+            .order_by(CompletedTask.completed_at.desc(), CompletedTask.id.desc())
+        )
+        if cursor is not None:
+            query = query.where(before_cursor(CompletedTask.completed_at, CompletedTask.id, cursor))
+        else:
+            query = query.offset(offset)
+
+        # Лишняя строка показывает, есть ли следующая страница
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        next_cursor = None
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            next_cursor = encode_cursor(last.cursor_completed_at, last.completed_id)
+
+        return [_row_to_feed_task(row) for row in rows[:limit]], next_cursor
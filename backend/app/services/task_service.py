@@ -1,110 +1,158 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
-from datetime import date
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, and_, or_, func, case
+from datetime import date, datetime, timedelta
 from typing import Dict, List, Optional
+import pytz
+from app.core.config import settings
+from app.core.database import serialized_write, dialect_insert
 from app.models.user import User
-from app.models.task import Task, TaskTranslation, TaskGenderTarget, GenderTarget, CategoryTranslation, TaskCategory
+from app.models.task import Task
 from app.models.daily import CompletedTask, DailyFreeTask
 from app.models.transaction import Transaction, TransactionType, PaymentMethod, TransactionStatus
-from app.models.language import Language
+from app.services.task_feed import TaskFeedService
+from app.services.user_cache import UserSnapshot
 
 
 class TaskService:
     @staticmethod
-    def get_tasks_for_user(
-        db: Session,
-        user: User,
-        limit: int = 10,
-        offset: int = 0,
-        category_id: Optional[int] = None
-    ) -> Dict:
+    async def get_daily_task(db: AsyncSession, user_id: int) -> Optional[DailyFreeTask]:
         """
-        Получение списка заданий для пользователя
+        Запись о бесплатных заданиях пользователя за сегодня
+        
+        Если записи нет, создает её с count=0 (для нового пользователя).
         
         Args:
             db: Сессия БД
-            user: Пользователь
-            limit: Лимит заданий
-            offset: Смещение
-            category_id: Фильтр по категории (опционально)
+            user_id: Telegram ID пользователя
             
         Returns:
-            Словарь с заданиями и метаданными
+            Запись DailyFreeTask за сегодня
         """
-        # Получаем категории интересов пользователя
-        # Проверяем, что interests не None и не пустой
-        # Если interests не загружены, загружаем их явно
-        if user.interests is None:
-            # Если отношения не загружены, загружаем их
-            from sqlalchemy.orm import joinedload
-            db.refresh(user, ['interests'])
+        today = date.today()
+        daily_task = await TaskService._get_daily_task(db, user_id, today)
+        if not daily_task:
+            await TaskService._ensure_daily_task(db, user_id, today)
+            await db.commit()
+            daily_task = await TaskService._get_daily_task(db, user_id, today)
+        return daily_task
+    
+    @staticmethod
+    def get_daily_free_count(daily_task: Optional[DailyFreeTask]) -> Dict:
+        """
+        Количество оставшихся бесплатных и купленных заданий за сегодня
         
-        user_category_ids = [uc.category_id for uc in (user.interests or [])]
+        Args:
+            daily_task: Запись за сегодня (get_daily_task)
+            
+        Returns:
+            Словарь remaining, reset_at (следующий день в 00:00 МСК), paid_available
+        """
+        count = daily_task.count if daily_task else 0
+        remaining = max(0, 3 - count)
+        # Обрабатываем случай, когда paid_available может быть None (для старых записей)
+        paid_available = daily_task.paid_available if daily_task and daily_task.paid_available is not None else 0
         
-        # Получаем выполненные задания
-        completed_task_ids = [
-            ct.task_id for ct in db.query(CompletedTask.task_id).filter(
-                CompletedTask.user_id == user.tg_id
-            ).all()
-        ]
+        # Время сброса - следующий день в 00:00 МСК
+        moscow_tz = pytz.timezone(settings.TIMEZONE)
+        tomorrow = date.today() + timedelta(days=1)
+        reset_at = moscow_tz.localize(datetime.combine(tomorrow, datetime.min.time()))
         
-        # Базовый запрос заданий
-        query = db.query(Task).filter(
-            Task.is_active == True
+        return {
+            "remaining": remaining,
+            "reset_at": reset_at,
+            "paid_available": paid_available
+        }
+    
+    @staticmethod
+    async def _get_daily_task(db: AsyncSession, user_id: int, day: date) -> Optional[DailyFreeTask]:
+        """Запись о бесплатных заданиях пользователя за день"""
+        result = await db.execute(
+            select(DailyFreeTask).where(
+                and_(
+                    DailyFreeTask.user_id == user_id,
+                    DailyFreeTask.date == day
+                )
+            )
         )
-        
-        # Фильтр по категориям интересов
-        if user_category_ids:
-            query = query.filter(Task.category_id.in_(user_category_ids))
-        
-        # Фильтр по категории (если указана)
-        if category_id:
-            query = query.filter(Task.category_id == category_id)
-        
-        # Фильтр по полу пользователя
-        # Задание должно быть для 'all' или для пола пользователя
-        gender_filter = or_(
-            TaskGenderTarget.gender == GenderTarget.ALL,
-            TaskGenderTarget.gender == user.gender.value
+        return result.scalars().first()
+
+    @staticmethod
+    async def _ensure_daily_task(db: AsyncSession, user_id: int, day: date) -> None:
+        """
+        Создание записи о бесплатных заданиях за день, если её еще нет
+
+        INSERT ... ON CONFLICT DO NOTHING по (user_id, date): параллельные
+        запросы не падают на уникальном ограничении. Коммит остается
+        за вызывающим кодом.
+        """
+        await db.execute(
+            dialect_insert(DailyFreeTask)
+            .values(user_id=user_id, date=day, count=0, paid_available=0)
+            .on_conflict_do_nothing(index_elements=["user_id", "date"])
         )
+
+    @staticmethod
+    async def _upsert_daily_task(db: AsyncSession, user_id: int, day: date, values: Dict, set_: Dict, where=None):
+        """
+        Атомарное изменение записи за день одним запросом
         
-        task_ids_with_gender = db.query(TaskGenderTarget.task_id).filter(
-            gender_filter
-        ).distinct().all()
-        task_ids_with_gender = [t[0] for t in task_ids_with_gender]
-        
-        query = query.filter(Task.id.in_(task_ids_with_gender))
-        
-        # Исключаем выполненные задания
-        if completed_task_ids:
-            query = query.filter(~Task.id.in_(completed_task_ids))
-        
-        # Получаем общее количество
-        total = query.count()
+        INSERT ... ON CONFLICT (user_id, date) DO UPDATE ... WHERE ... RETURNING:
+        новая запись создается сразу с values, существующая изменяется по set_,
+        если выполнено условие where. Коммит остается за вызывающим кодом.
         
-        # Получаем задания с пагинацией
-        tasks = query.order_by(Task.created_at.desc()).offset(offset).limit(limit).all()
+        Returns:
+            Строка (count, paid_available) после изменения или None,
+            если условие не выполнено
+        """
+        result = await db.execute(
+            dialect_insert(DailyFreeTask)
+            .values(user_id=user_id, date=day, **values)
+            .on_conflict_do_update(index_elements=["user_id", "date"], set_=set_, where=where)
+            .returning(DailyFreeTask.count, DailyFreeTask.paid_available)
+        )
+        return result.first()
+
+    @staticmethod
+    async def _get_balance(db: AsyncSession, user_id: int) -> int:
+        """
+        Актуальный баланс пользователя
+
+        Баланс не входит в снимок пользователя (его меняют платежи и бонусы
+        в других запросах), поэтому читается из БД.
+        """
+        return (await db.execute(select(User.balance).where(User.tg_id == user_id))).scalar_one()
+
+    @staticmethod
+    async def get_tasks_for_user(
+        db: AsyncSession,
+        user: UserSnapshot,
+        limit: int = 10,
+        offset: int = 0,
+        category_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        daily_task: Optional[DailyFreeTask] = None
+    ) -> Dict:
+        """
+        Получение списка заданий для пользователя
         
+        Args:
+            db: Сессия БД
+            user: Снимок пользователя (UserSnapshot)
+            limit: Лимит заданий
+            offset: Смещение (игнорируется, если передан курсор)
+            category_id: Фильтр по категории (опционально)
+            cursor: Курсор следующей страницы (next_cursor предыдущего ответа)
+            daily_task: Уже загруженная запись за сегодня (get_daily_task), чтобы не читать ее повторно
+            
+        Returns:
+            Словарь с заданиями и метаданными
+            
+        Raises:
+            ValueError: Если курсор поврежден
+        """
         # Получаем информацию о бесплатных заданиях
-        today = date.today()
-        daily_task = db.query(DailyFreeTask).filter(
-            and_(
-                DailyFreeTask.user_id == user.tg_id,
-                DailyFreeTask.date == today
-            )
-        ).first()
-        
-        # Если записи нет, создаем её с count=0 (для нового пользователя)
-        if not daily_task:
-            daily_task = DailyFreeTask(
-                user_id=user.tg_id,
-                date=today,
-                count=0,
-                paid_available=0
-            )
-            db.add(daily_task)
-            db.commit()
-            db.refresh(daily_task)
+        if daily_task is None:
+            daily_task = await TaskService.get_daily_task(db, user.tg_id)
         
         free_count = daily_task.count if daily_task else 0
         free_remaining = max(0, 3 - free_count)
@@ -112,62 +160,32 @@ class TaskService:
         paid_available = (daily_task.paid_available if daily_task and daily_task.paid_available is not None else 0)
         total_available = free_remaining + paid_available
         
-        # Ограничиваем количество заданий до общего доступного лимита
-        # Пользователь может получить только столько заданий, сколько у него осталось бесплатных попыток + купленных
-        max_tasks_to_return = total_available
-        tasks = tasks[:max_tasks_to_return] if max_tasks_to_return > 0 else []
+        # Пользователь может получить только столько заданий, сколько у него осталось
+        # бесплатных попыток + купленных, поэтому ограничиваем страницу сразу в SQL.
+        # Вся страница (переводы, fallback на русский, категории) выбирается одним запросом
+        page_limit = max(0, min(limit, total_available))
+        feed_tasks, total, next_cursor = await TaskFeedService.get_page(
+            db,
+            user,
+            limit=page_limit,
+            offset=offset,
+            category_id=category_id,
+            cursor=cursor
+        )
         
-        # Формируем ответ с переводами
+        # Формируем ответ (сначала бесплатные, затем купленные)
         task_responses = []
-        for task in tasks:
-            # Получаем перевод на язык пользователя
-            translation = db.query(TaskTranslation).filter(
-                and_(
-                    TaskTranslation.task_id == task.id,
-                    TaskTranslation.language_id == user.language_id
-                )
-            ).first()
-            
-            # Если перевода нет, используем русский (fallback)
-            if not translation:
-                ru_language = db.query(Language).filter(Language.code == 'ru').first()
-                if ru_language:
-                    translation = db.query(TaskTranslation).filter(
-                        and_(
-                            TaskTranslation.task_id == task.id,
-                            TaskTranslation.language_id == ru_language.id
-                        )
-                    ).first()
-            
-            if not translation:
-                continue  # Пропускаем задания без перевода
-            
-            # Определяем, бесплатное ли задание (сначала бесплатные, затем купленные)
-            is_free = len(task_responses) < free_remaining
-            
-            # Получаем категорию
-            category = db.query(TaskCategory).filter(TaskCategory.id == task.category_id).first()
-            category_translation = db.query(CategoryTranslation).filter(
-                and_(
-                    CategoryTranslation.category_id == task.category_id,
-                    CategoryTranslation.language_id == user.language_id
-                )
-            ).first()
-            
-            category_name = category.slug if category else ""
-            if category_translation:
-                category_name = category_translation.name
-            
+        for feed_task in feed_tasks:
             task_responses.append({
-                "id": task.id,
-                "title": translation.title,
-                "description": translation.description,
+                "id": feed_task.id,
+                "title": feed_task.title,
+                "description": feed_task.description,
                 "category": {
-                    "id": task.category_id,
-                    "name": category_name,
-                    "color": category.color if category else "#000000"
+                    "id": feed_task.category_id,
+                    "name": feed_task.category_name,
+                    "color": feed_task.category_color
                 },
-                "is_free": is_free,
+                "is_free": len(task_responses) < free_remaining,
                 "is_completed": False
             })
         
@@ -175,167 +193,164 @@ class TaskService:
             "tasks": task_responses,
             "total": total,
             "free_remaining": free_remaining,
-            "paid_available": paid_available
+            "paid_available": paid_available,
+            "next_cursor": next_cursor
         }
     
     @staticmethod
-    def complete_task(db: Session, user: User, task_id: int) -> Dict:
+    async def complete_task(db: AsyncSession, user: UserSnapshot, task_id: int) -> Dict:
         """
         Выполнение задания пользователем
         
+        Слот списывается одним условным атомарным upsert (count < 3, иначе
+        paid_available > 0) с RETURNING, выполнение записывается
+        INSERT ... ON CONFLICT DO NOTHING. Все изменения - одна короткая
+        транзакция записи из двух запросов, параллельные запросы
+        не теряют обновления.
+        
         Args:
             db: Сессия БД
-            user: Пользователь
+            user: Снимок пользователя (UserSnapshot)
             task_id: ID задания
             
         Returns:
             Результат выполнения
         """
         # Проверяем, не выполнено ли уже
-        existing = db.query(CompletedTask).filter(
-            and_(
-                CompletedTask.user_id == user.tg_id,
-                CompletedTask.task_id == task_id
+        existing = (await db.execute(
+            select(CompletedTask.id).where(
+                and_(
+                    CompletedTask.user_id == user.tg_id,
+                    CompletedTask.task_id == task_id
+                )
             )
-        ).first()
+        )).scalar()
         
         if existing:
             return {
                 "success": False,
                 "message": "Задание уже выполнено",
-                "balance": user.balance
+                "balance": await TaskService._get_balance(db, user.tg_id)
             }
         
-        # Получаем задание
-        task = db.query(Task).filter(Task.id == task_id).first()
-        if not task:
+        # Проверяем, что задание существует
+        task_exists = (await db.execute(select(Task.id).where(Task.id == task_id))).scalar()
+        if not task_exists:
             return {
                 "success": False,
                 "message": "Задание не найдено",
-                "balance": user.balance
+                "balance": await TaskService._get_balance(db, user.tg_id)
             }
         
-        # Проверяем, бесплатное ли задание
         today = date.today()
-        daily_task = db.query(DailyFreeTask).filter(
-            and_(
-                DailyFreeTask.user_id == user.tg_id,
-                DailyFreeTask.date == today
-            )
-        ).first()
+        user_id = user.tg_id
+        paid_available = func.coalesce(DailyFreeTask.paid_available, 0)
+        has_free_slot = DailyFreeTask.count < 3
         
-        if not daily_task:
-            daily_task = DailyFreeTask(
-                user_id=user.tg_id,
-                date=today,
-                count=0,
-                paid_available=0
+        # Слот и запись о выполнении - одна короткая транзакция записи
+        async with serialized_write():
+            # Бесплатное задание - увеличиваем счетчик, иначе используем купленный
+            # слот без дополнительного списания; нет слотов - строка не изменяется
+            slot = await TaskService._upsert_daily_task(
+                db, user_id, today,
+                values={"count": 1, "paid_available": 0},
+                set_={
+                    "count": case((has_free_slot, DailyFreeTask.count + 1), else_=DailyFreeTask.count),
+                    "paid_available": case((has_free_slot, paid_available), else_=paid_available - 1),
+                },
+                where=or_(has_free_slot, paid_available > 0)
             )
-            db.add(daily_task)
-            db.flush()
-        
-        is_free = daily_task.count < 3
-        # Обрабатываем случай, когда paid_available может быть None (для старых записей)
-        paid_available_value = daily_task.paid_available if daily_task.paid_available is not None else 0
-        has_paid_slot = paid_available_value > 0
-        
-        if is_free:
-            # Бесплатное задание - увеличиваем счетчик
-            daily_task.count += 1
-        elif has_paid_slot:
-            # Используем купленный слот без дополнительного списания
-            # Убеждаемся, что paid_available не None перед уменьшением
-            if daily_task.paid_available is None:
-                daily_task.paid_available = 0
-            daily_task.paid_available -= 1
-        else:
-            # Нет бесплатных и купленных слотов
-            return {
-                "success": False,
-                "message": "Бесплатные задания закончились. Купите дополнительное задание за 10 искр.",
-                "balance": user.balance
-            }
-        
-        # Создаем запись о выполнении
-        completed_task = CompletedTask(
-            user_id=user.tg_id,
-            task_id=task_id
-        )
-        db.add(completed_task)
-        
-        db.commit()
-        db.refresh(user)
+            if slot is None:
+                # Нет бесплатных и купленных слотов (ничего не изменено -
+                # commit завершает транзакцию без сброса объектов сессии)
+                await db.commit()
+                return {
+                    "success": False,
+                    "message": "Бесплатные задания закончились. Купите дополнительное задание за 10 искр.",
+                    "balance": await TaskService._get_balance(db, user_id)
+                }
+            
+            # Создаем запись о выполнении (параллельный запрос мог успеть раньше)
+            completed_id = (await db.execute(
+                dialect_insert(CompletedTask)
+                .values(user_id=user_id, task_id=task_id)
+                .on_conflict_do_nothing(index_elements=["user_id", "task_id"])
+                .returning(CompletedTask.id)
+            )).scalar()
+            if completed_id is None:
+                # Слот не тратится повторно
+                await db.rollback()
+                return {
+                    "success": False,
+                    "message": "Задание уже выполнено",
+                    "balance": await TaskService._get_balance(db, user_id)
+                }
+            
+            await db.commit()
         
         return {
             "success": True,
             "message": "Задание выполнено",
-            "balance": user.balance
+            "balance": await TaskService._get_balance(db, user_id)
         }
 
     @staticmethod
-    def purchase_extra_task(db: Session, user: User) -> Dict:
+    async def purchase_extra_task(db: AsyncSession, user: UserSnapshot) -> Dict:
         """
         Покупка дополнительного задания за 10 искр
+        
+        Баланс списывается условным атомарным UPDATE (balance >= 10)
+        с RETURNING, поэтому параллельные покупки не уводят баланс в минус
+        и не теряют списания.
         """
         COST = 10
-        if user.balance < COST:
-            return {
-                "success": False,
-                "message": "Недостаточно искр для покупки задания",
-                "balance": user.balance,
-                "free_remaining": 0,
-                "paid_available": 0
-            }
-        
         today = date.today()
-        daily_task = db.query(DailyFreeTask).filter(
-            and_(
-                DailyFreeTask.user_id == user.tg_id,
-                DailyFreeTask.date == today
+        user_id = user.tg_id
+        
+        async with serialized_write():
+            new_balance = (await db.execute(
+                update(User)
+                .where(User.tg_id == user_id, User.balance >= COST)
+                .values(balance=User.balance - COST)
+                .returning(User.balance)
+                .execution_options(synchronize_session=False)
+            )).scalar()
+            
+            if new_balance is None:
+                # Баланс не изменен - commit завершает транзакцию без сброса объектов сессии
+                await db.commit()
+                return {
+                    "success": False,
+                    "message": "Недостаточно искр для покупки задания",
+                    "balance": await TaskService._get_balance(db, user_id),
+                    "free_remaining": 0,
+                    "paid_available": 0
+                }
+            
+            # Увеличиваем количество купленных слотов
+            slot = await TaskService._upsert_daily_task(
+                db, user_id, today,
+                values={"count": 0, "paid_available": 1},
+                set_={"paid_available": func.coalesce(DailyFreeTask.paid_available, 0) + 1}
             )
-        ).first()
-
-        if not daily_task:
-            daily_task = DailyFreeTask(
-                user_id=user.tg_id,
-                date=today,
-                count=0,
-                paid_available=0
+            
+            # Создаем транзакцию
+            transaction = Transaction(
+                user_id=user_id,
+                amount=-COST,
+                transaction_type=TransactionType.PURCHASE,
+                payment_method=PaymentMethod.SYSTEM,
+                status=TransactionStatus.COMPLETED,
+                description="Покупка дополнительного задания за 10 искр"
             )
-            db.add(daily_task)
-            db.flush()
-
-        # Списываем баланс и увеличиваем количество купленных слотов
-        user.balance -= COST
-        # Обрабатываем случай, когда paid_available может быть None (для старых записей)
-        if daily_task.paid_available is None:
-            daily_task.paid_available = 0
-        daily_task.paid_available += 1
-
-        # Создаем транзакцию
-        transaction = Transaction(
-            user_id=user.tg_id,
-            amount=-COST,
-            transaction_type=TransactionType.PURCHASE,
-            payment_method=PaymentMethod.SYSTEM,
-            status=TransactionStatus.COMPLETED,
-            description="Покупка дополнительного задания за 10 искр"
-        )
-        db.add(transaction)
-
-        db.commit()
-        db.refresh(user)
-        db.refresh(daily_task)
-
-        free_remaining = max(0, 3 - daily_task.count)
-        # Убеждаемся, что paid_available не None перед возвратом
-        paid_available_value = daily_task.paid_available if daily_task.paid_available is not None else 0
-
+            db.add(transaction)
+            
+            await db.commit()
+        
         return {
             "success": True,
             "message": "Дополнительное задание приобретено",
-            "balance": user.balance,
-            "free_remaining": free_remaining,
-            "paid_available": paid_available_value
+            "balance": new_balance,
+            "free_remaining": max(0, 3 - slot.count),
+            "paid_available": slot.paid_available
         }
-
@@ -0,0 +1,216 @@
+"""
+Асинхронный клиент TON API (tonapi.io)
+
+Один пул соединений httpx.AsyncClient на процесс, ограничение числа
+одновременных запросов, ограничение частоты запросов на хост (token bucket)
+и повтор с экспоненциальной задержкой для 429/5xx и сетевых ошибок.
+Запросы не блокируют event loop (в отличие от requests.get).
+"""
+import asyncio
+import random
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+import httpx
+from app.core.config import settings
+
+# Статусы, при которых запрос имеет смысл повторить
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов (token bucket)
+
+    Args:
+        rate: Запросов в секунду (0 - без ограничения)
+        burst: Размер пачки запросов, которые можно отправить сразу
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Ожидание свободного слота"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class TonApiClient:
+    """
+    Клиент TON API с пулом соединений, ограничениями и повторами
+
+    Args:
+        base_url: URL API (например https://tonapi.io/v2)
+        api_key: Bearer токен (опционально)
+        timeout: Таймаут одного запроса (сек)
+        max_concurrency: Максимум одновременных запросов
+        rate_limit: Запросов в секунду на хост (0 - без ограничения)
+        max_retries: Количество повторов после первой попытки
+        retry_backoff: Базовая задержка перед повтором (сек), удваивается
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str] = None,
+        timeout: float = 10.0,
+        max_concurrency: int = 5,
+        rate_limit: float = 0.0,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._limiters: Dict[str, RateLimiter] = {}
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Пул соединений создается лениво - внутри работающего event loop"""
+        if self._client is None or self._client.is_closed:
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _get_limiter(self, url: str) -> RateLimiter:
+        host = urlsplit(url).netloc
+        limiter = self._limiters.get(host)
+        if limiter is None:
+            limiter = RateLimiter(self.rate_limit, burst=self.max_concurrency)
+            self._limiters[host] = limiter
+        return limiter
+
+    async def aclose(self) -> None:
+        """Закрытие пула соединений (при остановке приложения)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_json(self, path: str) -> Optional[Dict]:
+        """
+        GET запрос к API с повторами
+
+        Args:
+            path: Путь относительно base_url
+
+        Returns:
+            JSON ответа или None (404, ошибка после всех повторов)
+        """
+        client = self._get_client()
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        limiter = self._get_limiter(url)
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.retries += 1
+                # Экспоненциальная задержка с небольшим разбросом
+                delay = self.retry_backoff * (2 ** (attempt - 1))
+                await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+            await limiter.acquire()
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    response = await client.get(url)
+            except httpx.HTTPError as e:
+                print(f"[TON API] Request error ({attempt + 1}/{self.max_retries + 1}): {url} - {e}")
+                continue
+
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code == 404:
+                return None
+            if response.status_code not in RETRY_STATUSES:
+                print(f"[TON API] Error: {response.status_code} - {response.text[:200]}")
+                self.failures += 1
+                return None
+            print(f"[TON API] Retryable status {response.status_code} ({attempt + 1}/{self.max_retries + 1}): {url}")
+
+        self.failures += 1
+        return None
+
+    async def get_transaction(self, transaction_hash: str) -> Optional[Dict]:
+        """Транзакция по хешу или None если не найдена"""
+        return await self.get_json(f"blockchain/transactions/{transaction_hash}")
+
+    async def get_account_transactions(self, account: str, after_lt: int = 0, limit: int = 100) -> Optional[List[Dict]]:
+        """
+        Транзакции аккаунта после logical time after_lt (по возрастанию lt)
+
+        Args:
+            account: Адрес аккаунта
+            after_lt: lt последней обработанной транзакции (0 - с начала)
+            limit: Размер страницы
+
+        Returns:
+            Список транзакций или None при ошибке
+        """
+        data = await self.get_json(
+            f"blockchain/accounts/{account}/transactions"
+            f"?after_lt={after_lt}&limit={limit}&sort_order=asc"
+        )
+        if data is None:
+            return None
+        return data.get("transactions", [])
+
+    async def get_account_last_lt(self, account: str) -> Optional[int]:
+        """
+        lt последней транзакции аккаунта (начальный курсор без истории)
+
+        Returns:
+            lt (0 если транзакций нет) или None при ошибке
+        """
+        data = await self.get_json(f"blockchain/accounts/{account}/transactions?limit=1&sort_order=desc")
+        if data is None:
+            return None
+        transactions = data.get("transactions", [])
+        return int(transactions[0].get("lt") or 0) if transactions else 0
+
+
+def get_api_url() -> str:
+    """URL TON API с учетом сети (testnet использует отдельный хост)"""
+    api_url = settings.TON_API_URL
+    if settings.TON_NETWORK == "testnet":
+        api_url = api_url.replace("tonapi.io/v2", "testnet.tonapi.io/v2")
+    return api_url
+
+
+ton_api_client = TonApiClient(
+    base_url=get_api_url(),
+    api_key=settings.TON_API_KEY,
+    timeout=settings.TON_API_TIMEOUT,
+    max_concurrency=settings.TON_API_MAX_CONCURRENCY,
+    rate_limit=settings.TON_API_RATE_LIMIT,
+    max_retries=settings.TON_API_MAX_RETRIES,
+    retry_backoff=settings.TON_API_RETRY_BACKOFF,
+)
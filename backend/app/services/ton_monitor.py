@@ -0,0 +1,453 @@
+"""
+Фоновый мониторинг pending TON платежей
+
+Два режима (TON_MONITOR_MODE):
+- "hash": pending платежи с хешем транзакции выбираются пачкой и проверяются
+  в TON API конкурентно (ограничения на параллельность и частоту запросов -
+  в ton_api_client). Каждый платеж подтверждается и коммитится в своей
+  сессии: ошибка одного платежа не откатывает остальные, а блокировка
+  записи SQLite держится только на время одного короткого UPDATE.
+  Стоимость прохода - O(pending платежей) запросов к API.
+- "account": входящие переводы на TON_WALLET_ADDRESS читаются страницами
+  после сохраненного в БД курсора lt и сопоставляются с pending платежами
+  в памяти по комментарию (номер транзакции) или по сумме и отправителю.
+  Стоимость прохода - O(новых переводов), без новых переводов - один запрос.
+  Перевод не подтверждает платеж, созданный после него, и не засчитывается
+  второй раз, если его хеш уже записан у другой транзакции.
+"""
+import asyncio
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Set, Tuple
+from sqlalchemy import select, update, insert, or_, and_
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.transaction import Transaction, TransactionStatus, PaymentMethod
+from app.models.ton_cursor import TonAccountCursor
+from app.services.payment_service import PaymentService
+from app.services.ton_api import TonApiClient, ton_api_client
+from app.services.ton_service import TONService
+
+# Номер транзакции в комментарии к переводу (см. PaymentService.create_ton_payment)
+COMMENT_TRANSACTION_RE = re.compile(r"transaction (\d+)")
+
+# Допустимое расхождение часов сервера и блокчейна (сек): перевод не может быть раньше платежа
+TRANSFER_TIME_SKEW = 60
+
+
+def _timestamp(value: Optional[datetime]) -> float:
+    """Unix время created_at (SQLite возвращает время UTC без часового пояса)"""
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def parse_incoming_transfer(tx_data: Dict) -> Optional[Dict]:
+    """
+    Входящий перевод из транзакции аккаунта (формат tonapi.io)
+
+    Returns:
+        {"hash", "lt", "utime", "amount", "source", "comment"} или None, если
+        транзакция не является входящим переводом TON
+    """
+    in_msg = tx_data.get("in_msg") or {}
+    amount = int(in_msg.get("value") or 0)
+    source = (in_msg.get("source") or {}).get("address")
+    if amount <= 0 or not source or tx_data.get("success") is False:
+        return None
+
+    comment = None
+    if in_msg.get("decoded_op_name") == "text_comment":
+        comment = (in_msg.get("decoded_body") or {}).get("text")
+    return {
+        "hash": tx_data.get("hash"),
+        "lt": int(tx_data.get("lt") or 0),
+        "utime": int(tx_data.get("utime") or 0),
+        "amount": str(amount),
+        "source": source,
+        "comment": comment,
+    }
+
+
+def _can_pay(transaction: Transaction, transfer: Dict, stored_hashes: Dict[str, Set[int]]) -> bool:
+    """Перевод мог оплатить платеж: не раньше его создания и не засчитан другой транзакции"""
+    owners = stored_hashes.get(transfer["hash"], set())
+    if owners - {transaction.id}:
+        return False
+    if transfer.get("utime") and transfer["utime"] < _timestamp(transaction.created_at) - TRANSFER_TIME_SKEW:
+        return False
+    return True
+
+
+def match_transfers(
+    transfers: List[Dict],
+    pending: List[Transaction],
+    stored_hashes: Optional[Dict[str, Set[int]]] = None
+) -> List[Tuple[Transaction, Dict]]:
+    """
+    Сопоставление входящих переводов с pending платежами
+
+    Сначала по номеру транзакции из комментария (с проверкой суммы), затем
+    переводы без комментария - по сумме и адресу отправителя, если такой
+    платеж ровно один. Каждый платеж сопоставляется не больше одного раза.
+    Перевод, сделанный раньше платежа (старая история кошелька) или с
+    хешем, уже записанным у другой транзакции, платеж не оплачивает.
+
+    Args:
+        transfers: Входящие переводы (parse_incoming_transfer)
+        pending: Pending платежи
+        stored_hashes: {хеш: ID транзакций в БД с этим ton_transaction_hash}
+
+    Returns:
+        Список пар (платеж, перевод)
+    """
+    stored_hashes = stored_hashes or {}
+    by_id = {transaction.id: transaction for transaction in pending}
+    matched: Dict[int, Tuple[Transaction, Dict]] = {}
+
+    unmatched = []
+    for transfer in transfers:
+        match = COMMENT_TRANSACTION_RE.search(transfer["comment"] or "")
+        transaction = by_id.get(int(match.group(1))) if match else None
+        if (
+            transaction and transaction.id not in matched
+            and transaction.ton_amount == transfer["amount"]
+            and _can_pay(transaction, transfer, stored_hashes)
+        ):
+            matched[transaction.id] = (transaction, transfer)
+        elif not match:
+            unmatched.append(transfer)
+
+    for transfer in unmatched:
+        candidates = [
+            transaction for transaction in pending
+            if transaction.id not in matched
+            and transaction.ton_amount == transfer["amount"]
+            and transaction.ton_from_address == transfer["source"]
+            and _can_pay(transaction, transfer, stored_hashes)
+        ]
+        if len(candidates) == 1:
+            matched[candidates[0].id] = (candidates[0], transfer)
+
+    return list(matched.values())
+
+
+class MonitorMetrics:
+    """Счетчики мониторинга: время проходов и подтверждения в минуту"""
+
+    def __init__(self):
+        self.batches = 0
+        self.checked = 0
+        self.confirmed = 0
+        self.errors = 0
+        self.last_batch_size = 0
+        self.last_batch_seconds = 0.0
+        self.total_batch_seconds = 0.0
+        self.max_batch_seconds = 0.0
+        self._confirmations: Deque[float] = deque()
+
+    def record_batch(self, size: int, seconds: float) -> None:
+        self.batches += 1
+        self.last_batch_size = size
+        self.last_batch_seconds = seconds
+        self.total_batch_seconds += seconds
+        self.max_batch_seconds = max(self.max_batch_seconds, seconds)
+
+    def record_confirmation(self) -> None:
+        self.confirmed += 1
+        self._confirmations.append(time.monotonic())
+
+    def confirmations_per_minute(self) -> int:
+        """Подтверждения за последние 60 секунд"""
+        border = time.monotonic() - 60
+        while self._confirmations and self._confirmations[0] < border:
+            self._confirmations.popleft()
+        return len(self._confirmations)
+
+    def snapshot(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "checked": self.checked,
+            "confirmed": self.confirmed,
+            "errors": self.errors,
+            "confirmations_per_minute": self.confirmations_per_minute(),
+            "last_batch_size": self.last_batch_size,
+            "last_batch_seconds": round(self.last_batch_seconds, 4),
+            "avg_batch_seconds": round(self.total_batch_seconds / self.batches, 4) if self.batches else 0.0,
+            "max_batch_seconds": round(self.max_batch_seconds, 4),
+        }
+
+
+class TonPaymentMonitor:
+    """
+    Проверка pending TON платежей
+
+    Args:
+        client: Клиент TON API
+        batch_size: Максимум платежей за один проход (режим hash)
+        mode: "hash" или "account"
+        wallet_address: Кошелек для приема платежей (режим account)
+        page_size: Транзакций кошелька на страницу (режим account)
+        max_pages: Максимум страниц за один проход (режим account)
+    """
+
+    def __init__(
+        self,
+        client: TonApiClient,
+        batch_size: int = 100,
+        mode: str = "hash",
+        wallet_address: Optional[str] = None,
+        page_size: int = 100,
+        max_pages: int = 10
+    ):
+        self.client = client
+        self.batch_size = batch_size
+        self.mode = mode
+        self.wallet_address = wallet_address
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.metrics = MonitorMetrics()
+        self._lock = asyncio.Lock()
+
+    async def _pending_payments(self) -> list:
+        """Самые старые pending TON платежи с хешем транзакции"""
+        async with AsyncSessionLocal() as db:
+            return list((await db.execute(
+                select(Transaction)
+                .where(
+                    Transaction.payment_method == PaymentMethod.TON,
+                    Transaction.status == TransactionStatus.PENDING,
+                    Transaction.ton_transaction_hash.isnot(None)
+                )
+                .order_by(Transaction.created_at)
+                .limit(self.batch_size)
+            )).scalars())
+
+    async def _check_payment(self, transaction: Transaction) -> bool:
+        """
+        Проверка одного платежа в блокчейне и подтверждение в своей сессии
+
+        Returns:
+            True если платеж подтвержден
+        """
+        try:
+            tx_data = await self.client.get_transaction(transaction.ton_transaction_hash)
+            self.metrics.checked += 1
+            if not tx_data:
+                return False
+
+            expected_to = transaction.ton_to_address or settings.TON_WALLET_ADDRESS
+            expected_amount = transaction.ton_amount or "0"
+            if not TONService.verify_transaction_payment(
+                tx_data,
+                expected_to,
+                expected_amount,
+                transaction.ton_from_address
+            ):
+                return False
+
+            async with AsyncSessionLocal() as db:
+                confirmed = await PaymentService.confirm_ton_payment(db, transaction)
+                await db.commit()
+        except Exception as e:
+            self.metrics.errors += 1
+            print(f"Error checking TON payment {transaction.id}: {e}")
+            return False
+
+        if confirmed:
+            self.metrics.record_confirmation()
+            print(f"TON payment confirmed: transaction {transaction.id}, user {transaction.user_id}")
+        return confirmed
+
+    async def _check_pending_hashes(self) -> Tuple[int, int]:
+        """
+        Режим hash: проверка каждого pending платежа по хешу
+
+        Returns:
+            (проверено платежей, подтверждено)
+        """
+        transactions = await self._pending_payments()
+        results = await asyncio.gather(*(self._check_payment(tx) for tx in transactions))
+        return len(transactions), sum(results)
+
+    async def _pending_for_transfers(self, db, transfers: List[Dict]) -> List[Transaction]:
+        """Pending платежи, которые могут соответствовать переводам"""
+        ids = set()
+        amounts = set()
+        sources = set()
+        for transfer in transfers:
+            match = COMMENT_TRANSACTION_RE.search(transfer["comment"] or "")
+            if match:
+                ids.add(int(match.group(1)))
+            else:
+                amounts.add(transfer["amount"])
+                sources.add(transfer["source"])
+
+        conditions = []
+        if ids:
+            conditions.append(Transaction.id.in_(ids))
+        if amounts:
+            conditions.append(and_(
+                Transaction.ton_amount.in_(amounts),
+                Transaction.ton_from_address.in_(sources)
+            ))
+        if not conditions:
+            return []
+        return list((await db.execute(
+            select(Transaction)
+            .where(
+                Transaction.payment_method == PaymentMethod.TON,
+                Transaction.status == TransactionStatus.PENDING,
+                or_(*conditions)
+            )
+            .order_by(Transaction.created_at)
+        )).scalars())
+
+    async def _stored_hashes(self, db, transfers: List[Dict]) -> Dict[str, Set[int]]:
+        """Транзакции в БД, у которых уже записан хеш одного из переводов"""
+        hashes = {transfer["hash"] for transfer in transfers if transfer["hash"]}
+        stored: Dict[str, Set[int]] = {}
+        if not hashes:
+            return stored
+        rows = await db.execute(
+            select(Transaction.ton_transaction_hash, Transaction.id)
+            .where(Transaction.ton_transaction_hash.in_(hashes))
+        )
+        for tx_hash, transaction_id in rows:
+            stored.setdefault(tx_hash, set()).add(transaction_id)
+        return stored
+
+    async def _initial_lt(self) -> Optional[int]:
+        """
+        Курсор кошелька, для которого его еще нет в БД
+
+        Без pending TON платежей старая история кошелька не нужна - чтение
+        начинается с последней транзакции. Если pending платежи есть,
+        история читается с начала: переводы раньше платежей и уже
+        засчитанные отбрасывает match_transfers.
+
+        Returns:
+            lt или None, если TON API недоступен
+        """
+        async with AsyncSessionLocal() as db:
+            has_pending = (await db.execute(
+                select(Transaction.id)
+                .where(
+                    Transaction.payment_method == PaymentMethod.TON,
+                    Transaction.status == TransactionStatus.PENDING
+                )
+                .limit(1)
+            )).first() is not None
+        if has_pending:
+            return 0
+        return await self.client.get_account_last_lt(self.wallet_address)
+
+    async def _save_cursor(self, db, last_lt: int) -> None:
+        """Сдвиг курсора вперед (курсор никогда не откатывается назад)"""
+        result = await db.execute(
+            update(TonAccountCursor)
+            .where(
+                TonAccountCursor.account == self.wallet_address,
+                TonAccountCursor.last_lt < last_lt
+            )
+            .values(last_lt=last_lt)
+        )
+        if result.rowcount == 0 and await db.get(TonAccountCursor, self.wallet_address) is None:
+            await db.execute(insert(TonAccountCursor).values(account=self.wallet_address, last_lt=last_lt))
+
+    async def _poll_account(self) -> Tuple[int, int]:
+        """
+        Режим account: новые входящие переводы на кошелек после курсора lt
+
+        Каждая страница обрабатывается в одной транзакции БД: подтверждения
+        и новый курсор коммитятся вместе, поэтому после сбоя страница будет
+        прочитана заново, а повторного зачисления не будет (условный UPDATE).
+        Если курсора в БД еще нет, начальный lt выбирает _initial_lt.
+
+        Returns:
+            (прочитано транзакций кошелька, подтверждено платежей)
+        """
+        if not self.wallet_address:
+            print("TON monitor: TON_WALLET_ADDRESS is not set, account polling skipped")
+            return 0, 0
+
+        async with AsyncSessionLocal() as db:
+            cursor = await db.get(TonAccountCursor, self.wallet_address)
+        if cursor is not None:
+            last_lt = cursor.last_lt
+        else:
+            last_lt = await self._initial_lt()
+            if last_lt is None:
+                return 0, 0
+            if last_lt:
+                async with AsyncSessionLocal() as db:
+                    await self._save_cursor(db, last_lt)
+                    await db.commit()
+
+        seen = 0
+        confirmed = 0
+        for _ in range(self.max_pages):
+            page = await self.client.get_account_transactions(self.wallet_address, after_lt=last_lt, limit=self.page_size)
+            if not page:
+                break
+            seen += len(page)
+            page_last_lt = max(int(tx.get("lt") or 0) for tx in page)
+            transfers = [transfer for transfer in map(parse_incoming_transfer, page) if transfer]
+
+            async with AsyncSessionLocal() as db:
+                pending = await self._pending_for_transfers(db, transfers) if transfers else []
+                stored_hashes = await self._stored_hashes(db, transfers) if pending else {}
+                confirmed_now = []
+                for transaction, transfer in match_transfers(transfers, pending, stored_hashes):
+                    if await PaymentService.confirm_ton_payment(db, transaction, transfer["hash"]):
+                        confirmed_now.append(transaction)
+                await self._save_cursor(db, page_last_lt)
+                await db.commit()
+
+            for transaction in confirmed_now:
+                self.metrics.record_confirmation()
+                print(f"TON payment confirmed: transaction {transaction.id}, user {transaction.user_id}")
+            confirmed += len(confirmed_now)
+            self.metrics.checked += len(transfers)
+            last_lt = page_last_lt
+            if len(page) < self.page_size:
+                break
+        return seen, confirmed
+
+    async def run_once(self) -> int:
+        """
+        Один проход мониторинга
+
+        Returns:
+            Количество подтвержденных платежей
+        """
+        # Проходы не накладываются, если предыдущий не успел за интервал
+        if self._lock.locked():
+            return 0
+        async with self._lock:
+            started = time.perf_counter()
+            try:
+                if self.mode == "account":
+                    size, confirmed = await self._poll_account()
+                else:
+                    size, confirmed = await self._check_pending_hashes()
+            except Exception as e:
+                self.metrics.errors += 1
+                print(f"Error monitoring pending payments: {e}")
+                return 0
+
+            self.metrics.record_batch(size, time.perf_counter() - started)
+            return confirmed
+
+ton_payment_monitor = TonPaymentMonitor(
+    ton_api_client,
+    batch_size=settings.TON_MONITOR_BATCH_SIZE,
+    mode=settings.TON_MONITOR_MODE,
+    wallet_address=settings.TON_WALLET_ADDRESS,
+    page_size=settings.TON_MONITOR_PAGE_SIZE,
+    max_pages=settings.TON_MONITOR_MAX_PAGES,
+)
@@ -0,0 +1,139 @@
+"""
+Хранилище одноразовых payload для TON Proof
+
+Payload выдается в /ton-proof/generate и погашается в /ton-proof/check.
+При нескольких воркерах uvicorn запросы попадают в разные процессы,
+поэтому хранилище должно быть общим:
+- "memory": словарь процесса + куча сроков истечения (только один воркер)
+- "redis": общий Redis (SET с EX и атомарный DEL), работает с любым
+  количеством воркеров и инстансов без sticky sessions
+"""
+import heapq
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+
+
+class PayloadStore(ABC):
+    """Интерфейс хранилища payload"""
+
+    @abstractmethod
+    async def put(self, payload: str, ttl: int) -> None:
+        """Сохранение payload на ttl секунд"""
+
+    @abstractmethod
+    async def pop(self, payload: str) -> bool:
+        """
+        Погашение payload (одноразовое использование)
+
+        Returns:
+            True если payload был выдан, не истек и еще не использован
+        """
+
+    @abstractmethod
+    async def size(self) -> int:
+        """Количество хранимых payload (для логов и проверок)"""
+
+    async def close(self) -> None:
+        """Освобождение соединений (при остановке приложения)"""
+
+
+class MemoryPayloadStore(PayloadStore):
+    """
+    Хранилище в памяти процесса
+
+    Сроки истечения лежат в куче (heapq): очистка снимает с вершины только
+    истекшие записи - O(log n) на запись вместо полного прохода по словарю
+    на каждый generate. Погашенные payload остаются в куче до своего срока
+    и пропускаются при очистке.
+    """
+
+    def __init__(self):
+        self._expires: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def _purge(self, now: float) -> int:
+        purged = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, payload = heapq.heappop(self._heap)
+            if self._expires.get(payload) == expires_at:
+                del self._expires[payload]
+                purged += 1
+        return purged
+
+    async def put(self, payload: str, ttl: int) -> None:
+        now = time.monotonic()
+        self._purge(now)
+        expires_at = now + ttl
+        self._expires[payload] = expires_at
+        heapq.heappush(self._heap, (expires_at, payload))
+
+    async def pop(self, payload: str) -> bool:
+        expires_at = self._expires.pop(payload, None)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    async def size(self) -> int:
+        self._purge(time.monotonic())
+        return len(self._expires)
+
+
+class RedisPayloadStore(PayloadStore):
+    """
+    Хранилище в Redis (общее для всех воркеров)
+
+    Срок жизни задает сам Redis (SET ... EX), погашение - DEL: команда
+    атомарна, поэтому при двух одновременных check с одним payload
+    успешен ровно один.
+
+    Args:
+        url: URL Redis (redis://host:port/db)
+        prefix: Префикс ключей
+    """
+
+    def __init__(self, url: str, prefix: str = "sparks:ton-proof:"):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+
+    def _get_client(self):
+        """Клиент создается лениво - внутри работающего event loop"""
+        if self._client is None:
+            import redis.asyncio as redis
+            self._client = redis.from_url(self.url)
+        return self._client
+
+    async def put(self, payload: str, ttl: int) -> None:
+        await self._get_client().set(self.prefix + payload, 1, ex=ttl)
+
+    async def pop(self, payload: str) -> bool:
+        return await self._get_client().delete(self.prefix + payload) == 1
+
+    async def size(self) -> int:
+        count = 0
+        async for _ in self._get_client().scan_iter(match=self.prefix + "*", count=1000):
+            count += 1
+        return count
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def create_payload_store(backend: Optional[str] = None) -> PayloadStore:
+    """
+    Хранилище по настройкам
+
+    Args:
+        backend: "memory" или "redis" (по умолчанию TON_PROOF_STORE)
+    """
+    backend = backend or settings.TON_PROOF_STORE
+    if backend == "redis":
+        return RedisPayloadStore(settings.REDIS_URL)
+    if backend != "memory":
+        raise ValueError(f"Unknown TON_PROOF_STORE: {backend}")
+    return MemoryPayloadStore()
+
+
+payload_store = create_payload_store()
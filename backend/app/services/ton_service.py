@@ -4,14 +4,10 @@
 import hashlib
 import hmac
 import time
-import requests
-import re
 import urllib.parse
 from typing import Dict, Optional
-from sqlalchemy.orm import Session
 from app.core.config import settings
-from app.models.transaction import Transaction, TransactionStatus
-from app.models.user import User
+from app.services.ton_api import ton_api_client
 
 
 class TONService:
@@ -150,6 +146,9 @@ class TONService:
         """
         Проверка транзакции в блокчейне TON
         
+        Запрос идет через общий асинхронный клиент (пул соединений,
+        ограничение частоты и повторы) и не блокирует event loop.
+        
         Args:
             transaction_hash: Хеш транзакции
             
@@ -157,32 +156,7 @@ class TONService:
             Данные транзакции или None если не найдена
         """
         try:
-            # Используем TON API для проверки транзакции
-            api_url = settings.TON_API_URL
-            api_key = settings.TON_API_KEY
-            
-            # Если используется testnet, меняем URL API
-            if settings.TON_NETWORK == "testnet":
-                # Для testnet используем testnet API
-                api_url = api_url.replace("tonapi.io/v2", "testnet.tonapi.io/v2")
-            
-            headers = {}
-            if api_key:
-                headers['Authorization'] = f'Bearer {api_key}'
-            
-            # Запрос к TON API для получения транзакции
-            # Формат зависит от используемого API (tonapi.io, toncenter.com и т.д.)
-            url = f"{api_url}/blockchain/transactions/{transaction_hash}"
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data
-            else:
-                print(f"TON API error: {response.status_code} - {response.text}")
-                return None
-                
+            return await ton_api_client.get_transaction(transaction_hash)
         except Exception as e:
             print(f"Error checking transaction: {e}")
             return None
@@ -230,78 +204,3 @@ class TONService:
         except Exception as e:
             print(f"Error verifying transaction payment: {e}")
             return False
-    
-    @staticmethod
-    async def monitor_pending_payments(db: Session) -> None:
-        """
-        Периодическая проверка всех pending TON платежей
-        
-        Args:
-            db: Сессия БД
-        """
-        try:
-            # Получаем все pending транзакции с методом оплаты TON
-            from app.models.transaction import PaymentMethod
-            
-            pending_transactions = db.query(Transaction).filter(
-                Transaction.payment_method == PaymentMethod.TON,
-                Transaction.status == TransactionStatus.PENDING,
-                Transaction.ton_transaction_hash.isnot(None)
-            ).all()
-            
-            for transaction in pending_transactions:
-                if not transaction.ton_transaction_hash:
-                    continue
-                
-                # Проверяем транзакцию в блокчейне
-                tx_data = await TONService.check_transaction(transaction.ton_transaction_hash)
-                
-                if tx_data:
-                    # Проверяем что транзакция соответствует ожидаемому платежу
-                    expected_to = transaction.ton_to_address or settings.TON_WALLET_ADDRESS
-                    expected_amount = transaction.ton_amount or "0"
-                    
-                    if TONService.verify_transaction_payment(
-                        tx_data,
-                        expected_to,
-                        expected_amount,
-                        transaction.ton_from_address
-                    ):
-                        # Транзакция подтверждена - обновляем статус
-                        transaction.status = TransactionStatus.COMPLETED
-                        
-                        # Пополняем баланс пользователя
-                        user = db.query(User).filter(User.tg_id == transaction.user_id).first()
-                        if user:
-                            # Проверяем если это lifetime подписка
-                            is_lifetime = False
-                            if transaction.description and "lifetime" in transaction.description.lower():
-                                is_lifetime = True
-                            elif isinstance(transaction.amount, str) and transaction.amount.lower() == "lifetime":
-                                is_lifetime = True
-                            else:
-                                # Проверяем по пакету через описание
-                                from app.services.payment_service import PaymentService
-                                packages = PaymentService.get_packages()
-                                match = re.search(r'пакет #(\d+)', transaction.description or '')
-                                if match:
-                                    package_id = int(match.group(1))
-                                    package = next((pkg for pkg in packages if pkg["id"] == package_id), None)
-                                    if package and package.get("amount") == "lifetime":
-                                        is_lifetime = True
-                            
-                            if is_lifetime:
-                                # Для lifetime подписки только устанавливаем флаг, баланс не пополняем
-                                user.has_lifetime_subscription = True
-                            else:
-                                # Для обычных пакетов пополняем баланс
-                                if isinstance(transaction.amount, int) and transaction.amount > 0:
-                                    user.balance += transaction.amount
-                        
-                        db.commit()
-                        print(f"TON payment confirmed: transaction {transaction.id}, user {transaction.user_id}")
-            
-        except Exception as e:
-            print(f"Error monitoring pending payments: {e}")
-            db.rollback()
-
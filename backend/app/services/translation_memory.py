@@ -0,0 +1,342 @@
+"""
+Память переводов (таблица translation_memory)
+
+Одни и те же русские строки (названия, повторяющиеся фразы) при каждом
+запуске translate_tasks и автоперевода уходили в MyMemory/Google заново.
+TranslationService сначала ищет перевод здесь. Ключ - sha256 от
+нормализованного текста, исходного и целевого языка и провайдера: переводы
+разных провайдеров хранятся отдельно, берется перевод провайдера с
+наибольшим приоритетом.
+
+Чтение: lookup ищет все тексты одним запросом; prefetch заранее загружает
+переводы пачки текстов (всех заданий translate_tasks, всех языков задания)
+в память процесса, и lookup по ним в БД уже не ходит. Кэш процесса - LRU
+не больше max_entries ключей; найденные и отсутствующие переводы живут в
+нем TRANSLATION_MEMORY_LOCAL_TTL секунд, поэтому долгоживущий воркер видит
+удаление перевода в админке и переводы других процессов.
+
+Запись: новые переводы и счетчики попаданий копятся в памяти процесса, а
+flush() записывает их одной транзакцией - потоки переводчиков в БД не
+пишут. Одни попадания записываются пачками по FLUSH_TOUCHES (или
+flush(force=True) в конце команды), чтобы перевод из памяти не стоил
+отдельной транзакции на задание. После записи размер таблицы ограничивается
+TRANSLATION_MEMORY_MAX_ENTRIES: удаляются записи с самым старым
+last_used_at.
+
+Один экземпляр на процесс (get_translation_memory), потокобезопасный.
+"""
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, func, select, update, delete
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import SessionLocal, dialect_insert
+from app.models.translation import TranslationMemory
+
+# Ограничение числа параметров в одном запросе IN (...)
+LOOKUP_CHUNK = 500
+
+# Счетчики попаданий без новых переводов записываются пачкой от стольких попаданий
+FLUSH_TOUCHES = 100
+
+# Маркер "в памяти переводов нет" для отрицательного кэширования
+_MISSING = object()
+
+
+def _utcnow() -> datetime:
+    """Текущее время UTC без часового пояса (как его хранит Django)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Нормализация исходного текста для ключа
+
+    Unicode NFC, пробелы по краям строк убираются, повторяющиеся пробелы
+    внутри строки схлопываются; переносы строк и регистр сохраняются.
+    """
+    text = unicodedata.normalize("NFC", text)
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines())
+
+
+def memory_key(text: str, source_lang: str, target_lang: str, provider: str) -> str:
+    """Ключ записи памяти переводов (sha256, 64 hex символа)"""
+    raw = "\x1f".join((normalize_text(text), source_lang, target_lang, provider))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationMemoryCache:
+    """
+    Память переводов: чтение с кэшем в процессе, отложенная запись
+
+    Args:
+        session_factory: Создание сессии БД для чтения и flush
+        max_entries: Максимум записей в таблице и ключей в кэше процесса (0 - без ограничения)
+        local_ttl: Сколько секунд кэш процесса доверяет найденному или отсутствующему переводу
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_entries: Optional[int] = None,
+        local_ttl: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.max_entries = settings.TRANSLATION_MEMORY_MAX_ENTRIES if max_entries is None else max_entries
+        self.local_ttl = settings.TRANSLATION_MEMORY_LOCAL_TTL if local_ttl is None else local_ttl
+        self._lock = threading.Lock()
+        # key -> (истекает, перевод или _MISSING - уже искали в БД, записи нет);
+        # порядок - от давно использованных к недавним
+        self._entries: "OrderedDict[str, Tuple[float, object]]" = OrderedDict()
+        self._pending: Dict[str, dict] = {}
+        self._touched: Counter = Counter()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember_locally(self, key: str, value: object) -> None:
+        """Запись в LRU процесса (под self._lock)"""
+        self._entries[key] = (time.monotonic() + self.local_ttl, value)
+        self._entries.move_to_end(key)
+        # Кэш процесса не растет бесконечно в долгоживущем воркере
+        while self.max_entries and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _cached(self, key: str, now: float) -> Optional[object]:
+        """
+        Значение из кэша процесса (под self._lock)
+
+        Returns:
+            Перевод, _MISSING или None, если ключа нет или он устарел
+        """
+        pending = self._pending.get(key)
+        if pending is not None:
+            return pending["translated_text"]
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _load(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Поиск ключей в БД пачками; найденные и отсутствующие кэшируются в процессе на local_ttl"""
+        keys = list(keys)
+        found = {}
+        if not keys:
+            return found
+        db = self.session_factory()
+        try:
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                found.update(db.execute(
+                    select(TranslationMemory.key, TranslationMemory.translated_text)
+                    .where(TranslationMemory.key.in_(chunk))
+                ).all())
+        finally:
+            db.close()
+        with self._lock:
+            for key in keys:
+                if key not in self._pending:
+                    self._remember_locally(key, found.get(key, _MISSING))
+        return found
+
+    def prefetch(self, texts: Sequence[str], source_lang: str, target_langs: Sequence[str], providers: Sequence[str]) -> int:
+        """
+        Загрузка переводов пачки текстов на все языки одним запросом на LOOKUP_CHUNK ключей
+
+        Returns:
+            Сколько переводов найдено
+        """
+        keys = {
+            memory_key(text, source_lang, target_lang, provider)
+            for text in texts if text and text.strip()
+            for target_lang in target_langs
+            for provider in providers
+        }
+        now = time.monotonic()
+        with self._lock:
+            keys = [key for key in keys if self._cached(key, now) is None]
+        return len(self._load(keys))
+
+    def lookup(self, texts: Sequence[str], source_lang: str, target_lang: str, providers: Sequence[str]) -> Dict[str, str]:
+        """
+        Поиск переводов текстов
+
+        Если перевод есть у нескольких провайдеров, берется первый по порядку providers.
+
+        Args:
+            texts: Исходные тексты
+            source_lang: Исходный язык
+            target_lang: Целевой язык
+            providers: Провайдеры в порядке приоритета
+
+        Returns:
+            {текст: перевод} для найденных текстов
+        """
+        keys = {text: [memory_key(text, source_lang, target_lang, provider) for provider in providers] for text in texts}
+        now = time.monotonic()
+        values = {}
+        with self._lock:
+            for text_keys in keys.values():
+                for key in text_keys:
+                    values[key] = self._cached(key, now)
+        unknown = [key for key, value in values.items() if value is None]
+        if unknown:
+            found = self._load(unknown)
+            values.update((key, found.get(key, _MISSING)) for key in unknown)
+
+        result = {}
+        with self._lock:
+            for text, text_keys in keys.items():
+                for key in text_keys:
+                    value = values[key]
+                    if value is not _MISSING:
+                        result[text] = value
+                        self._touched[key] += 1
+                        break
+            self.hits += len(result)
+            self.misses += len(keys) - len(result)
+        return result
+
+    def store(self, text: str, source_lang: str, target_lang: str, provider: str, translated: str) -> None:
+        """Новый перевод (в БД попадет при flush)"""
+        key = memory_key(text, source_lang, target_lang, provider)
+        with self._lock:
+            self._pending[key] = {
+                "key": key,
+                "provider": provider,
+                "source_lang": source_lang,
+                "target_lang": target_lang,
+                "source_text": normalize_text(text),
+                "translated_text": translated,
+            }
+            self._remember_locally(key, translated)
+
+    def flush(self, force: bool = False) -> Tuple[int, int]:
+        """
+        Запись новых переводов и счетчиков попаданий, вытеснение лишних записей
+
+        Args:
+            force: Записать счетчики попаданий, даже если их меньше FLUSH_TOUCHES
+
+        Returns:
+            (записано переводов, удалено старых записей)
+        """
+        with self._lock:
+            if not self._pending and not force and sum(self._touched.values()) < FLUSH_TOUCHES:
+                return 0, 0
+            pending, self._pending = list(self._pending.values()), {}
+            touched, self._touched = self._touched, Counter()
+        if not pending and not touched:
+            return 0, 0
+
+        now = _utcnow()
+        db = self.session_factory()
+        try:
+            if pending:
+                # Тот же текст мог перевести другой процесс - оставляем новый перевод
+                insert = dialect_insert(TranslationMemory, db.get_bind())
+                db.execute(
+                    insert.on_conflict_do_update(
+                        index_elements=["key"],
+                        set_={"translated_text": insert.excluded.translated_text, "last_used_at": now}
+                    ),
+                    [dict(row, hits=0, created_at=now, last_used_at=now) for row in pending]
+                )
+            if touched:
+                table = TranslationMemory.__table__
+                db.execute(
+                    update(table)
+                    .where(table.c.key == bindparam("touched_key"))
+                    .values(hits=table.c.hits + bindparam("count"), last_used_at=now),
+                    [{"touched_key": key, "count": count} for key, count in touched.items()]
+                )
+            evicted = self.evict(db) if pending else 0
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Не записанное вернется при следующем flush
+            with self._lock:
+                for row in pending:
+                    self._pending.setdefault(row["key"], row)
+                self._touched.update(touched)
+            raise
+        finally:
+            db.close()
+        return len(pending), evicted
+
+    def evict(self, db: Session) -> int:
+        """
+        Удаление давно не использованных записей сверх max_entries (без commit)
+
+        Returns:
+            Количество удаленных записей
+        """
+        if not self.max_entries:
+            return 0
+        excess = db.query(func.count(TranslationMemory.id)).scalar() - self.max_entries
+        if excess <= 0:
+            return 0
+        oldest = select(TranslationMemory.id).order_by(TranslationMemory.last_used_at, TranslationMemory.id).limit(excess)
+        evicted = db.execute(delete(TranslationMemory).where(TranslationMemory.id.in_(oldest))).rowcount
+        # Удаленные переводы не должны находиться из кэша процесса
+        with self._lock:
+            self._entries.clear()
+        return evicted
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Статистика памяти переводов
+
+        Returns:
+            entries - записей в таблице, stored_hits - попаданий за все время
+            (по записям в таблице), hits/misses/hit_rate - поиски этого процесса
+        """
+        db = self.session_factory()
+        try:
+            entries, stored_hits = db.query(
+                func.count(TranslationMemory.id), func.coalesce(func.sum(TranslationMemory.hits), 0)
+            ).one()
+        finally:
+            db.close()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "stored_hits": stored_hits,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def format_stats(self) -> str:
+        """Статистика одной строкой для вывода скриптов"""
+        stats = self.stats()
+        return (
+            f"записей {stats['entries']}/{stats['max_entries'] or '∞'}, "
+            f"попаданий {stats['hits']} из {stats['hits'] + stats['misses']} ({stats['hit_rate']:.0%}), "
+            f"всего попаданий {stats['stored_hits']}"
+        )
+
+
+_memory: Optional[TranslationMemoryCache] = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory() -> Optional[TranslationMemoryCache]:
+    """Память переводов процесса или None, если TRANSLATION_MEMORY_ENABLED=false"""
+    global _memory
+    if not settings.TRANSLATION_MEMORY_ENABLED:
+        return None
+    with _memory_lock:
+        if _memory is None:
+            _memory = TranslationMemoryCache()
+        return _memory
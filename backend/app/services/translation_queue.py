@@ -0,0 +1,298 @@
+"""
+Очередь автоперевода заданий (таблица translation_jobs)
+
+Сохранение задания в админке не ходит во внешние API перевода: оно только
+добавляет задачу pending (admin_app/translation_queue.py). Задачи выполняет
+отдельный процесс scripts/translation_worker.py - пул потоков
+TranslationWorker, не больше TRANSLATION_WORKER_CONCURRENCY заданий
+одновременно.
+
+Захват задачи - условный UPDATE pending -> running, поэтому несколько
+процессов воркера не возьмут одну задачу дважды, а два перевода одного
+задания не выполняются одновременно. Неудачная попытка возвращает задачу
+в pending с экспоненциальной задержкой, после TRANSLATION_JOB_MAX_ATTEMPTS
+попыток задача становится failed (видно в админке, там же ее можно
+перезапустить). Задачу running, чей воркер упал, возвращает в очередь
+release_stale через TRANSLATION_JOB_LEASE секунд.
+"""
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+from sqlalchemy import exists, func
+from sqlalchemy.orm import Session, aliased
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.translation import TranslationJob, TranslationJobStatus
+from app.services.translation_memory import get_translation_memory
+from app.services.translation_service import TranslationService
+
+PENDING = TranslationJobStatus.PENDING.value
+RUNNING = TranslationJobStatus.RUNNING.value
+DONE = TranslationJobStatus.DONE.value
+FAILED = TranslationJobStatus.FAILED.value
+
+
+def utcnow() -> datetime:
+    """Текущее время UTC без часового пояса (как его хранит Django)"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class TranslationQueue:
+    """Операции с очередью переводов"""
+
+    @staticmethod
+    def enqueue(db: Session, task_id: int, source_lang: str = "ru") -> Optional[int]:
+        """
+        Добавление задачи перевода задания (без commit)
+
+        Если у задания уже есть задача pending, новая не создается: она
+        прочитает актуальный исходный текст при выполнении.
+
+        Args:
+            db: Сессия БД
+            task_id: ID задания
+            source_lang: Исходный язык
+
+        Returns:
+            ID новой задачи или None, если задача уже в очереди
+        """
+        queued = db.query(TranslationJob.id).filter(
+            TranslationJob.task_id == task_id,
+            TranslationJob.status == PENDING
+        ).first()
+        if queued:
+            return None
+        job = TranslationJob(task_id=task_id, source_lang=source_lang, status=PENDING, attempts=0, run_after=utcnow())
+        db.add(job)
+        db.flush()
+        return job.id
+
+    @staticmethod
+    def claim(db: Session, worker_id: str) -> Optional[TranslationJob]:
+        """
+        Захват следующей готовой задачи
+
+        Задачи заданий, которые сейчас переводит другой воркер, пропускаются.
+        Если задачу перехватил другой процесс, берется следующая.
+
+        Args:
+            db: Сессия БД
+            worker_id: Имя воркера (сохраняется в locked_by)
+
+        Returns:
+            Задача в статусе running или None, если готовых задач нет
+        """
+        running = aliased(TranslationJob)
+        task_busy = exists().where(running.task_id == TranslationJob.task_id, running.status == RUNNING)
+        while True:
+            now = utcnow()
+            job_id = db.query(TranslationJob.id).filter(
+                TranslationJob.status == PENDING,
+                TranslationJob.run_after <= now,
+                ~task_busy
+            ).order_by(TranslationJob.run_after, TranslationJob.id).limit(1).scalar()
+            if job_id is None:
+                db.rollback()
+                return None
+            # Условие повторяется в UPDATE: захват атомарен и между процессами
+            claimed = db.query(TranslationJob).filter(
+                TranslationJob.id == job_id,
+                TranslationJob.status == PENDING,
+                ~task_busy
+            ).update({
+                TranslationJob.status: RUNNING,
+                TranslationJob.attempts: TranslationJob.attempts + 1,
+                TranslationJob.locked_by: worker_id,
+                TranslationJob.locked_at: now,
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return db.get(TranslationJob, job_id)
+
+    @staticmethod
+    def complete(db: Session, job: TranslationJob) -> None:
+        """Задача выполнена"""
+        job.status = DONE
+        job.last_error = None
+        job.locked_by = None
+        job.finished_at = utcnow()
+        db.commit()
+
+    @staticmethod
+    def fail(db: Session, job: TranslationJob, error: str) -> None:
+        """
+        Неудачная попытка: повтор с задержкой или failed после последней попытки
+
+        Args:
+            db: Сессия БД
+            job: Задача в статусе running
+            error: Текст ошибки (сохраняется в last_error)
+        """
+        job.last_error = error[:500]
+        job.locked_by = None
+        if job.attempts >= settings.TRANSLATION_JOB_MAX_ATTEMPTS:
+            job.status = FAILED
+            job.finished_at = utcnow()
+        else:
+            delay = settings.TRANSLATION_JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.status = PENDING
+            job.run_after = utcnow() + timedelta(seconds=delay)
+        db.commit()
+
+    @staticmethod
+    def release_stale(db: Session) -> int:
+        """
+        Возврат в очередь задач running, чей воркер не отвечает дольше TRANSLATION_JOB_LEASE
+
+        Returns:
+            Количество возвращенных задач
+        """
+        now = utcnow()
+        released = db.query(TranslationJob).filter(
+            TranslationJob.status == RUNNING,
+            TranslationJob.locked_at < now - timedelta(seconds=settings.TRANSLATION_JOB_LEASE)
+        ).update({
+            TranslationJob.status: PENDING,
+            TranslationJob.locked_by: None,
+            TranslationJob.run_after: now,
+            TranslationJob.last_error: "Воркер не завершил задачу (lease истек)",
+        }, synchronize_session=False)
+        db.commit()
+        return released
+
+    @staticmethod
+    def stats(db: Session) -> Dict[str, int]:
+        """Количество задач по статусам"""
+        counts = dict(
+            db.query(TranslationJob.status, func.count()).group_by(TranslationJob.status).all()
+        )
+        return {status.value: counts.get(status.value, 0) for status in TranslationJobStatus}
+
+
+class TranslationWorker:
+    """
+    Пул потоков, выполняющий задачи очереди переводов
+
+    Переводчики deep-translator синхронные (HTTP через requests), поэтому
+    каждый поток держит свой TranslationService и свою сессию БД.
+
+    Args:
+        concurrency: Сколько заданий переводится одновременно
+        poll_interval: Пауза потока при пустой очереди (сек)
+        service_factory: Создание сервиса перевода для потока
+        log: Функция вывода
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        service_factory: Callable[[], TranslationService] = TranslationService,
+        log: Callable[[str], None] = print,
+    ):
+        self.concurrency = max(1, concurrency or settings.TRANSLATION_WORKER_CONCURRENCY)
+        self.poll_interval = settings.TRANSLATION_WORKER_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.service_factory = service_factory
+        self.log = log
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.processed = {DONE: 0, "retry": 0, FAILED: 0}
+
+    def run(self, drain: bool = False) -> Dict[str, int]:
+        """
+        Выполнение задач до stop() или, при drain=True, пока есть готовые задачи
+
+        Returns:
+            Сколько задач выполнено, отложено на повтор и провалено
+        """
+        db = SessionLocal()
+        try:
+            released = TranslationQueue.release_stale(db)
+            prefetched = self.prefetch(db)
+        finally:
+            db.close()
+        if released:
+            self.log(f"[Translation Worker] Возвращено в очередь брошенных задач: {released}")
+        if prefetched:
+            self.log(f"[Translation Worker] Из памяти переводов загружено переводов: {prefetched}")
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="translation") as pool:
+            for number in range(self.concurrency):
+                pool.submit(self._loop, f"{self.name}/{number}", drain)
+        # Накопленные счетчики попаданий памяти переводов
+        memory = get_translation_memory()
+        if memory is not None:
+            memory.flush(force=True)
+        return self.processed
+
+    def prefetch(self, db: Session, limit: int = 1000) -> int:
+        """
+        Загрузка из памяти переводов переводов заданий, ждущих в очереди
+
+        Память переводов общая для потоков процесса, поэтому задания очереди
+        потом не ищут переводы в БД по одному.
+
+        Returns:
+            Сколько переводов найдено в памяти
+        """
+        task_ids = [
+            task_id for (task_id,) in db.query(TranslationJob.task_id).filter(
+                TranslationJob.status == PENDING
+            ).order_by(TranslationJob.run_after).limit(limit)
+        ]
+        if not task_ids:
+            return 0
+        return self.service_factory().prefetch_tasks(db, task_ids)
+
+    def stop(self) -> None:
+        """Остановка после текущих задач"""
+        self.stop_event.set()
+
+    def _loop(self, worker_id: str, drain: bool) -> None:
+        service = self.service_factory()
+        while not self.stop_event.is_set():
+            db = SessionLocal()
+            try:
+                job = TranslationQueue.claim(db, worker_id)
+                if job is None:
+                    if drain:
+                        return
+                    # Брошенные задачи проверяются, пока очередь пуста
+                    TranslationQueue.release_stale(db)
+                else:
+                    self._process(db, service, job)
+                    continue
+            except Exception as e:
+                self.log(f"[Translation Worker] Ошибка очереди: {e}")
+            finally:
+                db.close()
+            self.stop_event.wait(self.poll_interval)
+
+    def _process(self, db: Session, service: TranslationService, job: TranslationJob) -> None:
+        started = time.perf_counter()
+        try:
+            created = service.translate_task(db, job.task_id, source_lang=job.source_lang, fallback=False)
+        except Exception as e:
+            db.rollback()
+            TranslationQueue.fail(db, job, f"{type(e).__name__}: {e}")
+            outcome = FAILED if job.status == FAILED else "retry"
+            self.log(
+                f"[Translation Worker] Задача #{job.id} (задание {job.task_id}), попытка {job.attempts}: "
+                f"{job.last_error}" + ("" if outcome == FAILED else f", повтор после {job.run_after:%H:%M:%S} UTC")
+            )
+            if outcome == FAILED:
+                traceback.print_exc()
+        else:
+            TranslationQueue.complete(db, job)
+            outcome = DONE
+            self.log(
+                f"[Translation Worker] Задача #{job.id} (задание {job.task_id}): "
+                f"переводов {created}, {time.perf_counter() - started:.1f} с"
+            )
+        with self._lock:
+            self.processed[outcome] += 1
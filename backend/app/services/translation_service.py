@@ -1,8 +1,13 @@
-from typing import Optional
+from typing import Dict, List, Optional, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.models.task import Task, TaskTranslation
 from app.models.language import Language
+from app.services.catalog_cache import bump_catalog_version
+from app.services.translation_memory import get_translation_memory
+import re
+import threading
 import time
 
 # Попытка импортировать переводчики
@@ -16,6 +21,111 @@ except ImportError:
     TRANSLATORS_AVAILABLE['google'] = False
     print("Warning: deep-translator not available")
 
+# Языки, на которые переводятся задания
+TARGET_LANGUAGES = ('en', 'es')
+
+# MyMemory принимает языки названиями или кодами вида ru-RU
+MYMEMORY_LANGUAGES = {
+    'ru': 'russian',
+    'en': 'english',
+    'es': 'spanish',
+    'de': 'german',
+    'fr': 'french',
+    'it': 'italian',
+    'pt': 'portuguese',
+}
+
+# Название и описание отправляются одним текстом через разделитель
+BATCH_SEPARATOR = "\n|||\n"
+BATCH_SPLIT_RE = re.compile(r"\s*\|\|\|\s*")
+
+# Максимальная длина текста одного запроса, если переводчик не задал свою
+MAX_TEXT_LENGTH = 5000
+
+
+class TranslationError(Exception):
+    """Ни один переводчик не вернул перевод (только при fallback=False)"""
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов к переводчику (потокобезопасное)
+    
+    Запросы распределяются равномерно: не чаще одного раз в 1/rate секунд.
+    Поток резервирует слот под блокировкой, а ждет его уже без нее.
+    
+    Args:
+        rate: Запросов в секунду (0 - без ограничения)
+    """
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Ожидание свободного слота"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + 1 / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+# Ограничители по провайдерам - общие для всех потоков и экземпляров сервиса
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, rate: float) -> RateLimiter:
+    """
+    Ограничитель частоты запросов провайдера перевода (один на процесс)
+    
+    Args:
+        provider: Провайдер ('mymemory', 'google')
+        rate: Запросов в секунду, если ограничитель еще не создан
+        
+    Returns:
+        Ограничитель провайдера
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(provider)
+        if limiter is None:
+            limiter = RateLimiter(rate)
+            _rate_limiters[provider] = limiter
+        return limiter
+
+
+class DeepTranslator:
+    """
+    Переводчик deep-translator с языками, заданными при вызове
+    
+    Экземпляр deep-translator хранит языки в себе и игнорирует source/target,
+    переданные в translate(), поэтому на каждый вызов создается новый
+    экземпляр - так же вызовы из разных потоков не мешают друг другу.
+    
+    Args:
+        translator_class: Класс переводчика (MyMemoryTranslator, GoogleTranslator)
+        languages: Замена кодов языков для переводчика (например, 'ru' -> 'russian')
+        **kwargs: Параметры конструктора переводчика
+    """
+    
+    def __init__(self, translator_class, languages: Optional[Dict[str, str]] = None, **kwargs):
+        self.translator_class = translator_class
+        self.languages = languages or {}
+        self.kwargs = kwargs
+    
+    def translate(self, text: str, source: str, target: str) -> str:
+        translator = self.translator_class(
+            source=self.languages.get(source, source),
+            target=self.languages.get(target, target),
+            **self.kwargs
+        )
+        return translator.translate(text)
+
 
 class TranslationService:
     def __init__(self):
@@ -27,8 +137,11 @@ class TranslationService:
             try:
                 self.translators.append({
                     'name': 'MyMemory (API)',
-                    'translator': MyMemoryTranslator(api_key=settings.MYMEMORY_API_KEY),
-                    'priority': 1
+                    'translator': DeepTranslator(MyMemoryTranslator, MYMEMORY_LANGUAGES, api_key=settings.MYMEMORY_API_KEY),
+                    'priority': 1,
+                    'provider': 'mymemory',
+                    'max_length': 500,
+                    'rate_limit': settings.TRANSLATION_MYMEMORY_RATE_LIMIT
                 })
             except:
                 pass
@@ -38,8 +151,11 @@ class TranslationService:
             try:
                 self.translators.append({
                     'name': 'MyMemory (Free)',
-                    'translator': MyMemoryTranslator(),
-                    'priority': 2
+                    'translator': DeepTranslator(MyMemoryTranslator, MYMEMORY_LANGUAGES),
+                    'priority': 2,
+                    'provider': 'mymemory',
+                    'max_length': 500,
+                    'rate_limit': settings.TRANSLATION_MYMEMORY_RATE_LIMIT
                 })
             except:
                 pass
@@ -49,62 +165,100 @@ class TranslationService:
             try:
                 self.translators.append({
                     'name': 'Google Translate',
-                    'translator': GoogleTranslator(),
-                    'priority': 3
+                    'translator': DeepTranslator(GoogleTranslator),
+                    'priority': 3,
+                    'provider': 'google',
+                    'max_length': 5000,
+                    'rate_limit': settings.TRANSLATION_GOOGLE_RATE_LIMIT
                 })
             except:
                 pass
         
         # Сортируем по приоритету
         self.translators.sort(key=lambda x: x['priority'])
+        
+        # Сколько языков одного задания переводится одновременно
+        self.language_concurrency = max(1, settings.TRANSLATION_LANGUAGE_CONCURRENCY)
+        
+        # Память переводов (None, если выключена)
+        self.memory = get_translation_memory()
+    
+    @staticmethod
+    def _provider(translator_info: dict) -> str:
+        return translator_info.get('provider', translator_info['name'])
+    
+    def _providers(self, max_retries: int = 3) -> List[str]:
+        """Провайдеры переводчиков в порядке приоритета (для поиска в памяти переводов)"""
+        return [self._provider(translator_info) for translator_info in self.translators[:max_retries]]
     
-    def translate_text(self, text: str, source_lang: str, target_lang: str, max_retries: int = 3) -> str:
+    def _remember(self, translator_info: dict, text: str, source_lang: str, target_lang: str, translated: str) -> None:
+        if self.memory is not None:
+            self.memory.store(text, source_lang, target_lang, self._provider(translator_info), translated)
+    
+    def _request(self, translator_info: dict, text: str, source_lang: str, target_lang: str) -> str:
+        """Один запрос к переводчику с учетом ограничения частоты его провайдера"""
+        get_rate_limiter(self._provider(translator_info), translator_info.get('rate_limit', 0)).acquire()
+        return translator_info['translator'].translate(text, source=source_lang, target=target_lang)
+    
+    def translate_text(
+        self,
+        text: str,
+        source_lang: str,
+        target_lang: str,
+        max_retries: int = 3,
+        fallback: bool = True
+    ) -> str:
         """
         Перевод текста через бесплатные API с автоматическим fallback
         
+        Сначала перевод ищется в памяти переводов, новый перевод в нее
+        сохраняется.
+        
         Args:
             text: Текст для перевода
             source_lang: Исходный язык (например, 'ru')
             target_lang: Целевой язык (например, 'en')
             max_retries: Максимальное количество попыток с разными переводчиками
+            fallback: Вернуть текст с маркером языка, если перевести не удалось
             
         Returns:
             Переведенный текст
+            
+        Raises:
+            TranslationError: Перевести не удалось и fallback=False
         """
         if not text or not text.strip():
             return text
         
         # Если нет доступных переводчиков
         if not self.translators:
+            if not fallback:
+                raise TranslationError("No translators available")
             print(f"[Translation] No translators available, returning original text")
             return text
         
-        # Маппинг языков для разных переводчиков
-        lang_map = {
-            'ru': 'russian',
-            'en': 'english',
-            'es': 'spanish'
-        }
-        
-        source_mapped = lang_map.get(source_lang, source_lang)
-        target_mapped = lang_map.get(target_lang, target_lang)
+        if self.memory is not None:
+            cached = self.memory.lookup([text], source_lang, target_lang, self._providers(max_retries))
+            if text in cached:
+                print(f"[Translation] Found in translation memory: {source_lang} -> {target_lang}")
+                return cached[text]
         
+        return self._translate_uncached(text, source_lang, target_lang, max_retries, fallback)
+    
+    def _translate_uncached(self, text: str, source_lang: str, target_lang: str, max_retries: int, fallback: bool) -> str:
+        """Перевод текста переводчиками по очереди, без поиска в памяти переводов"""
         # Пробуем каждый переводчик по очереди
         last_error = None
-        for attempt, translator_info in enumerate(self.translators[:max_retries], 1):
+        for translator_info in self.translators[:max_retries]:
             try:
-                translator = translator_info['translator']
                 translator_name = translator_info['name']
                 
-                # Небольшая задержка между попытками для избежания rate limiting
-                if attempt > 1:
-                    time.sleep(0.5)
-                
-                # Все переводчики из deep-translator используют одинаковый интерфейс
-                result = translator.translate(text, source=source_lang, target=target_lang)
+                # Частоту запросов ограничивает RateLimiter провайдера
+                result = self._request(translator_info, text, source_lang, target_lang)
                 
                 if result and result.strip() and result != text:
                     print(f"[Translation] Successfully translated using {translator_name}: {source_lang} -> {target_lang}")
+                    self._remember(translator_info, text, source_lang, target_lang, result.strip())
                     return result.strip()
                 else:
                     print(f"[Translation] Empty result from {translator_name}, trying next translator")
@@ -116,23 +270,172 @@ class TranslationService:
         
         # Если все переводчики не сработали
         print(f"[Translation] All translators failed. Last error: {last_error}")
+        if not fallback:
+            raise TranslationError(f"All translators failed: {last_error}")
         print(f"[Translation] Returning original text with language marker")
         return f"[{target_lang.upper()}] {text}"
     
-    def translate_task(self, db: Session, task_id: int, source_lang: str = 'ru') -> None:
+    def translate_batch(
+        self,
+        texts: List[str],
+        source_lang: str,
+        target_lang: str,
+        max_retries: int = 3,
+        fallback: bool = True
+    ) -> List[str]:
+        """
+        Перевод нескольких текстов одним запросом к переводчику
+        
+        Тексты, найденные в памяти переводов, не переводятся, остальные
+        объединяются через BATCH_SEPARATOR. Если объединенный текст длиннее
+        лимита переводчика или в переводе не сохранились разделители, тексты
+        переводятся по одному.
+        
+        Args:
+            texts: Тексты для перевода (например, название и описание)
+            source_lang: Исходный язык (например, 'ru')
+            target_lang: Целевой язык (например, 'en')
+            max_retries: Максимальное количество попыток с разными переводчиками
+            fallback: Вернуть тексты с маркером языка, если перевести не удалось
+            
+        Returns:
+            Переведенные тексты в том же порядке
+            
+        Raises:
+            TranslationError: Перевести не удалось и fallback=False
+        """
+        result = list(texts)
+        indexes = [i for i, text in enumerate(texts) if text and text.strip()]
+        if not self.translators:
+            for i in indexes:
+                result[i] = self.translate_text(texts[i], source_lang, target_lang, max_retries, fallback)
+            return result
+        
+        # Переводим только тексты, которых нет в памяти переводов
+        if self.memory is not None and indexes:
+            cached = self.memory.lookup([texts[i] for i in indexes], source_lang, target_lang, self._providers(max_retries))
+            for i in indexes:
+                if texts[i] in cached:
+                    result[i] = cached[texts[i]]
+            indexes = [i for i in indexes if texts[i] not in cached]
+        
+        if len(indexes) < 2:
+            for i in indexes:
+                result[i] = self._translate_uncached(texts[i], source_lang, target_lang, max_retries, fallback)
+            return result
+        
+        joined = BATCH_SEPARATOR.join(texts[i].strip() for i in indexes)
+        last_error = None
+        one_by_one = False
+        for translator_info in self.translators[:max_retries]:
+            translator_name = translator_info['name']
+            if len(joined) >= translator_info.get('max_length', MAX_TEXT_LENGTH):
+                one_by_one = True
+                continue
+            
+            try:
+                translated = self._request(translator_info, joined, source_lang, target_lang)
+            except Exception as e:
+                last_error = e
+                print(f"[Translation] Error with {translator_name}: {e}, trying next translator")
+                continue
+            
+            if not translated or not translated.strip() or translated.strip() == joined:
+                print(f"[Translation] Empty result from {translator_name}, trying next translator")
+                continue
+            
+            parts = BATCH_SPLIT_RE.split(translated.strip())
+            if len(parts) == len(indexes) and all(parts):
+                print(f"[Translation] Successfully translated {len(parts)} texts using {translator_name}: {source_lang} -> {target_lang}")
+                for i, part in zip(indexes, parts):
+                    result[i] = part
+                    self._remember(translator_info, texts[i], source_lang, target_lang, part)
+                return result
+            
+            # Переводчик изменил разделители - тексты не сопоставить
+            print(f"[Translation] {translator_name} changed batch separators, translating texts one by one")
+            one_by_one = True
+            break
+        
+        if last_error is not None and not one_by_one:
+            # Все переводчики вернули ошибку - по одному тексту будет то же самое
+            print(f"[Translation] All translators failed. Last error: {last_error}")
+            if not fallback:
+                raise TranslationError(f"All translators failed: {last_error}")
+            print(f"[Translation] Returning original texts with language marker")
+            for i in indexes:
+                result[i] = f"[{target_lang.upper()}] {texts[i]}"
+            return result
+        
+        for i in indexes:
+            result[i] = self._translate_uncached(texts[i], source_lang, target_lang, max_retries, fallback)
+        return result
+    
+    def prefetch_tasks(
+        self,
+        db: Session,
+        task_ids: Sequence[int],
+        source_lang: str = 'ru',
+        target_langs: Optional[Sequence[str]] = None
+    ) -> int:
+        """
+        Загрузка из памяти переводов переводов пачки заданий одним запросом
+        
+        После этого translate_task по этим заданиям не ищет переводы в БД.
+        
+        Args:
+            db: Сессия БД
+            task_ids: ID заданий
+            source_lang: Исходный язык
+            target_langs: Коды языков перевода (по умолчанию TARGET_LANGUAGES)
+            
+        Returns:
+            Сколько переводов найдено в памяти
+        """
+        if self.memory is None or not task_ids or not self.translators:
+            return 0
+        rows = db.query(TaskTranslation.title, TaskTranslation.description).join(Language).filter(
+            TaskTranslation.task_id.in_(task_ids),
+            Language.code == source_lang
+        ).all()
+        texts = [text for row in rows for text in row]
+        return self.memory.prefetch(texts, source_lang, target_langs or TARGET_LANGUAGES, self._providers())
+    
+    def translate_task(
+        self,
+        db: Session,
+        task_id: int,
+        source_lang: str = 'ru',
+        fallback: bool = True,
+        target_langs: Optional[Sequence[str]] = None
+    ) -> int:
         """
         Перевод задания на все языки и сохранение в БД
         
+        Название и описание переводятся одним запросом на язык (translate_batch),
+        языки - параллельно, до language_concurrency одновременно. Переводы
+        всех языков сначала ищутся в памяти переводов (одним запросом), новые
+        записываются в нее после перевода. Сессия БД используется только
+        в вызывающем потоке.
+        
         Args:
             db: Сессия БД
             task_id: ID задания
             source_lang: Исходный язык (по умолчанию 'ru')
+            fallback: Сохранять текст с маркером языка, если перевести не удалось
+            target_langs: Коды языков перевода (по умолчанию TARGET_LANGUAGES)
+            
+        Returns:
+            Количество созданных переводов
+            
+        Raises:
+            TranslationError: Перевести не удалось и fallback=False (ничего не сохраняется)
         """
         # Получаем задание с русским переводом
         task = db.query(Task).filter(Task.id == task_id).first()
         if not task:
             print(f"[Translation] Task {task_id} not found")
-            return
+            return 0
         
         # Получаем русский перевод (source)
         source_translation = db.query(TaskTranslation).join(Language).filter(
@@ -142,61 +445,74 @@ class TranslationService:
         
         if not source_translation:
             print(f"[Translation] No source translation (lang={source_lang}) found for task {task_id}")
-            return
+            return 0
         
         # Получаем языки для перевода (en, es)
         target_languages = db.query(Language).filter(
-            Language.code.in_(['en', 'es']),
+            Language.code.in_(target_langs or TARGET_LANGUAGES),
             Language.is_active == True
         ).all()
         
         if not target_languages:
             print(f"[Translation] No target languages found")
-            return
+            return 0
         
-        translations_created = 0
+        # Языки, на которые задание уже переведено
+        existing_ids = {
+            language_id for (language_id,) in db.query(TaskTranslation.language_id).filter(
+                TaskTranslation.task_id == task_id
+            )
+        }
+        missing = []
         for target_lang in target_languages:
-            # Проверяем, есть ли уже перевод
-            existing = db.query(TaskTranslation).filter(
-                TaskTranslation.task_id == task_id,
-                TaskTranslation.language_id == target_lang.id
-            ).first()
-            
-            if existing:
+            if target_lang.id in existing_ids:
                 print(f"[Translation] Translation for task {task_id} to {target_lang.code} already exists")
-                continue  # Перевод уже существует
-            
-            print(f"[Translation] Translating task {task_id} from {source_lang} to {target_lang.code}...")
-            
-            # Переводим title и description
-            translated_title = self.translate_text(
-                source_translation.title,
-                source_lang,
-                target_lang.code
-            )
-            
-            # Небольшая задержка между переводами для избежания rate limiting
-            time.sleep(0.3)
+            else:
+                missing.append((target_lang.id, target_lang.code))
+        
+        texts = [source_translation.title, source_translation.description]
+        
+        def translate(language_code: str) -> List[str]:
+            print(f"[Translation] Translating task {task_id} from {source_lang} to {language_code}...")
+            return self.translate_batch(texts, source_lang, language_code, fallback=fallback)
+        
+        if self.memory is not None and missing and self.translators:
+            # Переводы всех языков задания из памяти переводов - одним запросом
+            self.memory.prefetch(texts, source_lang, [code for _, code in missing], self._providers())
+        
+        try:
+            # Переводим языки параллельно; при ошибке любого языка ничего не сохраняется
+            workers = min(self.language_concurrency, len(missing))
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate-lang") as pool:
+                    results = list(pool.map(translate, [code for _, code in missing]))
+            else:
+                results = [translate(code) for _, code in missing]
             
-            translated_description = self.translate_text(
-                source_translation.description,
-                source_lang,
-                target_lang.code
-            )
+            translations_created = 0
+            for (language_id, _), (translated_title, translated_description) in zip(missing, results):
+                # Создаем перевод
+                translation = TaskTranslation(
+                    task_id=task_id,
+                    language_id=language_id,
+                    title=translated_title,
+                    description=translated_description
+                )
+                db.add(translation)
+                translations_created += 1
             
-            # Создаем перевод
-            translation = TaskTranslation(
-                task_id=task_id,
-                language_id=target_lang.id,
-                title=translated_title,
-                description=translated_description
-            )
-            db.add(translation)
-            translations_created += 1
-        
-        if translations_created > 0:
-            db.commit()
-            print(f"[Translation] Successfully created {translations_created} translation(s) for task {task_id}")
-        else:
-            print(f"[Translation] No new translations created for task {task_id}")
-
+            if translations_created > 0:
+                # Новые переводы - сбрасываем кэш справочников во всех воркерах
+                bump_catalog_version(db)
+                db.commit()
+                print(f"[Translation] Successfully created {translations_created} translation(s) for task {task_id}")
+            else:
+                print(f"[Translation] No new translations created for task {task_id}")
+        finally:
+            # Переведенные языки сохраняются в памяти и при ошибке остальных
+            if self.memory is not None:
+                try:
+                    self.memory.flush()
+                except Exception as e:
+                    print(f"[Translation] Translation memory flush failed: {e}")
+        return translations_created
@@ -0,0 +1,273 @@
+"""
+In-process кэш пользователей для авторизации запросов
+
+Каждый запрос к API определяет пользователя по X-Wallet-Address или
+X-Telegram-User-ID; без кэша это один-два запроса к БД с загрузкой
+интересов на каждый запрос. Кэш хранит неизменяемый снимок пользователя
+(UserSnapshot) по tg_id и адресу кошелька с коротким TTL, промахи
+(неизвестный кошелек или tg_id) тоже кэшируются.
+
+В снимок входят только идентификация и настройки пользователя.
+Баланс и lifetime подписка меняются платежами, бонусами и мониторингом
+TON в других запросах и процессах, поэтому в снимок не входят и читаются
+из БД там, где нужны.
+
+Инвалидация:
+- UserService сбрасывает запись пользователя после каждого изменения
+  (UserService.reload после commit)
+- Django админка увеличивает версию в таблице user_cache_version; каждый
+  воркер не чаще раза в USER_CACHE_CHECK_INTERVAL секунд сверяет версию
+  и при её изменении сбрасывает кэш целиком (как кэш справочников)
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from app.core.config import settings
+from app.models.user import User, Gender
+from app.models.user_cache import UserCacheVersion
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Неизменяемый снимок пользователя для обработчиков API и сервисов"""
+    tg_id: int
+    username: Optional[str]
+    first_name: str
+    last_name: Optional[str]
+    gender: Gender
+    language_id: int
+    is_admin: bool
+    is_active: bool
+    wallet_address: Optional[str]
+    created_at: Optional[datetime]
+    interest_ids: Tuple[int, ...]
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        """Снимок из модели User (interests должны быть загружены)"""
+        return cls(
+            tg_id=user.tg_id,
+            username=user.username,
+            first_name=user.first_name,
+            last_name=user.last_name,
+            gender=user.gender,
+            language_id=user.language_id,
+            is_admin=user.is_admin,
+            is_active=user.is_active,
+            wallet_address=user.wallet_address,
+            created_at=user.created_at,
+            interest_ids=user.interest_ids,
+        )
+
+
+async def get_user_cache_version(db: AsyncSession) -> int:
+    """Текущая версия кэша пользователей в БД (0 если строки нет)"""
+    version = (await db.execute(
+        select(UserCacheVersion.version).where(UserCacheVersion.id == 1)
+    )).scalar()
+    return version or 0
+
+
+class UserCache:
+    """
+    Кэш снимков пользователей по tg_id и адресу кошелька
+
+    Args:
+        ttl: Время жизни записи (сек), 0 - кэш выключен
+        max_size: Максимум пользователей (вытесняются давно использованные)
+        check_interval: Как часто сверять версию user_cache_version (сек)
+    """
+
+    def __init__(self, ttl: float, max_size: int, check_interval: float):
+        self.ttl = ttl
+        self.max_size = max(1, max_size)
+        self.check_interval = check_interval
+        # tg_id -> (истекает, снимок); порядок - от давно использованных к недавним
+        self._users: "OrderedDict[int, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._wallets: Dict[str, int] = {}
+        # ("tg", tg_id) / ("wallet", адрес) -> истекает: пользователя нет в БД
+        self._missing: Dict[Tuple[str, object], float] = {}
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    # ------------------------------------------------------------------
+    # Сброс
+    # ------------------------------------------------------------------
+
+    def clear(self) -> None:
+        """Сброс всего кэша"""
+        self._users.clear()
+        self._wallets.clear()
+        self._missing.clear()
+        self.invalidations += 1
+
+    def invalidate(self, tg_id: int, wallet_address: Optional[str] = None) -> None:
+        """
+        Сброс записи пользователя после его изменения
+
+        Args:
+            tg_id: Telegram ID
+            wallet_address: Текущий адрес кошелька (сбрасывается кэшированный
+                промах по нему, например после привязки кошелька)
+        """
+        entry = self._users.pop(tg_id, None)
+        if entry is not None and entry[1].wallet_address:
+            self._wallets.pop(entry[1].wallet_address, None)
+        self._missing.pop(("tg", tg_id), None)
+        if wallet_address:
+            self._wallets.pop(wallet_address, None)
+            self._missing.pop(("wallet", wallet_address), None)
+        self.invalidations += 1
+
+    async def _ensure_fresh(self, db: AsyncSession) -> None:
+        """Сверка версии с БД (не чаще раза в check_interval секунд)"""
+        now = time.monotonic()
+        if self._version is not None and now - self._checked_at < self.check_interval:
+            return
+
+        version = await get_user_cache_version(db)
+        if self._version is not None and version != self._version:
+            self.clear()
+        self._version = version
+        self._checked_at = now
+
+    # ------------------------------------------------------------------
+    # Чтение
+    # ------------------------------------------------------------------
+
+    def _cached(self, tg_id: int, now: float) -> Optional[UserSnapshot]:
+        entry = self._users.get(tg_id)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            self._drop(tg_id)
+            return None
+        self._users.move_to_end(tg_id)
+        return entry[1]
+
+    def _drop(self, tg_id: int) -> None:
+        expires_at, snapshot = self._users.pop(tg_id)
+        if snapshot.wallet_address and self._wallets.get(snapshot.wallet_address) == tg_id:
+            del self._wallets[snapshot.wallet_address]
+
+    def _store(self, snapshot: UserSnapshot, now: float) -> None:
+        if snapshot.tg_id in self._users:
+            self._drop(snapshot.tg_id)
+        self._users[snapshot.tg_id] = (now + self.ttl, snapshot)
+        if snapshot.wallet_address:
+            self._wallets[snapshot.wallet_address] = snapshot.tg_id
+        while len(self._users) > self.max_size:
+            self._drop(next(iter(self._users)))
+
+    def _is_missing(self, key: Tuple[str, object], now: float) -> bool:
+        expires_at = self._missing.get(key)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del self._missing[key]
+            return False
+        return True
+
+    def _store_missing(self, key: Tuple[str, object], now: float) -> None:
+        if len(self._missing) >= self.max_size:
+            self._missing = {k: v for k, v in self._missing.items() if v > now}
+            if len(self._missing) >= self.max_size:
+                self._missing.clear()
+        self._missing[key] = now + self.ttl
+
+    async def _load(self, db: AsyncSession, condition) -> Optional[UserSnapshot]:
+        user = (await db.execute(
+            select(User).options(selectinload(User.interests)).where(condition)
+        )).scalars().first()
+        return UserSnapshot.from_user(user) if user else None
+
+    async def get_by_tg_id(self, db: AsyncSession, tg_id: int) -> Optional[UserSnapshot]:
+        """
+        Снимок пользователя по Telegram ID (read-through)
+
+        Args:
+            db: Сессия БД
+            tg_id: Telegram ID
+
+        Returns:
+            Снимок или None, если пользователя нет
+        """
+        if self.ttl <= 0:
+            return await self._load(db, User.tg_id == tg_id)
+
+        await self._ensure_fresh(db)
+        now = time.monotonic()
+        snapshot = self._cached(tg_id, now)
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+        if self._is_missing(("tg", tg_id), now):
+            self.hits += 1
+            return None
+
+        self.misses += 1
+        snapshot = await self._load(db, User.tg_id == tg_id)
+        if snapshot is None:
+            self._store_missing(("tg", tg_id), now)
+        else:
+            self._store(snapshot, now)
+        return snapshot
+
+    async def get_by_wallet(self, db: AsyncSession, wallet_address: str) -> Optional[UserSnapshot]:
+        """
+        Снимок пользователя по адресу TON кошелька (read-through)
+
+        Args:
+            db: Сессия БД
+            wallet_address: Адрес кошелька
+
+        Returns:
+            Снимок или None, если пользователя нет
+        """
+        if self.ttl <= 0:
+            return await self._load(db, User.wallet_address == wallet_address)
+
+        await self._ensure_fresh(db)
+        now = time.monotonic()
+        tg_id = self._wallets.get(wallet_address)
+        if tg_id is not None:
+            snapshot = self._cached(tg_id, now)
+            if snapshot is not None and snapshot.wallet_address == wallet_address:
+                self.hits += 1
+                return snapshot
+        if self._is_missing(("wallet", wallet_address), now):
+            self.hits += 1
+            return None
+
+        self.misses += 1
+        snapshot = await self._load(db, User.wallet_address == wallet_address)
+        if snapshot is None:
+            self._store_missing(("wallet", wallet_address), now)
+        else:
+            self._store(snapshot, now)
+        return snapshot
+
+    def stats(self) -> Dict:
+        return {
+            "users": len(self._users),
+            "missing": len(self._missing),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "version": self._version,
+        }
+
+
+user_cache = UserCache(
+    ttl=settings.USER_CACHE_TTL,
+    max_size=settings.USER_CACHE_MAX_SIZE,
+    check_interval=settings.USER_CACHE_CHECK_INTERVAL,
+)
@@ -1,11 +1,14 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select, delete
 from datetime import date
+from typing import Optional
 from app.models.user import User, UserCategory, Gender
 from app.models.language import Language
 from app.models.task import TaskCategory
 from app.models.daily import DailyFreeTask
 from app.schemas.user import UserCreate
+from app.services.user_cache import user_cache
 from passlib.context import CryptContext
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -13,7 +16,63 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 class UserService:
     @staticmethod
-    def create_user(db: Session, data: UserCreate) -> User:
+    async def get_user(db: AsyncSession, *conditions) -> Optional[User]:
+        """
+        Поиск пользователя вместе с интересами
+        
+        Интересы загружаются selectinload, так как в асинхронной сессии
+        ленивая загрузка relationship недоступна.
+        
+        Args:
+            db: Сессия БД
+            conditions: Условия WHERE (например User.tg_id == tg_id)
+            
+        Returns:
+            Пользователь или None
+        """
+        result = await db.execute(
+            select(User).options(selectinload(User.interests)).where(*conditions)
+        )
+        return result.scalars().first()
+    
+    @staticmethod
+    async def reload(db: AsyncSession, user: User) -> User:
+        """
+        Перечитывание пользователя из БД вместе с интересами (после commit)
+        
+        Вызывается после каждого изменения пользователя, поэтому здесь же
+        сбрасывается его запись в кэше авторизации (user_cache).
+        
+        Args:
+            db: Сессия БД
+            user: Пользователь
+            
+        Returns:
+            Тот же объект пользователя с актуальными полями и интересами
+        """
+        result = await db.execute(
+            select(User)
+            .options(selectinload(User.interests))
+            .where(User.tg_id == user.tg_id)
+            .execution_options(populate_existing=True)
+        )
+        user = result.scalar_one()
+        user_cache.invalidate(user.tg_id, user.wallet_address)
+        return user
+    
+    @staticmethod
+    async def _active_categories(db: AsyncSession, category_ids: list[int]) -> list[TaskCategory]:
+        """Активные категории из списка ID"""
+        result = await db.execute(
+            select(TaskCategory).where(
+                TaskCategory.id.in_(category_ids),
+                TaskCategory.is_active == True
+            )
+        )
+        return list(result.scalars())
+    
+    @staticmethod
+    async def create_user(db: AsyncSession, data: UserCreate) -> User:
         """
         Создание нового пользователя
         
@@ -28,21 +87,22 @@ class UserService:
         # Сначала по tg_id, затем по wallet_address
         existing_user = None
         if data.tg_id:
-            existing_user = db.query(User).filter(User.tg_id == data.tg_id).first()
+            existing_user = (await db.execute(
+                select(User).where(User.tg_id == data.tg_id)
+            )).scalars().first()
         if not existing_user and data.wallet_address:
-            existing_user = db.query(User).filter(User.wallet_address == data.wallet_address).first()
+            existing_user = (await db.execute(
+                select(User).where(User.wallet_address == data.wallet_address)
+            )).scalars().first()
         
         if existing_user:
             # Пользователь существует - обновляем категории интересов если они переданы
             if data.category_ids:
                 # Удаляем старые связи с категориями
-                db.query(UserCategory).filter(UserCategory.user_id == existing_user.tg_id).delete()
+                await db.execute(delete(UserCategory).where(UserCategory.user_id == existing_user.tg_id))
                 
                 # Добавляем новые категории
-                categories = db.query(TaskCategory).filter(
-                    TaskCategory.id.in_(data.category_ids),
-                    TaskCategory.is_active == True
-                ).all()
+                categories = await UserService._active_categories(db, data.category_ids)
                 
                 for category in categories:
                     user_category = UserCategory(
@@ -55,17 +115,20 @@ class UserService:
                 if data.username and data.username != existing_user.username:
                     existing_user.username = data.username
                 
-                db.commit()
-                db.refresh(existing_user)
+                await db.commit()
             
-            return existing_user
+            return await UserService.reload(db, existing_user)
         
         # Определяем язык
         language_code = data.language_code or 'en'
-        language = db.query(Language).filter(Language.code == language_code).first()
+        language = (await db.execute(
+            select(Language).where(Language.code == language_code)
+        )).scalars().first()
         if not language:
             # Если язык не найден, используем английский
-            language = db.query(Language).filter(Language.code == 'en').first()
+            language = (await db.execute(
+                select(Language).where(Language.code == 'en')
+            )).scalars().first()
         
         # Создаем пользователя
         user = User(
@@ -82,13 +145,10 @@ class UserService:
             has_lifetime_subscription=False
         )
         db.add(user)
-        db.flush()
+        await db.flush()
         
         # Связываем с категориями (1-5)
-        categories = db.query(TaskCategory).filter(
-            TaskCategory.id.in_(data.category_ids),
-            TaskCategory.is_active == True
-        ).all()
+        categories = await UserService._active_categories(db, data.category_ids)
         
         for category in categories:
             user_category = UserCategory(
@@ -106,12 +166,11 @@ class UserService:
         )
         db.add(daily_task)
         
-        db.commit()
-        db.refresh(user)
-        return user
+        await db.commit()
+        return await UserService.reload(db, user)
     
     @staticmethod
-    def update_interests(db: Session, user: User, category_ids: list[int]) -> User:
+    async def update_interests(db: AsyncSession, user: User, category_ids: list[int]) -> User:
         """
         Обновление интересов пользователя
         
@@ -124,13 +183,10 @@ class UserService:
             Обновленный пользователь
         """
         # Удаляем старые связи
-        db.query(UserCategory).filter(UserCategory.user_id == user.tg_id).delete()
+        await db.execute(delete(UserCategory).where(UserCategory.user_id == user.tg_id))
         
         # Добавляем новые категории
-        categories = db.query(TaskCategory).filter(
-            TaskCategory.id.in_(category_ids),
-            TaskCategory.is_active == True
-        ).all()
+        categories = await UserService._active_categories(db, category_ids)
         
         for category in categories:
             user_category = UserCategory(
@@ -139,12 +195,11 @@ class UserService:
             )
             db.add(user_category)
         
-        db.commit()
-        db.refresh(user)
-        return user
+        await db.commit()
+        return await UserService.reload(db, user)
     
     @staticmethod
-    def update_language(db: Session, user: User, language_code: str) -> User:
+    async def update_language(db: AsyncSession, user: User, language_code: str) -> User:
         """
         Обновление языка пользователя
         
@@ -156,15 +211,17 @@ class UserService:
         Returns:
             Обновленный пользователь
         """
-        language = db.query(Language).filter(
-            Language.code == language_code,
-            Language.is_active == True
-        ).first()
+        language = (await db.execute(
+            select(Language).where(
+                Language.code == language_code,
+                Language.is_active == True
+            )
+        )).scalars().first()
         
         if language:
             user.language_id = language.id
-            db.commit()
-            db.refresh(user)
+            await db.commit()
+            user = await UserService.reload(db, user)
         
         return user
     
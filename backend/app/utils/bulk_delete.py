@@ -0,0 +1,229 @@
+"""
+Удаление больших объемов строк пачками по rowid
+
+Один DELETE по таблице с миллионами строк держит блокировку записи SQLite
+до конца транзакции, и все запросы API на запись ждут ее (и падают по
+busy_timeout). Здесь строки удаляются пачками по диапазону rowid: каждая
+пачка - отдельная короткая транзакция, после commit следует пауза, чтобы
+блокировку успели взять другие писатели. Размер пачки подстраивается так,
+чтобы одна транзакция держала блокировку не дольше max_lock_ms.
+
+Удаление можно прервать (Ctrl+C, kill) и запустить снова: пачка
+фиксируется целиком или не фиксируется вовсе, удаленные строки не
+возвращаются, а следующий запуск находит только оставшиеся - поиск
+начинается с наименьшего оставшегося rowid, удаленное заново не читается.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import Table, bindparam, text
+from sqlalchemy.engine import Engine
+from app.core.database import Base
+import app.models  # noqa: F401 - все таблицы в Base.metadata
+
+MIN_BATCH = 100
+MAX_BATCH = 100_000
+# Меньше любого rowid: первая пачка начинается с начала таблицы
+FIRST_ROWID = -(2 ** 63)
+
+
+def user_tables() -> List[Table]:
+    """
+    Таблицы со ссылкой на users.tg_id
+
+    Returns:
+        Таблицы в порядке удаления (новые модели подхватываются сами)
+    """
+    return [
+        table for table in reversed(Base.metadata.sorted_tables)
+        if any(fk.column.table.name == "users" for fk in table.foreign_keys)
+    ]
+
+
+@dataclass
+class DeleteStats:
+    """Прогресс удаления по одной таблице"""
+    table: str
+    total: int
+    deleted: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    max_lock_ms: float = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Строк в секунду (с учетом пауз между пачками)"""
+        return self.deleted / self.seconds if self.seconds else 0.0
+
+
+class BulkDeleter:
+    """
+    Удаление строк пачками с commit и паузой между ними
+
+    Args:
+        engine: Синхронный engine (профиль PRAGMA с busy_timeout)
+        batch_size: Начальный размер пачки
+        max_lock_ms: Сколько одна пачка может держать блокировку записи;
+            размер пачки подбирается по скорости предыдущей на половину этого времени
+        pause_ms: Пауза после каждой пачки для других писателей
+        progress_interval: Как часто печатать прогресс (сек)
+        log: Функция вывода прогресса
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        batch_size: int = 5000,
+        max_lock_ms: float = 100,
+        pause_ms: float = 20,
+        progress_interval: float = 2.0,
+        log: Callable[[str], None] = print,
+    ):
+        self.engine = engine
+        self.batch_size = max(MIN_BATCH, min(batch_size, MAX_BATCH))
+        self.max_lock_ms = max_lock_ms
+        self.pause = pause_ms / 1000
+        self.progress_interval = progress_interval
+        self.log = log
+        self.stats: Dict[str, DeleteStats] = {}
+
+    def count(self, table: str, where: str = "1", params: Optional[dict] = None) -> int:
+        """Количество строк таблицы по условию (чтение без блокировки записи)"""
+        with self.engine.connect() as conn:
+            return conn.execute(self._text(f"SELECT count(*) FROM {table} WHERE {where}", params), params or {}).scalar()
+
+    def delete(self, table: str, where: str = "1", params: Optional[dict] = None) -> DeleteStats:
+        """
+        Удаление строк таблицы по условию пачками по rowid
+
+        Границу пачки (rowid последней из batch_size следующих строк) ищет
+        чтение вне транзакции записи, затем DELETE по диапазону rowid
+        фиксируется отдельной транзакцией. Строки, добавленные во время
+        удаления выше границы, попадут в следующие пачки.
+
+        Args:
+            table: Имя таблицы
+            where: SQL условие (параметры - в params, списки раскрываются)
+            params: Параметры условия
+
+        Returns:
+            DeleteStats по таблице (также в self.stats, обновляется по пачкам)
+        """
+        params = params or {}
+        stats = DeleteStats(table=table, total=self.count(table, where, params))
+        self.stats[table] = stats
+        if stats.total == 0:
+            return stats
+
+        bound_sql = self._text(
+            f"SELECT max(r) FROM (SELECT rowid AS r FROM {table} "
+            f"WHERE rowid > :after AND ({where}) ORDER BY rowid LIMIT :batch)",
+            params,
+        )
+        delete_sql = self._text(
+            f"DELETE FROM {table} WHERE rowid > :after AND rowid <= :upper AND ({where})",
+            params,
+        )
+        # Строки разных таблиц удаляются с разной скоростью (число индексов),
+        # поэтому каждая таблица начинает с начального размера пачки
+        batch = self.batch_size
+        after = FIRST_ROWID
+        started = time.perf_counter()
+        reported = started
+        with self.engine.connect() as conn:
+            while True:
+                # SELECT вне транзакции: pysqlite открывает ее только перед DELETE
+                upper = conn.execute(bound_sql, {**params, "after": after, "batch": batch}).scalar()
+                if upper is None:
+                    break
+                lock_started = time.perf_counter()
+                deleted = conn.execute(delete_sql, {**params, "after": after, "upper": upper}).rowcount
+                conn.commit()
+                lock_ms = (time.perf_counter() - lock_started) * 1000
+
+                after = upper
+                stats.deleted += deleted
+                stats.batches += 1
+                stats.max_lock_ms = max(stats.max_lock_ms, lock_ms)
+                stats.seconds = time.perf_counter() - started
+                batch = self._adapt_batch(batch, lock_ms)
+
+                if time.perf_counter() - reported >= self.progress_interval:
+                    reported = time.perf_counter()
+                    self.log(self._progress_line(stats, batch))
+                if self.pause:
+                    time.sleep(self.pause)
+        stats.seconds = time.perf_counter() - started
+        return stats
+
+    def delete_users(self, tg_ids: Optional[Iterable[int]] = None) -> Dict[str, DeleteStats]:
+        """
+        Удаление пользователей и всех связанных данных
+
+        Сначала пачками удаляются строки зависимых таблиц, затем сами
+        пользователи (ON DELETE CASCADE подчищает строки, добавленные API
+        за время удаления). В конце увеличивается версия user_cache_version,
+        чтобы воркеры API сбросили кэш пользователей.
+
+        Args:
+            tg_ids: Telegram ID пользователей; None - все пользователи
+
+        Returns:
+            Словарь {таблица: DeleteStats}
+        """
+        if tg_ids is None:
+            child_where, user_where, params = "1", "1", {}
+        else:
+            params = {"tg_ids": list(tg_ids)}
+            child_where, user_where = "user_id IN :tg_ids", "tg_id IN :tg_ids"
+
+        for table in user_tables():
+            self.delete(table.name, child_where, params)
+            self.log(self._done_line(self.stats[table.name]))
+        users = self.delete("users", user_where, params)
+        self.log(self._done_line(users))
+        if users.deleted:
+            self.bump_user_cache_version()
+        return self.stats
+
+    def bump_user_cache_version(self) -> None:
+        """Увеличение версии кэша пользователей (как при изменении в админке)"""
+        with self.engine.begin() as conn:
+            updated = conn.execute(text(
+                "UPDATE user_cache_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1"
+            )).rowcount
+            if updated == 0:
+                conn.execute(text(
+                    "INSERT INTO user_cache_version (id, version, updated_at) VALUES (1, 1, CURRENT_TIMESTAMP)"
+                ))
+
+    def _adapt_batch(self, batch: int, lock_ms: float) -> int:
+        """Размер следующей пачки: половина max_lock_ms по скорости текущей, рост не больше чем вдвое"""
+        target = batch * (self.max_lock_ms / 2) / max(lock_ms, 0.1)
+        return int(max(MIN_BATCH, min(target, batch * 2, MAX_BATCH)))
+
+    @staticmethod
+    def _text(sql: str, params: Optional[dict]):
+        """text() с раскрытием списков в IN (...)"""
+        statement = text(sql)
+        for name, value in (params or {}).items():
+            if isinstance(value, (list, tuple)):
+                statement = statement.bindparams(bindparam(name, expanding=True))
+        return statement
+
+    @staticmethod
+    def _progress_line(stats: DeleteStats, batch: int) -> str:
+        percent = stats.deleted * 100 // stats.total if stats.total else 100
+        return (
+            f"   {stats.table}: {stats.deleted:,}/{stats.total:,} ({percent}%), "
+            f"{stats.rate:,.0f} строк/с, пачка {batch:,}"
+        )
+
+    @staticmethod
+    def _done_line(stats: DeleteStats) -> str:
+        if not stats.total:
+            return f"   {stats.table}: нет строк"
+        return (
+            f"   ✓ {stats.table}: удалено {stats.deleted:,} за {stats.seconds:.1f} с "
+            f"({stats.rate:,.0f} строк/с, {stats.batches} пачек, блокировка до {stats.max_lock_ms:.0f} мс)"
+        )
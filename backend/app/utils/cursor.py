@@ -0,0 +1,112 @@
+"""
+Курсорная (keyset) пагинация по (время, id)
+
+Вместо OFFSET, при котором SQLite читает и отбрасывает все пропущенные
+строки, следующая страница выбирается условием (время, id) < (курсор)
+по индексу, и стоимость страницы не зависит от ее номера.
+
+Курсор - непрозрачная строка (base64url от JSON [время ISO-8601, id]).
+В PostgreSQL время сравнивается как timestamp. В SQLite время лежит
+текстом в разных форматах (CURRENT_TIMESTAMP без микросекунд, SQLAlchemy
+и Django - с ними), ORDER BY сортирует его как текст, поэтому курсор
+хранит значение как в БД и сравнивается как текст (CursorTimestamp).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+from sqlalchemy import DateTime, String, bindparam, tuple_, type_coerce
+from sqlalchemy.types import TypeDecorator
+
+
+class CursorTimestamp(TypeDecorator):
+    """
+    Время для курсора: ISO-8601 строка в Python
+
+    SQLite - текст как в БД (без преобразования), остальные БД -
+    DateTime: значение столбца превращается в isoformat(), параметр
+    курсора - обратно в datetime.
+    """
+    impl = String
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime(timezone=True))
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name == "sqlite":
+            return value
+        return datetime.fromisoformat(value)
+
+    def process_result_value(self, value, dialect):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+
+def raw_value(column):
+    """Столбец времени для курсора (ISO-8601 строка, в SQLite - как в БД)"""
+    return type_coerce(column, CursorTimestamp())
+
+
+def encode_cursor(timestamp: str, row_id: int) -> str:
+    """
+    Курсор страницы по последней строке
+
+    Args:
+        timestamp: Время строки из столбца raw_value (ISO-8601)
+        row_id: ID строки
+
+    Returns:
+        Непрозрачная строка курсора
+    """
+    payload = json.dumps([timestamp, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Разбор курсора
+
+    Args:
+        cursor: Строка курсора из encode_cursor
+
+    Returns:
+        (время ISO-8601, id)
+
+    Raises:
+        ValueError: Если курсор поврежден
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        datetime.fromisoformat(timestamp)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(row_id, int) or isinstance(row_id, bool):
+        raise ValueError("Invalid cursor")
+    return timestamp, row_id
+
+
+def before_cursor(timestamp_column, id_column, cursor: str):
+    """
+    Условие WHERE для строк после курсора при ORDER BY время DESC, id DESC
+
+    Args:
+        timestamp_column: Столбец времени
+        id_column: Столбец id
+        cursor: Строка курсора
+
+    Returns:
+        SQL условие (время, id) < (курсор)
+
+    Raises:
+        ValueError: Если курсор поврежден
+    """
+    timestamp, row_id = decode_cursor(cursor)
+    return tuple_(type_coerce(timestamp_column, CursorTimestamp()), id_column) < tuple_(
+        bindparam(None, timestamp, type_=CursorTimestamp()),
+        bindparam(None, row_id),
+    )
@@ -0,0 +1,87 @@
+"""
+HTTP кэширование неизменяемых ответов справочников (ETag / If-None-Match)
+
+Ответ сериализуется один раз (RenderedBody) и отдается готовыми байтами;
+ETag строится из версии справочников и хэша тела. Запрос с совпадающим
+If-None-Match получает 304 без тела.
+
+nginx (frontend/nginx.conf) сжимает JSON больше gzip_min_length и при этом
+превращает сильный ETag в слабый (W/"..."), поэтому If-None-Match
+сравнивается по слабому правилу (RFC 7232), как и положено для 304.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Response
+from pydantic import BaseModel
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class RenderedBody:
+    """Сериализованный JSON ответа и его ETag"""
+    body: bytes
+    etag: str
+
+
+def render_body(model: BaseModel, version: object) -> RenderedBody:
+    """
+    Сериализация ответа и ETag
+
+    Args:
+        model: Pydantic модель ответа
+        version: Версия данных (версия справочников)
+
+    Returns:
+        RenderedBody с телом и сильным ETag "v<версия>-<хэш тела>"
+    """
+    body = model.model_dump_json().encode()
+    digest = hashlib.sha256(body).hexdigest()[:16]
+    return RenderedBody(body=body, etag=f'"v{version}-{digest}"')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Совпадает ли If-None-Match с ETag (слабое сравнение, список и *)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def cache_control(shared: bool) -> str:
+    """
+    Заголовок Cache-Control для справочника
+
+    Args:
+        shared: Ответ одинаков для всех пользователей (public) или зависит
+            от пользователя, например от его языка (private)
+    """
+    scope = "public" if shared else "private"
+    if settings.CATALOG_HTTP_MAX_AGE > 0:
+        return f"{scope}, max-age={settings.CATALOG_HTTP_MAX_AGE}, must-revalidate"
+    return f"{scope}, no-cache"
+
+
+def cached_response(rendered: RenderedBody, if_none_match: Optional[str], shared: bool = True) -> Response:
+    """
+    Ответ с готовым телом или 304, если у клиента актуальная версия
+
+    Args:
+        rendered: Сериализованный ответ
+        if_none_match: Заголовок If-None-Match запроса
+        shared: См. cache_control
+
+    Returns:
+        Response 200 с телом или 304 без тела
+    """
+    headers = {"ETag": rendered.etag, "Cache-Control": cache_control(shared)}
+    if etag_matches(if_none_match, rendered.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=rendered.body, media_type="application/json", headers=headers)
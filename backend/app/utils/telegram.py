@@ -1,70 +1,169 @@
+"""
+Проверка initData Telegram WebApp
+
+Подпись initData проверяется по алгоритму Telegram: секретный ключ -
+HMAC-SHA256("WebAppData", bot token), подпись - HMAC-SHA256 от
+отсортированных полей без hash. Ключ вычисляется один раз на процесс
+(для текущего токена), а уже проверенные initData хранятся в LRU до
+истечения auth_date + TELEGRAM_INIT_DATA_MAX_AGE: mini-app отправляет одну
+и ту же строку на каждый запрос сессии, и повторная проверка стоит одного
+обращения к словарю.
+"""
 import hmac
 import hashlib
+import json
+import time
 import urllib.parse
-from typing import Dict, Optional
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 from app.core.config import settings
 
 
+@lru_cache(maxsize=4)
+def _secret_key(bot_token: str) -> bytes:
+    """Секретный ключ WebAppData для токена бота (вычисляется один раз)"""
+    return hmac.new(
+        "WebAppData".encode(),
+        bot_token.encode(),
+        hashlib.sha256
+    ).digest()
+
+
+class VerifiedInitDataCache:
+    """
+    LRU уже проверенных initData
+    
+    Args:
+        max_size: Максимум записей (вытесняются давно использованные), 0 - кэш выключен
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # initData -> (истекает по time.time(), данные пользователя)
+        self._items: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._token: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        self._items.clear()
+
+    def get(self, init_data: str, bot_token: str, now: float) -> Optional[Dict]:
+        """Данные из кэша или None (нет записи, истекла или сменился токен)"""
+        if bot_token != self._token:
+            # Проверки со старым токеном недействительны
+            self._items.clear()
+            self._token = bot_token
+            return None
+        entry = self._items.get(init_data)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._items[init_data]
+            return None
+        self._items.move_to_end(init_data)
+        return entry[1]
+
+    def put(self, init_data: str, expires_at: float, result: Dict) -> None:
+        if self.max_size <= 0:
+            return
+        self._items[init_data] = (expires_at, result)
+        self._items.move_to_end(init_data)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+verified_init_data = VerifiedInitDataCache(max_size=settings.TELEGRAM_INIT_DATA_CACHE_SIZE)
+
+
+def _verify(init_data: str, bot_token: str, max_age: int, now: float) -> Optional[Tuple[float, Dict]]:
+    """Полная проверка подписи; возвращает (истекает, данные) или None"""
+    # Поля в исходном порядке; пустые значения тоже входят в подпись
+    fields = dict(urllib.parse.parse_qsl(init_data, keep_blank_values=True))
+    
+    # Извлекаем hash для проверки
+    received_hash = fields.pop('hash', None)
+    if not received_hash:
+        return None
+    
+    # Создаем строку для проверки (без hash)
+    data_check_string = '\n'.join(f"{key}={fields[key]}" for key in sorted(fields))
+    
+    # Вычисляем hash
+    calculated_hash = hmac.new(
+        _secret_key(bot_token),
+        data_check_string.encode(),
+        hashlib.sha256
+    ).hexdigest()
+    
+    # Проверяем hash
+    if not hmac.compare_digest(calculated_hash, received_hash):
+        return None
+    
+    # Проверяем срок действия по auth_date
+    try:
+        auth_date = int(fields.get('auth_date', 0))
+    except ValueError:
+        return None
+    if max_age > 0:
+        expires_at = float(auth_date + max_age)
+        if expires_at <= now:
+            return None
+    else:
+        expires_at = float("inf")
+    
+    # Извлекаем данные пользователя
+    result = {'auth_date': auth_date}
+    if 'user' in fields:
+        user_data = json.loads(fields['user'])
+        result['tg_id'] = user_data.get('id')
+        result['username'] = user_data.get('username')
+        result['first_name'] = user_data.get('first_name')
+        result['last_name'] = user_data.get('last_name')
+        result['language_code'] = user_data.get('language_code', 'en')
+    
+    return expires_at, result
+
+
 def verify_telegram_data(init_data: str) -> Optional[Dict]:
     """
     Верификация данных от Telegram WebApp
     
+    Повторная проверка той же строки initData берется из LRU проверенных
+    initData без разбора и вычисления HMAC. Данные действительны
+    TELEGRAM_INIT_DATA_MAX_AGE секунд после auth_date (0 - без ограничения).
+    
     Args:
         init_data: Строка с данными от Telegram (query string)
-        
+    
     Returns:
         Dict с данными пользователя или None если верификация не прошла
     """
+    bot_token = settings.TELEGRAM_BOT_TOKEN
+    if not bot_token or not init_data:
+        # Без токена подпись проверить нельзя
+        return None
+    
+    now = time.time()
+    
+    cached = verified_init_data.get(init_data, bot_token, now)
+    if cached is not None:
+        verified_init_data.hits += 1
+        return dict(cached)
+    
+    verified_init_data.misses += 1
     try:
-        # Парсим query string
-        parsed_data = urllib.parse.parse_qs(init_data)
-        
-        # Извлекаем hash для проверки
-        if 'hash' not in parsed_data:
-            return None
-            
-        received_hash = parsed_data['hash'][0]
-        
-        # Создаем строку для проверки (без hash)
-        data_check_string = []
-        for key in sorted(parsed_data.keys()):
-            if key != 'hash':
-                data_check_string.append(f"{key}={parsed_data[key][0]}")
-        
-        data_check_string = '\n'.join(data_check_string)
-        
-        # Создаем секретный ключ из bot token
-        secret_key = hmac.new(
-            "WebAppData".encode(),
-            settings.TELEGRAM_BOT_TOKEN.encode(),
-            hashlib.sha256
-        ).digest()
-        
-        # Вычисляем hash
-        calculated_hash = hmac.new(
-            secret_key,
-            data_check_string.encode(),
-            hashlib.sha256
-        ).hexdigest()
-        
-        # Проверяем hash
-        if calculated_hash != received_hash:
-            return None
-        
-        # Извлекаем данные пользователя
-        result = {}
-        if 'user' in parsed_data:
-            import json
-            user_data = json.loads(parsed_data['user'][0])
-            result['tg_id'] = user_data.get('id')
-            result['username'] = user_data.get('username')
-            result['first_name'] = user_data.get('first_name')
-            result['last_name'] = user_data.get('last_name')
-            result['language_code'] = user_data.get('language_code', 'en')
-        
-        return result
-        
+        verified = _verify(init_data, bot_token, settings.TELEGRAM_INIT_DATA_MAX_AGE, now)
     except Exception as e:
         print(f"Error verifying Telegram data: {e}")
         return None
-
+    if verified is None:
+        return None
+    
+    expires_at, result = verified
+    verified_init_data.put(init_data, expires_at, result)
+    return dict(result)
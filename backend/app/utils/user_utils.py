@@ -1,50 +1,39 @@
 """
 Утилиты для работы с пользователями
 """
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.user import UserResponse
 from app.models.user import User
-from app.models.task import CategoryTranslation
+from app.services.catalog_cache import catalog_cache
 
 
-def user_to_response(user: User, db: Session = None) -> UserResponse:
+async def user_to_response(user: User, db: AsyncSession) -> UserResponse:
     """
     Преобразование модели User в UserResponse
     
+    Категории интересов и язык берутся из кэша справочников, поэтому
+    у пользователя должны быть загружены только interests (без category).
+    
     Args:
         user: Модель пользователя
+        db: Асинхронная сессия БД
         
     Returns:
         UserResponse объект
     """
-    # Получаем переводы категорий на языке пользователя
+    # Получаем категории на языке пользователя
     interests = []
     for uc in user.interests:
-        # Ищем перевод категории на языке пользователя
-        category_translation = None
-        
-        # Если есть доступ к БД, делаем запрос напрямую (быстрее)
-        if db:
-            category_translation = db.query(CategoryTranslation).filter(
-                CategoryTranslation.category_id == uc.category.id,
-                CategoryTranslation.language_id == user.language_id
-            ).first()
-        else:
-            # Fallback на relationship (может быть медленнее)
-            for translation in uc.category.translations:
-                if translation.language_id == user.language_id:
-                    category_translation = translation
-                    break
-        
-        # Используем перевод если есть, иначе slug
-        category_name = category_translation.name if category_translation else uc.category.slug
-        
-        interests.append({
-            "id": uc.category.id,
-            "slug": uc.category.slug,
-            "name": category_name,
-            "color": uc.category.color
-        })
+        category = await catalog_cache.category(db, uc.category_id, user.language_id)
+        if category:
+            interests.append({
+                "id": category.id,
+                "slug": category.slug,
+                "name": category.name,
+                "color": category.color
+            })
+    
+    language = await catalog_cache.language(db, user.language_id)
     
     return UserResponse(
         tg_id=user.tg_id,
@@ -54,8 +43,8 @@ def user_to_response(user: User, db: Session = None) -> UserResponse:
         gender=user.gender,
         balance=user.balance,
         language={
-            "code": user.language.code,
-            "name": user.language.name
+            "code": language.code,
+            "name": language.name
         },
         interests=interests,
         is_admin=user.is_admin,
@@ -63,4 +52,3 @@ def user_to_response(user: User, db: Session = None) -> UserResponse:
         has_lifetime_subscription=user.has_lifetime_subscription,
         created_at=user.created_at
     )
-
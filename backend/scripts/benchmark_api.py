@@ -0,0 +1,535 @@
+"""
+Нагрузочный бенчмарк API (/api/v1) через ASGI приложение в процессе
+
+Создает временную базу заданного размера (пользователи, задания по
+категориям и языкам, выполнения, транзакции, бонусы) и прогоняет каждый
+маршрут /api/v1 через httpx.AsyncClient с ASGITransport: --requests
+запросов на маршрут, --concurrency одновременно. Затем смешанный прогон
+всех GET маршрутов вперемешку.
+
+Для каждого маршрута: p50/p95/p99 времени ответа, пропускная способность
+(запросов в секунду), SQL запросов на HTTP запрос и время БД (из
+Server-Timing) и статусы ответов. Результат пишется в JSON (--output),
+--compare сравнивает его с прошлым результатом: рост количества SQL
+запросов или p95 больше --max-regression процентов - exit 1.
+
+Работает без сети: TON API - локальный FakeTonApi (scripts/fake_tonapi.py),
+Telegram бот выключен; переводы (MyMemory/Google) в API не вызываются -
+только в админке. Данные и параметры запросов детерминированы (--seed).
+sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_api.py [--users 1000] [--tasks 2000]
+        [--requests 200] [--concurrency 20] [--output benchmark_api.json]
+        [--compare benchmark_api.baseline.json]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fake_tonapi import FakeTonApi
+
+# Временная БД, фейковый TON API и Server-Timing должны быть заданы до импорта app
+_fake_ton = FakeTonApi()
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-bench-")
+_db_path = os.path.join(_tmp_dir, "bench.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ["ENABLE_TELEGRAM_BOT"] = "false"
+os.environ["TELEGRAM_INIT_DATA_REQUIRED"] = "false"
+os.environ["TON_API_URL"] = _fake_ton.base_url
+os.environ["TON_API_RATE_LIMIT"] = "0"
+os.environ["TON_SIMULATE_PAYMENTS"] = "false"
+os.environ["TON_WALLET_ADDRESS"] = "EQ" + "B" * 46
+os.environ["METRICS_SERVER_TIMING"] = "true"
+
+import httpx
+from sqlalchemy import insert
+from app.core.database import Base, engine, SessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.user_service import UserService
+from app.main import app
+
+PREFIX = "/api/v1"
+LANGUAGES = [("ru", "Русский"), ("en", "English"), ("es", "Español"), ("de", "Deutsch"), ("fr", "Français")]
+ADMIN_USERNAME = "bench-admin"
+ADMIN_PASSWORD = "bench-password"
+INSERT_BATCH = 10000
+SERVER_TIMING_PREFIX = "db;dur="
+SQL_REGRESSION = 0.5  # Рост SQL запросов на HTTP запрос, который считается регрессией
+P95_REGRESSION_MIN_MS = 5.0  # Меньший рост p95 - шум, даже если в процентах он больше --max-regression
+
+
+class Dataset:
+    """Идентификаторы сгенерированных данных для построения запросов"""
+
+    def __init__(self):
+        self.user_ids: List[int] = []
+        self.task_ids: List[int] = []
+        self.category_ids: List[int] = []
+        self.language_codes: List[str] = []
+        self.completed: Dict[int, set] = {}
+        self.pending_ton: List[Tuple[int, int]] = []  # (user_id, transaction_id)
+        self.next_user_id = 0
+        self.rows = 0
+        self.admin = False  # Пароль администратора захеширован (есть рабочий bcrypt)
+
+
+def bulk_insert(db, model, rows: List[Dict], dataset: Dataset) -> None:
+    """executemany пачками по INSERT_BATCH строк"""
+    for start in range(0, len(rows), INSERT_BATCH):
+        db.execute(insert(model), rows[start:start + INSERT_BATCH])
+    dataset.rows += len(rows)
+
+
+def seed(args, rng: random.Random) -> Dataset:
+    """
+    Заполнение временной базы
+
+    Каждое задание переведено на русский и с вероятностью 1/2 на каждый
+    другой язык; у пользователя 1-5 интересов, в среднем --completions
+    выполненных заданий и --transactions транзакций, треть получала
+    бонусы, у каждого десятого - pending TON платеж с хешем.
+    """
+    dataset = Dataset()
+    db = SessionLocal()
+    today = date.today()
+    now = datetime.utcnow()
+
+    languages = LANGUAGES[:args.languages]
+    bulk_insert(db, Language, [
+        {"id": i, "code": code, "name": name, "is_active": True}
+        for i, (code, name) in enumerate(languages, start=1)
+    ], dataset)
+    language_ids = list(range(1, len(languages) + 1))
+    dataset.language_codes = [code for code, _ in languages]
+
+    dataset.category_ids = list(range(1, args.categories + 1))
+    bulk_insert(db, TaskCategory, [
+        {"id": category_id, "slug": f"category-{category_id}", "color": "#FFC700", "is_active": True}
+        for category_id in dataset.category_ids
+    ], dataset)
+    bulk_insert(db, CategoryTranslation, [
+        {"category_id": category_id, "language_id": language_id, "name": f"Category {category_id} ({language_id})"}
+        for category_id in dataset.category_ids
+        for language_id in language_ids
+    ], dataset)
+
+    dataset.task_ids = list(range(1, args.tasks + 1))
+    bulk_insert(db, Task, [
+        {"id": task_id, "category_id": dataset.category_ids[task_id % args.categories], "is_active": True}
+        for task_id in dataset.task_ids
+    ], dataset)
+    bulk_insert(db, TaskTranslation, [
+        {"task_id": task_id, "language_id": language_id,
+         "title": f"Task {task_id} ({language_id})", "description": "Description " * 8}
+        for task_id in dataset.task_ids
+        for language_id in language_ids
+        if language_id == 1 or rng.random() < 0.5
+    ], dataset)
+    bulk_insert(db, TaskGenderTarget, [
+        {"task_id": task_id, "gender": GenderTarget.ALL} for task_id in dataset.task_ids
+    ], dataset)
+
+    dataset.user_ids = list(range(1, args.users + 1))
+    dataset.next_user_id = args.users + 1
+    bulk_insert(db, User, [
+        {"tg_id": user_id, "username": f"user{user_id}", "first_name": f"User {user_id}",
+         "gender": Gender.MALE if user_id % 2 else Gender.FEMALE,
+         "language_id": rng.choice(language_ids), "is_admin": False, "balance": 10 ** 6,
+         "is_active": True, "has_lifetime_subscription": False}
+        for user_id in dataset.user_ids
+    ], dataset)
+    try:
+        password = UserService.get_password_hash(ADMIN_PASSWORD)
+        dataset.admin = True
+    except ValueError as e:
+        # passlib 1.7.4 несовместим с bcrypt >= 4.1 - /admin/login в таком окружении не замеряется
+        print(f"[WARN] bcrypt недоступен ({e}), /admin/login пропущен")
+        password = None
+    db.add(User(
+        tg_id=args.users + 10 ** 9, username=ADMIN_USERNAME, first_name="Admin", gender=Gender.MALE,
+        language_id=1, is_admin=True, password=password
+    ))
+    bulk_insert(db, UserCategory, [
+        {"user_id": user_id, "category_id": category_id}
+        for user_id in dataset.user_ids
+        for category_id in rng.sample(dataset.category_ids, rng.randint(1, min(5, args.categories)))
+    ], dataset)
+
+    completions = []
+    for user_id in dataset.user_ids:
+        count = min(args.tasks - 1, rng.randint(0, 2 * args.completions))
+        completed = set(rng.sample(dataset.task_ids, count))
+        dataset.completed[user_id] = completed
+        completions.extend(
+            {"user_id": user_id, "task_id": task_id, "completed_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 90))}
+            for task_id in completed
+        )
+    bulk_insert(db, CompletedTask, completions, dataset)
+    # Купленные слоты на сегодня: выполнение заданий в бенчмарке не упирается в лимит 3 в день
+    bulk_insert(db, DailyFreeTask, [
+        {"user_id": user_id, "date": today, "count": 0, "paid_available": 10 ** 4}
+        for user_id in dataset.user_ids
+    ], dataset)
+
+    transactions = []
+    kinds = [
+        (TransactionType.PURCHASE, PaymentMethod.TON, 100),
+        (TransactionType.TASK_PAYMENT, PaymentMethod.SYSTEM, -10),
+        (TransactionType.BONUS, PaymentMethod.DAILY_BONUS, 10),
+    ]
+    for user_id in dataset.user_ids:
+        for _ in range(rng.randint(0, 2 * args.transactions)):
+            transaction_type, method, amount = rng.choice(kinds)
+            transactions.append({
+                "user_id": user_id, "amount": amount, "transaction_type": transaction_type,
+                "payment_method": method, "status": TransactionStatus.COMPLETED,
+                "description": "bench", "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)),
+            })
+    bulk_insert(db, Transaction, transactions, dataset)
+    # Pending TON платежи с хешем: проверка статуса обращается к (фейковому) TON API
+    for user_id in dataset.user_ids[::10]:
+        transaction = Transaction(
+            user_id=user_id, amount=100, transaction_type=TransactionType.PURCHASE,
+            payment_method=PaymentMethod.TON, status=TransactionStatus.PENDING,
+            ton_transaction_hash=f"{user_id:064x}", ton_to_address=os.environ["TON_WALLET_ADDRESS"],
+            ton_amount="1000000000", description="bench pending"
+        )
+        db.add(transaction)
+        db.flush()
+        dataset.pending_ton.append((user_id, transaction.id))
+        dataset.rows += 1
+
+    bonuses = []
+    streaks = []
+    for user_id in dataset.user_ids[::3]:
+        days = rng.randint(1, 6)
+        last = today - timedelta(days=1)
+        bonuses.extend(
+            {"user_id": user_id, "day_number": day, "bonus_amount": 10 * day, "date": last - timedelta(days=days - day)}
+            for day in range(1, days + 1)
+        )
+        streaks.append({"user_id": user_id, "day_number": days, "last_claim_date": last})
+    bulk_insert(db, DailyBonus, bonuses, dataset)
+    bulk_insert(db, DailyBonusStreak, streaks, dataset)
+
+    db.add(CatalogVersion(id=1, version=1))
+    db.commit()
+    db.close()
+    return dataset
+
+
+# Построение запроса: (dataset, rng, номер запроса) -> (url, X-Telegram-User-ID или None, JSON тело или None)
+RequestBuilder = Callable[[Dataset, random.Random, int], Tuple[str, Optional[int], Optional[Dict]]]
+
+
+def any_user(dataset: Dataset, rng: random.Random) -> int:
+    return rng.choice(dataset.user_ids)
+
+
+def complete_task(dataset: Dataset, rng: random.Random, i: int):
+    user_id = any_user(dataset, rng)
+    completed = dataset.completed[user_id]
+    task_id = rng.choice(dataset.task_ids)
+    while task_id in completed:
+        task_id = rng.choice(dataset.task_ids)
+    completed.add(task_id)
+    return f"/tasks/{task_id}/complete", user_id, None
+
+
+def claim_bonus(dataset: Dataset, rng: random.Random, i: int):
+    # Каждый пользователь получает бонус один раз за день
+    return "/daily-bonus/claim", dataset.user_ids[i % len(dataset.user_ids)], None
+
+
+def register(dataset: Dataset, rng: random.Random, i: int):
+    user_id = dataset.next_user_id
+    dataset.next_user_id += 1
+    return "/auth/register", None, {
+        "tg_id": user_id, "first_name": f"New {user_id}", "gender": "female",
+        "language_code": rng.choice(dataset.language_codes),
+        "category_ids": rng.sample(dataset.category_ids, min(3, len(dataset.category_ids))),
+    }
+
+
+def check_ton_payment(dataset: Dataset, rng: random.Random, i: int):
+    user_id, transaction_id = rng.choice(dataset.pending_ton)
+    return f"/payments/ton/check/{transaction_id}", user_id, None
+
+
+def ton_connect(dataset: Dataset, rng: random.Random, i: int):
+    wallet = "EQ" + "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789") for _ in range(46))
+    return "/auth/ton/connect", None, {"wallet_address": wallet, "signature": "bench", "message": "bench"}
+
+
+# (метод, шаблон пути, построение запроса, ожидаемые статусы)
+ROUTES: List[Tuple[str, str, RequestBuilder, Tuple[int, ...]]] = [
+    ("GET", "/auth/me", lambda d, r, i: ("/auth/me", any_user(d, r), None), (200,)),
+    ("GET", "/auth/verify", lambda d, r, i: (f"/auth/verify?tg_id={any_user(d, r)}", None, None), (200,)),
+    ("GET", "/tasks/", lambda d, r, i: ("/tasks/", any_user(d, r), None), (200,)),
+    ("GET", "/tasks/daily-free-count", lambda d, r, i: ("/tasks/daily-free-count", any_user(d, r), None), (200,)),
+    ("GET", "/tasks/{task_id}", lambda d, r, i: (f"/tasks/{r.choice(d.task_ids)}", any_user(d, r), None), (200,)),
+    ("GET", "/profile/", lambda d, r, i: ("/profile/", any_user(d, r), None), (200,)),
+    ("GET", "/profile/history", lambda d, r, i: ("/profile/history", any_user(d, r), None), (200,)),
+    ("GET", "/categories/", lambda d, r, i: ("/categories/", any_user(d, r), None), (200,)),
+    ("GET", "/languages/", lambda d, r, i: ("/languages/", None, None), (200,)),
+    ("GET", "/payments/balance", lambda d, r, i: ("/payments/balance", any_user(d, r), None), (200,)),
+    ("GET", "/payments/packages", lambda d, r, i: ("/payments/packages", None, None), (200,)),
+    ("GET", "/payments/ton/check/{transaction_id}", check_ton_payment, (200,)),
+    ("GET", "/daily-bonus/status", lambda d, r, i: ("/daily-bonus/status", any_user(d, r), None), (200,)),
+    ("GET", "/bootstrap/", lambda d, r, i: ("/bootstrap/", any_user(d, r), None), (200,)),
+    ("POST", "/tasks/{task_id}/complete", complete_task, (200,)),
+    ("POST", "/tasks/purchase-extra", lambda d, r, i: ("/tasks/purchase-extra", any_user(d, r), None), (200,)),
+    ("POST", "/daily-bonus/claim", claim_bonus, (200, 400)),
+    ("POST", "/payments/ton/create", lambda d, r, i: ("/payments/ton/create", any_user(d, r), {"package_id": 1}), (200,)),
+    ("PUT", "/profile/", lambda d, r, i: ("/profile/", any_user(d, r), {"first_name": f"Bench {i}"}), (200,)),
+    ("PUT", "/profile/interests", lambda d, r, i: (
+        "/profile/interests", any_user(d, r), {"category_ids": r.sample(d.category_ids, min(2, len(d.category_ids)))}
+    ), (200,)),
+    ("PUT", "/profile/language", lambda d, r, i: (
+        "/profile/language", any_user(d, r), {"language_code": r.choice(d.language_codes)}
+    ), (200,)),
+    ("PATCH", "/auth/wallet/disconnect", lambda d, r, i: ("/auth/wallet/disconnect", any_user(d, r), None), (200,)),
+    ("POST", "/auth/register", register, (200,)),
+    ("POST", "/auth/ton/connect", ton_connect, (200,)),
+    ("POST", "/auth/ton-proof/generate", lambda d, r, i: ("/auth/ton-proof/generate", None, None), (200,)),
+    # Подпись кошелька в бенчмарке не создается: замеряется отказ по неизвестному payload
+    ("POST", "/auth/ton-proof/check", lambda d, r, i: ("/auth/ton-proof/check", None, {
+        "address": "0:" + "0" * 64, "network": "-239", "public_key": "0" * 64,
+        "proof": {"timestamp": int(time.time()), "domain": {"lengthBytes": 5, "value": "bench"},
+                  "signature": "", "payload": f"unknown-{i}", "state_init": ""},
+    }), (400, 401, 422)),
+    ("POST", "/admin/login", lambda d, r, i: ("/admin/login", None, {
+        "username": ADMIN_USERNAME, "password": ADMIN_PASSWORD
+    }), (200,)),
+]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Перцентиль по ближайшему рангу (values отсортирован)"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def parse_server_timing(header: str) -> Tuple[int, float]:
+    """(SQL запросов, время БД мс) из Server-Timing MetricsMiddleware"""
+    for part in header.split(","):
+        part = part.strip()
+        if part.startswith(SERVER_TIMING_PREFIX):
+            duration, _, desc = part[len(SERVER_TIMING_PREFIX):].partition(";desc=\"")
+            return int(desc.split(" ", 1)[0]), float(duration)
+    return 0, 0.0
+
+
+async def run_requests(client: httpx.AsyncClient, requests: List[Tuple[str, str, Optional[int], Optional[Dict]]],
+                       concurrency: int) -> Dict:
+    """Выполнение запросов не более concurrency одновременно"""
+    latencies = []
+    queries = []
+    db_ms = []
+    statuses: Dict[int, int] = {}
+    queue = list(reversed(requests))
+
+    async def worker():
+        while queue:
+            method, url, user_id, body = queue.pop()
+            headers = {"X-Telegram-User-ID": str(user_id)} if user_id is not None else {}
+            started = time.perf_counter()
+            response = await client.request(method, PREFIX + url, headers=headers, json=body)
+            latencies.append((time.perf_counter() - started) * 1000)
+            count, duration = parse_server_timing(response.headers.get("server-timing", ""))
+            queries.append(count)
+            db_ms.append(duration)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+        "sql_per_request": round(sum(queries) / len(queries), 2) if queries else 0.0,
+        "sql_max": max(queries, default=0),
+        "db_ms_per_request": round(sum(db_ms) / len(db_ms), 2) if db_ms else 0.0,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def build_requests(route, dataset: Dataset, rng: random.Random, count: int, offset: int = 0) -> List[Tuple]:
+    method, _, builder, _ = route
+    return [(method, *builder(dataset, rng, offset + i)) for i in range(count)]
+
+
+async def benchmark(args, dataset: Dataset, rng: random.Random) -> Dict:
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for route in ROUTES:
+                method, template, _, expected = route
+                if template == "/admin/login" and not dataset.admin:
+                    continue
+                name = f"{method} {PREFIX}{template}"
+                await run_requests(client, build_requests(route, dataset, rng, args.warmup), args.concurrency)
+                result = await run_requests(
+                    client, build_requests(route, dataset, rng, args.requests, args.warmup), args.concurrency
+                )
+                result["unexpected"] = sum(
+                    count for status, count in result["statuses"].items() if int(status) not in expected
+                )
+                results[name] = result
+
+            # Смешанная нагрузка: все GET маршруты вперемешку
+            mixed_requests = []
+            get_routes = [route for route in ROUTES if route[0] == "GET"]
+            for i in range(args.requests * 2):
+                mixed_requests.extend(build_requests(rng.choice(get_routes), dataset, rng, 1, i))
+            mixed = await run_requests(client, mixed_requests, args.concurrency)
+    return {"routes": results, "mixed_get": mixed}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Сравнение с прошлым результатом, возвращает список регрессий"""
+    regressions = []
+    print("-" * 60)
+    print(f"Сравнение с {baseline['meta'].get('commit') or 'baseline'}")
+    print(f"{'маршрут':<50} {'p95 было':>9} {'p95 стало':>10} {'SQL было':>9} {'SQL стало':>10}")
+    for name, result in current["routes"].items():
+        old = baseline["routes"].get(name)
+        if not old:
+            print(f"{name:<50} {'-':>9} {result['p95_ms']:>10.2f} {'-':>9} {result['sql_per_request']:>10.1f}")
+            continue
+        marks = []
+        # Попадания в кэши зависят от порядка параллельных запросов, поэтому
+        # SQL сравнивается с допуском: новый запрос на каждый HTTP запрос - +1
+        if result["sql_per_request"] - old["sql_per_request"] >= SQL_REGRESSION:
+            marks.append("SQL")
+        slower = result["p95_ms"] - old["p95_ms"]
+        if old["p95_ms"] and slower > P95_REGRESSION_MIN_MS and slower / old["p95_ms"] * 100 > max_regression:
+            marks.append("p95")
+        print(f"{name:<50} {old['p95_ms']:>9.2f} {result['p95_ms']:>10.2f} {old['sql_per_request']:>9.1f} "
+              f"{result['sql_per_request']:>10.1f} {' '.join(marks)}")
+        if marks:
+            regressions.append(f"{name}: {', '.join(marks)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный бенчмарк API")
+    parser.add_argument("--users", type=int, default=1000, help="Пользователей")
+    parser.add_argument("--tasks", type=int, default=2000, help="Заданий")
+    parser.add_argument("--categories", type=int, default=8, help="Категорий")
+    parser.add_argument("--languages", type=int, default=3, choices=range(1, len(LANGUAGES) + 1), help="Языков")
+    parser.add_argument("--completions", type=int, default=20, help="Выполненных заданий на пользователя в среднем")
+    parser.add_argument("--transactions", type=int, default=5, help="Транзакций на пользователя в среднем")
+    parser.add_argument("--requests", type=int, default=200, help="Запросов на маршрут")
+    parser.add_argument("--warmup", type=int, default=10, help="Запросов прогрева на маршрут (не учитываются)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Одновременных запросов")
+    parser.add_argument("--seed", type=int, default=1, help="Seed генератора данных и запросов")
+    parser.add_argument("--ton-latency", type=float, default=0.0, help="Задержка ответа фейкового TON API (сек)")
+    parser.add_argument("--output", default="benchmark_api.json", help="Файл результата (JSON)")
+    parser.add_argument("--compare", help="Прошлый результат (JSON) для сравнения")
+    parser.add_argument("--max-regression", type=float, default=30.0, help="Допустимый рост p95 при сравнении, %%")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    _fake_ton.latency = args.ton_latency
+    _fake_ton.start()
+
+    Base.metadata.create_all(engine)
+    started = time.perf_counter()
+    dataset = seed(args, rng)
+    seed_seconds = time.perf_counter() - started
+
+    print("=" * 60)
+    print(f"Бенчмарк API: {args.users} пользователей, {args.tasks} заданий, {dataset.rows} строк "
+          f"(заполнение {seed_seconds:.1f} с)")
+    print(f"{args.requests} запросов на маршрут, {args.concurrency} одновременно, время в мс")
+    print("=" * 60)
+    # Вывод print() в обработчиках (платежи, TON Proof) не мешает таблице
+    with open(os.devnull, "w") as devnull:
+        stdout = sys.stdout
+        sys.stdout = devnull
+        try:
+            results = asyncio.run(benchmark(args, dataset, rng))
+        finally:
+            sys.stdout = stdout
+    _fake_ton.stop()
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "rows": dataset.rows,
+            "ton_api_requests": _fake_ton.requests,
+            "args": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        },
+        **results,
+    }
+    print(f"{'маршрут':<50} {'p50':>7} {'p95':>7} {'p99':>7} {'rps':>7} {'SQL':>5} {'статусы'}")
+    for name, result in results["routes"].items():
+        print(f"{name:<50} {result['p50_ms']:>7.2f} {result['p95_ms']:>7.2f} {result['p99_ms']:>7.2f} "
+              f"{result['rps']:>7.1f} {result['sql_per_request']:>5.1f} "
+              f"{' '.join(f'{status}:{count}' for status, count in result['statuses'].items())}")
+    mixed = results["mixed_get"]
+    print("-" * 60)
+    print(f"{'GET вперемешку':<50} {mixed['p50_ms']:>7.2f} {mixed['p95_ms']:>7.2f} {mixed['p99_ms']:>7.2f} "
+          f"{mixed['rps']:>7.1f} {mixed['sql_per_request']:>5.1f}")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результат: {args.output}")
+
+    problems = [
+        f"{name}: неожиданные статусы {result['statuses']}"
+        for name, result in results["routes"].items() if result["unexpected"]
+    ]
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems += [f"регрессия {regression}" for regression in compare(report, baseline, args.max_regression)]
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print(f"[OK] {len(results['routes'])} маршрутов /api/v1 без неожиданных статусов")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Бенчмарк конкурентной обработки запросов: синхронная сессия vs AsyncSession
+
+Запускает 100 конкурентных клиентов (корутин) против ASGI приложения
+в одном event loop - так же, как работает один воркер uvicorn:
+- "sync": обработчик async def выполняет запрос ленты через синхронную
+  Session (как было раньше) - каждый запрос к БД блокирует event loop
+- "async": тот же SQL через AsyncSession (aiosqlite)
+- "api": реальный эндпоинт GET /api/v1/tasks/ на AsyncSession
+
+Параллельно с нагрузкой фоновая корутина раз в 10 мс дергает легкий эндпоинт
+/ping и замеряет лаг event loop (насколько позже запланированного она
+просыпается) - он показывает, насколько loop заблокирован запросами к БД.
+Задержки самих запросов в режиме sync не показательны: запрос выполняется
+целиком без переключений, а ожидание в очереди in-process клиент не видит.
+Работает на временной SQLite базе, sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_async_db.py [--tasks 2000] [--clients 100] [--requests 2000]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-bench-")
+_db_path = os.path.join(_tmp_dir, "bench.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi import FastAPI, Depends
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import Base, engine, async_engine, SessionLocal, get_db
+from app.models import *  # Импортируем все модели
+from app.models.catalog import CatalogVersion
+from app.services.task_feed import TaskFeedService, localized_task_select
+from app.main import app as api_app
+from benchmark_task_feed import seed
+
+PAGE_SIZE = 20
+
+
+def feed_query(user: User):
+    """Тот же SELECT страницы ленты, что и в TaskFeedService.get_page"""
+    category_ids = [uc.category_id for uc in user.interests]
+    return (
+        localized_task_select(user.language_id)
+        .where(*TaskFeedService.feed_filter(user, category_ids))
+        .order_by(Task.created_at.desc(), Task.id.desc())
+        .limit(PAGE_SIZE)
+    )
+
+
+def build_bench_app(user_id: int) -> FastAPI:
+    """Приложение с одинаковыми запросами на синхронной и асинхронной сессии"""
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/sync")
+    async def sync_feed():
+        # Синхронная сессия внутри async def - так роутеры работали раньше.
+        # Сессия закрывается в самом обработчике: при закрытии в threadpool
+        # (sync-генератор get_db) 100 клиентов исчерпывают пул соединений
+        # и event loop зависает в ожидании соединения
+        with SessionLocal() as db:
+            user = db.execute(
+                select(User).options(selectinload(User.interests)).where(User.tg_id == user_id)
+            ).scalar_one()
+            rows = db.execute(feed_query(user)).all()
+        return {"tasks": len(rows)}
+
+    @app.get("/async")
+    async def async_feed(db: AsyncSession = Depends(get_db)):
+        user = (await db.execute(
+            select(User).options(selectinload(User.interests)).where(User.tg_id == user_id)
+        )).scalar_one()
+        rows = (await db.execute(feed_query(user))).all()
+        return {"tasks": len(rows)}
+
+    return app
+
+
+async def asgi_get(app, path: str, headers: dict = None) -> int:
+    """GET запрос напрямую в ASGI приложение (без сети), возвращает статус"""
+    query = ""
+    if "?" in path:
+        path, query = path.split("?", 1)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "client": ("127.0.0.1", 12345),
+        "server": ("testserver", 80),
+    }
+    status = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+
+    await app(scope, receive, send)
+    return status.get("code", 0)
+
+
+async def run_load(app, path: str, headers: dict, clients: int, total_requests: int) -> dict:
+    """
+    Нагрузка: clients конкурентных клиентов выполняют total_requests запросов
+
+    Returns:
+        Словарь с rps, задержками запросов и лагом event loop
+    """
+    remaining = total_requests
+    latencies = []
+    loop_lags = []
+    errors = 0
+    done = asyncio.Event()
+
+    async def client():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            code = await asgi_get(app, path, headers)
+            latencies.append(time.perf_counter() - started)
+            if code != 200:
+                errors += 1
+
+    async def pinger():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            await asgi_get(app, "/ping")
+            loop_lags.append(time.perf_counter() - started - 0.01)
+
+    ping_task = asyncio.create_task(pinger())
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ping_task
+
+    latencies.sort()
+    loop_lags.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "lag_p95_ms": loop_lags[max(0, int(len(loop_lags) * 0.95) - 1)] * 1000 if loop_lags else 0.0,
+        "lag_max_ms": loop_lags[-1] * 1000 if loop_lags else 0.0,
+        "errors": errors,
+    }
+
+
+async def run(args) -> int:
+    bench_app = build_bench_app(args.user_id)
+    # Реальное API монтируется внутрь bench-приложения, чтобы /ping был общим
+    bench_app.mount("/real", api_app)
+
+    modes = [
+        ("sync", "/sync", {}),
+        ("async", "/async", {}),
+        ("api", "/real/api/v1/tasks/?limit=20", {"X-Telegram-User-ID": str(args.user_id)}),
+    ]
+
+    print("=" * 60)
+    print(f"Конкурентность: {args.clients} клиентов, {args.requests} запросов, {args.tasks} заданий")
+    print("=" * 60)
+    print(f"{'режим':>6} {'req/s':>9} {'p50 мс':>8} {'p95 мс':>8} {'лаг p95':>9} {'лаг max':>9} {'ошибки':>7}")
+
+    results = {}
+    for name, path, headers in modes:
+        # Прогрев: пулы соединений и кэш справочников
+        await run_load(bench_app, path, headers, clients=min(args.clients, 10), total_requests=50)
+        result = await run_load(bench_app, path, headers, args.clients, args.requests)
+        results[name] = result
+        print(
+            f"{name:>6} {result['rps']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+            f"{result['lag_p95_ms']:>9.1f} {result['lag_max_ms']:>9.1f} {result['errors']:>7}"
+        )
+
+    print("-" * 60)
+    speedup = results["async"]["rps"] / results["sync"]["rps"]
+    print(f"async/sync по пропускной способности: x{speedup:.2f}")
+    print(
+        f"Лаг event loop под нагрузкой (p95): sync {results['sync']['lag_p95_ms']:.1f} мс, "
+        f"async {results['async']['lag_p95_ms']:.1f} мс"
+    )
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    await async_engine.dispose()
+    if any(result["errors"] for result in results.values()):
+        print("[ERROR] Есть неуспешные запросы")
+        return 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк синхронной и асинхронной сессии БД")
+    parser.add_argument("--tasks", type=int, default=2000, help="Количество заданий в базе")
+    parser.add_argument("--clients", type=int, default=100, help="Количество конкурентных клиентов")
+    parser.add_argument("--requests", type=int, default=2000, help="Количество запросов на режим")
+    parser.add_argument("--json", action="store_true", help="Вывести результаты в JSON")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    args.user_id = seed(db, args.tasks)
+    db.add(CatalogVersion(id=1, version=1))
+    db.commit()
+    db.close()
+
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
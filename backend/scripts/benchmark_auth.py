@@ -0,0 +1,199 @@
+"""
+Бенчмарк определения пользователя в зависимостях API (core.dependencies)
+
+Создает временную базу с N пользователями (у каждого интересы, у половины
+привязан TON кошелек) и прогоняет get_current_user_required так, как его
+вызывает FastAPI на каждый запрос, в режимах:
+- "db": кэш выключен (USER_CACHE_TTL=0) - как было: запрос пользователя
+  с интересами на каждый вызов, при непривязанном кошельке - два запроса
+- "cache": кэш авторизации user_cache (с пустого кэша)
+- "warm": повторный прогон с заполненным кэшем
+
+Заголовки запросов: только X-Telegram-User-ID, только X-Wallet-Address и
+оба заголовка с кошельком, который не привязан (поиск по кошельку, затем
+по tg_id). Печатает SQL запросов и микросекунд на запрос.
+
+Затем проверяет инвалидацию: изменение языка через UserService,
+привязку кошелька, деактивацию через увеличение user_cache_version
+(как делает Django админка).
+sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_auth.py [--users 1000] [--requests 5000]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-bench-")
+_db_path = os.path.join(_tmp_dir, "bench.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi import HTTPException
+from sqlalchemy import event, update
+from app.core import dependencies
+from app.core.database import Base, engine, async_engine, SessionLocal, AsyncSessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.user_cache import UserCache
+from app.services.user_service import UserService
+
+
+def seed(users: int) -> None:
+    """Пользователи с 3 интересами; у четных привязан кошелек"""
+    db = SessionLocal()
+    languages = [Language(code="ru", name="Русский"), Language(code="en", name="English")]
+    db.add_all(languages)
+    db.flush()
+    categories = [TaskCategory(slug=f"category-{i}", color="#FFC700") for i in range(5)]
+    db.add_all(categories)
+    db.flush()
+    for tg_id in range(1, users + 1):
+        db.add(User(
+            tg_id=tg_id,
+            first_name=f"User {tg_id}",
+            gender=Gender.MALE,
+            language_id=languages[0].id,
+            wallet_address=f"EQ-wallet-{tg_id}" if tg_id % 2 == 0 else None,
+        ))
+        for category in categories[:3]:
+            db.add(UserCategory(user_id=tg_id, category_id=category.id))
+    db.add(UserCacheVersion(id=1, version=1))
+    db.commit()
+    db.close()
+
+
+def make_requests(users: int, count: int) -> dict:
+    """Заголовки запросов: (X-Telegram-User-ID, X-Wallet-Address) по сценариям"""
+    rng = random.Random(42)
+    with_wallet = list(range(2, users + 1, 2))
+    return {
+        "tg_id": [(str(rng.randint(1, users)), None) for _ in range(count)],
+        "wallet": [(None, f"EQ-wallet-{rng.choice(with_wallet)}") for _ in range(count)],
+        "wallet+tg": [(str(tg_id), f"EQ-unlinked-{tg_id}") for tg_id in (rng.randint(1, users) for _ in range(count))],
+    }
+
+
+async def resolve(db, tg_id, wallet_address):
+    """Вызов зависимости с заголовками, как это делает FastAPI"""
+    return await dependencies.get_current_user_required(
+        tg_id=tg_id, tg_id_query=None, wallet_address=wallet_address, init_data=None, db=db
+    )
+
+
+async def measure(cache: UserCache, requests: list, queries: list) -> dict:
+    dependencies.user_cache = cache
+    queries.clear()
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        for tg_id, wallet_address in requests:
+            await resolve(db, tg_id, wallet_address)
+        elapsed = time.perf_counter() - started
+    return {
+        "us_per_request": elapsed / len(requests) * 1e6,
+        "queries_per_request": len(queries) / len(requests),
+    }
+
+
+async def check_invalidation(queries: list) -> list:
+    """Изменения пользователя видны через кэш сразу после изменения"""
+    problems = []
+    cache = UserCache(ttl=60, max_size=100, check_interval=0)
+    dependencies.user_cache = cache
+    # UserService сбрасывает глобальный кэш; для проверки подменяем его
+    from app.services import user_service
+    user_service.user_cache = cache
+
+    async with AsyncSessionLocal() as db:
+        user = await resolve(db, "1", None)
+        db_user = await UserService.get_user(db, User.tg_id == 1)
+        await UserService.update_language(db, db_user, "en")
+        en = await UserService.get_user(db, User.tg_id == 1)
+        user = await resolve(db, "1", None)
+        if user.language_id != en.language_id:
+            problems.append(f"язык после изменения: {user.language_id}, ожидался {en.language_id}")
+
+        # Кошелек еще не привязан - промах кэшируется, после привязки должен сброситься
+        await resolve(db, "1", "EQ-new-wallet")
+        db_user.wallet_address = "EQ-new-wallet"
+        await db.commit()
+        await UserService.reload(db, db_user)
+        queries.clear()
+        user = await resolve(db, None, "EQ-new-wallet")
+        if user.tg_id != 1:
+            problems.append("привязанный кошелек не найден")
+        if not queries:
+            problems.append("после привязки кошелька использован устаревший промах кэша")
+
+        # Деактивация через админку: is_active меняется в БД, версия увеличивается
+        await db.execute(update(User).where(User.tg_id == 1).values(is_active=False))
+        await db.execute(update(UserCacheVersion).values(version=UserCacheVersion.version + 1))
+        await db.commit()
+        try:
+            await resolve(db, "1", None)
+            problems.append("деактивированный пользователь прошел авторизацию")
+        except HTTPException as e:
+            if e.status_code != 403:
+                problems.append(f"деактивированный пользователь: {e.status_code}, ожидался 403")
+    return problems
+
+
+async def run(args) -> int:
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+
+    requests = make_requests(args.users, args.requests)
+    print(f"{'заголовки':>10} {'режим':>6} {'SQL/запрос':>11} {'мкс/запрос':>11}")
+    for name, scenario in requests.items():
+        results = {}
+        for mode, ttl in (("db", 0), ("cache", 60), ("warm", 60)):
+            # "warm" - повторный прогон с тем же (уже заполненным) кэшем
+            if mode != "warm":
+                cache = UserCache(ttl=ttl, max_size=args.users * 2, check_interval=5.0)
+            results[mode] = await measure(cache, scenario, queries)
+            print(f"{name:>10} {mode:>6} {results[mode]['queries_per_request']:>11.3f} {results[mode]['us_per_request']:>11.0f}")
+        print(
+            f"{name:>10} cache быстрее db: x{results['db']['us_per_request'] / results['cache']['us_per_request']:.1f}, "
+            f"прогретый: x{results['db']['us_per_request'] / results['warm']['us_per_request']:.0f}"
+        )
+
+    print("-" * 60)
+    problems = await check_invalidation(queries)
+    await async_engine.dispose()
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print("[OK] Изменения языка, кошелька и деактивация видны через кэш сразу")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк определения пользователя в зависимостях API")
+    parser.add_argument("--users", type=int, default=1000, help="Количество пользователей")
+    parser.add_argument("--requests", type=int, default=5000, help="Запросов на сценарий")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    seed(args.users)
+
+    print("=" * 60)
+    print(f"Авторизация запросов: {args.users} пользователей, {args.requests} запросов на сценарий")
+    print("=" * 60)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Бенчмарк запуска mini-app: пять отдельных запросов против /bootstrap
+
+Создает временную базу (задания, категории, пользователь с интересами и
+историей бонусов) и через ASGI приложение сравнивает:
+- "отдельно": /auth/me, /tasks/, /tasks/daily-free-count,
+  /daily-bonus/status и /payments/balance - как сейчас при старте mini-app
+- "bootstrap": GET /bootstrap/ - те же данные одним запросом
+
+Для каждого варианта выводится количество SQL запросов и время на запуск.
+Каждый раздел /bootstrap/ должен совпадать с ответом своего эндпоинта,
+include выбирает разделы, неизвестный раздел - 422.
+sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_bootstrap.py [--tasks 2000] [--repeat 50]
+"""
+import sys
+import os
+import argparse
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-bench-")
+_db_path = os.path.join(_tmp_dir, "bench.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.core.database import Base, engine, async_engine, SessionLocal
+from app.models import *  # Импортируем все модели
+from app.main import app
+
+USER_ID = 1
+HEADERS = {"X-Telegram-User-ID": str(USER_ID)}
+PREFIX = "/api/v1"
+STARTUP_CALLS = {
+    "me": "/auth/me",
+    "tasks": "/tasks/",
+    "daily_free_count": "/tasks/daily-free-count",
+    "daily_bonus": "/daily-bonus/status",
+    "balance": "/payments/balance",
+}
+
+
+def seed(tasks: int) -> None:
+    db = SessionLocal()
+    ru = Language(code="ru", name="Русский")
+    en = Language(code="en", name="English")
+    db.add_all([ru, en])
+    db.flush()
+    categories = []
+    for i in range(5):
+        category = TaskCategory(slug=f"category-{i}", color="#FFC700")
+        db.add(category)
+        db.flush()
+        db.add(CategoryTranslation(category_id=category.id, language_id=en.id, name=f"Category {i}"))
+        categories.append(category)
+    db.add(User(tg_id=USER_ID, first_name="Bench", gender=Gender.MALE, language_id=en.id, balance=120))
+    for category in categories:
+        db.add(UserCategory(user_id=USER_ID, category_id=category.id))
+    for i in range(tasks):
+        task = Task(category_id=categories[i % len(categories)].id)
+        db.add(task)
+        db.flush()
+        db.add(TaskTranslation(task_id=task.id, language_id=en.id, title=f"Task {i}", description="Description"))
+        db.add(TaskGenderTarget(task_id=task.id, gender=GenderTarget.ALL))
+        if i % 4 == 0:
+            db.add(CompletedTask(user_id=USER_ID, task_id=task.id))
+    # Серия бонусов до вчерашнего дня
+    for day in range(1, 4):
+        db.add(DailyBonus(user_id=USER_ID, day_number=day, bonus_amount=10, date=date.today() - timedelta(days=4 - day)))
+    db.commit()
+    db.close()
+
+
+def measure(client: TestClient, queries: list, call, repeat: int) -> tuple:
+    """SQL запросов и миллисекунд на один запуск"""
+    call()  # прогрев кэшей справочников и пользователя
+    queries.clear()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        call()
+    elapsed = (time.perf_counter() - started) * 1000 / repeat
+    return len(queries) / repeat, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк /bootstrap против отдельных запросов")
+    parser.add_argument("--tasks", type=int, default=2000, help="Количество заданий")
+    parser.add_argument("--repeat", type=int, default=50, help="Запусков на замер")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    seed(args.tasks)
+
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+
+    print("=" * 60)
+    print(f"Запуск mini-app: {args.tasks} заданий")
+    print("=" * 60)
+
+    problems = []
+    with TestClient(app) as client:
+        def separate():
+            return {name: client.get(PREFIX + path, headers=HEADERS) for name, path in STARTUP_CALLS.items()}
+
+        def bootstrap(include=None):
+            params = {"include": include} if include is not None else None
+            return client.get(PREFIX + "/bootstrap/", headers=HEADERS, params=params)
+
+        # Разделы совпадают с отдельными ответами
+        combined = bootstrap().json()
+        for name, response in separate().items():
+            if response.status_code != 200 or combined.get(name) != response.json():
+                problems.append(f"{name}: раздел /bootstrap/ отличается от {STARTUP_CALLS[name]}")
+        partial = bootstrap("tasks,balance").json()
+        if partial["tasks"] is None or partial["balance"] is None or partial["me"] is not None:
+            problems.append(f"include=tasks,balance: разделы {[k for k, v in partial.items() if v is not None]}")
+        if bootstrap("tasks,unknown").status_code != 422:
+            problems.append("неизвестный раздел в include не отклонен")
+
+        print(f"{'вариант':>12} {'HTTP':>6} {'SQL':>6} {'мс/запуск':>10}")
+        results = {
+            "отдельно": (len(STARTUP_CALLS), *measure(client, queries, separate, args.repeat)),
+            "bootstrap": (1, *measure(client, queries, bootstrap, args.repeat)),
+        }
+        for name, (requests, sql, elapsed) in results.items():
+            print(f"{name:>12} {requests:>6} {sql:>6.1f} {elapsed:>10.2f}")
+        if results["bootstrap"][1] >= results["отдельно"][1]:
+            problems.append("bootstrap выполняет не меньше SQL запросов, чем отдельные вызовы")
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print("[OK] Разделы /bootstrap/ совпадают с отдельными эндпоинтами")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Бенчмарк ежедневного сброса бесплатных заданий на большом количестве пользователей
+
+Создает временную базу с N пользователями (по умолчанию 1 000 000), у каждого
+строка daily_free_tasks за сегодня и за вчера, и сравнивает:
+- "orm": прежняя реализация - загрузка всех строк за сегодня в ORM объекты
+  и изменение по одному, синхронно внутри event loop
+- "update": reset_daily_free_tasks - один UPDATE по индексу даты через
+  AsyncSession
+
+Во время сброса фоновая корутина раз в 10 мс замеряет лаг event loop
+(насколько позже запланированного она просыпается). Проверяется, что все
+строки за сегодня сброшены, а вчерашние не тронуты.
+sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_daily_reset.py [--users 1000000] [--skip-orm]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-bench-")
+_db_path = os.path.join(_tmp_dir, "bench.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytz
+from app.core.config import settings
+from app.core.database import Base, engine, async_engine, SessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.daily_service import reset_daily_free_tasks, reset_metrics
+
+CHUNK = 50_000
+
+
+def seed(users: int, today) -> None:
+    """Пользователи и строки daily_free_tasks за сегодня и вчера (напрямую через sqlite3)"""
+    yesterday = today - timedelta(days=1)
+    conn = sqlite3.connect(_db_path)
+    conn.execute("INSERT INTO languages (id, code, name, is_active) VALUES (1, 'ru', 'Русский', 1)")
+    for start in range(1, users + 1, CHUNK):
+        ids = range(start, min(start + CHUNK, users + 1))
+        conn.executemany(
+            "INSERT INTO users (tg_id, first_name, gender, language_id, is_admin, balance, is_active, has_lifetime_subscription) "
+            "VALUES (?, 'User', 'MALE', 1, 0, 0, 1, 0)",
+            ((tg_id,) for tg_id in ids)
+        )
+        conn.executemany(
+            "INSERT INTO daily_free_tasks (user_id, date, count, paid_available) VALUES (?, ?, ?, 0)",
+            ((tg_id, day.isoformat(), tg_id % 4) for tg_id in ids for day in (yesterday, today))
+        )
+    conn.commit()
+    conn.close()
+
+
+def restore_counts(today) -> None:
+    """Исходные счетчики за сегодня (перед каждым прогоном)"""
+    conn = sqlite3.connect(_db_path)
+    conn.execute("UPDATE daily_free_tasks SET count = user_id % 4 WHERE date = ?", (today.isoformat(),))
+    conn.commit()
+    conn.close()
+
+
+def legacy_reset() -> int:
+    """Прежняя реализация сброса: все строки за сегодня в ORM и изменение по одному"""
+    db = SessionLocal()
+    try:
+        moscow_time = datetime.now(pytz.timezone(settings.TIMEZONE))
+        daily_tasks = db.query(DailyFreeTask).filter(DailyFreeTask.date == moscow_time.date()).all()
+        for daily_task in daily_tasks:
+            daily_task.count = 0
+            daily_task.last_reset = moscow_time
+        db.commit()
+        return len(daily_tasks)
+    finally:
+        db.close()
+
+
+async def measure(reset) -> dict:
+    """Сброс с замером времени и лага event loop"""
+    loop_lags = []
+    done = asyncio.Event()
+
+    async def lag_probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            loop_lags.append(time.perf_counter() - started - 0.01)
+
+    probe = asyncio.create_task(lag_probe())
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    rows = await reset()
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe
+    return {"seconds": elapsed, "rows": rows, "lag_max_ms": max(loop_lags, default=0.0) * 1000}
+
+
+def check(today) -> list:
+    """Все строки за сегодня сброшены, вчерашние не тронуты"""
+    conn = sqlite3.connect(_db_path)
+    problems = []
+    not_reset = conn.execute(
+        "SELECT COUNT(*) FROM daily_free_tasks WHERE date = ? AND count != 0", (today.isoformat(),)
+    ).fetchone()[0]
+    if not_reset:
+        problems.append(f"не сброшено строк за сегодня: {not_reset}")
+    touched = conn.execute(
+        "SELECT COUNT(*) FROM daily_free_tasks WHERE date = ? AND count != user_id % 4",
+        ((today - timedelta(days=1)).isoformat(),)
+    ).fetchone()[0]
+    if touched:
+        problems.append(f"изменено вчерашних строк: {touched}")
+    conn.close()
+    return problems
+
+
+async def run(args, today) -> int:
+    async def orm_reset():
+        # Синхронный вызов прямо в event loop - так работал прежний сброс
+        return legacy_reset()
+
+    modes = [("update", reset_daily_free_tasks)]
+    if not args.skip_orm:
+        modes.insert(0, ("orm", orm_reset))
+
+    print(f"{'режим':>7} {'строк':>9} {'сек':>8} {'лаг max мс':>11}")
+    failures = 0
+    for name, reset in modes:
+        restore_counts(today)
+        result = await measure(reset)
+        print(f"{name:>7} {result['rows']:>9} {result['seconds']:>8.2f} {result['lag_max_ms']:>11.1f}")
+        problems = check(today)
+        if result["rows"] != args.users:
+            problems.append(f"сброшено {result['rows']} строк из {args.users}")
+        for problem in problems:
+            print(f"[ERROR] {name}: {problem}")
+        failures += bool(problems)
+
+    await async_engine.dispose()
+    print("-" * 60)
+    print(f"Метрики сброса: {reset_metrics.snapshot()}")
+    if failures:
+        return 1
+    print("[OK] Все строки за сегодня сброшены, вчерашние не тронуты")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк ежедневного сброса бесплатных заданий")
+    parser.add_argument("--users", type=int, default=1_000_000, help="Количество пользователей")
+    parser.add_argument("--skip-orm", action="store_true", help="Не запускать прежнюю ORM реализацию")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    today = datetime.now(pytz.timezone(settings.TIMEZONE)).date()
+
+    print("=" * 60)
+    print(f"Ежедневный сброс: {args.users} пользователей, {args.users * 2} строк daily_free_tasks")
+    print("=" * 60)
+    started = time.perf_counter()
+    seed(args.users, today)
+    print(f"Заполнение базы: {time.perf_counter() - started:.1f} сек")
+
+    return asyncio.run(run(args, today))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Бенчмарк пагинации ленты заданий и истории выполненных заданий
+
+Создает временную базу с N заданиями и пользователем, выполнившим
+половину из них (длинная история), и сравнивает время первой и
+--page страницы (по 20 записей):
+- "offset": прежний путь, LIMIT/OFFSET - SQLite читает и отбрасывает
+  все пропущенные строки
+- "cursor": курсор (время, id) из предыдущей страницы
+
+Курсоры до нужной страницы собираются проходом по всем страницам; проход
+заодно проверяет, что страницы по курсору совпадают со страницами по
+offset (без пропусков и повторов, в том числе при одинаковом времени).
+sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_pagination.py [--tasks 30000] [--page 500] [--repeat 20]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-bench-")
+_db_path = os.path.join(_tmp_dir, "bench.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi import Response
+from app.core.database import Base, engine, async_engine, AsyncSessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.task_service import TaskService
+from app.services.user_cache import user_cache
+from app.api.v1 import profile as profile_api
+
+PAGE_SIZE = 20
+USER_ID = 1
+CATEGORIES = 5
+
+
+def seed(tasks: int) -> None:
+    """
+    Задания и история выполнения (напрямую через sqlite3)
+
+    Время хранится как у server_default (CURRENT_TIMESTAMP, без долей секунды);
+    по 4 задания и выполнения имеют одинаковое время - проверка сортировки по id.
+    """
+    start = datetime(2025, 1, 1)
+    conn = sqlite3.connect(_db_path)
+    conn.execute("INSERT INTO languages (id, code, name, is_active) VALUES (1, 'ru', 'Русский', 1)")
+    for category_id in range(1, CATEGORIES + 1):
+        conn.execute(
+            "INSERT INTO task_categories (id, slug, color, is_active) VALUES (?, ?, '#FFC700', 1)",
+            (category_id, f"category-{category_id}")
+        )
+        conn.execute(
+            "INSERT INTO category_translations (category_id, language_id, name) VALUES (?, 1, ?)",
+            (category_id, f"Категория {category_id}")
+        )
+    conn.executemany(
+        "INSERT INTO tasks (id, category_id, is_active, created_at) VALUES (?, ?, 1, ?)",
+        ((task_id, task_id % CATEGORIES + 1, (start + timedelta(minutes=task_id // 4)).strftime("%Y-%m-%d %H:%M:%S"))
+         for task_id in range(1, tasks + 1))
+    )
+    conn.executemany(
+        "INSERT INTO task_translations (task_id, language_id, title, description) VALUES (?, 1, ?, 'Описание')",
+        ((task_id, f"Задание {task_id}") for task_id in range(1, tasks + 1))
+    )
+    conn.executemany(
+        "INSERT INTO task_gender_targets (task_id, gender) VALUES (?, 'ALL')",
+        ((task_id,) for task_id in range(1, tasks + 1))
+    )
+    conn.execute(
+        "INSERT INTO users (tg_id, first_name, gender, language_id, is_admin, balance, is_active, has_lifetime_subscription) "
+        "VALUES (?, 'Bench', 'MALE', 1, 0, 0, 1, 0)",
+        (USER_ID,)
+    )
+    conn.executemany(
+        "INSERT INTO user_categories (user_id, category_id) VALUES (?, ?)",
+        ((USER_ID, category_id) for category_id in range(1, CATEGORIES + 1))
+    )
+    # Выполнена каждая вторая задача - половина ленты и длинная история
+    conn.executemany(
+        "INSERT INTO completed_tasks (user_id, task_id, completed_at) VALUES (?, ?, ?)",
+        ((USER_ID, task_id, (start + timedelta(days=30, minutes=task_id // 8)).strftime("%Y-%m-%d %H:%M:%S"))
+         for task_id in range(2, tasks + 1, 2))
+    )
+    # Много купленных слотов, чтобы лимит страницы ленты не обрезался до 3 заданий
+    conn.execute(
+        "INSERT INTO daily_free_tasks (user_id, date, count, paid_available) VALUES (?, ?, 0, 1000000)",
+        (USER_ID, date.today().isoformat())
+    )
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+
+async def feed_page(db, user, offset=0, cursor=None):
+    result = await TaskService.get_tasks_for_user(db, user, limit=PAGE_SIZE, offset=offset, cursor=cursor)
+    return [task["id"] for task in result["tasks"]], result["next_cursor"]
+
+
+async def history_page(db, user, offset=0, cursor=None):
+    response = Response()
+    tasks = await profile_api.get_history(
+        response=response, limit=PAGE_SIZE, offset=offset, cursor=cursor, user=user, db=db
+    )
+    return [task.id for task in tasks], response.headers.get("X-Next-Cursor")
+
+
+async def timed(call, repeat: int) -> float:
+    """Миллисекунд на запрос"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await call()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+async def run_endpoint(name: str, fetch, db, user, page: int, repeat: int) -> list:
+    """Проход по страницам курсором со сверкой с offset и замер первой и page-й страницы"""
+    problems = []
+    cursors = [None]
+    seen = set()
+    page_number = 0
+    while cursors[-1] is not None or page_number == 0:
+        ids, next_cursor = await fetch(db, user, cursor=cursors[-1])
+        page_number += 1
+        if page_number in (1, 2, page // 2, page):
+            offset_ids, _ = await fetch(db, user, offset=(page_number - 1) * PAGE_SIZE)
+            if offset_ids != ids:
+                problems.append(f"{name}: страница {page_number} по курсору не совпадает с offset")
+        if seen.intersection(ids):
+            problems.append(f"{name}: повтор записей на странице {page_number}")
+        seen.update(ids)
+        if page_number == page:
+            break
+        cursors.append(next_cursor)
+    if page_number < page:
+        problems.append(f"{name}: всего {page_number} страниц, нужно {page} (увеличьте --tasks)")
+        return problems
+
+    page_cursor = cursors[-1]
+    offset = (page - 1) * PAGE_SIZE
+    results = {
+        ("offset", 1): await timed(lambda: fetch(db, user, offset=0), repeat),
+        ("offset", page): await timed(lambda: fetch(db, user, offset=offset), repeat),
+        ("cursor", 1): await timed(lambda: fetch(db, user, cursor=None), repeat),
+        ("cursor", page): await timed(lambda: fetch(db, user, cursor=page_cursor), repeat),
+    }
+    for mode in ("offset", "cursor"):
+        first, last = results[(mode, 1)], results[(mode, page)]
+        print(f"{name:>8} {mode:>7} {first:>12.2f} {last:>12.2f} {last / first:>8.1f}")
+    # Страница по курсору не должна заметно дорожать с номером
+    if results[("cursor", page)] > results[("cursor", 1)] * 2:
+        problems.append(
+            f"{name}: страница {page} по курсору {results[('cursor', page)]:.2f} мс, "
+            f"первая {results[('cursor', 1)]:.2f} мс"
+        )
+    return problems
+
+
+async def run(args) -> int:
+    async with AsyncSessionLocal() as db:
+        user = await user_cache.get_by_tg_id(db, USER_ID)
+        print(f"{'':>8} {'режим':>7} {'стр. 1, мс':>12} {f'стр. {args.page}, мс':>12} {'рост':>8}")
+        problems = []
+        problems += await run_endpoint("лента", feed_page, db, user, args.page, args.repeat)
+        problems += await run_endpoint("история", history_page, db, user, args.page, args.repeat)
+    await async_engine.dispose()
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print(f"[OK] Страницы по курсору совпадают с offset, стр. {args.page} не дороже первой")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк пагинации ленты и истории")
+    parser.add_argument("--tasks", type=int, default=30000, help="Количество заданий (выполнена половина)")
+    parser.add_argument("--page", type=int, default=500, help="Номер дальней страницы (по 20 записей)")
+    parser.add_argument("--repeat", type=int, default=20, help="Повторов на замер")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    seed(args.tasks)
+
+    print("=" * 60)
+    print(f"Пагинация: {args.tasks} заданий, {args.tasks // 2} в истории, страница {args.page}")
+    print("=" * 60)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""
+Нагрузочный тест SQLite: конкурентные чтения и записи с разными профилями PRAGMA
+
+Сравнивает режим по умолчанию (rollback journal, synchronous=FULL) и профиль
+из настроек (WAL, synchronous=NORMAL, busy_timeout, mmap, cache_size...).
+Писатели в отдельных потоках начисляют баланс и создают транзакции (как
+ежедневный бонус), читатели выбирают задания с переводами (как лента).
+Считаются операции в секунду и ошибки "database is locked".
+Каждый профиль работает на своей временной базе, sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_sqlite_pragmas.py [--writers 4] [--readers 8] [--duration 5]
+"""
+import sys
+import os
+import argparse
+import tempfile
+import threading
+import time
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base, SQLITE_PRAGMAS, apply_sqlite_pragmas
+from app.models import *  # Импортируем все модели
+from benchmark_task_feed import seed
+
+# Поведение до настройки: журнал отката, синхронная запись, только foreign keys
+DEFAULT_PRAGMAS = {
+    "journal_mode": "DELETE",
+    "synchronous": "FULL",
+    "foreign_keys": "ON",
+}
+
+READ_SQL = text("""
+    SELECT t.id, tt.title, tt.description
+    FROM tasks t
+    JOIN task_translations tt ON tt.task_id = t.id
+    WHERE t.is_active = 1
+    ORDER BY t.created_at DESC, t.id DESC
+    LIMIT 20 OFFSET :offset
+""")
+
+WRITE_SQL = [
+    text("UPDATE users SET balance = balance + 1 WHERE tg_id = :user_id"),
+    text("""
+        INSERT INTO transactions (user_id, amount, transaction_type, payment_method, status, created_at)
+        VALUES (:user_id, 1, 'BONUS', 'DAILY_BONUS', 'COMPLETED', CURRENT_TIMESTAMP)
+    """),
+]
+
+
+def make_engine(db_file: str, pragmas: dict):
+    """Engine с заданным профилем PRAGMA"""
+    engine = create_engine(f"sqlite:///{db_file}", connect_args={"check_same_thread": False})
+    event.listen(engine, "connect", lambda conn, record: apply_sqlite_pragmas(conn, pragmas))
+    return engine
+
+
+def run_profile(name: str, pragmas: dict, args) -> dict:
+    """Прогон нагрузки на свежей базе с профилем pragmas"""
+    db_file = os.path.join(tempfile.mkdtemp(prefix="sparks-bench-"), f"{name}.db")
+    engine = make_engine(db_file, pragmas)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user_id = seed(db, args.tasks)
+    db.close()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    counters = {"reads": 0, "writes": 0, "locked": 0, "errors": 0}
+
+    def count(key: str) -> None:
+        with lock:
+            counters[key] += 1
+
+    def writer():
+        with engine.connect() as conn:
+            while not stop.is_set():
+                try:
+                    with conn.begin():
+                        for statement in WRITE_SQL:
+                            conn.execute(statement, {"user_id": user_id})
+                    count("writes")
+                except OperationalError as e:
+                    count("locked" if "locked" in str(e) else "errors")
+
+    def reader(offset: int):
+        with engine.connect() as conn:
+            while not stop.is_set():
+                try:
+                    with conn.begin():
+                        conn.execute(READ_SQL, {"offset": offset}).all()
+                    count("reads")
+                except OperationalError as e:
+                    count("locked" if "locked" in str(e) else "errors")
+
+    threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(i * 20,)) for i in range(args.readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with engine.connect() as conn:
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+    engine.dispose()
+
+    return {
+        "journal_mode": journal_mode,
+        "reads_per_sec": counters["reads"] / elapsed,
+        "writes_per_sec": counters["writes"] / elapsed,
+        "locked": counters["locked"],
+        "errors": counters["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест профилей PRAGMA SQLite")
+    parser.add_argument("--tasks", type=int, default=2000, help="Количество заданий в базе")
+    parser.add_argument("--writers", type=int, default=4, help="Потоков-писателей")
+    parser.add_argument("--readers", type=int, default=8, help="Потоков-читателей")
+    parser.add_argument("--duration", type=float, default=5.0, help="Длительность прогона (сек)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"SQLite: {args.writers} писателей, {args.readers} читателей, {args.duration} сек")
+    print(f"Профиль настроек: {SQLITE_PRAGMAS}")
+    print("=" * 60)
+    print(f"{'профиль':>9} {'журнал':>7} {'чтений/с':>10} {'записей/с':>10} {'locked':>7} {'ошибки':>7}")
+
+    results = {}
+    for name, pragmas in (("default", DEFAULT_PRAGMAS), ("settings", SQLITE_PRAGMAS)):
+        result = run_profile(name, pragmas, args)
+        results[name] = result
+        print(
+            f"{name:>9} {result['journal_mode']:>7} {result['reads_per_sec']:>10.1f} "
+            f"{result['writes_per_sec']:>10.1f} {result['locked']:>7} {result['errors']:>7}"
+        )
+
+    print("-" * 60)
+    before, after = results["default"], results["settings"]
+    if before["reads_per_sec"]:
+        print(f"Чтения:  x{after['reads_per_sec'] / before['reads_per_sec']:.2f}")
+    if before["writes_per_sec"]:
+        print(f"Записи:  x{after['writes_per_sec'] / before['writes_per_sec']:.2f}")
+    if after["locked"] or after["errors"]:
+        print(f"[ERROR] С профилем настроек есть ошибки: locked={after['locked']}, прочие={after['errors']}")
+        return 1
+    print("[OK] Ошибок \"database is locked\" нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
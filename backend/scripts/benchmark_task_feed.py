@@ -0,0 +1,142 @@
+"""
+Бенчмарк ленты заданий (TaskService.get_tasks_for_user)
+
+Проверяет, что количество SQL запросов на страницу ленты не зависит
+от размера страницы, и замеряет время построения страницы.
+Работает на временной SQLite базе, sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_task_feed.py [--tasks 2000] [--repeat 50]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import date
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker, selectinload
+from app.core.database import Base
+from app.models import *  # Импортируем все модели
+from app.services.task_service import TaskService
+
+PAGE_SIZES = [1, 5, 10, 20, 50, 100]
+
+
+def seed(db, tasks_count: int) -> int:
+    """Заполнение базы: 3 языка, 5 категорий, tasks_count заданий, 1 пользователь"""
+    languages = [
+        Language(code="ru", name="Русский"),
+        Language(code="en", name="English"),
+        Language(code="es", name="Español"),
+    ]
+    db.add_all(languages)
+    db.flush()
+
+    categories = []
+    for i in range(5):
+        category = TaskCategory(slug=f"category-{i}", color="#FFC700")
+        db.add(category)
+        db.flush()
+        db.add(CategoryTranslation(category_id=category.id, language_id=languages[0].id, name=f"Категория {i}"))
+        categories.append(category)
+
+    for i in range(tasks_count):
+        task = Task(category_id=categories[i % len(categories)].id, is_active=True)
+        db.add(task)
+        db.flush()
+        db.add(TaskTranslation(task_id=task.id, language_id=languages[0].id, title=f"Задание {i}", description="Описание"))
+        # Для половины заданий есть перевод на английский, остальные идут через fallback
+        if i % 2 == 0:
+            db.add(TaskTranslation(task_id=task.id, language_id=languages[1].id, title=f"Task {i}", description="Description"))
+        db.add(TaskGenderTarget(task_id=task.id, gender=GenderTarget.ALL))
+
+    user = User(
+        tg_id=1,
+        first_name="Bench",
+        gender=Gender.MALE,
+        language_id=languages[1].id,
+        balance=0,
+    )
+    db.add(user)
+    db.flush()
+    for category in categories:
+        db.add(UserCategory(user_id=user.tg_id, category_id=category.id))
+
+    # Часть заданий уже выполнена - они должны отфильтроваться anti-join'ом
+    for task_id in range(1, tasks_count + 1, 10):
+        db.add(CompletedTask(user_id=user.tg_id, task_id=task_id))
+
+    # Много купленных слотов, чтобы лимит страницы не обрезался до 3 заданий
+    db.add(DailyFreeTask(user_id=user.tg_id, date=date.today(), count=0, paid_available=1000))
+    db.commit()
+    return user.tg_id
+
+
+async def measure(Session, statements: list, user_id: int, repeat: int) -> int:
+    """Замер количества запросов и времени для каждого размера страницы"""
+    print(f"{'limit':>6} {'задач':>6} {'SQL/запрос':>11} {'мс/запрос':>10}")
+
+    query_counts = set()
+    for page_size in PAGE_SIZES:
+        async with Session() as db:
+            user = (await db.execute(
+                select(User).options(selectinload(User.interests)).where(User.tg_id == user_id)
+            )).scalar_one()
+
+            statements.clear()
+            result = await TaskService.get_tasks_for_user(db, user, limit=page_size, offset=0)
+            per_call = len(statements)
+            query_counts.add(per_call)
+
+            started = time.perf_counter()
+            for _ in range(repeat):
+                await TaskService.get_tasks_for_user(db, user, limit=page_size, offset=0)
+            elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+
+        print(f"{page_size:>6} {len(result['tasks']):>6} {per_call:>11} {elapsed_ms:>10.2f}")
+
+    print("-" * 60)
+    if len(query_counts) == 1:
+        print(f"[OK] Количество запросов постоянно: {query_counts.pop()} на страницу")
+        return 0
+    print(f"[ERROR] Количество запросов зависит от размера страницы: {sorted(query_counts)}")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк ленты заданий")
+    parser.add_argument("--tasks", type=int, default=2000, help="Количество заданий в базе")
+    parser.add_argument("--repeat", type=int, default=50, help="Количество повторов на размер страницы")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="sparks-bench-")
+    db_file = os.path.join(tmp_dir, 'bench.db')
+    engine = create_engine(f"sqlite:///{db_file}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user_id = seed(db, args.tasks)
+    db.close()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_file}")
+    Session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    statements = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count_statements(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    print("=" * 60)
+    print(f"Лента заданий: {args.tasks} заданий, {args.repeat} повторов")
+    print("=" * 60)
+    return asyncio.run(measure(Session, statements, user_id, args.repeat))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+Микробенчмарк проверки initData Telegram WebApp (utils/telegram)
+
+Генерирует N подписанных initData (сессии mini-app) и проверяет их
+R раз вперемешку, как приходят запросы сессий, в режимах:
+- "legacy": прежняя реализация - ключ из токена, parse_qs и сортировка
+  полей на каждый вызов
+- "no-cache": текущая проверка без LRU (TELEGRAM_INIT_DATA_CACHE_SIZE=0),
+  ключ вычислен один раз
+- "cache": LRU проверенных initData с пустого кэша
+- "warm": повторный прогон с заполненным LRU
+
+Печатает проверок в секунду и микросекунд на проверку; цель - не меньше
+--target проверок в секунду с LRU.
+
+Затем проверяет корректность: подделанные поля и hash, истекший
+auth_date, смена токена бота, отсутствие токена.
+БД не используется.
+
+Запуск: python scripts/benchmark_telegram_auth.py [--sessions 1000] [--requests 100000]
+"""
+import sys
+import os
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import time
+import urllib.parse
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.config import settings
+from app.utils import telegram
+from app.utils.telegram import VerifiedInitDataCache, verify_telegram_data
+
+BOT_TOKEN = "1234567890:BENCHMARK-token-for-init-data"
+
+
+def sign(fields: dict, bot_token: str = BOT_TOKEN) -> str:
+    """initData с подписью, как ее формирует Telegram"""
+    secret_key = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    data_check_string = "\n".join(f"{key}={fields[key]}" for key in sorted(fields))
+    fields = dict(fields, hash=hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest())
+    return urllib.parse.urlencode(fields)
+
+
+def make_init_data(tg_id: int, auth_date: int) -> str:
+    user = {
+        "id": tg_id,
+        "first_name": f"User {tg_id}",
+        "last_name": "",
+        "username": f"user{tg_id}",
+        "language_code": "ru",
+        "allows_write_to_pm": True,
+    }
+    return sign({
+        "query_id": f"AAH{tg_id:010d}",
+        "user": json.dumps(user, separators=(",", ":")),
+        "auth_date": str(auth_date),
+    })
+
+
+def legacy_verify(init_data: str):
+    """Прежняя verify_telegram_data: все вычисления на каждый вызов"""
+    parsed_data = urllib.parse.parse_qs(init_data)
+    if 'hash' not in parsed_data:
+        return None
+    received_hash = parsed_data['hash'][0]
+    data_check_string = []
+    for key in sorted(parsed_data.keys()):
+        if key != 'hash':
+            data_check_string.append(f"{key}={parsed_data[key][0]}")
+    data_check_string = '\n'.join(data_check_string)
+    secret_key = hmac.new("WebAppData".encode(), settings.TELEGRAM_BOT_TOKEN.encode(), hashlib.sha256).digest()
+    calculated_hash = hmac.new(secret_key, data_check_string.encode(), hashlib.sha256).hexdigest()
+    if calculated_hash != received_hash:
+        return None
+    user_data = json.loads(parsed_data['user'][0])
+    return {'tg_id': user_data.get('id')}
+
+
+def measure(verify, requests: list) -> float:
+    """Проверок в секунду"""
+    started = time.perf_counter()
+    for init_data in requests:
+        if verify(init_data) is None:
+            raise RuntimeError("валидный initData не прошел проверку")
+    return len(requests) / (time.perf_counter() - started)
+
+
+def check_correctness() -> list:
+    problems = []
+    telegram.verified_init_data = VerifiedInitDataCache(max_size=100)
+    now = int(time.time())
+    init_data = make_init_data(42, now)
+
+    data = verify_telegram_data(init_data)
+    if not data or data.get("tg_id") != 42:
+        problems.append(f"валидный initData: {data}")
+    # Повтор из LRU дает те же данные
+    if verify_telegram_data(init_data) != data:
+        problems.append("данные из LRU отличаются от проверенных")
+
+    forged = init_data.replace("user42", "user43")
+    if verify_telegram_data(forged) is not None:
+        problems.append("initData с подмененным полем прошел проверку")
+    bad_hash = init_data[:-1] + ("0" if init_data[-1] != "0" else "1")
+    if verify_telegram_data(bad_hash) is not None:
+        problems.append("initData с неверным hash прошел проверку")
+    if verify_telegram_data(init_data + "&extra=1") is not None:
+        problems.append("initData с добавленным полем прошел проверку")
+
+    expired = make_init_data(42, now - settings.TELEGRAM_INIT_DATA_MAX_AGE - 1)
+    if verify_telegram_data(expired) is not None:
+        problems.append("истекший initData прошел проверку")
+
+    # Запись LRU истекает вместе с auth_date
+    almost = make_init_data(44, now - settings.TELEGRAM_INIT_DATA_MAX_AGE + 1)
+    verify_telegram_data(almost)
+    entry = telegram.verified_init_data._items.get(almost)
+    if entry is None or entry[0] > now + 1:
+        problems.append(f"запись LRU живет дольше auth_date + max_age: {entry}")
+
+    settings.TELEGRAM_BOT_TOKEN = "987654321:another-token"
+    if verify_telegram_data(init_data) is not None:
+        problems.append("после смены токена принят initData, подписанный старым токеном")
+    settings.TELEGRAM_BOT_TOKEN = ""
+    if verify_telegram_data(init_data) is not None:
+        problems.append("без токена бота initData прошел проверку")
+    settings.TELEGRAM_BOT_TOKEN = BOT_TOKEN
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк проверки initData Telegram WebApp")
+    parser.add_argument("--sessions", type=int, default=1000, help="Разных initData (сессий)")
+    parser.add_argument("--requests", type=int, default=100000, help="Проверок на режим")
+    parser.add_argument("--target", type=int, default=10000, help="Цель: проверок в секунду с LRU")
+    args = parser.parse_args()
+
+    settings.TELEGRAM_BOT_TOKEN = BOT_TOKEN
+    now = int(time.time())
+    sessions = [make_init_data(tg_id, now - tg_id % 3600) for tg_id in range(1, args.sessions + 1)]
+    rng = random.Random(42)
+    requests = [rng.choice(sessions) for _ in range(args.requests)]
+
+    print("=" * 60)
+    print(f"Проверка initData: {args.sessions} сессий, {args.requests} проверок")
+    print("=" * 60)
+
+    results = {"legacy": measure(legacy_verify, requests)}
+    telegram.verified_init_data = VerifiedInitDataCache(max_size=0)
+    results["no-cache"] = measure(verify_telegram_data, requests)
+    telegram.verified_init_data = VerifiedInitDataCache(max_size=args.sessions * 2)
+    results["cache"] = measure(verify_telegram_data, requests)
+    results["warm"] = measure(verify_telegram_data, requests)
+
+    print(f"{'режим':>9} {'проверок/с':>12} {'мкс/проверка':>13}")
+    for mode, rate in results.items():
+        print(f"{mode:>9} {rate:>12.0f} {1e6 / rate:>13.2f}")
+    print(f"LRU быстрее legacy: x{results['warm'] / results['legacy']:.1f}")
+
+    print("-" * 60)
+    problems = check_correctness()
+    if results["warm"] < args.target:
+        problems.append(f"с LRU {results['warm']:.0f} проверок/с, цель {args.target}")
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print(f"[OK] Не меньше {args.target} проверок/с, подделка и истекшие initData отклоняются")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""
+Бенчмарк и проверка мониторинга TON платежей на локальном фейковом tonapi
+
+Создает временную базу с pending TON платежами (часть транзакций еще не
+попала в блокчейн и должна остаться pending, часть - lifetime пакеты),
+поднимает fake tonapi с задержкой ответа и долей ответов 503 и прогоняет:
+- "serial": один запрос за раз (как было: платежи проверялись по очереди)
+- "concurrent": параллельные запросы по хешам с настройками из аргументов
+- "race": два монитора одновременно по одним и тем же платежам
+- "account": входящие переводы на кошелек страницами по курсору lt
+- "account-2": повторный проход без новых переводов (один запрос)
+- "acc-race": два монитора account одновременно
+
+После каждого прогона проверяется, что каждый найденный платеж подтвержден
+и зачислен ровно один раз, а ненайденные остались pending. Затем режим
+account без курсора проверяется на старой истории кошелька: уже
+засчитанный перевод и перевод раньше создания платежа не подтверждают
+новые pending платежи, а без pending платежей чтение начинается с
+последней транзакции кошелька. Печатает время
+прохода, подтверждения в минуту, запросы к API, повторы и лаг event loop.
+sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_ton_monitor.py [--payments 200] [--latency 0.1] [--concurrency 10]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import tempfile
+import time
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-bench-")
+_db_path = os.path.join(_tmp_dir, "bench.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import select, update, delete
+from app.core.database import Base, engine, async_engine, SessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.ton_api import TonApiClient
+from app.services.ton_monitor import TonPaymentMonitor
+from fake_tonapi import FakeTonApi
+
+WALLET = "EQ-bench-wallet"
+PACKAGE_AMOUNT = 50
+PACKAGE_NANOTONS = "200000000"
+LIFETIME_NANOTONS = "8000000000"
+
+
+def seed(payments: int, api: FakeTonApi) -> dict:
+    """
+    Пользователи с одним pending платежом каждый
+
+    Returns:
+        {tg_id: "lifetime" | "balance" | "pending"} - ожидаемый результат
+    """
+    db = SessionLocal()
+    language = Language(code="ru", name="Русский")
+    db.add(language)
+    db.flush()
+
+    expected = {}
+    for i in range(1, payments + 1):
+        db.add(User(tg_id=i, first_name=f"User {i}", gender=Gender.MALE, language_id=language.id, balance=0))
+        lifetime = i % 10 == 0
+        tx_hash = f"hash-{i}"
+        ton_amount = LIFETIME_NANOTONS if lifetime else PACKAGE_NANOTONS
+        transaction = Transaction(
+            user_id=i,
+            amount=0 if lifetime else PACKAGE_AMOUNT,
+            transaction_type=TransactionType.PURCHASE,
+            payment_method=PaymentMethod.TON,
+            status=TransactionStatus.PENDING,
+            description=f"Покупка {'lifetime' if lifetime else PACKAGE_AMOUNT} искр (пакет #{4 if lifetime else 1})",
+            ton_to_address=WALLET,
+            ton_amount=ton_amount,
+            ton_transaction_hash=tx_hash,
+            ton_from_address=f"EQ-user-{i}",
+        )
+        db.add(transaction)
+        db.flush()
+        # Каждая пятая транзакция еще не попала в блокчейн
+        if i % 5 == 3:
+            expected[i] = "pending"
+            continue
+        # Часть переводов без комментария - сопоставляются по сумме и отправителю
+        comment = None if i % 7 == 0 else f"Payment for package 1, transaction {transaction.id}"
+        api.add_transaction(tx_hash, WALLET, ton_amount, transaction.ton_from_address, comment)
+        expected[i] = "lifetime" if lifetime else "balance"
+        # Посторонние транзакции кошелька: исходящие и переводы не по платежам
+        if i % 4 == 0:
+            api.add_outgoing(f"out-{i}", WALLET)
+            api.add_transaction(f"tip-{i}", WALLET, "12345", "EQ-stranger", "thanks")
+    db.commit()
+    db.close()
+    return expected
+
+
+def reset() -> None:
+    """Возврат платежей и балансов в исходное состояние"""
+    db = SessionLocal()
+    db.execute(update(Transaction).values(status=TransactionStatus.PENDING))
+    db.execute(update(User).values(balance=0, has_lifetime_subscription=False))
+    db.execute(delete(TonAccountCursor))
+    db.commit()
+    db.close()
+
+
+def verify(expected: dict) -> list:
+    """Проверка зачислений: каждый найденный платеж ровно один раз"""
+    db = SessionLocal()
+    problems = []
+    users = {user.tg_id: user for user in db.query(User)}
+    statuses = {tx.user_id: tx.status for tx in db.query(Transaction)}
+    for tg_id, outcome in expected.items():
+        user = users[tg_id]
+        status = statuses[tg_id]
+        if outcome == "pending":
+            ok = status == TransactionStatus.PENDING and user.balance == 0 and not user.has_lifetime_subscription
+        elif outcome == "lifetime":
+            ok = status == TransactionStatus.COMPLETED and user.balance == 0 and user.has_lifetime_subscription
+        else:
+            ok = status == TransactionStatus.COMPLETED and user.balance == PACKAGE_AMOUNT
+        if not ok:
+            problems.append(f"user {tg_id}: {status}, balance={user.balance}, lifetime={user.has_lifetime_subscription}")
+    db.close()
+    return problems
+
+
+async def run_monitors(monitors: list) -> dict:
+    """Проход мониторов с замером лага event loop"""
+    loop_lags = []
+    done = asyncio.Event()
+
+    async def lag_probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            loop_lags.append(time.perf_counter() - started - 0.01)
+
+    probe = asyncio.create_task(lag_probe())
+    started = time.perf_counter()
+    confirmed = await asyncio.gather(*(monitor.run_once() for monitor in monitors))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await probe
+    return {
+        "seconds": elapsed,
+        "confirmed": sum(confirmed),
+        "lag_max_ms": max(loop_lags, default=0.0) * 1000,
+    }
+
+
+async def check_replay(api: FakeTonApi, monitor: TonPaymentMonitor) -> list:
+    """
+    Повторное чтение истории кошелька (курсора нет) после основных прогонов
+
+    Переводы без комментария (tg_id кратен 7) уже засчитаны; у пользователя
+    7 создается новый такой же платеж - старый перевод с тем же хешем не
+    должен его оплатить. У пользователя 14 хеш засчитанного платежа
+    стирается, а перевод сдвигается на час назад - новый платеж создан
+    позже перевода и тоже должен остаться pending.
+    """
+    db = SessionLocal()
+    db.execute(delete(TonAccountCursor))
+    db.execute(update(Transaction).where(Transaction.user_id == 14).values(ton_transaction_hash=None))
+    api.transactions["hash-14"]["utime"] -= 3600
+    new_ids = []
+    for tg_id in (7, 14):
+        old = db.query(Transaction).filter(Transaction.user_id == tg_id).first()
+        transaction = Transaction(
+            user_id=tg_id,
+            amount=old.amount,
+            transaction_type=TransactionType.PURCHASE,
+            payment_method=PaymentMethod.TON,
+            status=TransactionStatus.PENDING,
+            description=old.description,
+            ton_to_address=WALLET,
+            ton_amount=old.ton_amount,
+            ton_from_address=old.ton_from_address,
+        )
+        db.add(transaction)
+        db.flush()
+        new_ids.append(transaction.id)
+    db.commit()
+
+    problems = []
+    confirmed = await monitor.run_once()
+    statuses = [db.get(Transaction, transaction_id).status for transaction_id in new_ids]
+    if confirmed or any(status != TransactionStatus.PENDING for status in statuses):
+        problems.append(f"старые переводы подтвердили новые платежи: подтверждено {confirmed}, статусы {statuses}")
+
+    # Без pending платежей курсор начинается с последней транзакции кошелька
+    db.execute(delete(Transaction).where(Transaction.id.in_(new_ids)))
+    db.execute(update(Transaction).where(Transaction.status == TransactionStatus.PENDING).values(status=TransactionStatus.FAILED))
+    db.execute(delete(TonAccountCursor))
+    db.commit()
+    await monitor.run_once()
+    last_lt = db.execute(select(TonAccountCursor.last_lt)).scalar()
+    head = api.account_page(WALLET, 0, 1, descending=True)[0]["lt"]
+    if last_lt != head:
+        problems.append(f"без pending платежей курсор {last_lt}, а не последняя транзакция {head}")
+    db.close()
+    await monitor.client.aclose()
+    if not problems:
+        print("[OK] История кошелька: засчитанные и старые переводы не подтверждают новые платежи")
+    return problems
+
+
+async def run(args, api: FakeTonApi, expected: dict) -> int:
+    def make_monitor(mode: str, concurrency: int) -> TonPaymentMonitor:
+        return TonPaymentMonitor(
+            make_client(concurrency),
+            batch_size=args.payments,
+            mode=mode,
+            wallet_address=WALLET,
+            page_size=args.page_size,
+            max_pages=args.payments,
+        )
+
+    def make_client(concurrency: int) -> TonApiClient:
+        return TonApiClient(
+            base_url=api.base_url,
+            max_concurrency=concurrency,
+            rate_limit=args.rate,
+            max_retries=args.retries,
+            retry_backoff=0.05,
+        )
+
+    found = sum(1 for outcome in expected.values() if outcome != "pending")
+    # (название, режим монитора, параллельность мониторов, сброс перед прогоном, ожидаемо подтверждений)
+    modes = [
+        ("serial", "hash", [1], True, found),
+        ("concurrent", "hash", [args.concurrency], True, found),
+        ("race", "hash", [args.concurrency, args.concurrency], True, found),
+        ("account", "account", [args.concurrency], True, found),
+        ("account-2", "account", [args.concurrency], False, 0),
+        ("acc-race", "account", [args.concurrency, args.concurrency], True, found),
+    ]
+
+    print("=" * 60)
+    print(
+        f"TON мониторинг: {args.payments} платежей ({found} в блокчейне), задержка API "
+        f"{args.latency * 1000:.0f} мс, ошибки 503 {args.error_rate:.0%}"
+    )
+    print("=" * 60)
+    print(f"{'режим':>10} {'сек':>7} {'подтв.':>7} {'подтв./мин':>11} {'запросов':>9} {'повторов':>9} {'max парал.':>11} {'лаг мс':>7}")
+
+    failures = 0
+    results = {}
+    for name, mode, concurrencies, need_reset, expect_confirmed in modes:
+        if need_reset:
+            reset()
+        api.max_in_flight = 0
+        monitors = [make_monitor(mode, concurrency) for concurrency in concurrencies]
+        clients = [monitor.client for monitor in monitors]
+        result = await run_monitors(monitors)
+        for client in clients:
+            await client.aclose()
+        results[name] = result
+
+        per_minute = result["confirmed"] / result["seconds"] * 60 if result["seconds"] else 0.0
+        print(
+            f"{name:>10} {result['seconds']:>7.2f} {result['confirmed']:>7} {per_minute:>11.0f} "
+            f"{sum(c.requests for c in clients):>9} {sum(c.retries for c in clients):>9} "
+            f"{api.max_in_flight:>11} {result['lag_max_ms']:>7.1f}"
+        )
+
+        problems = verify(expected)
+        if result["confirmed"] != expect_confirmed:
+            problems.append(f"подтверждено {result['confirmed']}, ожидалось {expect_confirmed}")
+        if problems:
+            failures += 1
+            print(f"[ERROR] {name}: {len(problems)} расхождений, например: {problems[0]}")
+        metrics = monitors[0].metrics.snapshot()
+        if metrics["errors"]:
+            print(f"[ERROR] {name}: ошибок мониторинга {metrics['errors']}")
+            failures += 1
+
+    replay_problems = await check_replay(api, make_monitor("account", args.concurrency))
+    for problem in replay_problems:
+        print(f"[ERROR] история кошелька: {problem}")
+    failures += len(replay_problems)
+
+    await async_engine.dispose()
+
+    print("-" * 60)
+    print(f"concurrent/serial по времени прохода: x{results['serial']['seconds'] / results['concurrent']['seconds']:.2f}")
+    print(f"account/serial по времени прохода: x{results['serial']['seconds'] / results['account']['seconds']:.2f}")
+    print(f"Метрики последнего монитора: {monitors[0].metrics.snapshot()}")
+    if failures:
+        return 1
+    print("[OK] Каждый найденный платеж зачислен ровно один раз, остальные остались pending")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк мониторинга TON платежей")
+    parser.add_argument("--payments", type=int, default=200, help="Количество pending платежей")
+    parser.add_argument("--latency", type=float, default=0.1, help="Задержка ответа fake tonapi (сек)")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Доля ответов 503")
+    parser.add_argument("--concurrency", type=int, default=10, help="Одновременных запросов в режиме concurrent")
+    parser.add_argument("--rate", type=float, default=0.0, help="Запросов в секунду на хост (0 - без ограничения)")
+    parser.add_argument("--retries", type=int, default=5, help="Повторов при 503")
+    parser.add_argument("--page-size", type=int, default=100, help="Транзакций кошелька на страницу (режим account)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    api = FakeTonApi(latency=args.latency, error_rate=args.error_rate).start()
+    try:
+        expected = seed(args.payments, api)
+        return asyncio.run(run(args, api, expected))
+    finally:
+        api.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Бенчмарк перевода заданий (TranslationService.translate_task) на локальном
+переводчике-заглушке с задержкой сети вместо MyMemory/Google
+
+Создает временную базу с заданиями на русском и прогоняет перевод на
+1..N языков тремя способами:
+- "прежний": языки по очереди, название и описание - отдельными запросами
+  (как было; без прежних пауз 0.3 с между запросами);
+- "пакетный": языки по очереди, название и описание - одним запросом;
+- "параллельный": пакетный, языки одновременно (--concurrency потоков).
+После каждого прогона проверяется, что у каждого задания есть перевод на
+каждый язык с правильным названием и описанием. Затем прогон с
+ограничением частоты запросов провайдера (--rate) проверяет, что
+параллельные потоки не превышают лимит. Память переводов выключена -
+ее эффект проверяет scripts/check_translation_memory.py.
+sparks.db не затрагивается.
+
+Запуск: python scripts/benchmark_translation.py [--tasks 5] [--latency 0.1] [--concurrency 3] [--rate 20]
+"""
+import sys
+import os
+import argparse
+import contextlib
+import tempfile
+import threading
+import time
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-bench-")
+_db_path = os.path.join(_tmp_dir, "bench.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.config import settings
+from app.core.database import Base, engine, SessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.translation_service import TranslationService
+
+LANGUAGES = [("en", "English"), ("es", "Español"), ("de", "Deutsch"), ("fr", "Français"), ("it", "Italiano")]
+
+
+class StubTranslator:
+    """Локальный переводчик с задержкой сети, запоминает время вызовов"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.started = []
+
+    def translate(self, text, source, target):
+        with self.lock:
+            self.started.append(time.perf_counter())
+        time.sleep(self.latency)
+        return "\n".join(f"[{target}] {line}" if line.strip() != "|||" else line for line in text.split("\n"))
+
+
+def create_service(stub: StubTranslator, concurrency: int, provider: str = "stub", rate: float = 0) -> TranslationService:
+    service = TranslationService()
+    service.translators = [{
+        "name": "Stub",
+        "translator": stub,
+        "priority": 1,
+        "provider": provider,
+        "max_length": 500,
+        "rate_limit": rate,
+    }]
+    service.language_concurrency = concurrency
+    # Замеряются запросы к переводчику: повторные прогоны не должны брать переводы из памяти
+    service.memory = None
+    return service
+
+
+def seed(tasks: int) -> list:
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(Language(code="ru", name="Русский", is_active=True))
+    for code, name in LANGUAGES:
+        db.add(Language(code=code, name=name, is_active=True))
+    category = TaskCategory(slug="bench", color="#FF0000", is_active=True)
+    db.add(category)
+    db.flush()
+    ids = []
+    for i in range(tasks):
+        task = Task(category_id=category.id, is_active=True)
+        db.add(task)
+        db.flush()
+        db.add(TaskTranslation(
+            task_id=task.id,
+            language_id=1,
+            title=f"Задание {i}",
+            description=f"Описание задания {i}: сделайте что-нибудь приятное"
+        ))
+        ids.append(task.id)
+    db.commit()
+    db.close()
+    return ids
+
+
+def legacy_translate_task(service: TranslationService, db, task_id: int, codes: list) -> None:
+    """Прежний translate_task: языки по очереди, название и описание отдельно"""
+    source = db.query(TaskTranslation).filter(TaskTranslation.task_id == task_id, TaskTranslation.language_id == 1).one()
+    for language in db.query(Language).filter(Language.code.in_(codes)).all():
+        title = service.translate_text(source.title, "ru", language.code)
+        description = service.translate_text(source.description, "ru", language.code)
+        db.add(TaskTranslation(task_id=task_id, language_id=language.id, title=title, description=description))
+    db.commit()
+
+
+def run(mode: str, task_ids: list, codes: list, args, provider: str = "stub", rate: float = 0):
+    """Перевод всех заданий на codes; возвращает (секунды, заглушка, ошибки проверки)"""
+    db = SessionLocal()
+    db.query(TaskTranslation).filter(TaskTranslation.language_id != 1).delete()
+    db.commit()
+    stub = StubTranslator(args.latency)
+    service = create_service(stub, 1 if mode != "parallel" else args.concurrency, provider, rate)
+    started = time.perf_counter()
+    # Логи TranslationService не нужны в отчете
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for task_id in task_ids:
+            if mode == "legacy":
+                legacy_translate_task(service, db, task_id, codes)
+            else:
+                service.translate_task(db, task_id, source_lang="ru", fallback=False, target_langs=codes)
+    seconds = time.perf_counter() - started
+
+    problems = []
+    languages = {language.id: language.code for language in db.query(Language)}
+    translations = db.query(TaskTranslation).filter(TaskTranslation.language_id != 1).all()
+    if len(translations) != len(task_ids) * len(codes):
+        problems.append(f"{mode}, {len(codes)} яз.: {len(translations)} переводов вместо {len(task_ids) * len(codes)}")
+    for translation in translations:
+        code = languages[translation.language_id]
+        if not translation.title.startswith(f"[{code}] Задание") or not translation.description.startswith(f"[{code}] Описание"):
+            problems.append(f"{mode}: неверный перевод задания {translation.task_id} на {code}: {translation.title!r}")
+            break
+    db.close()
+    return seconds, stub, problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк перевода заданий")
+    parser.add_argument("--tasks", type=int, default=5, help="Заданий")
+    parser.add_argument("--latency", type=float, default=0.1, help="Задержка переводчика (сек)")
+    parser.add_argument("--concurrency", type=int, default=settings.TRANSLATION_LANGUAGE_CONCURRENCY, help="Языков одновременно")
+    parser.add_argument("--rate", type=float, default=20.0, help="Лимит запросов в секунду для проверки ограничения")
+    args = parser.parse_args()
+
+    task_ids = seed(args.tasks)
+    problems = []
+
+    print("=" * 60)
+    print(f"Перевод {args.tasks} заданий, переводчик-заглушка {args.latency * 1000:.0f} мс, потоков {args.concurrency}")
+    print("=" * 60)
+    print(f"{'языков':>6} {'прежний':>9} {'пакетный':>9} {'параллельный':>13} {'запросов':>12}")
+    timings = {}
+    for count in range(1, len(LANGUAGES) + 1):
+        codes = [code for code, _ in LANGUAGES[:count]]
+        row = {}
+        calls = []
+        for mode in ("legacy", "batch", "parallel"):
+            seconds, stub, mode_problems = run(mode, task_ids, codes, args)
+            row[mode] = seconds
+            calls.append(len(stub.started))
+            problems += mode_problems
+        timings[count] = row
+        print(f"{count:>6} {row['legacy']:>7.2f} с {row['batch']:>7.2f} с {row['parallel']:>11.2f} с {calls[0]:>5} -> {calls[2]:<5}")
+    print("-" * 60)
+
+    # Параллельный перевод растет ступенями по concurrency языков, а не линейно
+    most = len(LANGUAGES)
+    expected = args.tasks * args.latency * -(-most // args.concurrency)
+    if timings[most]["parallel"] > expected * 1.5 + 0.5:
+        problems.append(f"{most} языков параллельно: {timings[most]['parallel']:.2f} с, ожидалось около {expected:.2f} с")
+    else:
+        print(
+            f"[OK] {most} языков: {timings[most]['parallel']:.2f} с вместо {timings[most]['legacy']:.2f} с "
+            f"(в {timings[most]['legacy'] / timings[most]['parallel']:.1f} раза быстрее)"
+        )
+
+    # Ограничение частоты запросов провайдера при параллельном переводе
+    codes = [code for code, _ in LANGUAGES]
+    seconds, stub, mode_problems = run("parallel", task_ids, codes, args, provider="stub-limited", rate=args.rate)
+    problems += mode_problems
+    gaps = [b - a for a, b in zip(stub.started, stub.started[1:])]
+    observed = (len(stub.started) - 1) / (stub.started[-1] - stub.started[0])
+    if min(gaps) < 1 / args.rate * 0.9:
+        problems.append(f"запросы чаще лимита {args.rate}/с: минимальный интервал {min(gaps) * 1000:.1f} мс")
+    else:
+        print(
+            f"[OK] Лимит {args.rate:.0f} запросов/с соблюден: {observed:.1f} запросов/с, "
+            f"интервал не меньше {min(gaps) * 1000:.1f} мс ({seconds:.2f} с)"
+        )
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
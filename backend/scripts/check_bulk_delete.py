@@ -0,0 +1,210 @@
+"""
+Проверка удаления пользователей пачками (app/utils/bulk_delete.py)
+
+Создает временную базу generate_bulk_data.py и проверяет:
+  1. удаление одного пользователя затрагивает только его строки;
+  2. delete_all_users.py, прерванный посреди удаления, оставляет базу
+     целостной (integrity_check, foreign_key_check), а повторный запуск
+     удаляет остальное;
+  3. во время удаления другой процесс пишет в базу без ожидания
+     блокировки дольше MAX_WRITE_WAIT_MS - в отличие от прежнего одного
+     DELETE на таблицу в одной транзакции (замеряется для сравнения).
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_bulk_delete.py [--users 20000]
+"""
+import sys
+import os
+import argparse
+import shutil
+import signal
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+USER_TABLES = ["completed_tasks", "daily_free_tasks", "daily_bonuses", "daily_bonus_streaks", "transactions", "user_categories"]
+MAX_WRITE_WAIT_MS = 500
+
+
+def counts(path: str) -> dict:
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0] for table in USER_TABLES + ["users"]}
+    finally:
+        conn.close()
+
+
+def run_script(path: str, *args, interrupt_after: float = None) -> subprocess.CompletedProcess:
+    """Запуск скрипта удаления на базе path; interrupt_after - SIGINT через столько секунд"""
+    env = dict(os.environ, DATABASE_PATH=path, PYTHONUNBUFFERED="1")
+    command = [sys.executable, *args]
+    if interrupt_after is None:
+        return subprocess.run(command, env=env, capture_output=True, text=True)
+    process = subprocess.Popen(command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    time.sleep(interrupt_after)
+    process.send_signal(signal.SIGINT)
+    stdout, _ = process.communicate()
+    return subprocess.CompletedProcess(command, process.returncode, stdout, "")
+
+
+class Writer(threading.Thread):
+    """Другой писатель: короткие транзакции записи в цикле, замер ожидания блокировки"""
+
+    def __init__(self, path: str):
+        super().__init__(daemon=True)
+        self.path = path
+        self.stop = threading.Event()
+        self.waits = []
+        self.errors = []
+
+    def run(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+        while not self.stop.is_set():
+            started = time.perf_counter()
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("UPDATE catalog_version SET version = version WHERE id = 1")
+                conn.execute("COMMIT")
+            except sqlite3.OperationalError as e:
+                self.errors.append(str(e))
+            self.waits.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.005)
+        conn.close()
+
+
+def with_writer(path: str, action) -> Writer:
+    writer = Writer(path)
+    writer.start()
+    time.sleep(0.1)
+    try:
+        action()
+    finally:
+        writer.stop.set()
+        writer.join()
+    return writer
+
+
+def legacy_delete(path: str) -> None:
+    """Прежний способ: один DELETE на таблицу, одна транзакция"""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    for table in USER_TABLES + ["users"]:
+        conn.execute(f"DELETE FROM {table}")
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка удаления пользователей пачками")
+    parser.add_argument("--users", type=int, default=20000, help="Пользователей во временной базе")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix="sparks-delete-")
+    base = os.path.join(tmp_dir, "base.db")
+    problems = []
+
+    print("=" * 60)
+    print(f"Удаление пользователей пачками: {args.users:,} пользователей")
+    print("=" * 60)
+    try:
+        generated = subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS_DIR, "generate_bulk_data.py"),
+             "--database", base, "--users", str(args.users)],
+            capture_output=True, text=True,
+        )
+        if generated.returncode != 0:
+            print(generated.stdout + generated.stderr)
+            print("[ERROR] Не удалось создать временную базу")
+            return 1
+        conn = sqlite3.connect(base)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.close()
+        before = counts(base)
+        print(f"Строк: {sum(before.values()):,} ({', '.join(f'{t} {n:,}' for t, n in before.items())})")
+        print("-" * 60)
+
+        # 1. Один пользователь
+        path = os.path.join(tmp_dir, "user.db")
+        shutil.copy(base, path)
+        conn = sqlite3.connect(path)
+        tg_id = conn.execute(
+            "SELECT user_id FROM completed_tasks GROUP BY user_id ORDER BY count(*) DESC LIMIT 1"
+        ).fetchone()[0]
+        own = {t: conn.execute(f"SELECT count(*) FROM {t} WHERE user_id = ?", (tg_id,)).fetchone()[0] for t in USER_TABLES}
+        version = conn.execute("SELECT version FROM user_cache_version WHERE id = 1").fetchone()[0]
+        conn.close()
+        result = run_script(path, os.path.join(SCRIPTS_DIR, "delete_user.py"), str(tg_id), "--batch", "500")
+        after = counts(path)
+        expected = {t: before[t] - own[t] for t in USER_TABLES}
+        expected["users"] = before["users"] - 1
+        conn = sqlite3.connect(path)
+        new_version = conn.execute("SELECT version FROM user_cache_version WHERE id = 1").fetchone()[0]
+        conn.close()
+        if result.returncode != 0 or after != expected:
+            problems.append(f"delete_user.py: exit {result.returncode}, осталось {after}, ожидалось {expected}")
+        elif new_version != version + 1:
+            problems.append("delete_user.py не увеличил версию user_cache_version")
+        else:
+            print(f"[OK] delete_user.py удалил пользователя {tg_id} и {sum(own.values()):,} его строк, остальные на месте")
+
+        # 2. Прерывание и продолжение
+        path = os.path.join(tmp_dir, "resume.db")
+        shutil.copy(base, path)
+        delete_all = os.path.join(SCRIPTS_DIR, "delete_all_users.py")
+        result = run_script(path, delete_all, "--confirm", "--batch", "1000", "--max-lock-ms", "5", interrupt_after=2.0)
+        middle = counts(path)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA foreign_keys=ON")
+        integrity = conn.execute("PRAGMA integrity_check").fetchone()[0]
+        orphans = conn.execute("PRAGMA foreign_key_check").fetchall()
+        conn.close()
+        remaining = sum(middle.values())
+        if result.returncode == 0 or "Прервано" not in result.stdout:
+            problems.append(f"delete_all_users.py не прерван (exit {result.returncode}), увеличьте --users")
+        elif not 0 < remaining < sum(before.values()):
+            problems.append(f"после прерывания осталось {remaining:,} строк из {sum(before.values()):,}")
+        elif integrity != "ok" or orphans:
+            problems.append(f"после прерывания: integrity_check={integrity}, строк без пользователя {len(orphans)}")
+        else:
+            print(f"[OK] Прервано на {remaining:,} оставшихся строках, база целостна")
+
+        results = []
+        writer = with_writer(path, lambda: results.append(run_script(path, delete_all, "--confirm")))
+        final = counts(path)
+        if results[0].returncode != 0 or any(final.values()):
+            problems.append(f"повторный запуск: exit {results[0].returncode}, осталось {final}")
+        else:
+            print(f"[OK] Повторный запуск удалил оставшиеся {remaining:,} строк")
+        for line in results[0].stdout.splitlines():
+            if "Всего" in line:
+                print(f"    {line.strip()}")
+
+        # 3. Ожидание блокировки другим писателем
+        path = os.path.join(tmp_dir, "legacy.db")
+        shutil.copy(base, path)
+        legacy = with_writer(path, lambda: legacy_delete(path))
+        print("-" * 60)
+        print(f"{'удаление':<22} {'записей':>8} {'ожидание p50':>13} {'макс':>9}")
+        for name, w in (("пачками", writer), ("один DELETE (прежнее)", legacy)):
+            waits = sorted(w.waits)
+            print(f"{name:<22} {len(waits):>8} {waits[len(waits) // 2]:>10.1f} мс {waits[-1]:>6.0f} мс")
+        print("-" * 60)
+        if writer.errors:
+            problems.append(f"ошибки писателя во время удаления пачками: {writer.errors[:3]}")
+        elif max(writer.waits) > MAX_WRITE_WAIT_MS:
+            problems.append(f"писатель ждал блокировку {max(writer.waits):.0f} мс (> {MAX_WRITE_WAIT_MS} мс)")
+        else:
+            print(f"[OK] Во время удаления пачками запись ждет не дольше {max(writer.waits):.0f} мс")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
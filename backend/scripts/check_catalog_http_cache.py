@@ -0,0 +1,163 @@
+"""
+Проверка HTTP кэширования справочников (ETag / If-None-Match / 304)
+
+Создает временную базу со справочниками и вызывает GET /categories,
+/languages и /payments/packages:
+- ответ 200 содержит ETag и Cache-Control, повтор с If-None-Match
+  (сильным и слабым W/, как после gzip в nginx) - 304 без тела
+- у категорий на разных языках разные ETag; без language_code ответ private
+- после изменения справочников (увеличение catalog_version, как делает
+  Django админка) ETag меняется и старый If-None-Match получает 200
+Затем замеряет время ответа: прежний путь (модель ответа и сериализация
+на каждый запрос), готовое тело и 304.
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_catalog_http_cache.py [--requests 5000]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-check-")
+_db_path = os.path.join(_tmp_dir, "check.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import update
+from app.core.database import Base, engine, async_engine, SessionLocal, AsyncSessionLocal
+from app.models import *  # Импортируем все модели
+from app.schemas.category import CategoryListResponse, CategoryResponse
+from app.services.catalog_cache import catalog_cache
+from app.api.v1 import categories as categories_api, languages as languages_api, payments as payments_api
+
+
+def seed() -> None:
+    db = SessionLocal()
+    languages = [Language(code="ru", name="Русский"), Language(code="en", name="English")]
+    db.add_all(languages)
+    db.flush()
+    for i in range(12):
+        category = TaskCategory(slug=f"category-{i}", color="#FFC700")
+        db.add(category)
+        db.flush()
+        for language in languages:
+            db.add(CategoryTranslation(category_id=category.id, language_id=language.id, name=f"{language.code} {i}"))
+    db.add(CatalogVersion(id=1, version=1))
+    db.commit()
+    db.close()
+
+
+async def categories(db, if_none_match=None, language_code="en"):
+    return await categories_api.get_categories(
+        language_code=language_code, if_none_match=if_none_match, user=None, db=db
+    )
+
+
+async def legacy_categories(db):
+    """Прежний путь: модель ответа и сериализация на каждый запрос"""
+    language = await catalog_cache.language_by_code(db, "en")
+    result = [
+        CategoryResponse(id=c.id, slug=c.slug, name=c.name, color=c.color, is_active=c.is_active)
+        for c in await catalog_cache.active_categories(db, language.id)
+    ]
+    return json.dumps(jsonable_encoder(CategoryListResponse(categories=result))).encode()
+
+
+async def check(db) -> list:
+    problems = []
+    endpoints = {
+        "categories": lambda inm: categories(db, inm),
+        "languages": lambda inm: languages_api.get_languages(if_none_match=inm, db=db),
+        "packages": lambda inm: payments_api.get_packages(if_none_match=inm, db=db),
+    }
+    etags = {}
+    for name, call in endpoints.items():
+        response = await call(None)
+        etag = response.headers.get("etag")
+        etags[name] = etag
+        if response.status_code != 200 or not etag or "cache-control" not in response.headers:
+            problems.append(f"{name}: {response.status_code}, ETag {etag}")
+            continue
+        json.loads(response.body)
+        for if_none_match in (etag, f"W/{etag}", f'"other", W/{etag}', "*"):
+            cached = await call(if_none_match)
+            if cached.status_code != 304 or cached.body or cached.headers.get("etag") != etag:
+                problems.append(f"{name}: If-None-Match {if_none_match} -> {cached.status_code}")
+        stale = await call('"v0-stale"')
+        if stale.status_code != 200:
+            problems.append(f"{name}: чужой ETag -> {stale.status_code}")
+
+    ru = await categories(db, language_code="ru")
+    if ru.headers["etag"] == etags["categories"]:
+        problems.append("categories: одинаковый ETag для разных языков")
+    personal = await categories(db, language_code=None)
+    if not personal.headers["cache-control"].startswith("private"):
+        problems.append(f"categories без language_code: {personal.headers['cache-control']}")
+
+    # Изменение справочников в админке: версия в БД увеличивается
+    await db.execute(update(CatalogVersion).values(version=CatalogVersion.version + 1))
+    await db.commit()
+    catalog_cache._checked_at = 0.0  # не ждем CATALOG_CACHE_CHECK_INTERVAL
+    for name, call in endpoints.items():
+        response = await call(etags[name])
+        if response.status_code != 200 or response.headers.get("etag") == etags[name]:
+            problems.append(f"{name}: после изменения справочников {response.status_code}, ETag не сменился")
+    return problems
+
+
+async def measure(db, requests: int) -> None:
+    etag = (await categories(db)).headers["etag"]
+    modes = {
+        "прежний путь": lambda: legacy_categories(db),
+        "готовое тело": lambda: categories(db),
+        "304": lambda: categories(db, etag),
+    }
+    print(f"{'категории':>14} {'мкс/запрос':>11}")
+    for mode, call in modes.items():
+        started = time.perf_counter()
+        for _ in range(requests):
+            await call()
+        print(f"{mode:>14} {(time.perf_counter() - started) / requests * 1e6:>11.1f}")
+
+
+async def run(args) -> int:
+    async with AsyncSessionLocal() as db:
+        problems = await check(db)
+        await measure(db, args.requests)
+    await async_engine.dispose()
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print("[OK] ETag, 304 и сброс после изменения справочников работают")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка HTTP кэширования справочников")
+    parser.add_argument("--requests", type=int, default=5000, help="Запросов на замер")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    seed()
+
+    print("=" * 60)
+    print("HTTP кэширование справочников")
+    print("=" * 60)
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Проверка серии ежедневных бонусов (таблица daily_bonus_streaks)
+
+Создает временную базу на ревизии до daily_bonus_streaks, заполняет
+историю бонусов (серия до вчера, бонус сегодня, пропуск, год ежедневных
+бонусов, без бонусов) и применяет миграцию:
+- backfill создает серию каждого пользователя из последнего бонуса
+- статус по серии совпадает с прежним расчетом по истории daily_bonuses
+  и стоит один SQL запрос независимо от длины истории
+- последовательные получения по дням дают дни 1..7, затем снова 1;
+  после пропуска серия начинается с 1, повтор в тот же день - 400
+- параллельные запросы получения за один день начисляют бонус один раз
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_daily_bonus_streak.py [--parallel 20] [--repeat 500]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import sqlite3
+import tempfile
+import time
+from datetime import timedelta
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-check-")
+_db_path = os.path.join(_tmp_dir, "check.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from alembic import command
+from alembic.config import Config
+from fastapi import HTTPException
+from sqlalchemy import event, select, func
+from app.core.database import async_engine, AsyncSessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.user_cache import user_cache
+from app.api.v1 import daily_bonus as daily_bonus_api
+
+TODAY = daily_bonus_api.get_moscow_date()
+PRE_STREAK_REVISION = "d2f6b8a0c4e7"
+
+# Пользователь -> история бонусов: список (дней назад, номер дня)
+HISTORIES = {
+    1: [(3, 1), (2, 2), (1, 3)],                   # серия до вчера
+    2: [(1, 6), (0, 7)],                           # 7-й день получен сегодня
+    3: [(5, 1), (4, 2)],                           # пропуск - серия сначала
+    4: [],                                         # без бонусов
+    5: [(365 - i, i % 7 + 1) for i in range(365)], # год ежедневных бонусов до вчера
+    6: [(1, 7)],                                   # после 7-го дня - снова 1
+}
+CLAIM_USER = 10
+PARALLEL_USER = 11
+
+
+def alembic_upgrade(revision: str) -> None:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    command.upgrade(config, revision)
+
+
+def seed() -> None:
+    """Пользователи и история бонусов (напрямую через sqlite3)"""
+    conn = sqlite3.connect(_db_path)
+    conn.execute("INSERT INTO languages (id, code, name, is_active) VALUES (1, 'ru', 'Русский', 1)")
+    for user_id in list(HISTORIES) + [CLAIM_USER, PARALLEL_USER]:
+        conn.execute(
+            "INSERT INTO users (tg_id, first_name, gender, language_id, is_admin, balance, is_active, has_lifetime_subscription) "
+            "VALUES (?, 'Check', 'MALE', 1, 0, 0, 1, 0)",
+            (user_id,)
+        )
+    for user_id, history in HISTORIES.items():
+        conn.executemany(
+            "INSERT INTO daily_bonuses (user_id, day_number, bonus_amount, date) VALUES (?, ?, 10, ?)",
+            ((user_id, day_number, (TODAY - timedelta(days=days_ago)).isoformat()) for days_ago, day_number in history)
+        )
+    conn.commit()
+    conn.close()
+
+
+async def legacy_status(db, user_id: int, today) -> tuple:
+    """Прежний расчет статуса: бонус за сегодня, последний бонус и вся история"""
+    today_bonus = (await db.execute(
+        select(DailyBonus).where(DailyBonus.user_id == user_id, DailyBonus.date == today)
+    )).scalars().first()
+    all_bonuses = (await db.execute(
+        select(DailyBonus).where(DailyBonus.user_id == user_id).order_by(DailyBonus.date.desc())
+    )).scalars().all()
+    last = all_bonuses[0] if all_bonuses else None
+    yesterday = today - timedelta(days=1)
+    if last and last.date == yesterday:
+        day_number = last.day_number + 1 if last.day_number < 7 else 1
+        claimed_days = list(range(1, day_number))
+    elif last and last.date == today:
+        day_number = last.day_number
+        claimed_days = list(range(1, day_number + 1))
+    else:
+        day_number, claimed_days = 1, []
+    return day_number, daily_bonus_api.BONUS_AMOUNTS[day_number], today_bonus is not None, claimed_days
+
+
+async def status(db, user_id: int) -> tuple:
+    user = await user_cache.get_by_tg_id(db, user_id)
+    result = await daily_bonus_api.get_bonus_status(db, user)
+    return result.day_number, result.bonus_amount, result.is_claimed, result.claimed_days
+
+
+async def claim(user_id: int):
+    """Получение бонуса в отдельной сессии (как отдельный HTTP запрос)"""
+    async with AsyncSessionLocal() as db:
+        user = await user_cache.get_by_tg_id(db, user_id)
+        try:
+            return (await daily_bonus_api.claim_daily_bonus(user=user, db=db)).day_number
+        except HTTPException as e:
+            return e.status_code
+
+
+def set_today(day) -> None:
+    daily_bonus_api.get_moscow_date = lambda: day
+
+
+async def check_backfill(db) -> list:
+    problems = []
+    for user_id, history in HISTORIES.items():
+        streak = await daily_bonus_api.get_streak(db, user_id)
+        expected = None
+        if history:
+            days_ago, day_number = min(history)
+            expected = (day_number, TODAY - timedelta(days=days_ago))
+        if (tuple(streak) if streak else None) != expected:
+            problems.append(f"backfill пользователя {user_id}: {streak}, ожидалось {expected}")
+    return problems
+
+
+async def check_status(db, queries: list) -> list:
+    problems = []
+    for user_id in HISTORIES:
+        user = await user_cache.get_by_tg_id(db, user_id)
+        queries.clear()
+        result = await daily_bonus_api.get_bonus_status(db, user)
+        status_queries = len(queries)
+        actual = (result.day_number, result.bonus_amount, result.is_claimed, result.claimed_days)
+        expected = await legacy_status(db, user_id, TODAY)
+        if actual != expected:
+            problems.append(f"статус пользователя {user_id}: {actual}, прежде {expected}")
+        if status_queries > 1:
+            problems.append(f"статус пользователя {user_id}: {status_queries} SQL запросов")
+    return problems
+
+
+async def check_claims() -> list:
+    """Получение бонуса 12 дней подряд, пропуск дня и повтор в тот же день"""
+    problems = []
+    start = TODAY - timedelta(days=20)
+    days = [start + timedelta(days=i) for i in range(12)] + [start + timedelta(days=13)]
+    expected = [1, 2, 3, 4, 5, 6, 7, 1, 2, 3, 4, 5, 1]
+    actual = []
+    for day in days:
+        set_today(day)
+        async with AsyncSessionLocal() as db:
+            before = await status(db, CLAIM_USER)
+        day_number = await claim(CLAIM_USER)
+        actual.append(day_number)
+        if before[0] != day_number:
+            problems.append(f"{day}: статус обещал день {before[0]}, получен {day_number}")
+        async with AsyncSessionLocal() as db:
+            after = await status(db, CLAIM_USER)
+            legacy = await legacy_status(db, CLAIM_USER, day)
+        if after != legacy:
+            problems.append(f"{day}: статус после получения {after}, прежде {legacy}")
+    if actual != expected:
+        problems.append(f"дни серии {actual}, ожидалось {expected}")
+    repeated = await claim(CLAIM_USER)
+    if repeated != 400:
+        problems.append(f"повторное получение в тот же день: {repeated}")
+    set_today(TODAY)
+    return problems
+
+
+async def check_parallel(parallel: int) -> list:
+    results = await asyncio.gather(*(claim(PARALLEL_USER) for _ in range(parallel)))
+    async with AsyncSessionLocal() as db:
+        bonuses = (await db.execute(
+            select(func.count()).select_from(DailyBonus).where(DailyBonus.user_id == PARALLEL_USER)
+        )).scalar()
+        balance = (await db.execute(select(User.balance).where(User.tg_id == PARALLEL_USER))).scalar()
+    if sorted(results) != [1] + [400] * (parallel - 1) or bonuses != 1 or balance != daily_bonus_api.BONUS_AMOUNTS[1]:
+        return [f"{parallel} параллельных получений: ответы {sorted(set(results))}, бонусов {bonuses}, баланс {balance}"]
+    return []
+
+
+async def measure(db, repeat: int) -> None:
+    """Время статуса пользователя с годом истории"""
+    user_id = 5
+    user = await user_cache.get_by_tg_id(db, user_id)
+    modes = {
+        "история": lambda: legacy_status(db, user_id, TODAY),
+        "серия": lambda: daily_bonus_api.get_bonus_status(db, user),
+    }
+    print(f"{'статус (365 бонусов)':>22} {'мкс/запрос':>11}")
+    for mode, call in modes.items():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await call()
+        print(f"{mode:>22} {(time.perf_counter() - started) / repeat * 1e6:>11.1f}")
+
+
+async def run(args, queries: list) -> int:
+    problems = []
+    async with AsyncSessionLocal() as db:
+        problems += await check_backfill(db)
+        problems += await check_status(db, queries)
+        await measure(db, args.repeat)
+    problems += await check_claims()
+    problems += await check_parallel(args.parallel)
+    await async_engine.dispose()
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print("[OK] Серия бонусов совпадает с историей, статус - один запрос")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка серии ежедневных бонусов")
+    parser.add_argument("--parallel", type=int, default=20, help="Параллельных запросов получения")
+    parser.add_argument("--repeat", type=int, default=500, help="Запросов на замер статуса")
+    args = parser.parse_args()
+
+    alembic_upgrade(PRE_STREAK_REVISION)
+    seed()
+    alembic_upgrade("head")
+
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+
+    print("=" * 60)
+    print("Серия ежедневных бонусов")
+    print("=" * 60)
+    return asyncio.run(run(args, queries))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
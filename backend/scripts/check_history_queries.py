@@ -0,0 +1,167 @@
+"""
+Проверка количества SQL запросов истории выполненных заданий
+
+Создает временную базу (задания с переводом, с fallback на русский и
+без перевода, категории с переводом и без) и вызывает GET /profile/history
+с пустым кэшем справочников для страниц разного размера, по offset и
+по курсору. Количество запросов на страницу должно быть постоянным
+(один SELECT), а ответ - совпадать с прежней сборкой по строкам через
+кэш справочников (catalog_cache.task / catalog_cache.category).
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_history_queries.py [--tasks 300]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import tempfile
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-check-")
+_db_path = os.path.join(_tmp_dir, "check.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from fastapi import Response
+from sqlalchemy import event, select
+from app.core.database import Base, engine, async_engine, SessionLocal, AsyncSessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.catalog_cache import catalog_cache
+from app.services.user_cache import user_cache
+from app.api.v1 import profile as profile_api
+
+PAGE_SIZES = [1, 5, 20, 50, 100]
+USER_ID = 1
+
+
+def seed(tasks: int) -> None:
+    """Пользователь (английский язык) выполнил все задания"""
+    db = SessionLocal()
+    ru = Language(code="ru", name="Русский")
+    en = Language(code="en", name="English")
+    db.add_all([ru, en])
+    db.flush()
+    categories = []
+    for i in range(4):
+        category = TaskCategory(slug=f"category-{i}", color="#FFC700")
+        db.add(category)
+        db.flush()
+        # У половины категорий нет английского названия - берется slug
+        if i % 2 == 0:
+            db.add(CategoryTranslation(category_id=category.id, language_id=en.id, name=f"Category {i}"))
+        categories.append(category)
+    db.add(User(tg_id=USER_ID, first_name="Check", gender=Gender.MALE, language_id=en.id))
+    for i in range(tasks):
+        task = Task(category_id=categories[i % len(categories)].id, is_active=i % 7 != 0)
+        db.add(task)
+        db.flush()
+        # i % 3: 0 - английский и русский, 1 - только русский (fallback), 2 - у каждого десятого нет перевода
+        if i % 3 == 0:
+            db.add(TaskTranslation(task_id=task.id, language_id=en.id, title=f"Task {i}", description="Description"))
+        if i % 3 != 2 or i % 10 != 2:
+            db.add(TaskTranslation(task_id=task.id, language_id=ru.id, title=f"Задание {i}", description="Описание"))
+        db.add(CompletedTask(user_id=USER_ID, task_id=task.id))
+    db.commit()
+    db.close()
+
+
+async def legacy_history(db, user, limit: int, offset: int) -> list:
+    """Прежняя сборка: выполнения страницей, затем задание и категория по каждой строке"""
+    completed_tasks = (await db.execute(
+        select(CompletedTask)
+        .where(CompletedTask.user_id == user.tg_id)
+        .order_by(CompletedTask.completed_at.desc(), CompletedTask.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )).scalars().all()
+    result = []
+    for ct in completed_tasks:
+        task = await catalog_cache.task(db, ct.task_id, user.language_id)
+        if not task or not task.has_translation:
+            continue
+        category = await catalog_cache.category(db, task.category_id, user.language_id)
+        result.append((task.id, task.title, task.description, category.id, category.name, category.color))
+    return result
+
+
+def as_tuples(tasks) -> list:
+    return [(t.id, t.title, t.description, t.category.id, t.category.name, t.category.color) for t in tasks]
+
+
+async def run(queries: list) -> int:
+    problems = []
+    print(f"{'limit':>6} {'записей':>8} {'SQL offset':>11} {'SQL курсор':>11} {'SQL прежде':>11}")
+    async with AsyncSessionLocal() as db:
+        user = await user_cache.get_by_tg_id(db, USER_ID)
+        counts = set()
+        for limit in PAGE_SIZES:
+            catalog_cache.clear()
+            queries.clear()
+            response = Response()
+            page = await profile_api.get_history(
+                response=response, limit=limit, offset=0, cursor=None, user=user, db=db
+            )
+            offset_queries = len(queries)
+
+            # Вторая страница по курсору (кэш справочников снова пустой)
+            catalog_cache.clear()
+            queries.clear()
+            next_page = await profile_api.get_history(
+                response=Response(), limit=limit, offset=0,
+                cursor=response.headers.get("X-Next-Cursor"), user=user, db=db
+            )
+            cursor_queries = len(queries)
+            counts.update((offset_queries, cursor_queries))
+
+            # Прежняя сборка пропускала задания без перевода после LIMIT,
+            # поэтому сравниваем с ней на запасе строк
+            catalog_cache.clear()
+            queries.clear()
+            legacy = await legacy_history(db, user, limit * 3, 0)
+            legacy_queries = len(queries)
+            if as_tuples(page) + as_tuples(next_page) != legacy[:limit * 2]:
+                problems.append(f"limit={limit}: страницы отличаются от прежней сборки")
+            print(f"{limit:>6} {len(page):>8} {offset_queries:>11} {cursor_queries:>11} {legacy_queries:>11}")
+
+    await async_engine.dispose()
+    print("-" * 60)
+    if len(counts) != 1:
+        problems.append(f"количество запросов зависит от размера страницы: {sorted(counts)}")
+    elif counts != {1}:
+        problems.append(f"запросов на страницу: {counts.pop()}, ожидался 1")
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print("[OK] Один запрос на страницу истории, ответ совпадает с прежним")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка количества запросов истории")
+    parser.add_argument("--tasks", type=int, default=300, help="Количество выполненных заданий")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    seed(args.tasks)
+
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+
+    print("=" * 60)
+    print(f"История: {args.tasks} выполненных заданий, пустой кэш справочников")
+    print("=" * 60)
+    return asyncio.run(run(queries))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Бюджет SQL запросов эндпоинтов и поиск N+1
+
+Создает временную базу и вызывает эндпоинты mini-app через ASGI
+приложение дважды: с пустыми кэшами (справочники и пользователи - первый
+запрос воркера) и с прогретыми. Для каждого вызова проверяется бюджет
+(app.core.query_budget): количество SQL запросов не больше заданного и
+ни один запрос одной формы не повторяется больше MAX_REPEATS раз.
+Бюджеты равны текущему количеству запросов: новый запрос в горячем пути
+или запрос в цикле по строкам ломает проверку (exit 1).
+
+Затем проверяет сам детектор: прежняя сборка истории (задание и
+категория по каждой строке) должна быть отклонена как N+1, а
+MetricsMiddleware с repeat_threshold - сообщить о ней.
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_query_budgets.py
+"""
+import sys
+import os
+import asyncio
+import contextlib
+import io
+import tempfile
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-check-")
+_db_path = os.path.join(_tmp_dir, "check.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from app.core.database import Base, engine, async_engine, SessionLocal, AsyncSessionLocal
+from app.models import *  # Импортируем все модели
+from app.core.metrics import MetricsMiddleware, install_sql_hooks
+from app.core.query_budget import QueryBudgetExceeded, assert_max_queries, count_queries, check_budget, query_budget
+from app.services.catalog_cache import catalog_cache
+from app.services.user_cache import user_cache
+from app.main import app
+from benchmark_task_feed import seed
+
+TASKS = 200
+# Запрос одной формы допускается дважды: снимок пользователя для авторизации
+# и пользователь с интересами для ответа (/profile, /bootstrap с пустым кэшем)
+MAX_REPEATS = 2
+
+# (метод, путь) -> (бюджет с пустыми кэшами, бюджет с прогретыми)
+BUDGETS = {
+    ("GET", "/api/v1/auth/me"): (5, 2),
+    ("GET", "/api/v1/tasks/"): (5, 2),
+    ("GET", "/api/v1/tasks/{task_id}"): (8, 2),
+    ("GET", "/api/v1/tasks/daily-free-count"): (3, 1),
+    ("GET", "/api/v1/profile/"): (7, 2),
+    ("GET", "/api/v1/profile/history"): (3, 1),
+    ("GET", "/api/v1/categories/"): (5, 0),
+    ("GET", "/api/v1/languages/"): (2, 0),
+    ("GET", "/api/v1/payments/balance"): (3, 1),
+    ("GET", "/api/v1/payments/packages"): (1, 0),
+    ("GET", "/api/v1/daily-bonus/status"): (3, 1),
+    ("GET", "/api/v1/bootstrap/"): (10, 5),
+    ("POST", "/api/v1/tasks/{task_id}/complete"): (7, 5),
+    ("POST", "/api/v1/daily-bonus/claim"): (6, 1),  # второй вызов за день - 400 без записи
+}
+
+
+def call(client: TestClient, method: str, path: str, headers: dict, task_ids: list):
+    """GET - всегда первое задание, POST (выполнение) - следующее невыполненное"""
+    task_id = task_ids.pop() if method == "POST" else task_ids[0]
+    return client.request(method, path.replace("{task_id}", str(task_id)), headers=headers)
+
+
+def check_endpoints(client: TestClient, headers: dict, task_ids: list) -> list:
+    problems = []
+    print(f"{'эндпоинт':<42} {'SQL пусто':>10} {'SQL прогрето':>13} {'повторы':>8}")
+    for (method, path), (cold_budget, warm_budget) in BUDGETS.items():
+        counts = []
+        repeats = 0
+        for budget, clear in ((cold_budget, True), (warm_budget, False)):
+            if clear:
+                catalog_cache.clear()
+                user_cache.clear()
+            elif method == "POST":
+                call(client, "GET", "/api/v1/tasks/", headers, task_ids)  # прогрев кэшей перед записью
+            with count_queries() as log:
+                response = call(client, method, path, headers, task_ids)
+            counts.append(log.count)
+            repeats = max(repeats, log.max_repeats)
+            if response.status_code >= 500 or (method == "GET" and response.status_code != 200):
+                problems.append(f"{method} {path}: {response.status_code}")
+            try:
+                check_budget(log, budget, MAX_REPEATS, f"{method} {path} ({'пустые' if clear else 'прогретые'} кэши)")
+            except QueryBudgetExceeded as e:
+                problems.append(str(e))
+        print(f"{method + ' ' + path:<42} {counts[0]:>10} {counts[1]:>13} {repeats:>8}")
+    return problems
+
+
+async def legacy_history(user_id: int) -> None:
+    """Прежняя сборка истории: задание и категория из кэша справочников по каждой строке"""
+    async with AsyncSessionLocal() as db:
+        user = await user_cache.get_by_tg_id(db, user_id)
+        completed = (await db.execute(
+            select(CompletedTask).where(CompletedTask.user_id == user_id).limit(20)
+        )).scalars().all()
+        for ct in completed:
+            task = await catalog_cache.task(db, ct.task_id, user.language_id)
+            await catalog_cache.category(db, task.category_id, user.language_id)
+
+
+async def check_detector(user_id: int) -> list:
+    problems = []
+    catalog_cache.clear()
+
+    # Контекстный менеджер
+    try:
+        with assert_max_queries(max_repeats=MAX_REPEATS, label="прежняя история"):
+            await legacy_history(user_id)
+        problems.append("assert_max_queries не отклонил прежнюю сборку истории (N+1)")
+    except QueryBudgetExceeded as e:
+        print(f"[OK] Найден N+1: {str(e)[:150]}...")
+
+    # Декоратор
+    catalog_cache.clear()
+    try:
+        await query_budget(max_queries=10)(legacy_history)(user_id)
+        problems.append("query_budget не отклонил прежнюю сборку истории")
+    except QueryBudgetExceeded:
+        pass
+    await query_budget(max_queries=10, max_repeats=1)(legacy_history)(user_id)  # кэш прогрет: повторов нет
+
+    # Режим разработки: middleware сообщает о повторах в HTTP запросе
+    async def legacy_app(scope, receive, send):
+        await legacy_history(user_id)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    install_sql_hooks(async_engine.sync_engine)
+    catalog_cache.clear()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        scope = {"type": "http", "method": "GET", "path": "/legacy", "app": app, "headers": []}
+        await MetricsMiddleware(legacy_app, record=False, repeat_threshold=3)(scope, receive, send)
+    if "[N+1] GET" not in output.getvalue():
+        problems.append("MetricsMiddleware не сообщил о повторах запросов")
+    return problems
+
+
+def main():
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user_id = seed(db, TASKS)
+    db.add(CatalogVersion(id=1, version=1))
+    db.commit()
+    # Задания, которые пользователь еще не выполнил (для GET и POST .../complete)
+    completed = {task_id for (task_id,) in db.query(CompletedTask.task_id).filter(CompletedTask.user_id == user_id)}
+    task_ids = [task.id for task in db.query(Task).order_by(Task.id) if task.id not in completed]
+    db.close()
+
+    print("=" * 60)
+    print(f"Бюджет SQL запросов: {TASKS} заданий, повторов формы не больше {MAX_REPEATS}")
+    print("=" * 60)
+
+    with TestClient(app) as client:
+        problems = check_endpoints(client, {"X-Telegram-User-ID": str(user_id)}, task_ids)
+    print("-" * 60)
+    problems += asyncio.run(check_detector(user_id))
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print("[OK] Все эндпоинты укладываются в бюджет SQL запросов, N+1 нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
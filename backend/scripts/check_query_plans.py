@@ -0,0 +1,201 @@
+"""
+Проверка планов запросов (EXPLAIN QUERY PLAN) для запросов сервисов
+
+Создает временную базу миграциями Alembic, заполняет тестовыми данными,
+прогоняет основные сценарии (лента и история с OFFSET и по курсору, задание,
+выполнение, покупка, ежедневный бонус, платежи, мониторинг TON, ежедневный
+сброс) и для каждого
+выполненного SQL запроса проверяет план: полный проход по "горячей" таблице
+без индекса считается ошибкой. sparks.db не затрагивается.
+
+Запуск: python scripts/check_query_plans.py [--tasks 500] [--verbose]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import re
+import sqlite3
+import tempfile
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-plans-")
+_db_path = os.path.join(_tmp_dir, "plans.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+os.environ["TON_WALLET_ADDRESS"] = "EQ-plans-wallet"
+
+# Добавляем путь к приложению
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alembic import command
+from fastapi import Response
+from alembic.config import Config
+from sqlalchemy import event
+from app.core.database import engine, async_engine, SessionLocal, AsyncSessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.task_service import TaskService
+from app.services.user_cache import user_cache
+from app.services.payment_service import PaymentService
+from app.services.ton_api import TonApiClient
+from app.services.ton_monitor import TonPaymentMonitor
+from app.services.daily_service import reset_daily_free_tasks
+from app.utils.cursor import encode_cursor
+from app.api.v1 import tasks as tasks_api, profile as profile_api, daily_bonus as daily_bonus_api
+from benchmark_task_feed import seed
+from fake_tonapi import FakeTonApi
+
+# Таблицы, растущие вместе с пользователями и заданиями: полный проход недопустим
+HOT_TABLES = {
+    "users",
+    "user_categories",
+    "tasks",
+    "task_translations",
+    "task_gender_targets",
+    "completed_tasks",
+    "daily_free_tasks",
+    "daily_bonuses",
+    "transactions",
+}
+
+FULL_SCAN_RE = re.compile(r"^SCAN (\w+)$")
+ALIAS_RE = re.compile(r"\b(\w+) AS (\w+)\b")
+
+
+async def run_scenarios(user_id: int, api: FakeTonApi) -> None:
+    """Основные сценарии API на AsyncSession и фоновые задачи"""
+    async with AsyncSessionLocal() as db:
+        # Снимок пользователя из кэша авторизации - как в зависимостях API
+        user = await user_cache.get_by_tg_id(db, user_id)
+        page = await TaskService.get_tasks_for_user(db, user, limit=20)
+        await TaskService.get_tasks_for_user(db, user, limit=20, category_id=2)
+        # Следующая страница ленты по курсору
+        await TaskService.get_tasks_for_user(db, user, limit=20, cursor=page["next_cursor"])
+        await tasks_api.get_task(task_id=3, user=user, db=db)
+        await TaskService.complete_task(db, user, task_id=3)
+        await TaskService.purchase_extra_task(db, user)
+        await profile_api.get_history(response=Response(), limit=20, offset=0, cursor=None, user=user, db=db)
+        await profile_api.get_history(
+            response=Response(), limit=20, offset=0, cursor=encode_cursor("2100-01-01 00:00:00", 2**31), user=user, db=db
+        )
+        await daily_bonus_api.get_daily_bonus_status(user=user, db=db)
+        await daily_bonus_api.claim_daily_bonus(user=user, db=db)
+        payment = await PaymentService.create_ton_payment(db, user, package_id=1)
+        await PaymentService.check_ton_payment_status(db, payment["transaction_id"], user)
+        await user_cache.get_by_wallet(db, "EQ-plans-check")
+
+        # Платеж попадает в блокчейн - его подтверждает мониторинг
+        transaction = await db.get(Transaction, payment["transaction_id"])
+        transaction.ton_transaction_hash = "plans-check-hash"
+        await db.commit()
+        api.add_transaction(transaction.ton_transaction_hash, transaction.ton_to_address, transaction.ton_amount)
+
+        # Переводы на кошелек: по комментарию и без комментария (по сумме и отправителю)
+        second = await PaymentService.create_ton_payment(db, user, package_id=2)
+        third = await PaymentService.create_ton_payment(db, user, package_id=3)
+        api.add_transaction("plans-check-comment", transaction.ton_to_address, second["ton_amount"], "EQ-plans-check", second["comment"])
+        api.add_transaction("plans-check-amount", transaction.ton_to_address, third["ton_amount"], "EQ-plans-check")
+
+    client = TonApiClient(base_url=api.base_url, max_retries=0)
+    await TonPaymentMonitor(client).run_once()
+    await TonPaymentMonitor(client, mode="account", wallet_address=transaction.ton_to_address).run_once()
+    await client.aclose()
+
+    await reset_daily_free_tasks()
+
+
+def collect_statements(user_id: int) -> list:
+    """Выполнение сценариев с записью всех SQL запросов и их параметров"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+
+    api = FakeTonApi().start()
+    try:
+        asyncio.run(run_scenarios(user_id, api))
+    finally:
+        api.stop()
+
+    return statements
+
+
+def full_scans(conn: sqlite3.Connection, statement: str, parameters) -> tuple:
+    """
+    План запроса и список полных проходов по горячим таблицам
+
+    Returns:
+        (строки плана, таблицы с полным проходом)
+    """
+    aliases = {alias: table for table, alias in ALIAS_RE.findall(statement)}
+    plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())]
+    scans = []
+    for detail in plan:
+        match = FULL_SCAN_RE.match(detail)
+        if match:
+            table = aliases.get(match.group(1), match.group(1))
+            if table in HOT_TABLES:
+                scans.append(table)
+    return plan, scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка планов запросов сервисов")
+    parser.add_argument("--tasks", type=int, default=500, help="Количество заданий в базе")
+    parser.add_argument("--verbose", action="store_true", help="Печатать планы всех запросов")
+    args = parser.parse_args()
+
+    alembic_config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    alembic_config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    command.upgrade(alembic_config, "head")
+
+    db = SessionLocal()
+    user_id = seed(db, args.tasks)
+    user = db.get(User, user_id)
+    user.balance = 100
+    user.wallet_address = "EQ-plans-check"
+    db.commit()
+    db.close()
+
+    statements = collect_statements(user_id)
+
+    print("=" * 60)
+    print(f"Планы запросов: {len(statements)} запросов")
+    print("=" * 60)
+
+    conn = sqlite3.connect(_db_path)
+    failures = 0
+    seen = set()
+    for statement, parameters in statements:
+        if statement in seen:
+            continue
+        seen.add(statement)
+        plan, scans = full_scans(conn, statement, parameters)
+        first_line = " ".join(statement.split())[:100]
+        if scans:
+            failures += 1
+            print(f"[ERROR] Полный проход по {', '.join(sorted(set(scans)))}: {first_line}")
+        elif args.verbose:
+            print(f"[OK] {first_line}")
+        if scans or args.verbose:
+            for detail in plan:
+                print(f"        {detail}")
+    conn.close()
+
+    print("-" * 60)
+    if failures:
+        print(f"[ERROR] Запросов без индекса: {failures} из {len(seen)}")
+        return 1
+    print(f"[OK] Все {len(seen)} уникальных запросов используют индексы")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
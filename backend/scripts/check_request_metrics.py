@@ -0,0 +1,207 @@
+"""
+Проверка метрик запросов (/metrics, Server-Timing, медленные SQL запросы)
+
+Создает временную базу, включает METRICS_ENABLED и METRICS_SERVER_TIMING
+и вызывает эндпоинты через ASGI приложение:
+- количество SQL запросов в Server-Timing и в sparks_db_statements_total
+  совпадает с независимым счетчиком запросов engine
+- маршрут в метках - шаблон пути (/api/v1/tasks/{task_id}), запросы мимо
+  маршрутов - "<unmatched>", статус ответа учитывается
+- медленные запросы попадают в /metrics/slow-queries
+- с METRICS_TOKEN /metrics без токена - 401
+Затем замеряет накладные расходы: обработчики событий SQLAlchemy на
+SQL запрос и middleware на HTTP запрос.
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_request_metrics.py [--repeat 2000]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import re
+import tempfile
+import time
+
+# Временная БД и настройки метрик должны быть заданы до импорта app
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-check-")
+_db_path = os.path.join(_tmp_dir, "check.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+os.environ["METRICS_ENABLED"] = "true"
+os.environ["METRICS_SERVER_TIMING"] = "true"
+os.environ["METRICS_TOKEN"] = "check-token"
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from app.core.database import Base, engine, async_engine, SessionLocal, AsyncSessionLocal
+from app.models import *  # Импортируем все модели
+from app.core import metrics as metrics_module
+from app.core.metrics import metrics, MetricsMiddleware
+from app.main import app
+from benchmark_task_feed import seed
+
+AUTH = {"Authorization": "Bearer check-token"}
+
+
+def metric_value(body: str, name: str, **labels) -> float:
+    """Значение метрики с заданными метками из текста /metrics (0, если нет)"""
+    for line in body.splitlines():
+        if not line.startswith(name + "{"):
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', line[len(name):line.rindex("}") + 1]))
+        if all(found.get(key) == value for key, value in labels.items()):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def check(client: TestClient, headers: dict, task_id: int) -> list:
+    problems = []
+    queries = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    metrics.clear()
+
+    calls = [
+        ("GET", "/api/v1/tasks/", "/api/v1/tasks/", 200),
+        ("GET", f"/api/v1/tasks/{task_id}", "/api/v1/tasks/{task_id}", 200),
+        ("GET", f"/api/v1/tasks/{task_id}", "/api/v1/tasks/{task_id}", 200),
+        ("GET", f"/api/v1/tasks/{10 ** 9}", "/api/v1/tasks/{task_id}", 404),
+        ("GET", "/api/v1/bootstrap/", "/api/v1/bootstrap/", 200),
+        ("GET", "/api/v1/daily-bonus/status", "/api/v1/daily-bonus/status", 200),
+    ]
+    expected = {}
+    for method, url, route, status in calls:
+        queries.clear()
+        response = client.request(method, url, headers=headers)
+        timing = response.headers.get("server-timing", "")
+        match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries", app;dur=[\d.]+', timing)
+        if response.status_code != status or not match:
+            problems.append(f"{url}: {response.status_code}, Server-Timing {timing!r}")
+            continue
+        if int(match.group(1)) != len(queries):
+            problems.append(f"{url}: Server-Timing {match.group(1)} запросов, выполнено {len(queries)}")
+        expected[route] = expected.get(route, 0) + len(queries)
+    event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    client.get("/api/v1/no-such-route", headers=headers)
+
+    if client.get("/metrics").status_code != 401:
+        problems.append("/metrics без токена не отклонен")
+    body = client.get("/metrics", headers=AUTH).text
+    for route, count in expected.items():
+        actual = metric_value(body, "sparks_db_statements_total", method="GET", route=route)
+        if actual != count:
+            problems.append(f"{route}: sparks_db_statements_total {actual}, выполнено {count}")
+    if metric_value(body, "sparks_http_requests_total", method="GET", route="/api/v1/tasks/{task_id}", status="200") != 2:
+        problems.append("ответы 200 /api/v1/tasks/{task_id} не посчитаны")
+    if metric_value(body, "sparks_http_requests_total", method="GET", route="/api/v1/tasks/{task_id}", status="404") != 1:
+        problems.append("ответ 404 /api/v1/tasks/{task_id} не посчитан")
+    if metric_value(body, "sparks_http_requests_total", method="GET", route="<unmatched>", status="404") != 1:
+        problems.append("запрос мимо маршрутов не попал в <unmatched>")
+    if metric_value(body, "sparks_http_request_duration_seconds_count", method="GET", route="/api/v1/tasks/") != 1:
+        problems.append("гистограмма времени ответа не заполнена")
+
+    # Медленные запросы: порог ниже времени любого запроса
+    metrics.slow_query_seconds = 1e-9
+    client.get("/api/v1/tasks/", headers=headers)
+    metrics.slow_query_seconds = 0.1
+    slow = client.get("/metrics/slow-queries", headers=AUTH).json()["queries"]
+    if not slow or slow[0]["route"] != "/api/v1/tasks/" or "SELECT" not in slow[0]["statement"].upper():
+        problems.append(f"медленные запросы не сохранены: {slow[:1]}")
+    return problems
+
+
+async def measure_sql_hooks(repeat: int) -> tuple:
+    """Микросекунд на SELECT 1 без запроса, в HTTP запросе без хуков и с хуками"""
+    async def run() -> float:
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            for _ in range(repeat):
+                await db.execute(text("SELECT 1"))
+            return (time.perf_counter() - started) / repeat * 1e6
+
+    sync_engine = async_engine.sync_engine
+    outside = await run()
+    token = metrics_module._current_request.set(metrics_module.RequestStats())
+    inside = await run()
+    event.remove(sync_engine, "before_cursor_execute", metrics_module._before_cursor_execute)
+    event.remove(sync_engine, "after_cursor_execute", metrics_module._after_cursor_execute)
+    without_hooks = await run()
+    metrics_module.install_sql_hooks(sync_engine)
+    metrics_module._current_request.reset(token)
+    return without_hooks, outside, inside
+
+
+async def measure_middleware(repeat: int) -> tuple:
+    """Микросекунд на ASGI запрос к пустому приложению без middleware и с ним"""
+    async def empty_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "method": "GET", "path": "/", "app": app, "headers": []}
+    results = []
+    for asgi_app in (empty_app, MetricsMiddleware(empty_app, record=True, server_timing=True)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await asgi_app(dict(scope), receive, send)
+        results.append((time.perf_counter() - started) / repeat * 1e6)
+    metrics.clear()
+    return tuple(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка метрик запросов")
+    parser.add_argument("--repeat", type=int, default=2000, help="Повторов на замер накладных расходов")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user_id = seed(db, 40)
+    db.add(CatalogVersion(id=1, version=1))
+    db.commit()
+    task_id = db.query(Task.id).first()[0]
+    db.close()
+
+    print("=" * 60)
+    print("Метрики запросов")
+    print("=" * 60)
+
+    with TestClient(app) as client:
+        problems = check(client, {"X-Telegram-User-ID": str(user_id)}, task_id)
+
+    without_hooks, outside, inside = asyncio.run(measure_sql_hooks(args.repeat))
+    bare, wrapped = asyncio.run(measure_middleware(args.repeat))
+    print(f"{'SELECT 1, мкс':>34}")
+    print(f"{'без хуков':>24} {without_hooks:>9.1f}")
+    print(f"{'хуки вне HTTP запроса':>24} {outside:>9.1f}")
+    print(f"{'хуки в HTTP запросе':>24} {inside:>9.1f}")
+    print(f"{'ASGI запрос, мкс':>34}")
+    print(f"{'без middleware':>24} {bare:>9.1f}")
+    print(f"{'MetricsMiddleware':>24} {wrapped:>9.1f}")
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print("[OK] Server-Timing и /metrics совпадают с выполненными SQL запросами")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
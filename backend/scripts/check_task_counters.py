@@ -0,0 +1,177 @@
+"""
+Проверка счетчиков заданий и баланса под конкурентной нагрузкой
+
+На временной базе запускает сотни параллельных вызовов
+TaskService.complete_task и TaskService.purchase_extra_task (каждый в своей
+AsyncSession, как отдельные запросы API) и проверяет точные значения
+счетчиков: ни одно обновление не потеряно, слоты и баланс не уходят
+в минус, повторное выполнение задания не тратит слот.
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_task_counters.py [--parallel 500]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import date
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-check-")
+_db_path = os.path.join(_tmp_dir, "check.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from sqlalchemy import select, delete, update, func
+from app.core.database import Base, engine, async_engine, SessionLocal, AsyncSessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.task_service import TaskService
+from app.services.user_service import UserService
+from benchmark_task_feed import seed
+
+
+def prepare(user_id: int, balance: int, paid_available: int) -> None:
+    """Исходное состояние: баланс, купленные слоты, нет выполненных заданий и покупок"""
+    db = SessionLocal()
+    db.execute(delete(CompletedTask))
+    db.execute(delete(Transaction))
+    db.execute(update(User).where(User.tg_id == user_id).values(balance=balance))
+    db.execute(
+        update(DailyFreeTask)
+        .where(DailyFreeTask.user_id == user_id, DailyFreeTask.date == date.today())
+        .values(count=0, paid_available=paid_available)
+    )
+    db.commit()
+    db.close()
+
+
+def state(user_id: int) -> dict:
+    """Текущие счетчики пользователя"""
+    db = SessionLocal()
+    daily = db.execute(
+        select(DailyFreeTask).where(DailyFreeTask.user_id == user_id, DailyFreeTask.date == date.today())
+    ).scalar_one()
+    result = {
+        "balance": db.get(User, user_id).balance,
+        "count": daily.count,
+        "paid_available": daily.paid_available,
+        "completed": db.execute(select(func.count(CompletedTask.id))).scalar(),
+        "purchases": db.execute(select(func.count(Transaction.id))).scalar(),
+    }
+    db.close()
+    return result
+
+
+async def fire(calls: list) -> dict:
+    """Параллельный запуск вызовов сервиса, каждый в своей сессии"""
+
+    async def call(method, *args):
+        async with AsyncSessionLocal() as db:
+            user = await UserService.get_user(db, User.tg_id == args[0])
+            return await method(db, user, *args[1:])
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(call(*c) for c in calls), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    errors = [r for r in results if isinstance(r, BaseException)]
+    return {
+        "seconds": elapsed,
+        "success": sum(1 for r in results if isinstance(r, dict) and r["success"]),
+        "errors": errors,
+    }
+
+
+def report(name: str, result: dict, actual: dict, expected: dict) -> int:
+    """Печать результата сценария и сравнение счетчиков с ожидаемыми"""
+    problems = [
+        f"{key}: {actual[key]} (ожидалось {value})"
+        for key, value in expected.items()
+        if actual[key] != value
+    ]
+    if result["errors"]:
+        problems.append(f"исключений: {len(result['errors'])}, первое: {result['errors'][0]!r}")
+    print(f"{name}: {result['success']} успешных за {result['seconds']:.2f} сек, {actual}")
+    for problem in problems:
+        print(f"[ERROR] {name}: {problem}")
+    if not problems:
+        print(f"[OK] {name}: счетчики точные")
+    return len(problems)
+
+
+async def run(args, user_id: int) -> int:
+    parallel = args.parallel
+    failures = 0
+
+    # 1. Выполнения с повторами: уникальных заданий меньше, чем слотов
+    unique = parallel * 4 // 5
+    paid = parallel
+    prepare(user_id, balance=0, paid_available=paid)
+    calls = [(TaskService.complete_task, user_id, task_id) for task_id in range(1, unique + 1)]
+    calls += [(TaskService.complete_task, user_id, task_id) for task_id in range(1, parallel - unique + 1)]
+    result = await fire(calls)
+    failures += report("complete (повторы)", result, state(user_id), {
+        "count": 3,
+        "paid_available": paid - (unique - 3),
+        "completed": unique,
+    })
+    failures += result["success"] != unique
+
+    # 2. Выполнения сверх лимита: слотов меньше, чем заданий
+    paid = parallel // 10
+    prepare(user_id, balance=0, paid_available=paid)
+    calls = [(TaskService.complete_task, user_id, task_id) for task_id in range(1, parallel + 1)]
+    result = await fire(calls)
+    failures += report("complete (лимит)", result, state(user_id), {
+        "count": 3,
+        "paid_available": 0,
+        "completed": 3 + paid,
+    })
+    failures += result["success"] != 3 + paid
+
+    # 3. Покупки: баланса хватает только на часть
+    balance = parallel * 2 + 5
+    prepare(user_id, balance=balance, paid_available=0)
+    calls = [(TaskService.purchase_extra_task, user_id) for _ in range(parallel)]
+    result = await fire(calls)
+    bought = balance // 10
+    failures += report("purchase", result, state(user_id), {
+        "balance": balance - bought * 10,
+        "paid_available": bought,
+        "purchases": bought,
+    })
+    failures += result["success"] != bought
+
+    await async_engine.dispose()
+    print("-" * 60)
+    if failures:
+        print(f"[ERROR] Расхождений: {failures}")
+        return 1
+    print("[OK] Все счетчики совпадают с ожидаемыми")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка счетчиков заданий под конкурентной нагрузкой")
+    parser.add_argument("--parallel", type=int, default=500, help="Параллельных вызовов в сценарии")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    user_id = seed(db, args.parallel)
+    db.close()
+
+    print("=" * 60)
+    print(f"Конкурентные вызовы: {args.parallel} на сценарий")
+    print("=" * 60)
+    return asyncio.run(run(args, user_id))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Проверка хранилищ payload TON Proof и бенчмарк очистки истекших payload
+
+Поднимает локальный фейковый Redis и проверяет:
+- "memory" и "redis": одноразовость, неизвестный payload, истечение срока,
+  одновременное погашение одного payload двумя воркерами (успешен ровно один)
+- "redis": payload, выданный одним воркером, принимается другим
+  (два независимых клиента хранилища, как в двух процессах uvicorn)
+- API: /ton-proof/generate на одном воркере и /ton-proof/check на другом
+  (для memory ожидаемо 401 - так выглядела ошибка при нескольких воркерах)
+- Бенчмарк generate при N живых payload: прежний полный проход по словарю
+  на каждый вызов против кучи сроков истечения
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_ton_proof_store.py [--payloads 100000] [--parallel 200]
+"""
+import sys
+import os
+import argparse
+import asyncio
+import secrets
+import tempfile
+import time
+
+# Временная БД должна быть задана до импорта app.core.database
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-check-")
+_db_path = os.path.join(_tmp_dir, "check.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, os.path.dirname(__file__))
+
+import httpx
+from app.core.database import Base, engine, async_engine
+from app.models import *  # Импортируем все модели
+from app.main import app
+from app.api.v1 import auth
+from app.services.ton_proof_store import MemoryPayloadStore, RedisPayloadStore
+from fake_redis import FakeRedis
+
+
+def legacy_generate(cache: dict, ttl: int) -> str:
+    """Прежний generate: запись в словарь и полный проход по нему в поисках истекших"""
+    payload = secrets.token_hex(32)
+    cache[payload] = {"created_at": time.time(), "ttl": ttl}
+    current_time = time.time()
+    expired_keys = [
+        key for key, value in cache.items()
+        if current_time - value["created_at"] > value["ttl"]
+    ]
+    for key in expired_keys:
+        del cache[key]
+    return payload
+
+
+class Checker:
+    """Сбор результатов проверок"""
+
+    def __init__(self):
+        self.failures = 0
+
+    def check(self, name: str, ok: bool, details: str = "") -> None:
+        if ok:
+            print(f"[OK] {name}")
+        else:
+            self.failures += 1
+            print(f"[ERROR] {name}{': ' + details if details else ''}")
+
+
+async def check_store(checker: Checker, name: str, worker_a, worker_b, parallel: int) -> None:
+    """Одноразовость, истечение и гонка погашения (worker_a выдает, worker_b погашает)"""
+    payload = secrets.token_hex(32)
+    await worker_a.put(payload, 60)
+    checker.check(f"{name}: payload принят другим воркером", await worker_b.pop(payload))
+    checker.check(f"{name}: повторное использование отклонено", not await worker_b.pop(payload))
+    checker.check(f"{name}: неизвестный payload отклонен", not await worker_b.pop(secrets.token_hex(32)))
+
+    payload = secrets.token_hex(32)
+    await worker_a.put(payload, 1)
+    await asyncio.sleep(1.2)
+    checker.check(f"{name}: истекший payload отклонен", not await worker_b.pop(payload))
+
+    payloads = [secrets.token_hex(32) for _ in range(parallel)]
+    for payload in payloads:
+        await worker_a.put(payload, 60)
+    results = await asyncio.gather(*(
+        worker.pop(payload) for payload in payloads for worker in (worker_a, worker_b)
+    ))
+    accepted = sum(results)
+    checker.check(
+        f"{name}: {parallel} payload, по два одновременных check - принято {accepted}",
+        accepted == parallel,
+        f"ожидалось {parallel}"
+    )
+
+
+async def check_api(checker: Checker, name: str, worker_a, worker_b, expected_status: int) -> None:
+    """generate на одном воркере, check на другом через API"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        auth.payload_store = worker_a
+        response = await client.post("/api/v1/auth/ton-proof/generate")
+        payload = response.json()["payload"]
+        auth.payload_store = worker_b
+        body = {
+            "address": "EQ-proof-wallet",
+            "network": "-239",
+            "proof": {"payload": payload, "signature": "sig", "timestamp": int(time.time())},
+        }
+        first = await client.post("/api/v1/auth/ton-proof/check", json=body)
+        second = await client.post("/api/v1/auth/ton-proof/check", json=body)
+    checker.check(
+        f"API {name}: generate и check на разных воркерах -> {first.status_code}, повтор -> {second.status_code}",
+        first.status_code == expected_status and second.status_code == 401,
+        f"ожидалось {expected_status} и 401"
+    )
+
+
+async def benchmark(payloads: int, calls: int) -> None:
+    """Время generate при payloads живых записях"""
+    cache = {}
+    now = time.time()
+    for _ in range(payloads):
+        cache[secrets.token_hex(32)] = {"created_at": now, "ttl": 1200}
+    started = time.perf_counter()
+    for _ in range(calls):
+        legacy_generate(cache, 1200)
+    legacy = (time.perf_counter() - started) / calls
+
+    store = MemoryPayloadStore()
+    for _ in range(payloads):
+        await store.put(secrets.token_hex(32), 1200)
+    started = time.perf_counter()
+    for _ in range(calls):
+        await store.put(secrets.token_hex(32), 1200)
+    heap = (time.perf_counter() - started) / calls
+
+    print(f"{'хранилище':>12} {'живых':>8} {'мкс/generate':>13}")
+    print(f"{'dict+scan':>12} {payloads:>8} {legacy * 1e6:>13.1f}")
+    print(f"{'heap':>12} {payloads:>8} {heap * 1e6:>13.1f}")
+    print(f"heap быстрее прохода по словарю: x{legacy / heap:.0f}")
+
+
+async def run(args, fake: FakeRedis) -> int:
+    checker = Checker()
+
+    memory = MemoryPayloadStore()
+    await check_store(checker, "memory", memory, memory, args.parallel)
+
+    redis_a = RedisPayloadStore(fake.url)
+    redis_b = RedisPayloadStore(fake.url)
+    await check_store(checker, "redis", redis_a, redis_b, args.parallel)
+
+    print("-" * 60)
+    await check_api(checker, "redis", redis_a, redis_b, 200)
+    await check_api(checker, "memory", MemoryPayloadStore(), MemoryPayloadStore(), 401)
+    checker.check(f"redis: все payload погашены, ключей осталось {await redis_a.size()}", await redis_a.size() == 0)
+    await redis_a.close()
+    await redis_b.close()
+    await async_engine.dispose()
+
+    print("-" * 60)
+    await benchmark(args.payloads, args.calls)
+
+    print("-" * 60)
+    print(f"Команд к fake Redis: {fake.commands}")
+    if checker.failures:
+        print(f"[ERROR] Не пройдено проверок: {checker.failures}")
+        return 1
+    print("[OK] Хранилища payload работают корректно")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка хранилищ payload TON Proof")
+    parser.add_argument("--payloads", type=int, default=100_000, help="Живых payload в бенчмарке")
+    parser.add_argument("--calls", type=int, default=200, help="Вызовов generate в бенчмарке")
+    parser.add_argument("--parallel", type=int, default=200, help="Payload в проверке одновременного погашения")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+    fake = FakeRedis().start()
+
+    print("=" * 60)
+    print(f"TON Proof payload: memory и redis ({fake.url})")
+    print("=" * 60)
+    try:
+        return asyncio.run(run(args, fake))
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+Проверка памяти переводов (app/services/translation_memory.py)
+
+Создает временную базу миграциями (включая translation_memory) и переводит
+задания с повторяющимися названиями и описаниями через TranslationService
+с локальным переводчиком-заглушкой вместо MyMemory/Google:
+- одинаковые тексты переводятся один раз, prefetch_tasks загружает память
+  для всей пачки заданий одним запросом;
+- повторный перевод тех же заданий (новый процесс - пустой кэш процесса)
+  не обращается к переводчику и почти мгновенен;
+- текст, отличающийся только пробелами, находится в памяти;
+- переводы хранятся по провайдерам: другой провайдер переводит заново,
+  а цепочка провайдеров берет перевод любого из них;
+- таблица не растет больше max_entries: удаляются давно не использованные;
+- кэш процесса - LRU: вытесняется давно не использованный ключ, а удаление
+  записи из таблицы (админка) видно после local_ttl.
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_translation_memory.py [--tasks 40] [--latency 0.05]
+"""
+import sys
+import os
+import argparse
+import contextlib
+import tempfile
+import threading
+import time
+
+# Временная БД должна быть задана до импорта app
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-check-")
+_db_path = os.path.join(_tmp_dir, "check.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import func
+from app.core.database import SessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.translation_memory import TranslationMemoryCache, memory_key
+from app.services.translation_service import TranslationService
+
+# Повторяющиеся названия и фразы, как в реальных заданиях
+TITLES = ["Комплимент", "Объятия", "Завтрак в постель", "Прогулка", "Сюрприз"]
+PHRASES = ["Сделайте это сегодня вечером.", "Без слов, только действия.", "Пусть это будет неожиданно."]
+
+
+class StubTranslator:
+    """Локальный переводчик с задержкой сети, считает вызовы"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def translate(self, text, source, target):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return "\n".join(f"[{target}] {line}" if line.strip() != "|||" else line for line in text.split("\n"))
+
+
+def create_service(stub: StubTranslator, providers=("stub",), memory: TranslationMemoryCache = None) -> TranslationService:
+    """Сервис с заглушкой под именами providers и отдельной памятью (как в новом процессе)"""
+    service = TranslationService()
+    service.translators = [
+        {"name": provider, "translator": stub, "priority": number, "provider": provider, "max_length": 500}
+        for number, provider in enumerate(providers, 1)
+    ]
+    service.memory = memory or TranslationMemoryCache()
+    return service
+
+
+def alembic_upgrade() -> None:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    command.upgrade(config, "head")
+
+
+def create_tasks(db, count: int) -> list:
+    for language_id, code, name in ((1, "ru", "Русский"), (2, "en", "English"), (3, "es", "Español")):
+        db.add(Language(id=language_id, code=code, name=name, is_active=True))
+    db.add(TaskCategory(id=1, slug="check", color="#FF0000", is_active=True))
+    ids = []
+    for i in range(count):
+        task = Task(category_id=1, is_active=True)
+        db.add(task)
+        db.flush()
+        db.add(TaskTranslation(
+            task_id=task.id,
+            language_id=1,
+            title=TITLES[i % len(TITLES)],
+            description=PHRASES[i % len(PHRASES)]
+        ))
+        ids.append(task.id)
+    db.commit()
+    return ids
+
+
+def translate_all(service: TranslationService, db, task_ids: list) -> float:
+    """Как translate_tasks: prefetch всей пачки, затем перевод по заданию"""
+    db.query(TaskTranslation).filter(TaskTranslation.language_id != 1).delete()
+    db.commit()
+    started = time.perf_counter()
+    # Логи TranslationService не нужны в отчете
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        service.prefetch_tasks(db, task_ids)
+        for task_id in task_ids:
+            service.translate_task(db, task_id, fallback=False)
+        service.memory.flush(force=True)
+    return time.perf_counter() - started
+
+
+def check_translations(db, task_ids: list) -> list:
+    rows = db.query(TaskTranslation).filter(TaskTranslation.language_id != 1).all()
+    if len(rows) != len(task_ids) * 2:
+        return [f"переводов {len(rows)} вместо {len(task_ids) * 2}"]
+    wrong = [row for row in rows if not row.title.startswith("[") or row.title[1:3] not in ("en", "es")]
+    return [f"неверные переводы: {[row.title for row in wrong[:3]]}"] if wrong else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка памяти переводов")
+    parser.add_argument("--tasks", type=int, default=40, help="Заданий")
+    parser.add_argument("--latency", type=float, default=0.05, help="Задержка переводчика (сек)")
+    args = parser.parse_args()
+
+    alembic_upgrade()
+    db = SessionLocal()
+    task_ids = create_tasks(db, args.tasks)
+    problems = []
+    distinct = len({(TITLES[i % len(TITLES)], PHRASES[i % len(PHRASES)]) for i in range(args.tasks)})
+
+    print("=" * 60)
+    print(f"Память переводов: {args.tasks} заданий, {len(TITLES)} названий, {len(PHRASES)} фраз, переводчик {args.latency * 1000:.0f} мс")
+    print("=" * 60)
+
+    # 1. Первый перевод: повторяющиеся тексты переводятся один раз
+    stub = StubTranslator(args.latency)
+    service = create_service(stub)
+    first = translate_all(service, db, task_ids)
+    problems += check_translations(db, task_ids)
+    stored = db.query(func.count(TranslationMemory.id)).scalar()
+    if stored != (len(TITLES) + len(PHRASES)) * 2:
+        problems.append(f"в памяти {stored} переводов вместо {(len(TITLES) + len(PHRASES)) * 2}")
+    if stub.calls > distinct * 2:
+        problems.append(f"первый прогон: {stub.calls} запросов, повторы не взяты из памяти")
+    print(f"первый прогон:   {first:.2f} с, запросов {stub.calls} (без памяти было бы {args.tasks * 2}), {service.memory.format_stats()}")
+
+    # 2. Повторный прогон в "новом процессе": только память в БД
+    stub = StubTranslator(args.latency)
+    service = create_service(stub)
+    second = translate_all(service, db, task_ids)
+    problems += check_translations(db, task_ids)
+    stats = service.memory.stats()
+    print(f"повторный прогон: {second:.2f} с, запросов {stub.calls}, {service.memory.format_stats()}")
+    print("-" * 60)
+    if stub.calls or stats["hit_rate"] < 1:
+        problems.append(f"повторный прогон обращался к переводчику: {stub.calls} запросов, {stats}")
+    elif second / args.tasks > args.latency:
+        problems.append(f"повторный прогон: {second / args.tasks * 1000:.0f} мс на задание - дольше одного запроса к API")
+    else:
+        print(
+            f"[OK] Повторный перевод без запросов к API: {second / args.tasks * 1000:.1f} мс на задание "
+            f"(запрос к API {args.latency * 1000:.0f} мс), попаданий 100%"
+        )
+
+    # 3. Нормализация пробелов
+    stub = StubTranslator(0)
+    service = create_service(stub)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        spaced = service.translate_text(f"  {TITLES[2].replace(' ', '   ')}  ", "ru", "en", fallback=False)
+    if stub.calls or spaced != f"[en] {TITLES[2]}":
+        problems.append(f"текст с лишними пробелами не найден в памяти: {stub.calls} запросов, {spaced!r}")
+    else:
+        print("[OK] Текст с лишними пробелами взят из памяти")
+
+    # 4. Провайдеры
+    stub = StubTranslator(0)
+    service = create_service(stub, providers=("other",))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        service.translate_text(TITLES[1], "ru", "en", fallback=False)
+        service.memory.flush()
+    other_calls = stub.calls
+    stub = StubTranslator(0)
+    service = create_service(stub, providers=("missing", "stub"))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        service.translate_text(TITLES[2], "ru", "es", fallback=False)
+    if other_calls != 1 or stub.calls:
+        problems.append(f"провайдеры: другой провайдер {other_calls} запросов, цепочка {stub.calls} запросов")
+    else:
+        print("[OK] Другой провайдер переводит заново, цепочка берет перевод любого провайдера из памяти")
+
+    # 5. Вытеснение давно не использованных
+    db.expire_all()
+    before = db.query(func.count(TranslationMemory.id)).scalar()
+    limit = before - 5
+    memory = TranslationMemoryCache(max_entries=limit)
+    stub = StubTranslator(0)
+    service = create_service(stub, memory=memory)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        # Последний использованный перевод должен пережить вытеснение
+        time.sleep(0.01)
+        service.translate_text(PHRASES[0], "ru", "en", fallback=False)
+        service.translate_text("Новая фраза", "ru", "en", fallback=False)
+        written, evicted = memory.flush()
+    db.expire_all()
+    after = db.query(func.count(TranslationMemory.id)).scalar()
+    kept = db.query(TranslationMemory).filter(TranslationMemory.source_text.in_([PHRASES[0], "Новая фраза"])).filter(
+        TranslationMemory.target_lang == "en", TranslationMemory.provider == "stub"
+    ).count()
+    if after != limit or evicted != before + 1 - limit or kept != 2:
+        problems.append(f"вытеснение: записей {after} (лимит {limit}), удалено {evicted}, свежих осталось {kept}/2")
+    else:
+        print(f"[OK] Вытеснение: при лимите {limit} удалено {evicted} давно не использованных записей")
+
+    # 6. Кэш процесса: LRU и TTL
+    ttl = 0.2
+    memory = TranslationMemoryCache(max_entries=2, local_ttl=ttl)
+    for title in (TITLES[0], TITLES[1], TITLES[0], TITLES[3]):
+        memory.lookup([title], "ru", "en", ["stub"])
+    lru = [memory_key(title, "ru", "en", "stub") in memory._entries for title in (TITLES[0], TITLES[1], TITLES[3])]
+    db.query(TranslationMemory).filter(TranslationMemory.key == memory_key(TITLES[3], "ru", "en", "stub")).delete()
+    db.commit()
+    cached = memory.lookup([TITLES[3]], "ru", "en", ["stub"])
+    time.sleep(ttl * 1.5)
+    expired = memory.lookup([TITLES[3]], "ru", "en", ["stub"])
+    if lru != [True, False, True] or not cached or expired:
+        problems.append(f"кэш процесса: в LRU {lru} вместо [True, False, True], до TTL {cached}, после TTL {expired}")
+    else:
+        print(f"[OK] Кэш процесса: вытесняется давно не использованный ключ, удаление из таблицы видно через {ttl} с")
+    db.close()
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
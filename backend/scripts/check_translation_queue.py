@@ -0,0 +1,232 @@
+"""
+Проверка очереди автоперевода заданий (app/services/translation_queue.py)
+
+Создает временную базу миграциями (включая translation_jobs), ставит
+задания в очередь и выполняет ее TranslationWorker с локальным
+переводчиком-заглушкой вместо MyMemory/Google:
+- каждое задание переведено на en/es ровно один раз, задачи done;
+- одновременно переводится не больше --concurrency заданий (языки задания
+  переводятся параллельно), а время очереди падает с ростом числа потоков;
+- два воркера (как два процесса) не берут одну задачу дважды;
+- сбой переводчика повторяется, после TRANSLATION_JOB_MAX_ATTEMPTS задача
+  failed с текстом ошибки, частичный перевод не сохраняется;
+- задача running упавшего воркера возвращается в очередь.
+sparks.db не затрагивается.
+
+Запуск: python scripts/check_translation_queue.py [--tasks 8] [--concurrency 4]
+"""
+import sys
+import os
+import argparse
+import contextlib
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+# Временная БД и быстрые повторы должны быть заданы до импорта app
+_tmp_dir = tempfile.mkdtemp(prefix="sparks-check-")
+_db_path = os.path.join(_tmp_dir, "check.db")
+open(_db_path, "w").close()
+os.environ["DATABASE_PATH"] = _db_path
+os.environ["TRANSLATION_JOB_RETRY_BACKOFF"] = "0"
+os.environ["TRANSLATION_JOB_MAX_ATTEMPTS"] = "3"
+os.environ.setdefault("ENABLE_TELEGRAM_BOT", "false")
+
+# Добавляем путь к приложению
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import func
+from app.core.database import SessionLocal
+from app.models import *  # Импортируем все модели
+from app.services.translation_queue import TranslationQueue, TranslationWorker, utcnow
+from app.services.translation_service import TranslationService
+
+TRANSLATE_DELAY = 0.2
+TARGET_LANGUAGES = 2  # en, es - переводятся параллельно внутри задания
+BROKEN_TEXT = "сломанный"  # Переводчик всегда падает на этом тексте
+FLAKY_TEXT = "нестабильный"  # Переводчик падает на первом вызове
+
+
+class StubTranslator:
+    """Локальный переводчик с задержкой сети, считает одновременные вызовы"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+        self.flaky_failed = False
+
+    def translate(self, text, source, target):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(TRANSLATE_DELAY)
+            if BROKEN_TEXT in text:
+                raise ConnectionError("stub translator is down")
+            with self.lock:
+                if FLAKY_TEXT in text and not self.flaky_failed:
+                    self.flaky_failed = True
+                    raise TimeoutError("stub translator timeout")
+            return f"{target}: {text}"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+def service_factory(stub: StubTranslator):
+    def create() -> TranslationService:
+        service = TranslationService()
+        service.translators = [{"name": "Stub", "translator": stub, "priority": 1}]
+        return service
+    return create
+
+
+def alembic_upgrade() -> None:
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "alembic"))
+    command.upgrade(config, "head")
+
+
+def create_tasks(db, titles) -> list:
+    if not db.query(Language).count():
+        for language_id, code, name in ((1, "ru", "Русский"), (2, "en", "English"), (3, "es", "Español")):
+            db.add(Language(id=language_id, code=code, name=name, is_active=True))
+        db.add(TaskCategory(id=1, slug="check", color="#FF0000", is_active=True))
+    ids = []
+    for title in titles:
+        task = Task(category_id=1, is_active=True)
+        db.add(task)
+        db.flush()
+        db.add(TaskTranslation(task_id=task.id, language_id=1, title=title, description=f"{title} - описание"))
+        ids.append(task.id)
+    db.commit()
+    return ids
+
+
+def run_queue(task_ids: list, concurrency: int, workers: int = 1):
+    """Постановка заданий в очередь и выполнение workers воркерами по concurrency потоков"""
+    stub = StubTranslator()
+    db = SessionLocal()
+    for task_id in task_ids:
+        TranslationQueue.enqueue(db, task_id)
+        TranslationQueue.enqueue(db, task_id)  # повторное сохранение в админке - без дубликата
+    db.commit()
+    db.close()
+    pool = [
+        TranslationWorker(concurrency=concurrency, poll_interval=0.01, service_factory=service_factory(stub), log=lambda line: None)
+        for _ in range(workers)
+    ]
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker.run, kwargs={"drain": True}) for worker in pool]
+    # Логи TranslationService и traceback failed задач не нужны в отчете
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return time.perf_counter() - started, stub, pool
+
+
+def check_done(db, task_ids: list) -> list:
+    problems = []
+    jobs = db.query(TranslationJob).filter(TranslationJob.task_id.in_(task_ids)).all()
+    if len(jobs) != len(task_ids) or any(job.status != "done" for job in jobs):
+        statuses = sorted((job.task_id, job.status) for job in jobs)
+        problems.append(f"ожидалась одна задача done на задание, есть {statuses[:5]}")
+    translations = db.query(TaskTranslation.task_id, func.count()).filter(
+        TaskTranslation.task_id.in_(task_ids)
+    ).group_by(TaskTranslation.task_id).all()
+    if sorted(count for _, count in translations) != [3] * len(task_ids):
+        problems.append(f"ожидалось 3 перевода на задание: {translations[:5]}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка очереди автоперевода")
+    parser.add_argument("--tasks", type=int, default=8, help="Заданий в очереди")
+    parser.add_argument("--concurrency", type=int, default=4, help="Потоков воркера")
+    args = parser.parse_args()
+
+    alembic_upgrade()
+    db = SessionLocal()
+    problems = []
+
+    print("=" * 60)
+    print(f"Очередь автоперевода: {args.tasks} заданий, переводчик-заглушка {TRANSLATE_DELAY * 1000:.0f} мс")
+    print("=" * 60)
+
+    # Один поток и concurrency потоков
+    timings = {}
+    for concurrency in (1, args.concurrency):
+        task_ids = create_tasks(db, [f"Задание {concurrency}-{i}" for i in range(args.tasks)])
+        seconds, stub, _ = run_queue(task_ids, concurrency)
+        timings[concurrency] = seconds
+        problems += check_done(db, task_ids)
+        if stub.max_active > concurrency * TARGET_LANGUAGES:
+            problems.append(f"одновременно {stub.max_active} вызовов переводчика при concurrency={concurrency}")
+        print(f"потоков {concurrency}: {seconds:.2f} с, одновременно до {stub.max_active}, вызовов переводчика {stub.calls}")
+    if timings[args.concurrency] > timings[1] / min(args.concurrency, args.tasks) * 1.5:
+        problems.append(f"{args.concurrency} потоков не ускоряют очередь: {timings}")
+
+    # Два воркера с общей очередью
+    task_ids = create_tasks(db, [f"Задание общее-{i}" for i in range(args.tasks)])
+    seconds, stub, pool = run_queue(task_ids, 2, workers=2)
+    problems += check_done(db, task_ids)
+    taken = sum(worker.processed["done"] for worker in pool)
+    if taken != args.tasks:
+        problems.append(f"два воркера выполнили {taken} задач вместо {args.tasks}")
+    print(f"два воркера по 2 потока: {seconds:.2f} с, задач {[w.processed['done'] for w in pool]}")
+    print("-" * 60)
+
+    # Повторы и ошибки
+    flaky, broken = create_tasks(db, [f"Задание {FLAKY_TEXT}", f"Задание {BROKEN_TEXT}"])
+    db.query(TaskTranslation).filter(TaskTranslation.task_id == broken).update({"title": "Задание"})
+    db.commit()
+    _, stub, pool = run_queue([flaky, broken], 2)
+    db.expire_all()
+    flaky_job = db.query(TranslationJob).filter(TranslationJob.task_id == flaky).one()
+    broken_job = db.query(TranslationJob).filter(TranslationJob.task_id == broken).one()
+    broken_translations = db.query(TaskTranslation).filter(TaskTranslation.task_id == broken).count()
+    if (flaky_job.status, flaky_job.attempts, flaky_job.last_error) != ("done", 2, None):
+        problems.append(f"сбой на первой попытке: {flaky_job.status}, попыток {flaky_job.attempts}")
+    else:
+        print("[OK] Сбой переводчика повторен, задача выполнена со 2-й попытки")
+    if broken_job.status != "failed" or broken_job.attempts != 3 or "stub translator is down" not in (broken_job.last_error or ""):
+        problems.append(f"постоянный сбой: {broken_job.status}, попыток {broken_job.attempts}, {broken_job.last_error}")
+    elif broken_translations != 1:
+        problems.append(f"при сбое описания сохранен частичный перевод ({broken_translations} переводов)")
+    else:
+        print(f"[OK] Постоянный сбой: failed после {broken_job.attempts} попыток, {broken_job.last_error}")
+
+    # Брошенная задача упавшего воркера
+    broken_job.status = "running"
+    broken_job.locked_by = "dead-worker"
+    broken_job.locked_at = utcnow() - timedelta(hours=1)
+    db.commit()
+    released = TranslationQueue.release_stale(db)
+    db.refresh(broken_job)
+    if released != 1 or broken_job.status != "pending":
+        problems.append(f"брошенная задача не возвращена в очередь: {released}, {broken_job.status}")
+    else:
+        print("[OK] Задача упавшего воркера возвращена в очередь")
+    print(f"Очередь: {TranslationQueue.stats(db)}")
+    db.close()
+
+    print("-" * 60)
+    for problem in problems:
+        print(f"[ERROR] {problem}")
+    if problems:
+        return 1
+    print(f"[OK] Очередь выполнена без дубликатов, {args.concurrency} потоков быстрее одного в {timings[1] / timings[args.concurrency]:.1f} раза")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
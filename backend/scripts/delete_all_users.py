@@ -1,183 +1,141 @@
 """
 Скрипт для удаления всех пользователей из базы данных
-Запуск: python scripts/delete_all_users.py
+
+Строки удаляются пачками по rowid (app/utils/bulk_delete.py): каждая
+пачка - короткая транзакция, между пачками блокировка записи свободна,
+и API продолжает работать. Размер пачки подстраивается под --max-lock-ms.
+Удаление можно прервать (Ctrl+C) и продолжить повторным запуском.
+
+База - DATABASE_PATH (по умолчанию backend/sparks.db).
+
+Запуск: python scripts/delete_all_users.py --confirm [--batch 5000] [--max-lock-ms 100] [--pause-ms 20]
 """
 import sys
 import os
-from pathlib import Path
+import argparse
 
 # Добавляем путь к приложению
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from sqlalchemy.orm import Session
 from sqlalchemy.exc import OperationalError
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
-from app.models.user import User
-from app.models.daily import CompletedTask, DailyFreeTask, DailyBonus
-from app.models.transaction import Transaction
-from app.models.user import UserCategory
+from app.core.database import engine
+from app.utils.bulk_delete import BulkDeleter, user_tables
 
+TABLE_TITLES = {
+    "users": "Пользователей",
+    "completed_tasks": "Выполненных заданий",
+    "daily_free_tasks": "Записей о бесплатных заданиях",
+    "daily_bonuses": "Ежедневных бонусов",
+    "daily_bonus_streaks": "Серий ежедневных бонусов",
+    "transactions": "Транзакций",
+    "user_categories": "Интересов",
+}
 
-def delete_all_users(confirm: bool = False):
+
+def delete_all_users(deleter: BulkDeleter, confirm: bool = False):
     """Удаление всех пользователей и всех связанных данных"""
-    # Определяем стандартный путь к БД (backend/sparks.db)
-    backend_dir = Path(__file__).parent.parent
-    db_path = backend_dir / "sparks.db"
-    
-    if not db_path.exists():
-        print(f"\n❌ Файл базы данных не найден: {db_path.resolve()}")
+    db_path = engine.url.database
+    if not os.path.exists(db_path):
+        print(f"\n❌ Файл базы данных не найден: {db_path}")
         print(f"   Убедитесь, что база данных создана и инициализирована.")
         print(f"   Для создания БД запустите миграции:")
         print(f"   cd backend && alembic upgrade head")
         return False
-    
-    print(f"📁 Используется база данных: {db_path.resolve()}")
-    
-    # Создаем прямое подключение к БД с правильным путем
-    database_url = f"sqlite:///{db_path.resolve()}"
-    engine = create_engine(
-        database_url,
-        echo=False,
-        connect_args={"check_same_thread": False},
-    )
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    
-    db: Session = SessionLocal()
-    
+
+    print(f"📁 Используется база данных: {db_path}")
+
     try:
-        # Подсчитываем всех пользователей
-        total_users = db.query(User).count()
-        
-        if total_users == 0:
+        tables = [table.name for table in user_tables()] + ["users"]
+        totals = {name: deleter.count(name) for name in tables}
+
+        if not any(totals.values()):
             print("ℹ️  В базе данных нет пользователей")
             return True
-        
-        print(f"📊 Найдено пользователей: {total_users}")
-        
-        # Подсчитываем связанные данные
-        total_completed_tasks = db.query(CompletedTask).count()
-        total_daily_free_tasks = db.query(DailyFreeTask).count()
-        total_daily_bonuses = db.query(DailyBonus).count()
-        total_transactions = db.query(Transaction).count()
-        total_interests = db.query(UserCategory).count()
-        
-        print(f"\n📊 Связанные данные:")
-        print(f"   Выполненных заданий: {total_completed_tasks}")
-        print(f"   Записей о бесплатных заданиях: {total_daily_free_tasks}")
-        print(f"   Ежедневных бонусов: {total_daily_bonuses}")
-        print(f"   Транзакций: {total_transactions}")
-        print(f"   Интересов: {total_interests}")
-        
+
+        print(f"📊 Найдено пользователей: {totals['users']:,}")
+        print(f"\n📊 Связанные данные (включая оставшиеся от прерванного запуска):")
+        for name in tables[:-1]:
+            print(f"   {TABLE_TITLES.get(name, name)}: {totals[name]:,}")
+
         # Подтверждение удаления
         print(f"\n⚠️  ВНИМАНИЕ: Будут удалены ВСЕ пользователи и ВСЕ связанные данные!")
         print(f"   Это действие нельзя отменить!")
-        
+
         if not confirm:
             print(f"\n❓ Для подтверждения удаления всех пользователей")
             print(f"   запустите скрипт с флагом --confirm:")
             print(f"   python scripts/delete_all_users.py --confirm")
             return False
-        
-        # Удаляем все связанные данные
-        print(f"\n🗑️  Удаление связанных данных...")
-        
-        deleted_completed_tasks = 0
-        deleted_daily_free_tasks = 0
-        deleted_daily_bonuses = 0
-        deleted_transactions = 0
-        deleted_interests = 0
-        
-        # Удаляем выполненные задания
-        if total_completed_tasks > 0:
-            deleted_completed_tasks = db.query(CompletedTask).delete()
-            print(f"   ✓ Удалено выполненных заданий: {deleted_completed_tasks}")
-        
-        # Удаляем записи о бесплатных заданиях
-        if total_daily_free_tasks > 0:
-            deleted_daily_free_tasks = db.query(DailyFreeTask).delete()
-            print(f"   ✓ Удалено записей о бесплатных заданиях: {deleted_daily_free_tasks}")
-        
-        # Удаляем ежедневные бонусы
-        if total_daily_bonuses > 0:
-            deleted_daily_bonuses = db.query(DailyBonus).delete()
-            print(f"   ✓ Удалено ежедневных бонусов: {deleted_daily_bonuses}")
-        
-        # Удаляем транзакции
-        if total_transactions > 0:
-            deleted_transactions = db.query(Transaction).delete()
-            print(f"   ✓ Удалено транзакций: {deleted_transactions}")
-        
-        # Удаляем интересы пользователей
-        if total_interests > 0:
-            deleted_interests = db.query(UserCategory).delete()
-            print(f"   ✓ Удалено интересов: {deleted_interests}")
-        
-        # Теперь удаляем всех пользователей
-        print(f"\n🗑️  Удаление всех пользователей...")
-        deleted_users = db.query(User).delete()
-        db.commit()
-        
+
+        print(f"\n🗑️  Удаление пачками по {deleter.batch_size:,} строк (пауза {deleter.pause * 1000:.0f} мс)...")
+        stats = deleter.delete_users()
+
         print(f"\n✅ Успешно удалено:")
-        print(f"   Пользователей: {deleted_users}")
-        print(f"   Выполненных заданий: {deleted_completed_tasks}")
-        print(f"   Записей о бесплатных заданиях: {deleted_daily_free_tasks}")
-        print(f"   Ежедневных бонусов: {deleted_daily_bonuses}")
-        print(f"   Транзакций: {deleted_transactions}")
-        print(f"   Интересов: {deleted_interests}")
-        
+        for name in ["users"] + tables[:-1]:
+            print(f"   {TABLE_TITLES.get(name, name)}: {stats[name].deleted:,}")
+        seconds = sum(s.seconds for s in stats.values())
+        deleted = sum(s.deleted for s in stats.values())
+        print(f"   Всего {deleted:,} строк за {seconds:.1f} с ({deleted / seconds if seconds else 0:,.0f} строк/с)")
+
         return True
-        
+
+    except KeyboardInterrupt:
+        deleted = sum(s.deleted for s in deleter.stats.values())
+        print(f"\n⚠️  Прервано, удалено строк: {deleted:,}")
+        print(f"   Удаленные пачки сохранены. Для продолжения запустите скрипт снова:")
+        print(f"   python scripts/delete_all_users.py --confirm")
+        return False
     except OperationalError as e:
-        db.rollback()
         error_msg = str(e)
         if "unable to open database file" in error_msg.lower():
             print(f"\n❌ Ошибка: Не удалось открыть файл базы данных")
-            print(f"   Путь: {db_path.resolve()}")
+            print(f"   Путь: {db_path}")
             print(f"   Проверьте права доступа к файлу и директории")
         elif "no such table" in error_msg.lower():
             print(f"\n❌ Ошибка: Таблицы в базе данных не найдены")
             print(f"   База данных не инициализирована.")
             print(f"   Для инициализации БД запустите миграции:")
             print(f"   cd backend && alembic upgrade head")
+        elif "locked" in error_msg.lower():
+            print(f"\n❌ Ошибка: База данных занята дольше busy_timeout")
+            print(f"   Удаленные пачки сохранены, запустите скрипт снова")
         else:
             print(f"\n❌ Ошибка подключения к базе данных: {e}")
         import traceback
         traceback.print_exc()
         return False
     except Exception as e:
-        db.rollback()
         print(f"\n❌ Ошибка при удалении пользователей: {e}")
         import traceback
         traceback.print_exc()
         return False
-    finally:
-        db.close()
 
 
 def main():
     """Основная функция"""
-    import sys
-    
-    # Проверяем наличие флага --confirm
-    confirm = '--confirm' in sys.argv or '-c' in sys.argv
-    
+    parser = argparse.ArgumentParser(description="Удаление всех пользователей и их данных пачками")
+    parser.add_argument("--confirm", "-c", action="store_true", help="Подтверждение удаления")
+    parser.add_argument("--batch", type=int, default=5000, help="Начальный размер пачки")
+    parser.add_argument("--max-lock-ms", type=float, default=100, help="Сколько пачка держит блокировку записи")
+    parser.add_argument("--pause-ms", type=float, default=20, help="Пауза между пачками для API")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Удаление всех пользователей из базы данных")
     print("=" * 60)
     print()
-    
-    success = delete_all_users(confirm=confirm)
-    
+
+    deleter = BulkDeleter(engine, batch_size=args.batch, max_lock_ms=args.max_lock_ms, pause_ms=args.pause_ms)
+    success = delete_all_users(deleter, confirm=args.confirm)
+
     print("\n" + "=" * 60)
     if success:
         print("✓ Операция завершена успешно")
     else:
-        print("✗ Операция не выполнена (требуется подтверждение)")
+        print("✗ Операция не выполнена")
     print("=" * 60)
+    return 0 if success else 1
 
 
 if __name__ == "__main__":
-    main()
-
+    sys.exit(main())
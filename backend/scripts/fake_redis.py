@@ -0,0 +1,192 @@
+"""
+Локальный фейковый Redis для проверки общего хранилища payload TON Proof
+
+Минимальный сервер протокола RESP2 в фоновом потоке: PING, SET (EX/PX/NX),
+GET, DEL, EXISTS, TTL, DBSIZE, SCAN (MATCH/COUNT), FLUSHDB, SELECT, CLIENT.
+Ключи с истекшим сроком удаляются при обращении. Считает команды.
+Подходит для redis-py (redis.asyncio) без установленного Redis.
+
+Запуск: python scripts/fake_redis.py [--port 6380]
+Затем в .env: TON_PROOF_STORE=redis и REDIS_URL=redis://127.0.0.1:6380/0
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    # Очередь подключений как у Redis (tcp-backlog 511): клиент открывает
+    # соединение на каждый одновременный запрос
+    request_queue_size = 511
+    allow_reuse_address = True
+
+
+class FakeRedis:
+    """
+    Фейковый Redis в фоновом потоке
+
+    Args:
+        port: Порт (0 - любой свободный)
+    """
+
+    def __init__(self, port: int = 0):
+        # ключ -> (значение, момент истечения по time.monotonic() или None)
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands = 0
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "FakeRedis":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _alive(self, key: bytes, now: float) -> bool:
+        item = self.data.get(key)
+        if item is None:
+            return False
+        if item[1] is not None and item[1] <= now:
+            del self.data[key]
+            return False
+        return True
+
+    def execute(self, args: List[bytes]):
+        """Выполнение команды; возвращает значение для кодирования в RESP"""
+        command = args[0].upper()
+        now = time.monotonic()
+        with self._lock:
+            self.commands += 1
+            if command == b"PING":
+                return "PONG"
+            if command in (b"SELECT", b"CLIENT"):
+                return "OK"
+            if command == b"SET":
+                return self._set(args[1], args[2], args[3:], now)
+            if command == b"GET":
+                return self.data[args[1]][0] if self._alive(args[1], now) else None
+            if command == b"DEL":
+                removed = 0
+                for key in args[1:]:
+                    if self._alive(key, now):
+                        del self.data[key]
+                        removed += 1
+                return removed
+            if command == b"EXISTS":
+                return sum(1 for key in args[1:] if self._alive(key, now))
+            if command == b"TTL":
+                if not self._alive(args[1], now):
+                    return -2
+                expires_at = self.data[args[1]][1]
+                return -1 if expires_at is None else int(expires_at - now + 0.999)
+            if command == b"DBSIZE":
+                return sum(1 for key in list(self.data) if self._alive(key, now))
+            if command == b"SCAN":
+                return self._scan(args[2:], now)
+            if command == b"FLUSHDB":
+                self.data.clear()
+                return "OK"
+        return Exception(f"ERR unknown command '{command.decode()}'")
+
+    def _set(self, key: bytes, value: bytes, options: List[bytes], now: float):
+        expires_at = None
+        nx = False
+        i = 0
+        while i < len(options):
+            option = options[i].upper()
+            if option == b"EX":
+                expires_at = now + int(options[i + 1])
+                i += 1
+            elif option == b"PX":
+                expires_at = now + int(options[i + 1]) / 1000
+                i += 1
+            elif option == b"NX":
+                nx = True
+            i += 1
+        if nx and self._alive(key, now):
+            return None
+        self.data[key] = (value, expires_at)
+        return "OK"
+
+    def _scan(self, options: List[bytes], now: float):
+        # Курсор не поддерживается: все ключи возвращаются за один вызов
+        pattern = "*"
+        for i in range(0, len(options) - 1, 2):
+            if options[i].upper() == b"MATCH":
+                pattern = options[i + 1].decode()
+        keys = [key for key in list(self.data) if self._alive(key, now) and fnmatch.fnmatchcase(key.decode(), pattern)]
+        return [b"0", keys]
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+
+            def _read_command(self) -> Optional[List[bytes]]:
+                line = self.rfile.readline()
+                if not line:
+                    return None
+                if not line.startswith(b"*"):
+                    return line.split()
+                args = []
+                for _ in range(int(line[1:])):
+                    length = int(self.rfile.readline()[1:])
+                    args.append(self.rfile.read(length + 2)[:-2])
+                return args
+
+            def _encode(self, value) -> bytes:
+                if value is None:
+                    return b"$-1\r\n"
+                if isinstance(value, Exception):
+                    return f"-{value}\r\n".encode()
+                if isinstance(value, str):
+                    return f"+{value}\r\n".encode()
+                if isinstance(value, int):
+                    return f":{value}\r\n".encode()
+                if isinstance(value, list):
+                    return f"*{len(value)}\r\n".encode() + b"".join(self._encode(item) for item in value)
+                return b"$%d\r\n%s\r\n" % (len(value), value)
+
+            def handle(self):
+                while True:
+                    args = self._read_command()
+                    if not args:
+                        return
+                    self.wfile.write(self._encode(server.execute(args)))
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковый Redis")
+    parser.add_argument("--port", type=int, default=6380, help="Порт")
+    args = parser.parse_args()
+
+    fake = FakeRedis(port=args.port)
+    print("=" * 60)
+    print(f"Fake Redis: {fake.url}")
+    print("=" * 60)
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fake._server.server_close()
+        print(f"Команд: {fake.commands}")
+
+
+if __name__ == "__main__":
+    main()
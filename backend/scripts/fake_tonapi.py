@@ -0,0 +1,203 @@
+"""
+Локальный фейковый tonapi.io для проверки мониторинга TON платежей
+
+Отвечает на GET /v2/blockchain/transactions/{hash} данными
+зарегистрированных транзакций (404 для неизвестных) и на
+GET /v2/blockchain/accounts/{address}/transactions?after_lt=&limit=&sort_order=
+страницами транзакций кошелька по возрастанию lt (sort_order=desc - последние
+транзакции). Задержка ответа и доля
+ответов 503 настраиваются. Считает запросы и максимальное число
+одновременных запросов. Транзакции регистрируются из кода
+(FakeTonApi.add_transaction) или запросом POST /v2/_fake/transactions
+с JSON {"hash": ..., "to": ..., "amount": ..., "from": ..., "comment": ...}.
+
+Запуск: python scripts/fake_tonapi.py [--port 8081] [--latency 0.1] [--error-rate 0.1]
+Затем в .env: TON_API_URL=http://127.0.0.1:8081/v2
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+TRANSACTIONS_PREFIX = "/v2/blockchain/transactions/"
+ACCOUNTS_PREFIX = "/v2/blockchain/accounts/"
+REGISTER_PATH = "/v2/_fake/transactions"
+
+
+class FakeTonApi:
+    """
+    Фейковый TON API в фоновом потоке
+
+    Args:
+        port: Порт (0 - любой свободный)
+        latency: Задержка ответа (сек)
+        error_rate: Доля ответов 503 (0..1)
+    """
+
+    def __init__(self, port: int = 0, latency: float = 0.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.transactions: Dict[str, Dict] = {}
+        self.accounts: Dict[str, List[Dict]] = {}
+        self._last_lt = 1000
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v2"
+
+    def add_transaction(
+        self,
+        tx_hash: str,
+        to_address: str,
+        amount_nanotons: str,
+        from_address: Optional[str] = None,
+        comment: Optional[str] = None
+    ) -> Dict:
+        """Регистрация входящего перевода в формате ответа tonapi.io"""
+        in_msg = {"value": int(amount_nanotons)}
+        if from_address:
+            in_msg["source"] = {"address": from_address}
+        if comment:
+            in_msg["decoded_op_name"] = "text_comment"
+            in_msg["decoded_body"] = {"text": comment}
+        return self._add({
+            "hash": tx_hash,
+            "account": {"address": to_address},
+            "in_msg": in_msg,
+            "success": True,
+        })
+
+    def add_outgoing(self, tx_hash: str, from_address: str) -> Dict:
+        """Исходящая транзакция кошелька (внешнее сообщение без суммы)"""
+        return self._add({
+            "hash": tx_hash,
+            "account": {"address": from_address},
+            "in_msg": {"value": 0},
+            "success": True,
+        })
+
+    def _add(self, tx: Dict) -> Dict:
+        with self._lock:
+            self._last_lt += 1
+            tx["lt"] = self._last_lt
+            tx.setdefault("utime", int(time.time()))
+            self.transactions[tx["hash"]] = tx
+            self.accounts.setdefault(tx["account"]["address"], []).append(tx)
+        return tx
+
+    def account_page(self, address: str, after_lt: int, limit: int, descending: bool = False) -> List[Dict]:
+        """Транзакции кошелька после after_lt по возрастанию lt (descending - от последней)"""
+        with self._lock:
+            transactions = [tx for tx in self.accounts.get(address, []) if tx["lt"] > after_lt]
+        if descending:
+            transactions.reverse()
+        return transactions[:limit]
+
+    def start(self) -> "FakeTonApi":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _make_handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status: int, payload: Dict) -> None:
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                with api._lock:
+                    api.requests += 1
+                    api.in_flight += 1
+                    api.max_in_flight = max(api.max_in_flight, api.in_flight)
+                try:
+                    if api.latency:
+                        time.sleep(api.latency)
+                    url = urlsplit(self.path)
+                    if not url.path.startswith((TRANSACTIONS_PREFIX, ACCOUNTS_PREFIX)):
+                        self._reply(404, {"error": "not found"})
+                        return
+                    if api.error_rate and random.random() < api.error_rate:
+                        with api._lock:
+                            api.errors += 1
+                        self._reply(503, {"error": "service unavailable"})
+                        return
+                    if url.path.startswith(ACCOUNTS_PREFIX):
+                        address = url.path[len(ACCOUNTS_PREFIX):].split("/")[0]
+                        query = parse_qs(url.query)
+                        after_lt = int(query.get("after_lt", ["0"])[0])
+                        limit = int(query.get("limit", ["100"])[0])
+                        descending = query.get("sort_order", ["asc"])[0] == "desc"
+                        self._reply(200, {"transactions": api.account_page(address, after_lt, limit, descending)})
+                        return
+                    tx = api.transactions.get(url.path[len(TRANSACTIONS_PREFIX):])
+                    if tx is None:
+                        self._reply(404, {"error": "entity not found"})
+                    else:
+                        self._reply(200, tx)
+                finally:
+                    with api._lock:
+                        api.in_flight -= 1
+
+            def do_POST(self):
+                if self.path != REGISTER_PATH:
+                    self._reply(404, {"error": "not found"})
+                    return
+                length = int(self.headers.get("Content-Length") or 0)
+                data = json.loads(self.rfile.read(length) or b"{}")
+                tx = api.add_transaction(data["hash"], data["to"], str(data["amount"]), data.get("from"), data.get("comment"))
+                self._reply(200, {"ok": True, "lt": tx["lt"]})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковый tonapi.io")
+    parser.add_argument("--port", type=int, default=8081, help="Порт")
+    parser.add_argument("--latency", type=float, default=0.1, help="Задержка ответа (сек)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов 503")
+    args = parser.parse_args()
+
+    api = FakeTonApi(port=args.port, latency=args.latency, error_rate=args.error_rate)
+    print("=" * 60)
+    print(f"Fake tonapi: {api.base_url}")
+    print(f"Регистрация транзакций: POST {REGISTER_PATH}")
+    print("=" * 60)
+    try:
+        api._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api._server.server_close()
+        print(f"Запросов: {api.requests}, ошибок 503: {api.errors}")
+
+
+if __name__ == "__main__":
+    main()
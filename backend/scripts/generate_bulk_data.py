@@ -0,0 +1,503 @@
+"""
+Генератор больших синтетических баз для нагрузочного тестирования
+
+Создает новую базу SQLite со схемой приложения (Base.metadata, версия
+alembic - head) и заполняет ее пользователями со всеми зависимыми
+строками. Пользователи делятся на порции по --chunk-users; каждую порцию
+процесс из пула (--workers) генерирует в отдельный файл-шард: таблицы без
+индексов, строки пишутся executemany пачками по --batch одной
+транзакцией. Основной процесс по порядку порций переносит шарды в базу
+одним INSERT ... SELECT на таблицу (без Python на каждую строку) и
+коммитит после каждой порции, пока пул генерирует следующие. На время
+загрузки PRAGMA ослаблены (journal_mode=OFF, synchronous=OFF,
+locking_mode=EXCLUSIVE, foreign_keys=OFF, большой cache_size),
+вторичные индексы удаляются и строятся после загрузки, затем ANALYZE и
+обычный профиль (WAL).
+
+Данные детерминированы: у каталога и у каждой порции свой генератор
+от --seed, поэтому результат не зависит от --workers. Модель данных:
+- пользователи регистрируются все чаще ближе к текущей дате, у каждого
+  1-5 интересов, язык: ru 60%, en 30%, остальные 10%
+- выполнения: 25% пользователей неактивны, у остальных количество по
+  Парето (тяжелый хвост, среднее по всем - около --completions), задания
+  выбираются по популярности (старые задания выполняют чаще), время -
+  после регистрации пользователя и создания задания
+- ежедневные бонусы: --bonus-share пользователей, серии подряд идущих
+  дней с пропусками, день серии как в /daily-bonus/claim, транзакция
+  BONUS на каждый бонус, daily_bonus_streaks по последнему бонусу
+- покупки: --payer-share пользователей покупают пакеты TON (90%
+  completed, 5% failed, 5% pending), часть активных покупает
+  дополнительные задания за искры; баланс = сумма транзакций
+
+Запуск: python scripts/generate_bulk_data.py --database /tmp/bulk.db
+        [--users 1000000] [--tasks 50000] [--completions 20] [--seed 1] [--workers 4]
+Затем в .env: DATABASE_PATH=/tmp/bulk.db
+"""
+import sys
+import os
+import argparse
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from multiprocessing import Pool
+from datetime import datetime, timedelta
+from typing import Dict, List, Sequence, Tuple
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine
+from app.core.database import Base, sqlite_pragma_profile
+from app.models import *  # Импортируем все модели
+from app.api.v1.daily_bonus import BONUS_AMOUNTS
+from app.services.payment_service import PaymentService
+
+LANGUAGES = [("ru", "Русский"), ("en", "English"), ("es", "Español"), ("de", "Deutsch"), ("fr", "Français")]
+LANGUAGE_WEIGHTS = [60, 30, 6, 2, 2]
+CATEGORY_COLORS = ["#FFC700", "#6049EC", "#EB454E"]
+USER_ID_BASE = 10 ** 9  # tg_id пользователей: USER_ID_BASE + номер
+INACTIVE_SHARE = 0.25  # Пользователи без выполненных заданий
+ACTIVITY_ALPHA = 1.6  # Параметр Парето количества выполнений (меньше - тяжелее хвост)
+POPULARITY_SKEW = 2.5  # Насколько старые задания популярнее новых
+EXTRA_TASK_COST = 10
+TARGET_ROWS_PER_SECOND = 500_000
+
+# Вторичные индексы удаляются на время загрузки; UNIQUE ограничения
+# объявлены в CREATE TABLE и остаются, поэтому строки идут в порядке user_id
+LOAD_PRAGMAS = {
+    "journal_mode": "OFF",
+    "synchronous": "OFF",
+    "locking_mode": "EXCLUSIVE",
+    "temp_store": "MEMORY",
+    "foreign_keys": "OFF",
+}
+
+COLUMNS = {
+    "users": ("tg_id", "username", "first_name", "last_name", "gender", "language_id", "is_admin", "balance",
+              "is_active", "wallet_address", "has_lifetime_subscription", "created_at", "updated_at"),
+    "user_categories": ("user_id", "category_id", "created_at"),
+    "completed_tasks": ("user_id", "task_id", "completed_at"),
+    "daily_free_tasks": ("user_id", "date", "count", "paid_available", "last_reset"),
+    "daily_bonuses": ("user_id", "day_number", "bonus_amount", "claimed_at", "date"),
+    "daily_bonus_streaks": ("user_id", "day_number", "last_claim_date", "updated_at"),
+    "transactions": ("user_id", "amount", "transaction_type", "payment_method", "ton_transaction_hash",
+                     "ton_from_address", "ton_to_address", "ton_amount", "status", "description", "created_at"),
+    "languages": ("id", "code", "name", "is_active", "created_at"),
+    "task_categories": ("id", "slug", "color", "is_active", "created_at"),
+    "category_translations": ("category_id", "language_id", "name"),
+    "tasks": ("id", "category_id", "is_active", "created_at"),
+    "task_translations": ("task_id", "language_id", "title", "description"),
+    "task_gender_targets": ("task_id", "gender"),
+}
+
+
+class BulkWriter:
+    """
+    Буферы строк по таблицам и запись executemany пачками
+
+    Args:
+        conn: Соединение sqlite3
+        batch: Строк в одном executemany
+    """
+
+    def __init__(self, conn: sqlite3.Connection, batch: int):
+        self.conn = conn
+        self.batch = batch
+        self.buffers: Dict[str, List[tuple]] = {table: [] for table in COLUMNS}
+        self.sql = {
+            table: f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            for table, columns in COLUMNS.items()
+        }
+        self.counts: Dict[str, int] = {table: 0 for table in COLUMNS}
+
+    def flush(self, table: str) -> None:
+        rows = self.buffers[table]
+        if rows:
+            self.conn.executemany(self.sql[table], rows)
+            self.counts[table] += len(rows)
+            self.buffers[table] = []
+
+    def flush_full(self) -> None:
+        """Запись буферов, в которых набралась пачка"""
+        for table, rows in self.buffers.items():
+            if len(rows) >= self.batch:
+                self.flush(table)
+
+    def close(self) -> None:
+        for table in self.buffers:
+            self.flush(table)
+        self.conn.commit()
+
+
+class Clock:
+    """Предвычисленные строки дат и времени (форматирование на каждую строку - самая дорогая часть)"""
+
+    def __init__(self, days: int, now: datetime):
+        self.now = now
+        self.minutes = days * 24 * 60
+        start = self.now - timedelta(minutes=self.minutes)
+        self.timestamps = [
+            (start + timedelta(minutes=minute)).strftime("%Y-%m-%d %H:%M:%S") for minute in range(self.minutes + 1)
+        ]
+        self.dates = [(start + timedelta(days=day)).strftime("%Y-%m-%d") for day in range(days + 1)]
+
+    def day(self, minute: int) -> int:
+        return minute // (24 * 60)
+
+
+def weighted_cycle(values: Sequence, weights: Sequence[int]) -> list:
+    """Список для rng.choice с заданными целыми весами"""
+    return [value for value, weight in zip(values, weights) for _ in range(weight)]
+
+
+def task_minute(clock: Clock, task_id: int, tasks: int) -> int:
+    """Минута создания задания: задания созданы в первой половине периода, по возрастанию id"""
+    return clock.minutes // 2 * task_id // tasks
+
+
+def generate_catalog(writer: BulkWriter, rng: random.Random, args, clock: Clock) -> None:
+    """Языки, категории с переводами и задания с переводами и целевой аудиторией"""
+    now = clock.timestamps[-1]
+    languages = LANGUAGES[:args.languages]
+    writer.buffers["languages"] = [(i, code, name, 1, now) for i, (code, name) in enumerate(languages, start=1)]
+    writer.buffers["task_categories"] = [
+        (category_id, f"category-{category_id}", CATEGORY_COLORS[category_id % len(CATEGORY_COLORS)], 1, now)
+        for category_id in range(1, args.categories + 1)
+    ]
+    writer.buffers["category_translations"] = [
+        (category_id, language_id, f"{code.upper()} категория {category_id}")
+        for category_id in range(1, args.categories + 1)
+        for language_id, (code, _) in enumerate(languages, start=1)
+    ]
+
+    # Популярность категорий - по Ципфу
+    categories = weighted_cycle(range(1, args.categories + 1), [args.categories * 4 // rank for rank in range(1, args.categories + 1)])
+    genders = ["ALL", "ALL", "MALE", "FEMALE", "COUPLE"]
+    for task_id in range(1, args.tasks + 1):
+        minute = task_minute(clock, task_id, args.tasks)
+        writer.buffers["tasks"].append((task_id, rng.choice(categories), int(rng.random() < 0.97), clock.timestamps[minute]))
+        writer.buffers["task_translations"].append((task_id, 1, f"Задание {task_id}", "Описание задания. " * 6))
+        for language_id in range(2, len(languages) + 1):
+            if rng.random() < args.translated:
+                writer.buffers["task_translations"].append((task_id, language_id, f"Task {task_id}", "Task description. " * 6))
+        first = rng.choice(genders)
+        writer.buffers["task_gender_targets"].append((task_id, first))
+        if first != "ALL" and rng.random() < 0.3:
+            writer.buffers["task_gender_targets"].append((task_id, "COUPLE" if first != "COUPLE" else "FEMALE"))
+        writer.flush_full()
+
+
+def generate_users(writer: BulkWriter, rng: random.Random, args, clock: Clock, numbers: range) -> None:
+    """Пользователи с номерами numbers и все их строки за один проход (строки таблиц идут в порядке user_id)"""
+    buffers = writer.buffers
+    timestamps = clock.timestamps
+    dates = clock.dates
+    total_minutes = clock.minutes
+    today = clock.day(total_minutes)
+    tasks = args.tasks
+    random_ = rng.random
+    randrange = rng.randrange
+    language_ids = weighted_cycle(range(1, args.languages + 1), LANGUAGE_WEIGHTS[:args.languages])
+    category_ids = list(range(1, args.categories + 1))
+    max_interests = min(5, args.categories)
+    genders = ["MALE", "FEMALE", "COUPLE"]
+    packages = PaymentService.get_packages()
+    package_choices = weighted_cycle(packages, [5, 3, 2, 1][:len(packages)])
+    pareto_mean = ACTIVITY_ALPHA / (ACTIVITY_ALPHA - 1)
+    activity_scale = args.completions / ((1 - INACTIVE_SHARE) * pareto_mean)
+    max_completions = max(1, tasks // 2)
+    task_minutes = [task_minute(clock, task_id, tasks) for task_id in range(1, tasks + 1)]
+
+    for number in numbers:
+        user_id = USER_ID_BASE + number
+        # Регистраций больше ближе к текущей дате (плотность растет линейно)
+        created = int(total_minutes * random_() ** 0.5)
+        created_at = timestamps[created]
+        balance = 0
+        lifetime = 0
+
+        for category_id in rng.sample(category_ids, 1 + randrange(max_interests)):
+            buffers["user_categories"].append((user_id, category_id, created_at))
+
+        # Выполненные задания
+        completions = 0
+        if random_() >= INACTIVE_SHARE:
+            completions = min(max_completions, int(activity_scale * rng.paretovariate(ACTIVITY_ALPHA)))
+        if completions:
+            if completions * 4 > tasks:
+                task_ids = [task_id + 1 for task_id in rng.sample(range(tasks), completions)]
+            else:
+                chosen = set()
+                while len(chosen) < completions:
+                    chosen.add(1 + int(tasks * random_() ** POPULARITY_SKEW))
+                task_ids = sorted(chosen)
+            completed = buffers["completed_tasks"]
+            for task_id in task_ids:
+                start = max(created, task_minutes[task_id - 1])
+                completed.append((user_id, task_id, timestamps[start + int((total_minutes - start) * random_())]))
+            # Счетчики бесплатных заданий за последние дни активности
+            for day in rng.sample(range(14), min(completions, 1 + randrange(5))):
+                if today - day >= clock.day(created):
+                    buffers["daily_free_tasks"].append(
+                        (user_id, dates[today - day], 1 + randrange(3), 0, timestamps[total_minutes - day * 1440])
+                    )
+
+        # Ежедневные бонусы: серии дней подряд с пропусками, от последнего бонуса назад
+        if random_() < args.bonus_share:
+            claims = 1 + int(rng.expovariate(1 / 10))
+            day = today - int(rng.expovariate(1 / 2))
+            first_day = clock.day(created)
+            claim_days = []
+            while len(claim_days) < claims and day >= first_day:
+                claim_days.append(day)
+                day -= 1 if random_() < 0.8 else 2 + randrange(5)
+            day_number = 0
+            previous = None
+            for day in reversed(claim_days):
+                # Как /daily-bonus/claim: вчера был бонус - следующий день серии, иначе день 1
+                day_number = day_number % 7 + 1 if previous == day - 1 else 1
+                previous = day
+                amount = BONUS_AMOUNTS.get(day_number, 10)
+                claimed_at = timestamps[min(total_minutes, day * 1440 + randrange(1440))]
+                buffers["daily_bonuses"].append((user_id, day_number, amount, claimed_at, dates[day]))
+                # Транзакция бонуса - как ее пишет /daily-bonus/claim (статус по умолчанию)
+                buffers["transactions"].append(
+                    (user_id, amount, "BONUS", "DAILY_BONUS", None, None, None, None, "PENDING", None, claimed_at)
+                )
+                balance += amount
+            if claim_days:
+                buffers["daily_bonus_streaks"].append((user_id, day_number, dates[previous], timestamps[previous * 1440]))
+
+        # Покупки пакетов через TON
+        if random_() < args.payer_share:
+            for _ in range(1 + int(rng.expovariate(1 / 1.5))):
+                package = rng.choice(package_choices)
+                roll = random_()
+                status = "COMPLETED" if roll < 0.9 else "FAILED" if roll < 0.95 else "PENDING"
+                amount = package["amount"] if isinstance(package["amount"], int) else 0
+                tx_hash = f"{rng.getrandbits(256):064x}" if status == "COMPLETED" else None
+                buffers["transactions"].append((
+                    user_id, amount, "PURCHASE", "TON", tx_hash, None, args.wallet,
+                    str(package["min_ton_amount_nanotons"]), status,
+                    f"Покупка {package['amount']} искр (пакет #{package['id']})",
+                    timestamps[created + int((total_minutes - created) * random_())]
+                ))
+                if status == "COMPLETED":
+                    balance += amount
+                    lifetime |= package["amount"] == "lifetime"
+
+        # Дополнительные задания за искры
+        if completions > 3 and balance >= EXTRA_TASK_COST and random_() < 0.3:
+            for _ in range(1 + randrange(min(5, balance // EXTRA_TASK_COST))):
+                balance -= EXTRA_TASK_COST
+                buffers["transactions"].append((
+                    user_id, -EXTRA_TASK_COST, "PURCHASE", "SYSTEM", None, None, None, None, "COMPLETED",
+                    "Покупка дополнительного задания за 10 искр",
+                    timestamps[created + int((total_minutes - created) * random_())]
+                ))
+
+        buffers["users"].append((
+            user_id, f"user{user_id}" if random_() < 0.7 else None, f"User {number}", None,
+            genders[randrange(3)], rng.choice(language_ids), 0, balance, int(random_() < 0.98),
+            f"EQ{user_id:046x}" if random_() < 0.05 else None, lifetime, created_at, created_at
+        ))
+        if len(buffers["completed_tasks"]) >= writer.batch:
+            writer.flush_full()
+    writer.flush_full()
+
+
+def create_schema(database: str) -> list:
+    """Таблицы приложения и версия alembic; возвращает вторичные индексы (строятся после загрузки)"""
+    engine = create_engine(f"sqlite:///{database}")
+    Base.metadata.create_all(engine)
+    indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+    with engine.begin() as conn:
+        for index in indexes:
+            index.drop(conn)
+    engine.dispose()
+
+    config = Config(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(os.path.dirname(config.config_file_name), "alembic"))
+    head = ScriptDirectory.from_config(config).get_current_head()
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TABLE IF NOT EXISTS alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)")
+    conn.execute("INSERT INTO alembic_version (version_num) VALUES (?)", (head,))
+    conn.execute("INSERT INTO catalog_version (id, version) VALUES (1, 1)")
+    conn.execute("INSERT INTO user_cache_version (id, version) VALUES (1, 1)")
+    conn.commit()
+    conn.close()
+    return indexes
+
+
+def build_indexes(database: str, indexes: list) -> None:
+    engine = create_engine(f"sqlite:///{database}")
+    with engine.begin() as conn:
+        for index in indexes:
+            index.create(conn)
+    engine.dispose()
+
+
+# Таблицы, которые заполняются порциями пользователей (остальные - каталог)
+USER_TABLES = ("users", "user_categories", "completed_tasks", "daily_free_tasks",
+               "daily_bonuses", "daily_bonus_streaks", "transactions")
+
+# Состояние процесса пула (initializer)
+_worker_args = None
+_worker_clock = None
+
+
+def init_worker(args, now: datetime) -> None:
+    global _worker_args, _worker_clock
+    _worker_args = args
+    _worker_clock = Clock(args.days, now)
+
+
+def generate_shard(chunk: int) -> Tuple[int, str]:
+    """
+    Генерация порции пользователей в файл-шард
+
+    Args:
+        chunk: Номер порции (пользователи chunk * --chunk-users ...)
+
+    Returns:
+        (номер порции, путь к шарду)
+    """
+    args = _worker_args
+    path = os.path.join(args.shard_dir, f"shard-{chunk}.db")
+    conn = sqlite3.connect(path)
+    for name, value in LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    for table in USER_TABLES:
+        conn.execute(f"CREATE TABLE {table} ({', '.join(COLUMNS[table])})")
+    writer = BulkWriter(conn, args.batch)
+    first = chunk * args.chunk_users
+    numbers = range(first, min(args.users, first + args.chunk_users))
+    generate_users(writer, random.Random(f"{args.seed}:users:{chunk}"), args, _worker_clock, numbers)
+    writer.close()
+    conn.close()
+    return chunk, path
+
+
+def merge_shard(conn: sqlite3.Connection, path: str, counts: Dict[str, int]) -> int:
+    """Перенос шарда в базу (INSERT ... SELECT на таблицу, одна транзакция); возвращает число строк"""
+    conn.execute("ATTACH DATABASE ? AS shard", (path,))
+    rows = 0
+    for table in USER_TABLES:
+        columns = ", ".join(COLUMNS[table])
+        inserted = conn.execute(f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM shard.{table}").rowcount
+        counts[table] = counts.get(table, 0) + inserted
+        rows += inserted
+    conn.commit()
+    conn.execute("DETACH DATABASE shard")
+    os.remove(path)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор больших синтетических баз")
+    parser.add_argument("--database", required=True, help="Путь к новой базе SQLite")
+    parser.add_argument("--force", action="store_true", help="Перезаписать существующий файл")
+    parser.add_argument("--users", type=int, default=100_000, help="Пользователей")
+    parser.add_argument("--tasks", type=int, default=5_000, help="Заданий")
+    parser.add_argument("--categories", type=int, default=12, help="Категорий")
+    parser.add_argument("--languages", type=int, default=3, choices=range(1, len(LANGUAGES) + 1), help="Языков")
+    parser.add_argument("--translated", type=float, default=0.7, help="Доля заданий с переводом на каждый язык кроме ru")
+    parser.add_argument("--completions", type=float, default=20, help="Выполненных заданий на пользователя в среднем")
+    parser.add_argument("--bonus-share", type=float, default=0.3, help="Доля пользователей, получающих ежедневные бонусы")
+    parser.add_argument("--payer-share", type=float, default=0.08, help="Доля пользователей с покупками TON")
+    parser.add_argument("--days", type=int, default=180, help="Период истории (дней)")
+    parser.add_argument("--wallet", default="EQ" + "A" * 46, help="Кошелек приема платежей (ton_to_address)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed генератора")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Процессов генерации")
+    parser.add_argument("--chunk-users", type=int, default=20_000, help="Пользователей в порции (одна транзакция переноса)")
+    parser.add_argument("--batch", type=int, default=50_000, help="Строк в одном executemany")
+    parser.add_argument("--cache-mb", type=int, default=512, help="cache_size SQLite на время загрузки (МБ)")
+    args = parser.parse_args()
+
+    database = os.path.abspath(args.database)
+    if os.path.exists(database):
+        if not args.force:
+            print(f"[ERROR] {database} уже существует (--force, чтобы перезаписать)")
+            return 1
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(database + suffix):
+                os.remove(database + suffix)
+
+    print("=" * 60)
+    print(f"Генерация базы: {args.users:,} пользователей, {args.tasks:,} заданий, "
+          f"~{args.completions:g} выполнений на пользователя, seed {args.seed}, {args.workers} процессов")
+    print(f"Файл: {database}")
+    print("=" * 60)
+
+    started = time.perf_counter()
+    indexes = create_schema(database)
+    now = datetime.utcnow().replace(second=0, microsecond=0)
+    args.shard_dir = tempfile.mkdtemp(prefix="sparks-shards-", dir=os.path.dirname(database))
+
+    conn = sqlite3.connect(database)
+    for name, value in LOAD_PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    conn.execute(f"PRAGMA cache_size=-{args.cache_mb * 1024}")
+
+    load_started = time.perf_counter()
+    writer = BulkWriter(conn, args.batch)
+    generate_catalog(writer, random.Random(f"{args.seed}:catalog"), args, Clock(args.days, now))
+    writer.close()
+    counts = dict(writer.counts)
+    rows = sum(counts.values())
+
+    chunks = range((args.users + args.chunk_users - 1) // args.chunk_users)
+    try:
+        if args.workers > 1:
+            pool = Pool(args.workers, initializer=init_worker, initargs=(args, now))
+            shards = pool.imap(generate_shard, chunks)
+        else:
+            pool = None
+            init_worker(args, now)
+            shards = map(generate_shard, chunks)
+        # Порции переносятся по порядку, пока пул генерирует следующие
+        for chunk, path in shards:
+            rows += merge_shard(conn, path, counts)
+            elapsed = time.perf_counter() - load_started
+            print(f"  порция {chunk + 1}/{len(chunks)}  {rows:>12,} строк  {elapsed:>7.1f} с  "
+                  f"{rows / elapsed:>10,.0f} строк/с", flush=True)
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        shutil.rmtree(args.shard_dir, ignore_errors=True)
+    load_seconds = time.perf_counter() - load_started
+    conn.close()
+
+    print("-" * 60)
+    print(f"Индексы ({len(indexes)}) и ANALYZE...", flush=True)
+    index_started = time.perf_counter()
+    build_indexes(database, indexes)
+    conn = sqlite3.connect(database)
+    conn.execute("ANALYZE")
+    # Обычный профиль приложения (WAL) для дальнейшей работы с базой
+    conn.execute(f"PRAGMA journal_mode={sqlite_pragma_profile().get('journal_mode', 'DELETE')}")
+    conn.close()
+    index_seconds = time.perf_counter() - index_started
+    total_seconds = time.perf_counter() - started
+
+    print("-" * 60)
+    for table, count in sorted(counts.items(), key=lambda item: -item[1]):
+        print(f"{table:<24} {count:>14,}")
+    load_rate = rows / load_seconds
+    print("-" * 60)
+    print(f"Загрузка: {rows:,} строк за {load_seconds:.1f} с ({load_rate:,.0f} строк/с)")
+    print(f"Индексы и ANALYZE: {index_seconds:.1f} с, всего {total_seconds:.1f} с "
+          f"({rows / total_seconds:,.0f} строк/с), {os.path.getsize(database) / 2 ** 20:,.0f} МБ")
+    if load_rate < TARGET_ROWS_PER_SECOND:
+        print(f"[WARN] Скорость загрузки ниже {TARGET_ROWS_PER_SECOND:,} строк/с (процессов: {args.workers})")
+    print(f"[OK] База готова: DATABASE_PATH={database}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Воркер очереди автоперевода заданий (app/services/translation_queue.py)
+
+Выполняет задачи translation_jobs, которые ставит админка при сохранении
+задания: до --concurrency заданий одновременно, с повторами и статусом,
+видным в админке ("Задачи перевода"). Можно запустить несколько процессов -
+задача достается только одному. Останавливается по Ctrl+C / SIGTERM после
+текущих переводов.
+
+Запуск: python scripts/translation_worker.py [--concurrency 2] [--once]
+"""
+import sys
+import os
+import argparse
+import signal
+
+# Добавляем путь к приложению
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.translation_memory import get_translation_memory
+from app.services.translation_queue import TranslationQueue, TranslationWorker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воркер очереди автоперевода заданий")
+    parser.add_argument("--concurrency", type=int, default=settings.TRANSLATION_WORKER_CONCURRENCY, help="Заданий одновременно")
+    parser.add_argument("--poll", type=float, default=settings.TRANSLATION_WORKER_POLL_INTERVAL, help="Проверка пустой очереди (сек)")
+    parser.add_argument("--once", action="store_true", help="Выполнить готовые задачи и выйти")
+    args = parser.parse_args()
+
+    worker = TranslationWorker(concurrency=args.concurrency, poll_interval=args.poll)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+
+    db = SessionLocal()
+    try:
+        stats = TranslationQueue.stats(db)
+    finally:
+        db.close()
+    print("=" * 60)
+    print(f"Воркер переводов {worker.name}: потоков {worker.concurrency}")
+    print(f"Очередь: {', '.join(f'{status} {count}' for status, count in stats.items())}")
+    print("=" * 60)
+
+    processed = worker.run(drain=args.once)
+
+    print("-" * 60)
+    print(f"Выполнено: {processed['done']}, отложено на повтор: {processed['retry']}, ошибок: {processed['failed']}")
+    memory = get_translation_memory()
+    if memory is not None:
+        print(f"Память переводов: {memory.format_stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
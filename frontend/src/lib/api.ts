@@ -76,6 +76,12 @@ apiClient.interceptors.request.use(
       config.headers['X-Telegram-User-ID'] = DEFAULT_TG_ID;
     }
 
+    // Подписанный initData: бэкенд проверяет по нему tg_id
+    const tgInitData = typeof window !== 'undefined' ? window.Telegram?.WebApp?.initData : undefined;
+    if (tgInitData) {
+      config.headers['X-Telegram-Init-Data'] = tgInitData;
+    }
+
     // Добавляем username из Telegram WebApp
     if (tgUsername) {
       config.headers['X-Telegram-Username'] = tgUsername;
@@ -5,6 +5,7 @@ declare global {
       WebApp: {
         ready: () => void;
         expand: () => void;
+        initData?: string;
         initDataUnsafe?: {
           user?: {
             id: number;